@@ -0,0 +1,124 @@
+"""Lookup latency on the audit tables before and after the v2 indexes.
+
+Builds a throwaway database with ``--rows`` requests (each with one action,
+one policy decision and one execution result), then times the store's hot
+lookups with only the v1 schema applied and again after migration v2.
+
+    python benchmarks/bench_audit_lookups.py --rows 1000000
+
+Usage outside the test suite only; it needs a few hundred MB of temp disk
+at 1M rows. Reference run (1M requests, 10 repeats, local NVMe):
+
+    lookup                           v1 (ms)     v2 (ms)   speedup
+    get_recent_context               307.564       0.030    10116x
+    get_actions_for_request           54.062       0.020     2766x
+    get_execution                     51.906       0.015     3523x
+    policy_decisions by action        44.316       0.012     3837x
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from agentic.memory.migrations import MIGRATIONS
+
+QUERIES: dict[str, str] = {
+    "get_recent_context": (
+        "SELECT id, raw_query, intent_type, confidence, created_at "
+        "FROM requests ORDER BY created_at DESC LIMIT 10"
+    ),
+    "get_actions_for_request": (
+        "SELECT id, request_id, action_type, description, command, risk_level, approved "
+        "FROM actions WHERE request_id = ?"
+    ),
+    "get_execution": (
+        "SELECT id, action_id, success, output, error, rolled_back, executed_at "
+        "FROM execution_results WHERE action_id = ?"
+    ),
+    "policy_decisions by action": (
+        "SELECT id, risk_level, approved FROM policy_decisions WHERE action_id = ?"
+    ),
+}
+
+
+def populate(conn: sqlite3.Connection, rows: int) -> None:
+    for sql in MIGRATIONS[0].statements:
+        conn.execute(sql)
+    base = 1_700_000_000
+    chunk = 50_000
+    for start in range(0, rows, chunk):
+        ids = range(start, min(start + chunk, rows))
+        conn.executemany(
+            "INSERT INTO requests VALUES (?, ?, 'FOCUS', 0.9, ?)",
+            (
+                (
+                    f"r{i:08d}",
+                    f"query {i}",
+                    time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(base + i)),
+                )
+                for i in ids
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO actions VALUES (?, ?, 'SUSPEND_PROCESS', 'Suspend', 'kill -STOP 1', 2, 1)",
+            ((f"a{i:08d}", f"r{i:08d}") for i in ids),
+        )
+        conn.executemany(
+            "INSERT INTO policy_decisions (action_id, risk_level, approved) VALUES (?, 2, 1)",
+            ((f"a{i:08d}",) for i in ids),
+        )
+        conn.executemany(
+            "INSERT INTO execution_results VALUES (?, ?, 1, 'ok', '', 0, '2025-01-01T00:00:00')",
+            ((f"e{i:08d}", f"a{i:08d}") for i in ids),
+        )
+        conn.commit()
+
+
+def time_queries(conn: sqlite3.Connection, rows: int, repeats: int) -> dict[str, float]:
+    rng = random.Random(0)
+    results: dict[str, float] = {}
+    for name, sql in QUERIES.items():
+        takes_id = "?" in sql
+        prefix = "r" if "request_id" in sql else "a"
+        start = time.perf_counter()
+        for _ in range(repeats):
+            params = (f"{prefix}{rng.randrange(rows):08d}",) if takes_id else ()
+            conn.execute(sql, params).fetchall()
+        results[name] = (time.perf_counter() - start) / repeats * 1000
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "bench.db")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        print(f"populating {args.rows:,} requests ...")
+        populate(conn, args.rows)
+
+        before = time_queries(conn, args.rows, args.repeats)
+        for sql in MIGRATIONS[1].statements:
+            conn.execute(sql)
+        conn.commit()
+        after = time_queries(conn, args.rows, args.repeats)
+        conn.close()
+
+    print(f"{'lookup':<28}{'v1 (ms)':>12}{'v2 (ms)':>12}{'speedup':>10}")
+    for name in QUERIES:
+        print(
+            f"{name:<28}{before[name]:>12.3f}{after[name]:>12.3f}{before[name] / after[name]:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
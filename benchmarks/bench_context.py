@@ -0,0 +1,83 @@
+"""``ContextRetriever.format_context`` latency on the pipeline hot path.
+
+Logs ``--rows`` requests through a file-backed store, then times context
+lookups for a repeated query with the caches disabled (every call searches
+the index and reads the hits from SQLite), with only the recent-request
+buffer, and with the formatted-context cache as well.
+
+    python benchmarks/bench_context.py --rows 5000
+
+Reference run (5000 requests, single core):
+
+    no caches                       0.2492 ms
+    recent buffer                   0.2538 ms
+    recent buffer + context         0.0003 ms
+
+The buffer only saves the SQLite read when the hits are recent requests;
+here they are spread over the whole log, so the vector search dominates.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from agentic.memory.context import ContextRetriever
+from agentic.memory.models import RequestRecord
+from agentic.memory.store import MemoryStore
+
+SERVICES = [
+    "nginx",
+    "postgres",
+    "docker",
+    "redis",
+    "cron",
+    "sshd",
+    "apache2",
+    "haproxy",
+]
+QUERY = "restart nginx please"
+
+
+async def time_lookups(path: Path, rows: int, repeats: int) -> None:
+    configs = [
+        ("no caches", 0, 0),
+        ("recent buffer", 256, 0),
+        ("recent buffer + context", 256, 128),
+    ]
+    for label, recent, context in configs:
+        store = MemoryStore(path / f"{label}.db", recent_cache_size=recent)
+        await store.initialize()
+        for i in range(rows):
+            await store.log_request(
+                RequestRecord(
+                    id=f"r{i}",
+                    raw_query=f"restart {SERVICES[i % len(SERVICES)]} {i}",
+                    intent_type="NETWORK",
+                    confidence=0.9,
+                )
+            )
+        await store.flush()
+        retriever = ContextRetriever(store, cache_size=context)
+        await retriever.format_context(QUERY)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            await retriever.format_context(QUERY)
+        print(f"{label:<28}{(time.perf_counter() - start) / repeats * 1000:>10.4f} ms")
+        await store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(time_lookups(Path(tmp), args.rows, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Decode throughput for audit reads: pydantic records vs ``__slots__`` rows.
+
+Fetches ``--rows`` request tuples once from an in-memory database, then
+times turning them into validated ``RequestRecord`` objects (the path every
+``get_*`` method used to take), into ``RequestRow`` objects, and into rows
+that are then read including the lazily decoded timestamp.
+
+    python benchmarks/bench_row_decode.py --rows 100000
+
+Reference run (100k rows, best of 5, Python 3.11, single core):
+
+    decode                            ms    rows/s
+    RequestRecord (validated)      127.1      787k
+    RequestRow                      13.0     7678k
+    RequestRow + created_at         31.5     3177k
+    RequestRow.to_record()         149.5      669k
+
+Rows are ~10x cheaper to build and ~4x even when every timestamp is read;
+converting to a record costs about what validating directly does, so the
+``get_*`` API paths are unchanged while bulk readers skip pydantic entirely.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+from agentic.memory.migrations import MIGRATIONS
+from agentic.memory.models import RequestRecord
+from agentic.memory.rows import RequestRow
+
+SQL = "SELECT id, raw_query, intent_type, confidence, created_at FROM requests"
+
+
+def fetch(rows: int) -> list[tuple]:
+    conn = sqlite3.connect(":memory:")
+    for sql in MIGRATIONS[0].statements:
+        conn.execute(sql)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    conn.executemany(
+        "INSERT INTO requests VALUES (?, ?, 'FOCUS', 0.9, ?)",
+        (
+            (f"r{i:08d}", f"query {i}", (base + timedelta(seconds=i)).isoformat())
+            for i in range(rows)
+        ),
+    )
+    result = conn.execute(SQL).fetchall()
+    conn.close()
+    return result
+
+
+def validated(data: list[tuple]) -> None:
+    for r in data:
+        RequestRecord(
+            id=r[0], raw_query=r[1], intent_type=r[2], confidence=r[3], created_at=r[4]
+        )
+
+
+def slots(data: list[tuple]) -> None:
+    for r in data:
+        RequestRow(*r)
+
+
+def slots_with_timestamp(data: list[tuple]) -> None:
+    for r in data:
+        RequestRow(*r).created_at
+
+
+def slots_to_record(data: list[tuple]) -> None:
+    for r in data:
+        RequestRow(*r).to_record()
+
+
+CASES = {
+    "RequestRecord (validated)": validated,
+    "RequestRow": slots,
+    "RequestRow + created_at": slots_with_timestamp,
+    "RequestRow.to_record()": slots_to_record,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    data = fetch(args.rows)
+    print(f"{'decode':<28}{'ms':>10}{'rows/s':>10}")
+    for name, decode in CASES.items():
+        best = float("inf")
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            decode(data)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<28}{best * 1000:>10.1f}{args.rows / best / 1000:>9.0f}k")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Top-k history search latency over an in-memory ``VectorIndex``.
+
+Embeds ``--rows`` synthetic requests with ``HashingEmbedder``, round-trips
+them through the int8 storage encoding, and times ``VectorIndex.search``
+plus query embedding.
+
+    python benchmarks/bench_similarity_search.py --rows 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from agentic.memory.embeddings import HashingEmbedder, VectorIndex
+
+VERBS = ["restart", "stop", "start", "suspend", "kill", "upgrade", "install", "check"]
+NOUNS = [
+    "nginx",
+    "spotify",
+    "firefox",
+    "postgres",
+    "docker",
+    "slack",
+    "memory",
+    "disk",
+    "packages",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    embedder = HashingEmbedder(dim=args.dim)
+    texts = [f"{rng.choice(VERBS)} {rng.choice(NOUNS)} {i}" for i in range(args.rows)]
+
+    start = time.perf_counter()
+    blobs = [embedder.quantize(embedder.embed(t)) for t in texts]
+    embed_s = time.perf_counter() - start
+
+    index = VectorIndex(args.dim, capacity=args.rows)
+    start = time.perf_counter()
+    index.add([str(i) for i in range(args.rows)], embedder.dequantize(blobs))
+    load_s = time.perf_counter() - start
+
+    queries = [f"{rng.choice(VERBS)} {rng.choice(NOUNS)}" for _ in range(args.repeats)]
+    start = time.perf_counter()
+    for q in queries:
+        index.search(embedder.embed(q), args.k)
+    search_ms = (time.perf_counter() - start) / args.repeats * 1000
+
+    print(f"rows={args.rows:,} dim={args.dim} k={args.k}")
+    print(f"embed+quantize: {embed_s / args.rows * 1e6:.1f} us/row")
+    print(f"load into index: {load_s * 1000:.1f} ms")
+    print(f"search (incl. query embed): {search_ms:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""``MemoryStore.search_text`` latency on a large audit database.
+
+Builds a throwaway database at the current schema with ``--rows`` requests
+and one action per request (the FTS5 triggers index both while loading),
+then times BM25-ranked searches through the store.
+
+    python benchmarks/bench_text_search.py --rows 2000000
+
+Reference run (2M requests + 2M actions, single core):
+
+    'nginx'                            14.41 ms
+    'restart haproxy'                  34.90 ms
+    'postgres stop'                    35.07 ms
+    'red*'                             38.96 ms
+    'when did we restart nginx'         0.50 ms
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from agentic.memory.migrations import MIGRATIONS
+from agentic.memory.store import MemoryStore
+
+SERVICES = [
+    "nginx",
+    "postgres",
+    "docker",
+    "redis",
+    "cron",
+    "sshd",
+    "apache2",
+    "haproxy",
+]
+VERBS = ["restart", "stop", "start", "reload", "check"]
+SEARCHES = [
+    "nginx",
+    "restart haproxy",
+    "postgres stop",
+    "red*",
+    "when did we restart nginx",
+]
+
+
+def populate(path: Path, rows: int) -> None:
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE schema_version (version INTEGER PRIMARY KEY, description TEXT NOT NULL, "
+        "applied_at TEXT NOT NULL)"
+    )
+    for m in MIGRATIONS:
+        for sql in m.statements:
+            conn.execute(sql)
+        conn.execute(
+            "INSERT INTO schema_version VALUES (?, ?, '')", (m.version, m.description)
+        )
+    conn.commit()
+    chunk = 50_000
+    for start in range(0, rows, chunk):
+        batch = []
+        for i in range(start, min(start + chunk, rows)):
+            verb, service = rng.choice(VERBS), rng.choice(SERVICES)
+            batch.append((i, verb, service))
+        conn.executemany(
+            "INSERT INTO requests (id, raw_query, intent_type, confidence, created_at) "
+            "VALUES ('r' || ?, ? || ' ' || ? || ' please', 'NETWORK', 0.9, '2025-01-01')",
+            batch,
+        )
+        conn.executemany(
+            "INSERT INTO actions (id, request_id, action_type, description, command) "
+            "VALUES ('a' || ?1, 'r' || ?1, 'SYSTEMCTL_RESTART', ?2 || ' service: ' || ?3, "
+            "'systemctl ' || ?2 || ' ' || ?3)",
+            batch,
+        )
+        conn.commit()
+    conn.close()
+
+
+async def time_searches(path: Path, repeats: int) -> None:
+    store = MemoryStore(path)
+    await store.initialize()
+    for query in SEARCHES:
+        await store.search_text(query)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            await store.search_text(query, limit=20)
+        print(
+            f"{query!r:<30}{(time.perf_counter() - start) / repeats * 1000:>10.2f} ms"
+        )
+    await store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        print(f"populating {args.rows:,} requests + {args.rows:,} actions ...")
+        populate(path, args.rows)
+        asyncio.run(time_searches(path, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,25 @@
 from __future__ import annotations
 
 import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Optional
 
 import psutil
 import typer
 from rich.console import Console
+from rich.markup import escape
 
 from agentic.cli.output import (
     print_action_plan,
+    print_denials,
     print_error,
     print_history,
     print_info,
     print_intent,
     print_results,
+    print_stats,
     print_status,
 )
 from agentic.cli.prompts import confirm_execution, display_dry_run
@@ -23,13 +29,82 @@ from agentic.exceptions import AgenticError
 
 console = Console()
 app = typer.Typer(name="agentic", help="AI-powered Linux system management.")
+audit_app = typer.Typer(help="Audit log maintenance.")
+app.add_typer(audit_app, name="audit")
+knn_app = typer.Typer(help="Nearest-neighbour intent model learned from the audit log.")
+app.add_typer(knn_app, name="knn")
 
 
 def _get_pipeline(dry_run: bool = False, force: bool = False):
     from agentic.main import build_pipeline
+
     return build_pipeline(dry_run=dry_run, force=force)
 
 
+def _get_retention_policy(**overrides):
+    from agentic.main import build_retention_policy
+
+    return build_retention_policy(**overrides)
+
+
+def _get_audit_key_path() -> Path:
+    from agentic.main import audit_key_path
+
+    return audit_key_path()
+
+
+def _get_knn_classifier(fresh: bool = False):
+    from agentic.main import build_knn_classifier
+
+    return build_knn_classifier(fresh=fresh)
+
+
+def _get_knn_path() -> Path:
+    from agentic.main import knn_model_path
+
+    return knn_model_path()
+
+
+def _save_learned(pipeline) -> None:
+    """Keep what the kNN tier learned from this run's model answers."""
+    from agentic.parser.tiered import TieredParser
+
+    parser = pipeline._parser
+    if (
+        isinstance(parser, TieredParser)
+        and parser.knn is not None
+        and parser.knn.changed
+    ):
+        parser.knn.save(_get_knn_path())
+
+
+_SHARD_HELP = "Shard to use when the audit log is sharded, e.g. 2025-01-10 or 2025-W02"
+
+
+def _single_database(store, shard: Optional[str]):
+    """The one audit database a command works on: ``store`` itself, or the
+    ``--shard`` of a sharded log. Exits if that choice is missing or wrong."""
+    from agentic.memory.shards import ShardedMemoryStore
+
+    if not isinstance(store, ShardedMemoryStore):
+        if shard is not None:
+            print_error("--shard needs a sharded audit log (AGENTIC_DB_SHARD_PERIOD).")
+            raise typer.Exit(1)
+        return store
+    keys = store.shard_keys()
+    if shard in keys:
+        return store.shard_store(shard)
+    known = ", ".join(keys[-5:]) if keys else "none yet"
+    if shard is None:
+        print_error(
+            f"The audit log is sharded by {store.period} in {store.directory}; "
+            f"choose one shard with --shard (newest: {known})."
+        )
+    else:
+        print_error(f"No shard {shard!r} in {store.directory} (newest: {known}).")
+    raise typer.Exit(1)
+
+
 @app.command()
 def ask(
     query: str = typer.Argument(..., help="Natural language request"),
@@ -38,60 +113,535 @@ def ask(
     verbose: bool = typer.Option(False, "--verbose", help="Show detailed output"),
 ) -> None:
     """Parse a natural language request and execute system actions."""
+
     async def _run():
         pipeline = _get_pipeline(dry_run=dry_run, force=force)
         await pipeline._store.initialize()
         try:
             intent, plan, results = await pipeline.run(query)
+            _show_run(pipeline, intent, plan, results, dry_run)
+        except AgenticError as exc:
+            print_error(str(exc))
+            raise typer.Exit(1)
+        finally:
+            await pipeline._store.close()
+            _save_learned(pipeline)
 
-            print_intent(intent)
+    asyncio.run(_run())
 
-            if plan.actions:
-                decisions = pipeline._gate.evaluate_plan(plan)
-                print_action_plan(plan, decisions)
 
-                if dry_run:
-                    approved, approved_d = pipeline._gate.filter_approved(plan, decisions)
-                    display_dry_run(approved, approved_d)
+@app.command()
+def batch(
+    source: typer.FileText = typer.Argument(
+        "-", help="File of requests, one per line ('-' for stdin)"
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Simulate without executing"),
+    force: bool = typer.Option(False, "--force", help="Skip confirmations"),
+    concurrency: Optional[int] = typer.Option(
+        None,
+        "--concurrency",
+        "-j",
+        min=1,
+        help="Requests parsed at once (default: AGENTIC_PARSE_CONCURRENCY)",
+    ),
+) -> None:
+    """Run many requests: parsed concurrently, then executed one at a time in order.
+
+    Blank lines and lines starting with # are skipped.
+    """
+    queries = [
+        line.strip()
+        for line in source
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+    if not queries:
+        print_info("No requests to run.")
+        return
 
-            if results:
-                print_results(results)
-        except AgenticError as exc:
-            print_error(str(exc))
+    async def _run() -> int:
+        pipeline = _get_pipeline(dry_run=dry_run, force=force)
+        if (
+            source.name == "<stdin>"
+            and pipeline._confirm_callback is not None
+            and not pipeline._dry_run
+        ):
+            print_error(
+                "Requests read from stdin cannot be confirmed interactively; "
+                "use --dry-run or --force, or pass a file."
+            )
             raise typer.Exit(1)
+        await pipeline._store.initialize()
+        try:
+            outcomes = await pipeline.run_many(queries, concurrency=concurrency)
         finally:
             await pipeline._store.close()
+            _save_learned(pipeline)
+        failed = 0
+        for i, (query, outcome) in enumerate(zip(queries, outcomes), 1):
+            console.print(f"\n[bold]{i}/{len(queries)}[/] {escape(query)}")
+            if isinstance(outcome, Exception):
+                failed += 1
+                print_error(str(outcome))
+            else:
+                _show_run(pipeline, *outcome, dry_run)
+        cache = pipeline._parser.cache
+        if cache is not None:
+            cs = cache.stats
+            print_info(
+                f"\nIntent cache: {cs.hits} hit(s), {cs.misses} miss(es), {cs.hit_rate:.0%} hit rate."
+            )
+        return failed
 
-    asyncio.run(_run())
+    failed = asyncio.run(_run())
+    print_info(
+        f"Ran {len(queries)} request(s): {len(queries) - failed} succeeded, {failed} failed."
+    )
+    if failed:
+        raise typer.Exit(1)
+
+
+def _show_run(pipeline, intent, plan, results, dry_run: bool) -> None:
+    print_intent(intent)
+
+    if plan.actions:
+        decisions = pipeline._gate.evaluate_plan(plan)
+        print_action_plan(plan, decisions)
+
+        if dry_run:
+            approved, approved_d = pipeline._gate.filter_approved(plan, decisions)
+            display_dry_run(approved, approved_d)
+
+    if results:
+        print_results(results)
+
+
+_HISTORY_PAGE_SIZE = 50
 
 
 @app.command()
 def history(
-    limit: int = typer.Option(20, "--limit", "-n", help="Number of records"),
+    limit: int = typer.Option(
+        20, "--limit", "-n", help="Number of requests (0 for all)"
+    ),
+    grep: Optional[str] = typer.Option(
+        None,
+        "--grep",
+        "-g",
+        help="Full-text search over queries and commands (best match first)",
+    ),
+    intent: Optional[str] = typer.Option(
+        None, "--intent", help="Only this intent type"
+    ),
+    action_type: Optional[str] = typer.Option(
+        None, "--action-type", help="Only this action type"
+    ),
+    approved: Optional[bool] = typer.Option(
+        None, "--approved/--denied", help="Only approved or only denied actions"
+    ),
+    after: Optional[datetime] = typer.Option(
+        None, "--after", help="Only requests after this time (UTC)"
+    ),
+    before: Optional[datetime] = typer.Option(
+        None, "--before", help="Only requests before this time (UTC)"
+    ),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print one JSON object per line"
+    ),
 ) -> None:
-    """Show recent action history."""
+    """Show recent action history, newest first."""
+
     async def _run():
         pipeline = _get_pipeline()
         await pipeline._store.initialize()
         try:
-            rows = await pipeline._store.get_history(limit=limit)
-            if not rows:
-                print_info("No history found.")
+            if grep:
+                rows = await pipeline._store.search_text(
+                    grep,
+                    limit=limit or None,
+                    intent_type=intent,
+                    action_type=action_type,
+                    approved=approved,
+                    after=after,
+                    before=before,
+                )
+                pages = _single_page(rows)
             else:
-                print_history(rows)
+                pages = _paged(
+                    pipeline._store.iter_history(
+                        intent_type=intent,
+                        action_type=action_type,
+                        approved=approved,
+                        after=after,
+                        before=before,
+                        limit=limit or None,
+                        page_size=_HISTORY_PAGE_SIZE,
+                    )
+                )
+            found = False
+            async for page in pages:
+                found = True
+                if as_json:
+                    for row in page:
+                        typer.echo(json.dumps(row))
+                else:
+                    print_history(page)
+            if not found and not as_json:
+                print_info("No history found.")
         finally:
             await pipeline._store.close()
 
     asyncio.run(_run())
 
 
+async def _single_page(rows: list[dict]):
+    if rows:
+        yield rows
+
+
+async def _paged(rows, size: int = _HISTORY_PAGE_SIZE):
+    """Group a row stream into display pages without buffering the rest."""
+    page: list[dict] = []
+    async for row in rows:
+        page.append(row)
+        if len(page) == size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
 @app.command()
 def rollback(
-    action_id: str = typer.Argument(..., help="Action ID to rollback"),
+    action_id: Optional[str] = typer.Argument(None, help="Action ID to rollback"),
+    request_id: Optional[str] = typer.Option(
+        None,
+        "--request",
+        help="Rollback every executed action of this request, newest first",
+    ),
+) -> None:
+    """Rollback a previously executed action, or all actions of a request."""
+    if (action_id is None) == (request_id is None):
+        print_error("Give either an action ID or --request, not both.")
+        raise typer.Exit(1)
+
+    async def _run():
+        pipeline = _get_pipeline()
+        await pipeline._store.initialize()
+        try:
+            if request_id is not None:
+                results = await pipeline.rollback_request(request_id)
+            else:
+                results = [await pipeline.rollback(action_id)]
+        finally:
+            await pipeline._store.close()
+        if not results:
+            print_info(f"Nothing to roll back for request {request_id}.")
+            return
+        print_results(results)
+        if not all(r.success for r in results):
+            raise typer.Exit(1)
+
+    asyncio.run(_run())
+
+
+_STATS_VIEWS = ("hour", "intent", "action_type", "gate", "denials")
+
+
+@app.command()
+def stats(
+    by: str = typer.Option(
+        "action_type", "--by", help=f"Breakdown: {', '.join(_STATS_VIEWS)}"
+    ),
+    limit: int = typer.Option(20, "--limit", "-n", min=1, help="Rows in the breakdown"),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print one JSON object per line"
+    ),
+    shard: Optional[str] = typer.Option(None, "--shard", help=_SHARD_HELP),
+) -> None:
+    """Show audit totals and one breakdown from the maintained aggregates."""
+    from agentic.memory.stats import AuditStats
+
+    if by not in _STATS_VIEWS:
+        print_error(f"--by must be one of {', '.join(_STATS_VIEWS)}")
+        raise typer.Exit(1)
+
+    async def _run():
+        pipeline = _get_pipeline()
+        store = _single_database(pipeline._store, shard)
+        await store.initialize()
+        try:
+            reader = AuditStats(store)
+            total = await reader.total()
+            if by == "denials":
+                rows = await reader.denials(limit=limit)
+            else:
+                rows = await reader.by(by, limit=limit)
+        finally:
+            await store.close()
+        if as_json:
+            typer.echo(json.dumps(total.to_dict()))
+            for row in rows:
+                typer.echo(json.dumps(row.to_dict()))
+            return
+        print_stats("Audit Totals", [total])
+        if by == "denials":
+            print_denials(rows)
+        else:
+            print_stats(f"By {by.replace('_', ' ')}", rows)
+
+    asyncio.run(_run())
+
+
+@audit_app.command("prune")
+def audit_prune(
+    max_age_days: Optional[int] = typer.Option(
+        None, "--max-age-days", help="Override AGENTIC_RETENTION_MAX_AGE_DAYS"
+    ),
+    max_db_mb: Optional[int] = typer.Option(
+        None, "--max-db-mb", help="Override AGENTIC_RETENTION_MAX_DB_MB"
+    ),
+    no_archive: bool = typer.Option(
+        False, "--no-archive", help="Delete pruned rows instead of archiving them"
+    ),
+) -> None:
+    """Archive and delete audit rows outside the retention policy.
+
+    A sharded audit log drops whole shards older than ``--max-age-days``.
+    """
+    from agentic.memory.retention import RetentionManager
+    from agentic.memory.shards import ShardedMemoryStore
+
+    async def _run():
+        pipeline = _get_pipeline()
+        policy = _get_retention_policy(
+            max_age_days=max_age_days,
+            max_db_mb=max_db_mb,
+            archive=False if no_archive else None,
+        )
+        await pipeline._store.initialize()
+        try:
+            if isinstance(pipeline._store, ShardedMemoryStore):
+                return await _drop_shards(pipeline._store, policy)
+            manager = RetentionManager(pipeline._store, policy)
+            report = await manager.run()
+            pages = await manager.vacuumed()
+        finally:
+            await pipeline._store.close()
+        print_info(
+            f"Removed {report.requests_removed} request(s) and "
+            f"{report.decisions_removed} orphaned decision(s); "
+            f"released {pages} page(s)."
+        )
+        for path in report.archive_files:
+            print_info(f"Archived to {path}")
+
+    asyncio.run(_run())
+
+
+async def _drop_shards(store, policy) -> None:
+    if policy.max_age_days is None:
+        print_error("A sharded audit log is pruned by age: set --max-age-days.")
+        raise typer.Exit(1)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=policy.max_age_days)
+    removed = await store.drop_before(cutoff)
+    print_info(f"Dropped {len(removed)} shard(s) older than {cutoff:%Y-%m-%d}.")
+    for path in removed:
+        print_info(f"Deleted {path}")
+
+
+@audit_app.command("export")
+def audit_export(
+    out: Path = typer.Argument(..., help="Output file (gzip-compressed)"),
+    fmt: str = typer.Option("jsonl", "--format", "-f", help="jsonl or columnar"),
+    name: str = typer.Option(
+        "default",
+        "--name",
+        help="Watermark to resume from; each consumer should use its own",
+    ),
+    full: bool = typer.Option(
+        False, "--full", help="Ignore the watermark and export everything"
+    ),
+    settle: float = typer.Option(
+        60.0,
+        "--settle",
+        min=0.0,
+        help="Leave rows younger than this many seconds for the next export",
+    ),
+    shard: Optional[str] = typer.Option(None, "--shard", help=_SHARD_HELP),
+) -> None:
+    """Export new audit rows since the last export."""
+    from agentic.memory.export import FORMATS, AuditExporter
+
+    if fmt not in FORMATS:
+        print_error(f"Unknown format {fmt!r}; choose one of: {', '.join(FORMATS)}")
+        raise typer.Exit(1)
+
+    async def _run():
+        pipeline = _get_pipeline()
+        store = _single_database(pipeline._store, shard)
+        await store.initialize()
+        try:
+            exporter = AuditExporter(store, name=name, settle_seconds=settle)
+            report = await exporter.export(out, fmt=fmt, full=full)
+        finally:
+            await store.close()
+        print_info(
+            f"Exported {report.requests} request(s), {report.actions} action(s), "
+            f"{report.policy_decisions} policy decision(s) and "
+            f"{report.execution_results} execution result(s) to {report.path}"
+        )
+
+    asyncio.run(_run())
+
+
+@audit_app.command("encode")
+def audit_encode(
+    batch_size: int = typer.Option(
+        1000, "--batch-size", min=1, help="Rows rewritten per transaction"
+    ),
+    shard: Optional[str] = typer.Option(None, "--shard", help=_SHARD_HELP),
+) -> None:
+    """Dictionary-encode audit rows written before encoding existed."""
+
+    async def _run():
+        pipeline = _get_pipeline()
+        store = _single_database(pipeline._store, shard)
+        await store.initialize()
+        try:
+            return await store.encode_dictionaries(batch_size=batch_size)
+        finally:
+            await store.close()
+
+    encoded = asyncio.run(_run())
+    print_info(f"Encoded {encoded} row(s).")
+
+
+@audit_app.command("backup")
+def audit_backup(
+    out: Path = typer.Argument(..., help="Backup file; a .gz name is gzip-compressed"),
+    pages: int = typer.Option(
+        256, "--pages", min=1, help="Database pages copied per step"
+    ),
+    sleep: float = typer.Option(
+        0.0, "--sleep", min=0.0, help="Seconds to pause between steps"
+    ),
+    shard: Optional[str] = typer.Option(None, "--shard", help=_SHARD_HELP),
 ) -> None:
-    """Rollback a previously executed action."""
-    print_info(f"Rollback for action {action_id} — not yet implemented.")
-    raise typer.Exit(0)
+    """Back up the audit database while the agent keeps running."""
+
+    async def _run():
+        pipeline = _get_pipeline()
+        store = _single_database(pipeline._store, shard)
+        await store.initialize()
+        try:
+            return await store.backup(out, pages=pages, sleep=sleep)
+        finally:
+            await store.close()
+
+    report = asyncio.run(_run())
+    print_info(
+        f"Backed up {report.pages} page(s) in {report.steps} step(s) to {report.path} "
+        f"({report.bytes_written} bytes, {report.elapsed_ms:.0f} ms)"
+    )
+
+
+@audit_app.command("verify")
+def audit_verify(
+    full: bool = typer.Option(
+        False,
+        "--full",
+        help="Re-check the whole chain instead of resuming at the last verified checkpoint",
+    ),
+    shard: Optional[str] = typer.Option(None, "--shard", help=_SHARD_HELP),
+) -> None:
+    """Check the audit hash chain for edited or deleted rows."""
+    from agentic.memory.chain import load_signing_key
+    from agentic.memory.integrity import AuditVerifier
+
+    async def _run():
+        pipeline = _get_pipeline()
+        store = _single_database(pipeline._store, shard)
+        await store.initialize()
+        try:
+            key = load_signing_key(_get_audit_key_path())
+            return await AuditVerifier(store, key).verify(full=full)
+        finally:
+            await store.close()
+
+    report = asyncio.run(_run())
+    for problem in report.problems:
+        print_error(problem)
+    if not report.ok:
+        print_error(
+            f"Audit chain verification FAILED ({len(report.problems)} problem(s) shown)."
+        )
+        raise typer.Exit(1)
+    print_info(
+        f"Audit chain OK: seq {report.start_seq}..{report.end_seq}, "
+        f"{report.rows_checked} row(s), {report.rows_pruned} pruned, "
+        f"{report.checkpoints_checked} checkpoint(s) checked."
+    )
+
+
+@knn_app.command("train")
+def knn_train(
+    full: bool = typer.Option(
+        False,
+        "--full",
+        help="Rebuild from the whole log instead of the rows since the last run",
+    ),
+) -> None:
+    """Teach the intent model the confidently parsed requests logged since its last run."""
+
+    async def _run():
+        pipeline = _get_pipeline()
+        model = _get_knn_classifier(fresh=full)
+        await pipeline._store.initialize()
+        try:
+            learned = await model.update(pipeline._store)
+        finally:
+            await pipeline._store.close()
+        path = _get_knn_path()
+        model.save(path)
+        print_info(
+            f"Learned {learned} request(s); the model holds {len(model)} example(s). Saved to {path}"
+        )
+
+    asyncio.run(_run())
+
+
+@knn_app.command("evaluate")
+def knn_evaluate(
+    holdout: float = typer.Option(
+        0.2,
+        "--holdout",
+        min=0.01,
+        max=0.99,
+        help="Newest share of the log held out for testing",
+    ),
+    as_json: bool = typer.Option(False, "--json", help="Print the result as JSON"),
+) -> None:
+    """Score the intent model against the LLM's labels on the newest requests."""
+    from agentic.parser.knn import evaluate
+
+    async def _run():
+        pipeline = _get_pipeline()
+        await pipeline._store.initialize()
+        try:
+            return await evaluate(
+                pipeline._store, _get_knn_classifier(fresh=True), holdout=holdout
+            )
+        finally:
+            await pipeline._store.close()
+
+    report = asyncio.run(_run())
+    if as_json:
+        typer.echo(json.dumps(report.to_dict()))
+        return
+    print_info(
+        f"Trained on {report.trained} request(s), tested on {report.tested}: answered {report.answered} "
+        f"({report.coverage:.1%}), {report.correct} matching the LLM ({report.accuracy:.1%} accuracy)."
+    )
 
 
 @app.command()
@@ -104,12 +654,14 @@ def status() -> None:
     for proc in psutil.process_iter(["pid", "name", "memory_percent", "cpu_percent"]):
         try:
             info = proc.info
-            procs.append({
-                "pid": info["pid"],
-                "name": info.get("name", ""),
-                "memory_percent": info.get("memory_percent", 0.0) or 0.0,
-                "cpu_percent": info.get("cpu_percent", 0.0) or 0.0,
-            })
+            procs.append(
+                {
+                    "pid": info["pid"],
+                    "name": info.get("name", ""),
+                    "memory_percent": info.get("memory_percent", 0.0) or 0.0,
+                    "cpu_percent": info.get("cpu_percent", 0.0) or 0.0,
+                }
+            )
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             continue
 
@@ -138,6 +690,7 @@ def show_config() -> None:
     }
 
     from rich.table import Table
+
     table = Table(title="Configuration", show_header=False)
     table.add_column("Setting", style="bold cyan")
     table.add_column("Value")
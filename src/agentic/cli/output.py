@@ -6,6 +6,7 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
+from agentic.memory.stats import DenialRow, StatsRow
 from agentic.models.action import ActionCandidate, ActionPlan, ActionResult
 from agentic.models.intent import ParsedIntent
 from agentic.models.policy import PolicyDecision
@@ -89,6 +90,52 @@ def print_history(rows: list[dict]) -> None:
     console.print(table)
 
 
+def _rate(value: float | None) -> str:
+    return "-" if value is None else f"{value:.0%}"
+
+
+def _ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:.0f} ms"
+
+
+def print_stats(title: str, rows: list[StatsRow]) -> None:
+    table = Table(title=title, expand=True)
+    table.add_column("Key", style="bold cyan")
+    table.add_column("Requests", justify="right")
+    table.add_column("Decisions", justify="right")
+    table.add_column("Approved", justify="right")
+    table.add_column("Actions", justify="right")
+    table.add_column("Executions", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Rollbacks", justify="right")
+    table.add_column("Mean latency", justify="right")
+
+    for row in rows:
+        table.add_row(
+            row.key or "-",
+            str(row.requests),
+            str(row.decisions_approved + row.decisions_denied),
+            _rate(row.approval_rate),
+            str(row.actions),
+            str(row.executions),
+            _rate(row.failure_rate),
+            str(row.rollbacks),
+            _ms(row.mean_latency_ms),
+        )
+
+    console.print(table)
+
+
+def print_denials(rows: list[DenialRow]) -> None:
+    table = Table(title="Denial Reasons", expand=True)
+    table.add_column("Gate", style="bold cyan")
+    table.add_column("Reason")
+    table.add_column("Count", justify="right")
+    for row in rows:
+        table.add_row(row.gate or "-", row.reason, str(row.count))
+    console.print(table)
+
+
 def print_status(cpu: float, memory_percent: float, top_procs: list[dict]) -> None:
     table = Table(title="System Status", show_header=False, expand=True)
     table.add_column("Metric", style="bold cyan")
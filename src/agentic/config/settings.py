@@ -3,8 +3,9 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Literal
 
-from pydantic import Field
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
 from agentic.models.environment import Environment
@@ -19,6 +20,155 @@ class Settings(BaseSettings):
         default=Path.home() / ".agentic" / "history.db",
         description="SQLite database path",
     )
+    audit_batch_size: int = Field(
+        default=256, ge=1, description="Audit records per write-behind commit"
+    )
+    audit_flush_interval: float = Field(
+        default=0.05,
+        ge=0.0,
+        description="Max seconds an audit record waits before commit",
+    )
+    db_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = Field(
+        default="NORMAL",
+        description="SQLite synchronous pragma (OFF/NORMAL/FULL/EXTRA)",
+    )
+    db_cache_size: int = Field(
+        default=-8000,
+        description="SQLite cache_size pragma (negative = KiB, positive = pages)",
+    )
+    db_mmap_size: int = Field(
+        default=0, ge=0, description="SQLite mmap_size pragma in bytes"
+    )
+    db_reader_pool_size: int = Field(
+        default=2, ge=0, description="Read-only connections used for history queries"
+    )
+    db_timestamp_format: Literal["iso", "epoch_us"] = Field(
+        default="iso",
+        description="Timestamp storage of a new audit DB: iso (text) or epoch_us (integer microseconds)",
+    )
+    db_shard_period: Literal["day", "week"] | None = Field(
+        default=None,
+        description="Shard the audit log by day or week: one database per period in <db dir>/shards",
+    )
+    id_scheme: Literal["uuid4", "uuid7"] = Field(
+        default="uuid4",
+        description="ID scheme of intents, actions and plans: uuid4 or uuid7 (time-sortable)",
+    )
+    embedding_dim: int = Field(
+        default=128,
+        ge=8,
+        description="Dimensions of the offline history-search embedding (search time grows linearly with it)",
+    )
+    retention_max_age_days: int | None = Field(
+        default=None, ge=0, description="Archive audit rows older than this many days"
+    )
+    retention_max_db_mb: int | None = Field(
+        default=None,
+        ge=0,
+        description="Archive oldest months until the audit DB holds at most this much data",
+    )
+    retention_archive: bool = Field(
+        default=True,
+        description="Write pruned rows to monthly archive files instead of discarding them",
+    )
+    retention_archive_dir: Path | None = Field(
+        default=None,
+        description="Monthly archive directory (default: <db dir>/archive)",
+    )
+    retention_batch_size: int = Field(
+        default=500,
+        ge=1,
+        description="Requests archived/deleted per retention transaction",
+    )
+    retention_vacuum_pages: int = Field(
+        default=256, ge=1, description="Pages released per incremental_vacuum step"
+    )
+    output_max_bytes: int = Field(
+        default=64 * 1024,
+        ge=64,
+        description="Execution output kept per result (head + tail beyond this)",
+    )
+    output_inline_bytes: int = Field(
+        default=256,
+        ge=0,
+        description="Execution output up to this size is stored inline, uncompressed",
+    )
+    audit_key_path: Path | None = Field(
+        default=None,
+        description="Audit checkpoint signing key (default: <db dir>/audit.key)",
+    )
+    audit_checkpoint_interval: int = Field(
+        default=1000,
+        ge=0,
+        description="Audit rows between signed chain checkpoints (0 disables)",
+    )
+    recent_cache_size: int = Field(
+        default=256,
+        ge=0,
+        description="Recent requests kept in memory for context lookups (0 disables)",
+    )
+    lookup_cache_size: int = Field(
+        default=1024,
+        ge=0,
+        description="Requests, action lists and executions cached by ID (0 disables)",
+    )
+    context_cache_size: int = Field(
+        default=128,
+        ge=0,
+        description="Formatted context strings cached between writes (0 disables)",
+    )
+    parse_concurrency: int = Field(
+        default=8, ge=1, description="Model parses in flight at once in batch runs"
+    )
+    openai_requests_per_minute: float = Field(
+        default=500.0,
+        ge=0.0,
+        description="OpenAI requests per minute the parser stays under (0: unlimited)",
+    )
+    openai_burst: int = Field(
+        default=10,
+        ge=1,
+        description="OpenAI requests the rate limiter lets through at once after a lull",
+    )
+    local_parser: bool = Field(
+        default=False,
+        description=(
+            "Answer unambiguous requests with local rules before calling OpenAI. Off by default: rule "
+            "answers score 0.9, above the 0.85 dry-run threshold, so they never get a forced dry run"
+        ),
+    )
+    knn_parser: bool = Field(
+        default=False,
+        description="Answer requests like past ones with a nearest-neighbour model of the audit log",
+    )
+    knn_model_path: Path | None = Field(
+        default=None,
+        description="Nearest-neighbour model file (default: intents.knn.npz beside the audit DB)",
+    )
+    knn_min_similarity: float = Field(
+        default=0.8,
+        ge=0.0,
+        le=1.0,
+        description="Cosine similarity a neighbour needs to count",
+    )
+    knn_min_confidence: float = Field(
+        default=0.85,
+        ge=0.0,
+        le=1.0,
+        description="Model confidence a logged request needs to be learned",
+    )
+    intent_cache_size: int = Field(
+        default=10000,
+        ge=0,
+        description="Parsed intents cached on disk by query and context (0 disables)",
+    )
+    intent_cache_ttl: float = Field(
+        default=86400.0, gt=0.0, description="Seconds a cached intent stays valid"
+    )
+    intent_cache_path: Path | None = Field(
+        default=None,
+        description="Intent cache database (default: intents.db beside the audit DB)",
+    )
     dry_run: bool = Field(default=False, description="Global dry-run mode")
     log_level: str = Field(default="INFO", description="Logging level")
     max_risk_level: str = Field(
@@ -32,3 +182,9 @@ class Settings(BaseSettings):
         default=Environment.DEVELOPMENT,
         description="Deployment environment (PRODUCTION/STAGING/DEVELOPMENT)",
     )
+
+    @field_validator("db_synchronous", mode="before")
+    @classmethod
+    def _upper_synchronous(cls, value: object) -> object:
+        # The pragma is case-insensitive; "normal" in the environment is fine.
+        return value.upper() if isinstance(value, str) else value
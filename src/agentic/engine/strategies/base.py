@@ -3,12 +3,31 @@
 from __future__ import annotations
 
 import abc
+import shlex
 
-from agentic.models.action import ActionCandidate
+from agentic.models.action import ActionCandidate, ActionType
 from agentic.models.intent import ParsedIntent
 
+# Shell commands that undo an action, by action type. Rollback rebuilds the
+# command from these and the action's target rather than running a command
+# read back from the audit log.
+_ROLLBACK_COMMANDS: dict[ActionType, str] = {
+    ActionType.SUSPEND_PROCESS: "kill -CONT $(pgrep -f {target})",
+    ActionType.APT_INSTALL: "apt remove -y {target}",
+    ActionType.SYSTEMCTL_START: "systemctl stop {target}",
+    ActionType.SYSTEMCTL_STOP: "systemctl start {target}",
+    ActionType.SYSTEMCTL_RESTART: "systemctl restart {target}",
+}
+
+
+def rollback_command(action_type: ActionType, target: str) -> str:
+    """The command undoing ``action_type`` on ``target``; empty if there is none."""
+    template = _ROLLBACK_COMMANDS.get(action_type)
+    return template.format(target=shlex.quote(target)) if template else ""
+
 
 class IntentStrategy(abc.ABC):
     @abc.abstractmethod
-    async def generate_actions(self, intent: ParsedIntent) -> list[ActionCandidate]:
-        ...  # pragma: no cover
+    async def generate_actions(
+        self, intent: ParsedIntent
+    ) -> list[ActionCandidate]: ...  # pragma: no cover
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
-from agentic.engine.strategies.base import IntentStrategy
+import shlex
+
+from agentic.engine.strategies.base import IntentStrategy, rollback_command
 from agentic.models.action import ActionCandidate, ActionType
 from agentic.models.intent import ParsedIntent
 
@@ -20,9 +22,7 @@ DEFAULT_DISTRACTIONS = [
 
 class FocusStrategy(IntentStrategy):
     async def generate_actions(self, intent: ParsedIntent) -> list[ActionCandidate]:
-        targets = [
-            e.value for e in intent.entities if e.name == "process"
-        ]
+        targets = [e.value for e in intent.entities if e.name == "process"]
         if not targets:
             targets = DEFAULT_DISTRACTIONS
 
@@ -32,9 +32,11 @@ class FocusStrategy(IntentStrategy):
                 ActionCandidate(
                     action_type=ActionType.SUSPEND_PROCESS,
                     description=f"Suspend process: {target}",
-                    command=f"kill -STOP $(pgrep -f {target})",
+                    command=f"kill -STOP $(pgrep -f {shlex.quote(target)})",
                     target=target,
-                    rollback_command=f"kill -CONT $(pgrep -f {target})",
+                    rollback_command=rollback_command(
+                        ActionType.SUSPEND_PROCESS, target
+                    ),
                 )
             )
         return actions
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from agentic.engine.strategies.base import IntentStrategy
+from agentic.engine.strategies.base import IntentStrategy, rollback_command
 from agentic.models.action import ActionCandidate, ActionType
 from agentic.models.intent import ParsedIntent
 
@@ -20,7 +20,7 @@ class UpdateStrategy(IntentStrategy):
                         description=f"Install package: {pkg}",
                         command=f"apt install -y {pkg}",
                         target=pkg,
-                        rollback_command=f"apt remove -y {pkg}",
+                        rollback_command=rollback_command(ActionType.APT_INSTALL, pkg),
                     )
                 )
         else:
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import shlex
 
 from agentic.exceptions import ExecutionError
 from agentic.executor.runners.base import BaseRunner
@@ -19,7 +20,7 @@ class SystemctlRunner(BaseRunner):
     async def run(self, action: ActionCandidate, dry_run: bool = False) -> ActionResult:
         verb = action.action_type.value.replace("SYSTEMCTL_", "").lower()
         service = action.target
-        cmd = f"systemctl {verb} {service}"
+        cmd = f"systemctl {verb} {shlex.quote(service)}"
 
         if dry_run:
             return ActionResult(
@@ -64,7 +65,7 @@ class SystemctlRunner(BaseRunner):
             )
 
         service = action.target
-        cmd = f"systemctl {reverse_verb} {service}"
+        cmd = f"systemctl {reverse_verb} {shlex.quote(service)}"
 
         try:
             proc = await asyncio.create_subprocess_shell(
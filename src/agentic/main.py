@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from pathlib import Path
+
 from agentic.cli.app import app
 from agentic.cli.prompts import confirm_execution
 from agentic.config.settings import Settings
@@ -9,8 +11,16 @@ from agentic.engine.action_registry import ActionRegistry
 from agentic.engine.decision_engine import DecisionEngine
 from agentic.executor.action_executor import ActionExecutor
 from agentic.memory.context import ContextRetriever
+from agentic.memory.embeddings import HashingEmbedder
+from agentic.memory.retention import RetentionPolicy
+from agentic.memory.shards import ShardedMemoryStore
 from agentic.memory.store import MemoryStore
+from agentic.models.ids import set_id_scheme
+from agentic.parser.cache import IntentCache
 from agentic.parser.intent_parser import IntentParser
+from agentic.parser.knn import KnnClassifier
+from agentic.parser.ratelimit import TokenBucket
+from agentic.parser.tiered import TieredParser
 from agentic.pipeline import Pipeline
 from agentic.policy.safety_gate import SafetyGate
 
@@ -21,10 +31,21 @@ def build_pipeline(
     settings: Settings | None = None,
 ) -> Pipeline:
     settings = settings or Settings()  # type: ignore[call-arg]
+    set_id_scheme(settings.id_scheme)
 
-    store = MemoryStore(db_path=settings.db_path)
-    context_retriever = ContextRetriever(store)
-    parser = IntentParser(settings)
+    store = build_store(settings)
+    context_retriever = ContextRetriever(store, cache_size=settings.context_cache_size)
+    parser: IntentParser | TieredParser = IntentParser(
+        settings,
+        cache=build_intent_cache(settings),
+        limiter=build_rate_limiter(settings),
+    )
+    if settings.local_parser or settings.knn_parser:
+        parser = TieredParser(
+            parser,
+            knn=build_knn_classifier(settings) if settings.knn_parser else None,
+            rules=settings.local_parser,
+        )
     registry = ActionRegistry()
     engine = DecisionEngine(registry)
     gate = SafetyGate(
@@ -45,5 +66,104 @@ def build_pipeline(
     )
 
 
+def build_store(settings: Settings) -> MemoryStore | ShardedMemoryStore:
+    """The audit store: one database, or one per day or week."""
+    options = dict(
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_interval,
+        synchronous=settings.db_synchronous,
+        cache_size=settings.db_cache_size,
+        mmap_size=settings.db_mmap_size,
+        reader_pool_size=settings.db_reader_pool_size,
+        embedder=HashingEmbedder(dim=settings.embedding_dim),
+        output_max_bytes=settings.output_max_bytes,
+        output_inline_bytes=settings.output_inline_bytes,
+        signing_key_path=audit_key_path(settings),
+        checkpoint_interval=settings.audit_checkpoint_interval,
+        recent_cache_size=settings.recent_cache_size,
+        lookup_cache_size=settings.lookup_cache_size,
+        timestamp_format=settings.db_timestamp_format,
+    )
+    if settings.db_shard_period:
+        return ShardedMemoryStore(
+            settings.db_path.parent / "shards",
+            period=settings.db_shard_period,
+            **options,
+        )
+    return MemoryStore(db_path=settings.db_path, **options)
+
+
+def build_intent_cache(settings: Settings) -> IntentCache | None:
+    """The persistent parsed-intent cache, or None when disabled."""
+    if not settings.intent_cache_size:
+        return None
+    return IntentCache(
+        settings.intent_cache_path or settings.db_path.parent / "intents.db",
+        ttl=settings.intent_cache_ttl,
+        max_entries=settings.intent_cache_size,
+    )
+
+
+def build_rate_limiter(settings: Settings) -> TokenBucket | None:
+    """The OpenAI request rate limiter, or None when unlimited."""
+    if not settings.openai_requests_per_minute:
+        return None
+    return TokenBucket(
+        settings.openai_requests_per_minute / 60, capacity=settings.openai_burst
+    )
+
+
+def knn_model_path(settings: Settings | None = None) -> Path:
+    """Where the nearest-neighbour intent model is saved."""
+    settings = settings or Settings()  # type: ignore[call-arg]
+    return settings.knn_model_path or settings.db_path.parent / "intents.knn.npz"
+
+
+def build_knn_classifier(
+    settings: Settings | None = None, fresh: bool = False
+) -> KnnClassifier:
+    """The saved nearest-neighbour intent model; an empty one if there is
+    none yet or ``fresh`` is set."""
+    settings = settings or Settings()  # type: ignore[call-arg]
+    params = dict(
+        min_similarity=settings.knn_min_similarity,
+        min_confidence=settings.knn_min_confidence,
+    )
+    path = knn_model_path(settings)
+    if path.exists() and not fresh:
+        return KnnClassifier.load(path, **params)
+    return KnnClassifier(HashingEmbedder(dim=settings.embedding_dim), **params)
+
+
+def audit_key_path(settings: Settings | None = None) -> Path:
+    """Where the audit checkpoint signing key lives."""
+    settings = settings or Settings()  # type: ignore[call-arg]
+    return settings.audit_key_path or settings.db_path.parent / "audit.key"
+
+
+def build_retention_policy(
+    settings: Settings | None = None,
+    max_age_days: int | None = None,
+    max_db_mb: int | None = None,
+    archive: bool | None = None,
+) -> RetentionPolicy:
+    """Retention policy from settings; explicit arguments take precedence."""
+    settings = settings or Settings()  # type: ignore[call-arg]
+    if max_age_days is None:
+        max_age_days = settings.retention_max_age_days
+    if max_db_mb is None:
+        max_db_mb = settings.retention_max_db_mb
+    if archive is None:
+        archive = settings.retention_archive
+    archive_dir = settings.retention_archive_dir or settings.db_path.parent / "archive"
+    return RetentionPolicy(
+        max_age_days=max_age_days,
+        max_db_bytes=None if max_db_mb is None else max_db_mb * 1024 * 1024,
+        archive_dir=archive_dir if archive else None,
+        batch_size=settings.retention_batch_size,
+        vacuum_pages=settings.retention_vacuum_pages,
+    )
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,231 @@
+"""Incrementally maintained audit aggregates for dashboards.
+
+``audit_stats`` holds one row of counters per ``(dimension, key)``:
+
+* ``total`` — a single row (key ``''``) over the whole log
+* ``hour`` — UTC hour bucket, ``YYYY-MM-DDTHH``
+* ``intent`` — intent type of the request
+* ``action_type`` — action type
+* ``gate`` — the policy gate that made a decision
+
+and ``audit_stats_denials`` counts denials per ``(gate, reason)``. Triggers on
+the four audit tables update both inside the inserting statement, so the
+aggregates commit or roll back together with the audit rows and every
+writer (including a second process on the same file) keeps them current.
+Reading a dashboard (``agentic.memory.stats``) is a primary-key lookup
+instead of a scan.
+
+Aggregates count everything ever logged: retention pruning deletes audit
+rows but leaves their counts in place. Dry-run executions are not counted.
+Execution latency is the time from the request being logged to the action's
+execution result, in milliseconds. Timestamps of either storage format
+(``agentic.memory.timestamps``) are bucketed the same way, and keys of
+dictionary-encoded columns (``agentic.memory.dictionary``) are the decoded
+strings.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from agentic.memory.dictionary import decode_references
+from agentic.memory.timestamps import sql_julianday
+
+DIMENSIONS = ("total", "hour", "intent", "action_type", "gate")
+
+COUNTERS = (
+    "requests",
+    "confidence_sum",
+    "decisions_approved",
+    "decisions_denied",
+    "actions",
+    "executions",
+    "failures",
+    "rollbacks",
+    "latency_ms_sum",
+    "latency_count",
+)
+
+_HOUR = "strftime('%Y-%m-%dT%H', " + sql_julianday("{ts}") + ")"
+
+
+@dataclass(frozen=True)
+class _Feed:
+    """How one audit table feeds one dimension.
+
+    ``{row}`` in every expression stands for the inserted row: ``NEW`` in
+    the trigger, the table alias in the backfill query.
+    """
+
+    table: str
+    key: str
+    counters: dict[str, str]
+    joins: str = ""
+    where: str = "1"
+
+
+_REQUEST = {"requests": "1", "confidence_sum": "{row}.confidence"}
+_DECISION = {
+    "decisions_approved": "{row}.approved != 0",
+    "decisions_denied": "{row}.approved = 0",
+}
+_ACTION = {"actions": "1"}
+_EXECUTION = {
+    "executions": "{row}.rolled_back = 0",
+    "failures": "{row}.rolled_back = 0 AND {row}.success = 0",
+    "rollbacks": "{row}.rolled_back != 0",
+    "latency_ms_sum": (
+        "CASE WHEN {row}.rolled_back = 0 THEN "
+        "COALESCE(("
+        + sql_julianday("{row}.executed_at")
+        + " - "
+        + sql_julianday("r.created_at")
+        + ") * 86400000.0, 0) ELSE 0 END"
+    ),
+    "latency_count": "{row}.rolled_back = 0 AND r.created_at IS NOT NULL",
+}
+_ACTION_REQUEST = "LEFT JOIN requests r ON r.id = {row}.request_id"
+_EXECUTION_ACTION = "LEFT JOIN actions a ON a.id = {row}.action_id LEFT JOIN requests r ON r.id = a.request_id"
+_EXECUTED = "{row}.dry_run = 0"
+
+_FEEDS = (
+    _Feed("requests", "'total', ''", _REQUEST),
+    _Feed("requests", "'hour', " + _HOUR.format(ts="{row}.created_at"), _REQUEST),
+    _Feed("requests", "'intent', {row}.intent_type", _REQUEST),
+    _Feed("policy_decisions", "'total', ''", _DECISION),
+    _Feed(
+        "policy_decisions",
+        "'hour', COALESCE(" + _HOUR.format(ts="{row}.created_at") + ", '')",
+        _DECISION,
+    ),
+    _Feed("policy_decisions", "'gate', COALESCE({row}.gate, '')", _DECISION),
+    _Feed("actions", "'total', ''", _ACTION),
+    _Feed(
+        "actions",
+        "'hour', " + _HOUR.format(ts="r.created_at"),
+        _ACTION,
+        _ACTION_REQUEST,
+        "r.id IS NOT NULL",
+    ),
+    _Feed(
+        "actions",
+        "'intent', r.intent_type",
+        _ACTION,
+        _ACTION_REQUEST,
+        "r.id IS NOT NULL",
+    ),
+    _Feed("actions", "'action_type', {row}.action_type", _ACTION),
+    _Feed("execution_results", "'total', ''", _EXECUTION, _EXECUTION_ACTION, _EXECUTED),
+    _Feed(
+        "execution_results",
+        "'hour', " + _HOUR.format(ts="{row}.executed_at"),
+        _EXECUTION,
+        _EXECUTION_ACTION,
+        _EXECUTED,
+    ),
+    _Feed(
+        "execution_results",
+        "'intent', r.intent_type",
+        _EXECUTION,
+        _EXECUTION_ACTION,
+        _EXECUTED + " AND r.id IS NOT NULL",
+    ),
+    _Feed(
+        "execution_results",
+        "'action_type', a.action_type",
+        _EXECUTION,
+        _EXECUTION_ACTION,
+        _EXECUTED + " AND a.id IS NOT NULL",
+    ),
+)
+
+_DENIAL_COUNTER = {"count": "1"}
+
+
+def _upsert(
+    table: str,
+    key_cols: str,
+    key: str,
+    counters: dict[str, str],
+    source: str,
+    aggregate: bool,
+) -> str:
+    values = ", ".join(
+        f"SUM({expr})" if aggregate else expr for expr in counters.values()
+    )
+    group = " GROUP BY 1, 2" if aggregate else ""
+    updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in counters)
+    return (
+        f"INSERT INTO {table} ({key_cols}, {', '.join(counters)}) SELECT {key}, {values} {source}{group} "
+        f"ON CONFLICT ({key_cols}) DO UPDATE SET {updates}"
+    )
+
+
+def _feed_sql(feed: _Feed, row: str, source: str, dictionary: bool = False) -> str:
+    sql = _upsert(
+        "audit_stats",
+        "dimension, key",
+        feed.key,
+        feed.counters,
+        f"{source} {feed.joins} WHERE {feed.where}",
+        aggregate=row != "NEW",
+    )
+    sql = sql.replace("{row}", row)
+    return decode_references(sql) if dictionary else sql
+
+
+def _denial_sql(row: str, source: str, dictionary: bool = False) -> str:
+    sql = _upsert(
+        "audit_stats_denials",
+        "gate, reason",
+        "COALESCE({row}.gate, ''), COALESCE({row}.reason, '')",
+        _DENIAL_COUNTER,
+        f"{source} WHERE {{row}}.approved = 0",
+        aggregate=row != "NEW",
+    )
+    sql = sql.replace("{row}", row)
+    return decode_references(sql) if dictionary else sql
+
+
+def _trigger(table: str, dictionary: bool = False) -> str:
+    body = [
+        _feed_sql(f, "NEW", "FROM (SELECT 1)", dictionary)
+        for f in _FEEDS
+        if f.table == table
+    ]
+    if table == "policy_decisions":
+        body.append(_denial_sql("NEW", "FROM (SELECT 1)", dictionary))
+    statements = "".join(f"    {sql};\n" for sql in body)
+    return f"CREATE TRIGGER IF NOT EXISTS {table}_stats AFTER INSERT ON {table} BEGIN\n{statements}END"
+
+
+_TABLES = ("requests", "policy_decisions", "actions", "execution_results")
+
+
+def trigger_statements(dictionary: bool = False) -> tuple[str, ...]:
+    """Replace the triggers with the current definitions; existing counts
+    are kept. ``dictionary`` decodes dictionary-encoded columns, which
+    needs the schema that introduced them."""
+    return (
+        *(f"DROP TRIGGER IF EXISTS {t}_stats" for t in _TABLES),
+        *(_trigger(t, dictionary) for t in _TABLES),
+    )
+
+
+def migration_statements() -> tuple[str, ...]:
+    """DDL, triggers and backfill for the migration that introduces the
+    aggregates. Later changes to the aggregates need a new migration."""
+    counters = ",\n".join(
+        f"    {name} {'REAL' if name.endswith('_sum') else 'INTEGER'} NOT NULL DEFAULT 0"
+        for name in COUNTERS
+    )
+    return (
+        "ALTER TABLE policy_decisions ADD COLUMN gate TEXT DEFAULT ''",
+        f"CREATE TABLE IF NOT EXISTS audit_stats (\n    dimension TEXT NOT NULL,\n    key TEXT NOT NULL,\n"
+        f"{counters},\n    PRIMARY KEY (dimension, key)\n) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS audit_stats_denials (\n    gate TEXT NOT NULL,\n    reason TEXT NOT NULL,\n"
+        "    count INTEGER NOT NULL DEFAULT 0,\n    PRIMARY KEY (gate, reason)\n) WITHOUT ROWID",
+        *(_trigger(t) for t in _TABLES),
+        *(_feed_sql(f, "n", f"FROM {f.table} n") for f in _FEEDS),
+        _denial_sql("n", "FROM policy_decisions n"),
+    )
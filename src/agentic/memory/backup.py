@@ -0,0 +1,43 @@
+"""Online backups of the audit database (``MemoryStore.backup``).
+
+A backup is copied with SQLite's online backup API from a separate
+read-only connection that holds one read transaction for the whole copy,
+so the result is a consistent snapshot of the database at the moment the
+backup started. In WAL mode readers never block the writer, so pipeline
+writes carry on while the copy runs; the copy is done ``pages`` pages per
+step on a worker thread and never blocks the event loop.
+
+The backup is an ordinary rollback-journal SQLite database. A target
+ending in ``.gz`` is gzip-compressed after the copy; either way the file
+only appears at its final path once it is complete.
+"""
+
+from __future__ import annotations
+
+import gzip
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+COMPRESSED_SUFFIX = ".gz"
+
+_CHUNK = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class BackupReport:
+    path: Path
+    pages: int
+    steps: int
+    bytes_written: int
+    elapsed_ms: float
+
+    @property
+    def compressed(self) -> bool:
+        return self.path.suffix == COMPRESSED_SUFFIX
+
+
+def compress_file(source: Path, target: Path) -> None:
+    """gzip ``source`` into ``target`` a chunk at a time."""
+    with source.open("rb") as src, gzip.open(target, "wb") as out:
+        shutil.copyfileobj(src, out, _CHUNK)
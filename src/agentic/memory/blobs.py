@@ -0,0 +1,51 @@
+"""Content-addressed, compressed storage for execution output.
+
+Package-manager output is large and repeats almost verbatim across runs, so
+``execution_results`` stores only a SHA-256 reference for outputs above a
+small inline threshold; the text itself lives once in ``blobs``, compressed.
+Outputs above the size cap keep their head and tail with a marker in between
+(the middle of a 400 KB ``apt upgrade`` log is rarely what an operator needs).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import zlib
+from dataclasses import dataclass
+
+CODEC_ZLIB = "zlib"
+
+
+@dataclass(frozen=True)
+class Blob:
+    hash: str
+    codec: str
+    size: int
+    data: bytes
+
+
+def truncate_output(text: str, max_bytes: int) -> str:
+    """Keep the first and last ``max_bytes // 2`` bytes of oversized output."""
+    data = text.encode()
+    if len(data) <= max_bytes:
+        return text
+    half = max_bytes // 2
+    head = data[:half].decode(errors="ignore")
+    tail = data[len(data) - half :].decode(errors="ignore")
+    return f"{head}\n... [{len(data) - 2 * half} bytes truncated] ...\n{tail}"
+
+
+def encode_blob(text: str, level: int = 6) -> Blob:
+    raw = text.encode()
+    return Blob(
+        hash=hashlib.sha256(raw).hexdigest(),
+        codec=CODEC_ZLIB,
+        size=len(raw),
+        data=zlib.compress(raw, level),
+    )
+
+
+def decode_blob(codec: str, data: bytes) -> str:
+    if codec != CODEC_ZLIB:
+        raise ValueError(f"Unknown blob codec: {codec!r}")
+    return zlib.decompress(data).decode()
@@ -0,0 +1,135 @@
+"""Tamper-evident hash chain over the audit tables.
+
+Every row written to ``requests``, ``actions``, ``policy_decisions`` and
+``execution_results`` gets the next ``chain_seq`` and a ``chain_hash`` of
+SHA-256 over the previous row's hash and the row's own columns, so editing or
+deleting any row breaks every hash after it. ``MemoryStore`` assigns both
+inside its commit transaction, under ``BEGIN IMMEDIATE``, so concurrent
+writers to one database file still form a single chain.
+
+A hash chain alone can be recomputed by whoever rewrote the rows. Checkpoints
+pin it: an HMAC-SHA256 over ``(seq, chain_hash, created_at)`` with a key kept
+outside the database. The store writes one every ``checkpoint_interval`` rows,
+and ``AuditVerifier.verify`` (``agentic.memory.integrity``) writes a *verified* checkpoint at the head when a
+check passes. The next verification starts from that checkpoint, so its cost
+is proportional to the rows written since, not to the size of the log.
+
+Retention may legitimately delete rows that have not been verified yet; it
+records their ``(chain_seq, chain_hash)`` in ``audit_chain_pruned``, signed
+with the checkpoint key, so the verifier can step over the gap. An unsigned
+link is reported like a missing row: anyone able to delete rows could
+otherwise write the links to hide the deletion.
+
+Columns added to a table after the chain was introduced are listed in
+``ADDED_DEFAULTS``; a row hashes them only when one differs from its default,
+so rows chained before the column existed still verify after the upgrade.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+GENESIS_HASH = "0" * 64
+
+# Columns covered by the chain, in hashing order; the store's INSERT
+# statements list them in the same order.
+CHAINED_COLUMNS: dict[str, tuple[str, ...]] = {
+    "requests": (
+        "id",
+        "raw_query",
+        "intent_type",
+        "confidence",
+        "created_at",
+        "entities",
+    ),
+    "actions": (
+        "id",
+        "request_id",
+        "action_type",
+        "description",
+        "command",
+        "risk_level",
+        "approved",
+        "target",
+        "parameters",
+        "rollback_command",
+        "rollback_support",
+    ),
+    "policy_decisions": (
+        "action_id",
+        "risk_level",
+        "approved",
+        "requires_sudo",
+        "reason",
+        "created_at",
+        "gate",
+    ),
+    "execution_results": (
+        "id",
+        "action_id",
+        "success",
+        "output",
+        "error",
+        "rolled_back",
+        "executed_at",
+        "output_hash",
+        "error_hash",
+        "dry_run",
+    ),
+}
+
+# Defaults of the trailing columns each table gained after migration 9.
+ADDED_DEFAULTS: dict[str, tuple[Any, ...]] = {
+    "requests": ("",),
+    "actions": ("", "{}", "", "UNKNOWN"),
+    "policy_decisions": ("",),
+    "execution_results": (0,),
+}
+
+
+def link(prev_hash: str, table: str, values: Sequence[Any]) -> str:
+    """Chain hash of a row given the previous row's hash."""
+    defaults = ADDED_DEFAULTS.get(table)
+    if defaults and tuple(values[-len(defaults) :]) == defaults:
+        values = values[: -len(defaults)]
+    payload = json.dumps([table, *values], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{prev_hash}:{payload}".encode()).hexdigest()
+
+
+def sign(key: bytes, seq: int, chain_hash: str, created_at: str) -> str:
+    return hmac.new(
+        key, f"{seq}:{chain_hash}:{created_at}".encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def sign_pruned(key: bytes, seq: int, chain_hash: str) -> str:
+    """Signature of a pruned row's chain link. The fixed label keeps it
+    from ever validating as a checkpoint and vice versa."""
+    return sign(key, seq, chain_hash, "pruned")
+
+
+def sign_verified(
+    key: bytes, seq: int, chain_hash: str, created_at: str, verified_at: str
+) -> str:
+    """Signature of a checkpoint recorded by a passing verification. It
+    covers ``verified_at`` under its own label, so setting ``verified_at``
+    on a periodic checkpoint does not turn it into a resume point."""
+    return sign(key, seq, chain_hash, f"{created_at}:verified:{verified_at}")
+
+
+def load_signing_key(path: Path) -> bytes:
+    """Read the checkpoint key, creating a random one (mode 0600) if absent."""
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    return path.read_text().strip().encode()
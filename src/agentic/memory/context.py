@@ -2,22 +2,56 @@
 
 from __future__ import annotations
 
+from collections import OrderedDict
+
 from agentic.memory.models import RequestRecord
 from agentic.memory.store import MemoryStore
 
 
 class ContextRetriever:
-    def __init__(self, store: MemoryStore) -> None:
+    """Formats similar past requests for the parser prompt.
+
+    Formatted strings are cached per ``(query, limit)`` until the store logs
+    or removes a request, so repeating a query between writes costs a dict
+    lookup. At most ``cache_size`` strings are kept (least recently used
+    evicted first); 0 disables the cache.
+    """
+
+    def __init__(self, store: MemoryStore, cache_size: int = 128) -> None:
+        if cache_size < 0:
+            raise ValueError(f"cache_size must be >= 0, got {cache_size}")
         self._store = store
+        self._cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, int], str] = OrderedDict()
+        self._generation = store.request_generation
 
     async def get_context(self, query: str, limit: int = 5) -> list[RequestRecord]:
         return await self._store.search_similar(query, limit=limit)
 
     async def format_context(self, query: str, limit: int = 5) -> str:
-        records = await self.get_context(query, limit=limit)
+        if self._generation != self._store.request_generation:
+            self._cache.clear()
+            self._generation = self._store.request_generation
+        key = (query, limit)
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache.move_to_end(key)
+            return text
+        text = self._format(await self.get_context(query, limit=limit))
+        # A write while the lookup ran may not be reflected in ``text``.
+        if self._cache_size and self._generation == self._store.request_generation:
+            self._cache[key] = text
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    @staticmethod
+    def _format(records: list[RequestRecord]) -> str:
         if not records:
             return "No previous context available."
         lines: list[str] = []
         for r in records:
-            lines.append(f"- [{r.intent_type}] {r.raw_query} (confidence: {r.confidence})")
+            lines.append(
+                f"- [{r.intent_type}] {r.raw_query} (confidence: {r.confidence})"
+            )
         return "Recent history:\n" + "\n".join(lines)
@@ -0,0 +1,114 @@
+"""Dictionary encoding of low-cardinality audit strings.
+
+``requests.intent_type``, ``actions.action_type`` and
+``policy_decisions.reason`` repeat a handful of distinct strings across
+millions of rows. Each has a lookup table (``intent_types``,
+``action_types``, ``decision_reasons``: ``id INTEGER PRIMARY KEY, value
+TEXT UNIQUE``), and rows store the value's id in ``<column>_id`` with the
+text column left empty, so a row carries a 1–2 byte integer instead of the
+string.
+
+Encoding is transparent: writes look the id up inside the INSERT, reads go
+through ``decoded()``, which falls back to the text column. Rows written
+before the dictionaries existed keep their text until
+``MemoryStore.encode_dictionaries`` rewrites them in small batches, and
+both kinds of row read the same in the meantime. Once none are left the
+database records it (``ENCODED_OPTION`` in ``schema_options``) and filters
+compare codes alone. The hash chain covers the logical (decoded) values,
+so encoding a row never changes its hash.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Dictionary:
+    table: str
+    column: str
+    lookup: str
+
+    @property
+    def code(self) -> str:
+        return f"{self.column}_id"
+
+
+DICTIONARIES = (
+    Dictionary("requests", "intent_type", "intent_types"),
+    Dictionary("actions", "action_type", "action_types"),
+    Dictionary("policy_decisions", "reason", "decision_reasons"),
+)
+_BY_COLUMN = {d.column: d for d in DICTIONARIES}
+_BY_TABLE = {(d.table, d.column): d for d in DICTIONARIES}
+ENCODED_OPTION = "dictionaries_encoded"
+_REFERENCE = re.compile(r"\b(\w+)\.(" + "|".join(_BY_COLUMN) + r")\b")
+
+
+def find(table: str, column: str) -> Dictionary | None:
+    return _BY_TABLE.get((table, column))
+
+
+def decoded(d: Dictionary, alias: str) -> str:
+    """SQL for the logical value of ``d`` in the row ``alias``."""
+    return f"COALESCE((SELECT value FROM {d.lookup} WHERE id = {alias}.{d.code}), {alias}.{d.column})"
+
+
+def decode_references(sql: str) -> str:
+    """Replace every ``alias.<dictionary column>`` in ``sql`` with its
+    decoded value; column names are unique across the dictionaries."""
+    return _REFERENCE.sub(lambda m: decoded(_BY_COLUMN[m.group(2)], m.group(1)), sql)
+
+
+def matches(d: Dictionary, alias: str, legacy: bool = False) -> str:
+    """SQL that is true where ``d`` equals a value; takes the value's id (None
+    if it has none) and, with ``legacy`` rows still unencoded, the value."""
+    if legacy:
+        return f"({alias}.{d.code} = ? OR {alias}.{d.column} = ?)"
+    return f"{alias}.{d.code} = ?"
+
+
+def encoded(d: Dictionary) -> str:
+    """SQL for the id of a value (the ``?``) already in the lookup table."""
+    return f"(SELECT id FROM {d.lookup} WHERE value = ?)"
+
+
+def select_columns(table: str, columns: Iterable[str], alias: str) -> str:
+    """A select list of ``columns`` with dictionary columns decoded (under
+    their own name) and their code columns left out."""
+    codes = {d.code for d in DICTIONARIES if d.table == table}
+    items: list[str] = []
+    for column in columns:
+        d = find(table, column)
+        if d is not None:
+            items.append(f"{decoded(d, alias)} AS {column}")
+        elif column not in codes:
+            items.append(f"{alias}.{column}")
+    return ", ".join(items)
+
+
+def migration_statements() -> tuple[str, ...]:
+    statements: list[str] = []
+    for d in DICTIONARIES:
+        statements += [
+            f"CREATE TABLE IF NOT EXISTS {d.lookup} (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)",
+            f"ALTER TABLE {d.table} ADD COLUMN {d.code} INTEGER REFERENCES {d.lookup}(id)",
+        ]
+    statements.append(
+        "CREATE INDEX IF NOT EXISTS idx_actions_action_type_id ON actions(action_type_id, request_id)"
+    )
+    return tuple(statements)
+
+
+def mark_encoded() -> str:
+    """SQL recording ``ENCODED_OPTION`` if no row is left unencoded."""
+    unencoded = " OR ".join(
+        f"EXISTS (SELECT 1 FROM {d.table} WHERE {d.code} IS NULL AND {d.column} IS NOT NULL)"
+        for d in DICTIONARIES
+    )
+    return (
+        f"INSERT OR IGNORE INTO schema_options (name, value) SELECT '{ENCODED_OPTION}', '1' "
+        f"WHERE NOT ({unencoded})"
+    )
@@ -0,0 +1,119 @@
+"""Offline text embeddings and an in-memory cosine index for history search.
+
+``HashingEmbedder`` maps text to a fixed-size vector with the hashing trick
+over word unigrams, word bigrams and character trigrams. It needs no model
+download or network access, and the same text always yields the same vector
+across processes (features are hashed with BLAKE2b, not Python's salted
+``hash``). Vectors are persisted as int8 — cosine similarity is scale
+invariant, so each vector is scaled to the full int8 range and renormalised
+on load.
+
+``VectorIndex`` keeps the dequantised, L2-normalised matrix in memory and
+answers top-k queries with one matrix-vector product plus ``argpartition``.
+The product reads the whole matrix, so search time is bound by memory
+bandwidth: at the default 128 dimensions, 100k rows (51 MB) take about
+1.5 ms for the product and 1.6 ms per search on one core, and
+``embedding_dim=64`` halves that (about 0.9 ms). Those figures depend on
+the machine's memory bandwidth; a 1 ms search over 100k rows is not
+guaranteed and is not tested. int8 and float16 products are slower in
+NumPy, which has no BLAS kernels for them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9_.+-]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """The lowercase word tokens embeddings are built from."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 128) -> None:
+        if dim < 8:
+            raise ValueError(f"dim must be >= 8, got {dim}")
+        self.dim = dim
+
+    def _features(self, text: str) -> list[tuple[str, float]]:
+        tokens = tokenize(text)
+        features: list[tuple[str, float]] = [(f"w:{t}", 1.0) for t in tokens]
+        features += [(f"b:{a} {b}", 0.5) for a, b in zip(tokens, tokens[1:])]
+        for t in tokens:
+            padded = f"<{t}>"
+            features += [
+                (f"c:{padded[i : i + 3]}", 0.25) for i in range(len(padded) - 2)
+            ]
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return the L2-normalised float32 embedding (all zeros for empty text)."""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = int.from_bytes(
+                hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+            )
+            vec[h % self.dim] += weight if h >> 63 else -weight
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def quantize(self, vec: np.ndarray) -> bytes:
+        """Encode a vector as ``dim`` int8 bytes scaled to the full int8 range."""
+        peak = float(np.abs(vec).max())
+        if peak == 0:
+            return bytes(self.dim)
+        return np.round(vec * (127.0 / peak)).astype(np.int8).tobytes()
+
+    def dequantize(self, blobs: list[bytes]) -> np.ndarray:
+        """Decode int8 blobs into an (n, dim) L2-normalised float32 matrix."""
+        matrix = np.frombuffer(b"".join(blobs), dtype=np.int8).reshape(
+            len(blobs), self.dim
+        )
+        matrix = matrix.astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class VectorIndex:
+    """Append-only matrix of normalised vectors with top-k cosine search."""
+
+    def __init__(self, dim: int, capacity: int = 1024) -> None:
+        self.dim = dim
+        self._matrix = np.zeros((max(capacity, 1), dim), dtype=np.float32)
+        self._ids: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids: list[str], vectors: np.ndarray) -> None:
+        n = len(self._ids)
+        needed = n + len(ids)
+        if needed > len(self._matrix):
+            grown = np.zeros(
+                (max(needed, 2 * len(self._matrix)), self.dim), dtype=np.float32
+            )
+            grown[:n] = self._matrix[:n]
+            self._matrix = grown
+        self._matrix[n:needed] = vectors
+        self._ids.extend(ids)
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[str, float]]:
+        """Return up to ``k`` (id, cosine) pairs ordered by descending similarity."""
+        n = len(self._ids)
+        if n == 0 or k <= 0:
+            return []
+        scores = self._matrix[:n] @ query
+        if k < n:
+            top = np.argpartition(scores, n - k)[n - k :]
+        else:
+            top = np.arange(n)
+        order = sorted(top.tolist(), key=lambda i: (-scores[i], -i))
+        return [(self._ids[i], float(scores[i])) for i in order]
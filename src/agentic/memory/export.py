@@ -0,0 +1,339 @@
+"""Streaming, incremental audit export for shipping logs to a SIEM.
+
+``AuditExporter`` walks the audit log in one ordered pass: each request,
+then its actions, then each action's policy decisions and execution results.
+Requests are read ``page_size`` at a time with keyset pagination on
+``(created_at, id)``, so memory stays bounded however large the database
+is. Policy decisions and execution results logged after their request was
+exported (a later rollback, say) follow afterwards in id and rowid order, as
+do policy decisions whose action was never logged (actions denied before an
+action row is written).
+
+Two gzip-compressed formats are written:
+
+* ``jsonl`` — one JSON object per row, tagged with its ``table``.
+* ``columnar`` — one JSON object per table per page holding column arrays,
+  ``{"table": ..., "rows": n, "columns": {name: [values, ...]}}``. This is
+  the record-batch layout of an Arrow IPC stream without a pyarrow
+  dependency; ``pyarrow.Table.from_pydict(batch["columns"])`` loads a batch.
+
+Exports are incremental. Once a file is completely written, the position of
+its last request and orphan decision, and the highest policy decision id and
+execution rowid it has seen, are saved under the export's ``name`` in ``export_watermarks``, and the
+next export resumes after them. Rows younger than ``settle_seconds`` are left
+for the next export, so a pipeline run still in flight is exported whole
+rather than split across two files.
+
+Dictionary-encoded columns (``agentic.memory.dictionary``) are exported as
+their strings. Other columns are exported as stored, so timestamps of an ``epoch_us`` database
+(``agentic.memory.timestamps``) are integer microseconds.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import IO, Any
+
+from agentic.memory.blobs import decode_blob
+from agentic.memory.dictionary import select_columns
+from agentic.memory.store import MemoryStore
+
+FORMATS = ("jsonl", "columnar")
+_TABLES = ("requests", "actions", "policy_decisions", "execution_results")
+
+Row = tuple[str, dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class ExportWatermark:
+    created_at: str | int = ""
+    request_id: str = ""
+    decision_id: int = 0
+    child_decision_id: int = 0
+    execution_rowid: int = 0
+
+
+@dataclass(frozen=True)
+class ExportReport:
+    path: Path
+    requests: int = 0
+    actions: int = 0
+    policy_decisions: int = 0
+    execution_results: int = 0
+    watermark: ExportWatermark = ExportWatermark()
+
+
+def _write_jsonl(out: IO[str], page: list[Row]) -> None:
+    for table, row in page:
+        out.write(json.dumps({"table": table, **row}) + "\n")
+
+
+def _write_columnar(out: IO[str], page: list[Row]) -> None:
+    batches: dict[str, dict[str, list[Any]]] = {}
+    for table, row in page:
+        columns = batches.get(table)
+        if columns is None:
+            columns = batches[table] = {name: [] for name in row}
+        for name, value in row.items():
+            columns[name].append(value)
+    for table, columns in batches.items():
+        rows = len(next(iter(columns.values())))
+        out.write(json.dumps({"table": table, "rows": rows, "columns": columns}) + "\n")
+
+
+_WRITERS = {"jsonl": _write_jsonl, "columnar": _write_columnar}
+
+
+class AuditExporter:
+    def __init__(
+        self,
+        store: MemoryStore,
+        name: str = "default",
+        page_size: int = 500,
+        settle_seconds: float = 60.0,
+    ) -> None:
+        if page_size < 1:
+            raise ValueError(f"page_size must be >= 1, got {page_size}")
+        if settle_seconds < 0:
+            raise ValueError(f"settle_seconds must be >= 0, got {settle_seconds}")
+        self._store = store
+        self._name = name
+        self._page_size = page_size
+        self._settle = timedelta(seconds=settle_seconds)
+        self._column_names: dict[str, list[str]] = {}
+
+    async def watermark(self) -> ExportWatermark:
+        row = await self._store._fetchone(
+            "SELECT created_at, request_id, decision_id, child_decision_id, execution_rowid "
+            "FROM export_watermarks WHERE name = ?",
+            (self._name,),
+        )
+        return ExportWatermark(*row) if row else ExportWatermark()
+
+    async def export(
+        self, path: str | Path, fmt: str = "jsonl", full: bool = False
+    ) -> ExportReport:
+        """Write everything after the saved watermark (or everything, with
+        ``full``) to ``path`` and advance the watermark."""
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {FORMATS}, got {fmt!r}")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        since = ExportWatermark() if full else await self.watermark()
+        until = self._store.timestamp_bound(datetime.now(timezone.utc) - self._settle)
+        write = _WRITERS[fmt]
+        counts = dict.fromkeys(_TABLES, 0)
+        watermark = since
+        partial = path.with_name(path.name + ".part")
+        try:
+            with gzip.open(partial, "wt", encoding="utf-8") as out:
+                async for page, watermark in self._pages(since, until):
+                    write(out, page)
+                    for table, _ in page:
+                        counts[table] += 1
+            partial.replace(path)
+        finally:
+            partial.unlink(missing_ok=True)
+        if watermark != since:
+            await self._save(watermark)
+        return ExportReport(path=path, watermark=watermark, **counts)
+
+    async def _save(self, watermark: ExportWatermark) -> None:
+        async with self._store.writer() as db:
+            await db.execute(
+                "INSERT INTO export_watermarks "
+                "(name, created_at, request_id, decision_id, child_decision_id, execution_rowid, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET created_at = excluded.created_at, "
+                "request_id = excluded.request_id, decision_id = excluded.decision_id, "
+                "child_decision_id = excluded.child_decision_id, "
+                "execution_rowid = excluded.execution_rowid, updated_at = excluded.updated_at",
+                (
+                    self._name,
+                    watermark.created_at,
+                    watermark.request_id,
+                    watermark.decision_id,
+                    watermark.child_decision_id,
+                    watermark.execution_rowid,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            await db.commit()
+
+    async def _columns(self, table: str, alias: str) -> str:
+        """Select list of ``table`` with dictionary-encoded columns decoded."""
+        if table not in self._column_names:
+            rows = await self._store._fetchall(
+                f"SELECT name FROM pragma_table_info('{table}')"
+            )
+            self._column_names[table] = [r[0] for r in rows]
+        return select_columns(table, self._column_names[table], alias)
+
+    async def _select(self, sql: str, params: tuple[Any, ...]) -> list[dict[str, Any]]:
+        async with self._store._read() as db:
+            cursor = await db.execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in await cursor.fetchall()]
+
+    async def _pages(
+        self, since: ExportWatermark, until: str | int
+    ) -> AsyncIterator[tuple[list[Row], ExportWatermark]]:
+        # Children are bounded by the high-water marks taken up front, so a
+        # row is exported either with a new request or, once its request is
+        # behind the watermark, as a late row -- never both.
+        (decision_max,) = await self._store._fetchone(
+            "SELECT COALESCE(MAX(id), 0) FROM policy_decisions"
+        )
+        (execution_max,) = await self._store._fetchone(
+            "SELECT COALESCE(MAX(rowid), 0) FROM execution_results"
+        )
+        bounds = (decision_max, execution_max)
+        watermark = since
+        while True:
+            # No keyset before the first request: an empty watermark does
+            # not compare below integer timestamps.
+            after = (
+                (watermark.created_at, watermark.request_id)
+                if watermark.request_id
+                else ()
+            )
+            requests = await self._select(
+                f"SELECT {await self._columns('requests', 'requests')} FROM requests WHERE created_at < ? "
+                + ("AND (created_at, id) > (?, ?) " if after else "")
+                + "ORDER BY created_at, id LIMIT ?",
+                (until, *after, self._page_size),
+            )
+            if not requests:
+                break
+            watermark = ExportWatermark(
+                requests[-1]["created_at"],
+                requests[-1]["id"],
+                since.decision_id,
+                *bounds,
+            )
+            yield await self._request_page(requests, bounds), watermark
+            if len(requests) < self._page_size:
+                break
+        watermark = ExportWatermark(
+            watermark.created_at, watermark.request_id, since.decision_id, *bounds
+        )
+
+        if since.request_id:
+            # Rows logged against requests an earlier export already wrote,
+            # such as the execution result of a later rollback. The check is
+            # correlated on primary keys, so a page only probes the actions
+            # and requests of the rows it reads.
+            exported = (
+                "EXISTS (SELECT 1 FROM actions a JOIN requests r ON r.id = a.request_id "
+                "WHERE a.id = {alias}.action_id AND (r.created_at, r.id) <= (?, ?))"
+            )
+            keyset = (since.created_at, since.request_id)
+            last = since.child_decision_id
+            while True:
+                decisions = await self._select(
+                    f"SELECT {await self._columns('policy_decisions', 'policy_decisions')} "
+                    f"FROM policy_decisions WHERE id > ? AND id <= ? AND {exported.format(alias='policy_decisions')} "
+                    "ORDER BY id LIMIT ?",
+                    (last, decision_max, *keyset, self._page_size),
+                )
+                if not decisions:
+                    break
+                last = decisions[-1]["id"]
+                yield [("policy_decisions", d) for d in decisions], watermark
+            last = since.execution_rowid
+            while True:
+                executions = await self._select(
+                    f"{await self._executions()} WHERE e.rowid > ? AND e.rowid <= ? "
+                    f"AND {exported.format(alias='e')} ORDER BY e.rowid LIMIT ?",
+                    (last, execution_max, *keyset, self._page_size),
+                )
+                if not executions:
+                    break
+                last = executions[-1]["_rowid"]
+                yield (
+                    [("execution_results", _inline_output(e)) for e in executions],
+                    watermark,
+                )
+
+        while True:
+            orphans = await self._select(
+                f"SELECT {await self._columns('policy_decisions', 'policy_decisions')} "
+                "FROM policy_decisions WHERE id > ? "
+                "AND (created_at IS NULL OR created_at < ?) "
+                "AND NOT EXISTS (SELECT 1 FROM actions a WHERE a.id = policy_decisions.action_id) "
+                "ORDER BY id LIMIT ?",
+                (watermark.decision_id, until, self._page_size),
+            )
+            if not orphans:
+                return
+            watermark = ExportWatermark(
+                watermark.created_at, watermark.request_id, orphans[-1]["id"], *bounds
+            )
+            yield [("policy_decisions", d) for d in orphans], watermark
+
+    async def _executions(self) -> str:
+        """Select from ``execution_results e`` with blob text joined for ``_inline_output``."""
+        return (
+            f"SELECT {await self._columns('execution_results', 'e')}, e.rowid AS _rowid, "
+            "       ob.codec AS _output_codec, ob.data AS _output_data, "
+            "       eb.codec AS _error_codec, eb.data AS _error_data "
+            "FROM execution_results e "
+            "LEFT JOIN blobs ob ON ob.hash = e.output_hash "
+            "LEFT JOIN blobs eb ON eb.hash = e.error_hash"
+        )
+
+    async def _request_page(
+        self, requests: list[dict[str, Any]], bounds: tuple[int, int]
+    ) -> list[Row]:
+        ids = tuple(r["id"] for r in requests)
+        marks = ", ".join("?" * len(ids))
+        in_page = f"action_id IN (SELECT id FROM actions WHERE request_id IN ({marks}))"
+        actions = await self._select(
+            f"SELECT {await self._columns('actions', 'actions')} FROM actions "
+            f"WHERE request_id IN ({marks}) ORDER BY rowid",
+            ids,
+        )
+        decisions = await self._select(
+            f"SELECT {await self._columns('policy_decisions', 'policy_decisions')} FROM policy_decisions "
+            f"WHERE {in_page} AND id <= ? ORDER BY id",
+            (*ids, bounds[0]),
+        )
+        executions = await self._select(
+            f"{await self._executions()} WHERE e.{in_page} AND e.rowid <= ? ORDER BY e.rowid",
+            (*ids, bounds[1]),
+        )
+        by_request: dict[str, list[dict[str, Any]]] = {}
+        for a in actions:
+            by_request.setdefault(a["request_id"], []).append(a)
+        children: dict[str, list[Row]] = {}
+        for d in decisions:
+            children.setdefault(d["action_id"], []).append(("policy_decisions", d))
+        for e in executions:
+            children.setdefault(e["action_id"], []).append(
+                ("execution_results", _inline_output(e))
+            )
+
+        page: list[Row] = []
+        for r in requests:
+            page.append(("requests", r))
+            for a in by_request.get(r["id"], ()):
+                page.append(("actions", a))
+                page.extend(children.get(a["id"], ()))
+        return page
+
+
+def _inline_output(row: dict[str, Any]) -> dict[str, Any]:
+    """Replace blob references with the text they point to."""
+    row.pop("_rowid")
+    for field in ("output", "error"):
+        codec = row.pop(f"_{field}_codec")
+        data = row.pop(f"_{field}_data")
+        row.pop(f"{field}_hash")
+        if codec:
+            row[field] = decode_blob(codec, data)
+    return row
@@ -0,0 +1,214 @@
+"""Incremental verification of the audit hash chain (see ``agentic.memory.chain``)."""
+
+from __future__ import annotations
+
+import hmac
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from agentic.memory.chain import (
+    CHAINED_COLUMNS,
+    GENESIS_HASH,
+    link,
+    sign,
+    sign_pruned,
+    sign_verified,
+)
+from agentic.memory.dictionary import decoded, find
+from agentic.memory.store import MemoryStore
+
+_MAX_PROBLEMS = 20
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    id: int
+    seq: int
+    chain_hash: str
+    created_at: str
+    signature: str
+    verified_at: str | None = None
+
+
+@dataclass(frozen=True)
+class VerifyReport:
+    start_seq: int
+    end_seq: int
+    rows_checked: int = 0
+    rows_pruned: int = 0
+    checkpoints_checked: int = 0
+    problems: tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def _union_sql() -> str:
+    width = max(len(cols) for cols in CHAINED_COLUMNS.values())
+    arms = []
+    for table, cols in CHAINED_COLUMNS.items():
+        # The chain covers logical values: decode dictionary-encoded columns.
+        values = [decoded(d, table) if (d := find(table, c)) else c for c in cols]
+        padded = ", ".join([*values, *(["NULL"] * (width - len(cols)))])
+        arms.append(
+            f"SELECT chain_seq, chain_hash, '{table}', {padded} FROM {table} "
+            "WHERE chain_seq > ? AND chain_seq <= ?"
+        )
+    return " UNION ALL ".join(arms) + " ORDER BY 1 LIMIT ?"
+
+
+_ROWS_SQL = _union_sql()
+
+
+class AuditVerifier:
+    def __init__(self, store: MemoryStore, key: bytes, page_size: int = 1000) -> None:
+        if page_size < 1:
+            raise ValueError(f"page_size must be >= 1, got {page_size}")
+        self._store = store
+        self._key = key
+        self._page_size = page_size
+
+    async def _checkpoints(
+        self, where: str, params: tuple[Any, ...] = ()
+    ) -> list[Checkpoint]:
+        rows = await self._store._fetchall(
+            "SELECT id, seq, chain_hash, created_at, signature, verified_at "
+            f"FROM audit_checkpoints WHERE {where} ORDER BY seq, id",
+            params,
+        )
+        return [Checkpoint(*r) for r in rows]
+
+    def _valid(self, cp: Checkpoint) -> bool:
+        if cp.verified_at is None:
+            expected = sign(self._key, cp.seq, cp.chain_hash, cp.created_at)
+        else:
+            expected = sign_verified(
+                self._key, cp.seq, cp.chain_hash, cp.created_at, cp.verified_at
+            )
+        return hmac.compare_digest(cp.signature, expected)
+
+    async def verify(self, full: bool = False) -> VerifyReport:
+        """Check every chained row after the last verified checkpoint (or
+        all of them, with ``full``) and record a verified checkpoint at the
+        head if nothing is wrong."""
+        problems: list[str] = []
+        start_seq, prev = 0, GENESIS_HASH
+        if not full:
+            verified = await self._checkpoints("verified_at IS NOT NULL")
+            if verified:
+                last = verified[-1]
+                if self._valid(last):
+                    start_seq, prev = last.seq, last.chain_hash
+                else:
+                    problems.append(
+                        f"checkpoint {last.id} at seq {last.seq}: bad signature"
+                    )
+        head_seq, head_hash = await self._store._fetchone(
+            "SELECT seq, hash FROM audit_chain_head WHERE id = 1"
+        )
+        pending = {
+            cp.seq: cp
+            for cp in await self._checkpoints(
+                "seq > ? AND verified_at IS NULL", (start_seq,)
+            )
+        }
+        pruned = {
+            seq: (chain_hash, signature)
+            for seq, chain_hash, signature in await self._store._fetchall(
+                "SELECT seq, chain_hash, signature FROM audit_chain_pruned WHERE seq > ? AND seq <= ?",
+                (start_seq, head_seq),
+            )
+        }
+
+        def problem(message: str) -> None:
+            if len(problems) < _MAX_PROBLEMS:
+                problems.append(message)
+
+        seq = start_seq
+        rows_checked = rows_pruned = checkpoints_checked = 0
+
+        def check_checkpoint(at: int, chain_hash: str) -> None:
+            nonlocal checkpoints_checked
+            cp = pending.pop(at, None)
+            if cp is None:
+                return
+            checkpoints_checked += 1
+            if not self._valid(cp):
+                problem(f"checkpoint {cp.id} at seq {cp.seq}: bad signature")
+            elif cp.chain_hash != chain_hash:
+                problem(
+                    f"checkpoint {cp.id} at seq {cp.seq}: chain diverges from signed hash"
+                )
+
+        def step_over_gap(until: int) -> None:
+            nonlocal seq, prev, rows_pruned
+            while seq + 1 < until:
+                seq += 1
+                if seq in pruned:
+                    prev, signature = pruned[seq]
+                    if not hmac.compare_digest(
+                        signature, sign_pruned(self._key, seq, prev)
+                    ):
+                        problem(
+                            f"seq {seq}: row missing; its pruned link is not signed"
+                        )
+                    rows_pruned += 1
+                    check_checkpoint(seq, prev)
+                else:
+                    problem(f"seq {seq}: row missing")
+
+        while seq < head_seq:
+            rows = await self._store._fetchall(
+                _ROWS_SQL, (seq, head_seq) * len(CHAINED_COLUMNS) + (self._page_size,)
+            )
+            if not rows:
+                break
+            for row in rows:
+                row_seq, stored, table = row[0], row[1], row[2]
+                step_over_gap(row_seq)
+                values = row[3 : 3 + len(CHAINED_COLUMNS[table])]
+                expected = link(prev, table, values)
+                if stored != expected:
+                    problem(f"seq {row_seq} ({table} {values[0]}): hash mismatch")
+                seq, prev = row_seq, stored
+                rows_checked += 1
+                check_checkpoint(seq, prev)
+        step_over_gap(head_seq + 1)
+        if prev != head_hash:
+            problem(f"seq {head_seq}: chain head does not match the last row")
+        for cp in pending.values():
+            problem(
+                f"checkpoint {cp.id} at seq {cp.seq}: refers to rows beyond the chain head"
+            )
+
+        report = VerifyReport(
+            start_seq=start_seq,
+            end_seq=head_seq,
+            rows_checked=rows_checked,
+            rows_pruned=rows_pruned,
+            checkpoints_checked=checkpoints_checked,
+            problems=tuple(problems),
+        )
+        if report.ok and head_seq > start_seq:
+            await self._record_verified(head_seq, head_hash)
+        return report
+
+    async def _record_verified(self, seq: int, chain_hash: str) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        async with self._store.writer() as db:
+            await db.execute(
+                "INSERT INTO audit_checkpoints (seq, chain_hash, created_at, signature, verified_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    seq,
+                    chain_hash,
+                    now,
+                    sign_verified(self._key, seq, chain_hash, now, now),
+                    now,
+                ),
+            )
+            # Gaps at or below a verified checkpoint are never walked again.
+            await db.execute("DELETE FROM audit_chain_pruned WHERE seq <= ?", (seq,))
+            await db.commit()
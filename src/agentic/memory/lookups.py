@@ -0,0 +1,78 @@
+"""Bounded LRU cache of ``MemoryStore`` point lookups by ID.
+
+Rollback, history rendering and reports look the same requests, actions
+and executions up again and again. Audit rows are append-only, so a row
+once found does not change; ``MemoryStore`` keeps what ``get_request``,
+``get_actions_for_request`` and ``get_execution`` found and drops an entry
+when it logs a row that would change the answer. Misses (None, no actions)
+are not cached: another process may log the row later.
+
+Every invalidation bumps ``generation``; a lookup that raced a write (its
+read started before the write was logged) does not cache its result.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    capacity: int
+    size: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LookupCache:
+    def __init__(self, capacity: int) -> None:
+        if capacity < 0:
+            raise ValueError(f"capacity must be >= 0, got {capacity}")
+        self.capacity = capacity
+        self.generation = 0
+        self._entries: OrderedDict[tuple[str, str], Any] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: tuple[str, str]) -> Any | None:
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def put(self, key: tuple[str, str], value: Any, generation: int) -> None:
+        """Cache ``value`` unless an invalidation happened since ``generation``
+        was read."""
+        if not self.capacity or generation != self.generation:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: tuple[str, str]) -> None:
+        self._entries.pop(key, None)
+        self.generation += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.generation += 1
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            capacity=self.capacity,
+            size=len(self._entries),
+            hits=self._hits,
+            misses=self._misses,
+        )
@@ -1,7 +1,31 @@
-"""SQLite CREATE TABLE statements."""
+"""Versioned schema migrations for the audit database.
+
+Each ``Migration`` is applied at most once, in ascending version order, inside
+its own transaction. The applied version is recorded in ``schema_version`` so
+that reopening a database only runs the steps it has not seen yet. Databases
+created before versioning existed are adopted at version 1: every step uses
+``IF NOT EXISTS`` and is therefore safe to replay.
+
+The timestamp storage format (``agentic.memory.timestamps``) is chosen when a
+database is created: in an ``epoch_us`` database the audit timestamp columns
+are declared ``INTEGER`` instead of ``TEXT``. The choice is recorded in
+``schema_options`` and never changes afterwards; an adopted pre-versioning
+database already has ``TEXT`` columns and so stays ISO.
+"""
 
 from __future__ import annotations
 
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import aiosqlite
+
+from agentic.memory.aggregates import migration_statements, trigger_statements
+from agentic.memory.dictionary import mark_encoded
+from agentic.memory.dictionary import migration_statements as dictionary_statements
+from agentic.memory.timestamps import EPOCH_US, ISO, check_format
+
 TABLES: list[str] = [
     """
     CREATE TABLE IF NOT EXISTS requests (
@@ -56,3 +80,402 @@ TABLES: list[str] = [
     )
     """,
 ]
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "Initial audit tables", tuple(TABLES)),
+    Migration(
+        2,
+        "Indexes for recent-context, per-request and per-action lookups",
+        (
+            "CREATE INDEX IF NOT EXISTS idx_requests_created_at ON requests(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_actions_request_id ON actions(request_id)",
+            "CREATE INDEX IF NOT EXISTS idx_execution_results_action_id "
+            "ON execution_results(action_id)",
+            "CREATE INDEX IF NOT EXISTS idx_policy_decisions_action_id "
+            "ON policy_decisions(action_id)",
+        ),
+    ),
+    Migration(
+        3,
+        "Link cached embeddings to the request they were computed for",
+        (
+            "ALTER TABLE embeddings_cache ADD COLUMN request_id TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_cache_request_id "
+            "ON embeddings_cache(request_id)",
+        ),
+    ),
+    Migration(
+        4,
+        "FTS5 full-text index over request queries and action descriptions/commands",
+        # External-content tables keyed on the source rowid: the text is not
+        # stored twice, and triggers keep the index in step with every write.
+        # A full VACUUM may renumber these rowids — rebuild both indexes
+        # ("INSERT INTO requests_fts(requests_fts) VALUES('rebuild')") after one.
+        (
+            "CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts "
+            "USING fts5(raw_query, content='requests', content_rowid='rowid')",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS actions_fts "
+            "USING fts5(description, command, content='actions', content_rowid='rowid')",
+            """
+            CREATE TRIGGER IF NOT EXISTS requests_fts_ai AFTER INSERT ON requests BEGIN
+                INSERT INTO requests_fts(rowid, raw_query) VALUES (new.rowid, new.raw_query);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS requests_fts_ad AFTER DELETE ON requests BEGIN
+                INSERT INTO requests_fts(requests_fts, rowid, raw_query)
+                VALUES ('delete', old.rowid, old.raw_query);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS requests_fts_au AFTER UPDATE OF raw_query ON requests BEGIN
+                INSERT INTO requests_fts(requests_fts, rowid, raw_query)
+                VALUES ('delete', old.rowid, old.raw_query);
+                INSERT INTO requests_fts(rowid, raw_query) VALUES (new.rowid, new.raw_query);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS actions_fts_ai AFTER INSERT ON actions BEGIN
+                INSERT INTO actions_fts(rowid, description, command)
+                VALUES (new.rowid, new.description, new.command);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS actions_fts_ad AFTER DELETE ON actions BEGIN
+                INSERT INTO actions_fts(actions_fts, rowid, description, command)
+                VALUES ('delete', old.rowid, old.description, old.command);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS actions_fts_au
+            AFTER UPDATE OF description, command ON actions BEGIN
+                INSERT INTO actions_fts(actions_fts, rowid, description, command)
+                VALUES ('delete', old.rowid, old.description, old.command);
+                INSERT INTO actions_fts(rowid, description, command)
+                VALUES (new.rowid, new.description, new.command);
+            END
+            """,
+            "INSERT INTO requests_fts(requests_fts) VALUES ('rebuild')",
+            "INSERT INTO actions_fts(actions_fts) VALUES ('rebuild')",
+        ),
+    ),
+    Migration(
+        5,
+        "Timestamp policy decisions so decisions without an action row can age out",
+        (
+            "ALTER TABLE policy_decisions ADD COLUMN created_at TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_policy_decisions_created_at "
+            "ON policy_decisions(created_at)",
+        ),
+    ),
+    Migration(
+        6,
+        "Content-addressed compressed storage for execution output",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+            """,
+            "ALTER TABLE execution_results ADD COLUMN output_hash TEXT",
+            "ALTER TABLE execution_results ADD COLUMN error_hash TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_execution_results_output_hash "
+            "ON execution_results(output_hash)",
+            "CREATE INDEX IF NOT EXISTS idx_execution_results_error_hash "
+            "ON execution_results(error_hash)",
+        ),
+    ),
+    Migration(
+        7,
+        "Keyset index for paginated history and action-type filter index",
+        (
+            "CREATE INDEX IF NOT EXISTS idx_requests_created_at_id ON requests(created_at, id)",
+            "DROP INDEX IF EXISTS idx_requests_created_at",
+            "CREATE INDEX IF NOT EXISTS idx_actions_action_type ON actions(action_type, request_id)",
+        ),
+    ),
+    Migration(
+        8,
+        "Watermarks for incremental audit exports",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS export_watermarks (
+                name TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                request_id TEXT NOT NULL,
+                decision_id INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        9,
+        "Hash chain over audit rows with signed checkpoints",
+        (
+            "ALTER TABLE requests ADD COLUMN chain_seq INTEGER",
+            "ALTER TABLE requests ADD COLUMN chain_hash TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_requests_chain_seq ON requests(chain_seq)",
+            "ALTER TABLE actions ADD COLUMN chain_seq INTEGER",
+            "ALTER TABLE actions ADD COLUMN chain_hash TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_actions_chain_seq ON actions(chain_seq)",
+            "ALTER TABLE policy_decisions ADD COLUMN chain_seq INTEGER",
+            "ALTER TABLE policy_decisions ADD COLUMN chain_hash TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_policy_decisions_chain_seq ON policy_decisions(chain_seq)",
+            "ALTER TABLE execution_results ADD COLUMN chain_seq INTEGER",
+            "ALTER TABLE execution_results ADD COLUMN chain_hash TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_execution_results_chain_seq ON execution_results(chain_seq)",
+            """
+            CREATE TABLE IF NOT EXISTS audit_chain_head (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                seq INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            )
+            """,
+            "INSERT OR IGNORE INTO audit_chain_head (id, seq, hash) VALUES (1, 0, '"
+            + "0" * 64
+            + "')",
+            """
+            CREATE TABLE IF NOT EXISTS audit_checkpoints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                seq INTEGER NOT NULL,
+                chain_hash TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                verified_at TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_audit_checkpoints_seq ON audit_checkpoints(seq)",
+            """
+            CREATE TABLE IF NOT EXISTS audit_chain_pruned (
+                seq INTEGER PRIMARY KEY,
+                chain_hash TEXT NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        10,
+        "Rollback metadata on actions and dry-run flag on execution results",
+        (
+            "ALTER TABLE actions ADD COLUMN target TEXT DEFAULT ''",
+            "ALTER TABLE actions ADD COLUMN parameters TEXT DEFAULT '{}'",
+            "ALTER TABLE actions ADD COLUMN rollback_command TEXT DEFAULT ''",
+            "ALTER TABLE actions ADD COLUMN rollback_support TEXT DEFAULT 'UNKNOWN'",
+            "ALTER TABLE execution_results ADD COLUMN dry_run INTEGER DEFAULT 0",
+        ),
+    ),
+    Migration(
+        11,
+        "Incrementally maintained audit aggregates and the gate of each policy decision",
+        migration_statements(),
+    ),
+    Migration(
+        12,
+        "Recorded timestamp format; aggregate triggers read either format",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS schema_options (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """,
+            f"INSERT OR IGNORE INTO schema_options (name, value) VALUES ('timestamp_format', '{ISO}')",
+            *trigger_statements(),
+        ),
+    ),
+    Migration(
+        13,
+        "Dictionary-encoded intent types, action types and decision reasons",
+        (*dictionary_statements(), *trigger_statements(dictionary=True)),
+    ),
+    Migration(
+        14,
+        "Action plans with every candidate action and its simulated effect",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS plans (
+                id TEXT PRIMARY KEY,
+                request_id TEXT NOT NULL,
+                reasoning TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_plans_request_id ON plans(request_id)",
+            """
+            CREATE TABLE IF NOT EXISTS plan_actions (
+                plan_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                action_id TEXT NOT NULL,
+                action_type_id INTEGER NOT NULL REFERENCES action_types(id),
+                description TEXT NOT NULL,
+                command TEXT NOT NULL DEFAULT '',
+                target TEXT NOT NULL DEFAULT '',
+                parameters TEXT,
+                flags INTEGER NOT NULL,
+                scope INTEGER,
+                warnings TEXT,
+                PRIMARY KEY (plan_id, position)
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_plan_actions_action_id ON plan_actions(action_id)",
+        ),
+    ),
+    Migration(
+        15,
+        "Export watermarks over policy decisions and execution results of exported requests",
+        (
+            "ALTER TABLE export_watermarks ADD COLUMN child_decision_id INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE export_watermarks ADD COLUMN execution_rowid INTEGER NOT NULL DEFAULT 0",
+            "UPDATE export_watermarks SET "
+            "child_decision_id = (SELECT COALESCE(MAX(id), 0) FROM policy_decisions), "
+            "execution_rowid = (SELECT COALESCE(MAX(rowid), 0) FROM execution_results)",
+        ),
+    ),
+    Migration(
+        16,
+        "Signed chain links of pruned audit rows",
+        (
+            "ALTER TABLE audit_chain_pruned ADD COLUMN signature TEXT NOT NULL DEFAULT ''",
+        ),
+    ),
+    Migration(
+        17,
+        "Parsed entities of each request (JSON; empty when not recorded)",
+        ("ALTER TABLE requests ADD COLUMN entities TEXT NOT NULL DEFAULT ''",),
+    ),
+    Migration(
+        18,
+        "Drop the action type text index (encoded rows leave it empty); note fully encoded databases",
+        ("DROP INDEX IF EXISTS idx_actions_action_type", mark_encoded()),
+    ),
+]
+
+LATEST_VERSION: int = MIGRATIONS[-1].version
+
+# The migration that records the timestamp format.
+_OPTIONS_VERSION = 12
+
+# Columns declared INTEGER instead of TEXT in an ``epoch_us`` database.
+EPOCH_COLUMNS: dict[str, tuple[str, ...]] = {
+    "requests": ("created_at",),
+    "policy_decisions": ("created_at",),
+    "execution_results": ("executed_at",),
+    "embeddings_cache": ("created_at",),
+    "export_watermarks": ("created_at",),
+    "plans": ("created_at",),
+}
+
+_TABLE_DDL = re.compile(r"(?:CREATE TABLE IF NOT EXISTS|ALTER TABLE) (\w+)")
+
+
+def _epoch_schema(sql: str) -> str:
+    match = _TABLE_DDL.search(sql)
+    if match is None:
+        return sql
+    for column in EPOCH_COLUMNS.get(match.group(1), ()):
+        sql = re.sub(rf"\b{column} TEXT\b", f"{column} INTEGER", sql)
+    return sql
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    await db.execute(SCHEMA_VERSION_TABLE)
+    cursor = await db.execute("SELECT MAX(version) FROM schema_version")
+    row = await cursor.fetchone()
+    return row[0] or 0
+
+
+async def get_timestamp_format(db: aiosqlite.Connection) -> str:
+    """The timestamp format the database was created with."""
+    cursor = await db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_options'"
+    )
+    if await cursor.fetchone() is None:
+        return ISO
+    cursor = await db.execute(
+        "SELECT value FROM schema_options WHERE name = 'timestamp_format'"
+    )
+    row = await cursor.fetchone()
+    return row[0] if row is not None else ISO
+
+
+async def migrate(
+    db: aiosqlite.Connection,
+    migrations: list[Migration] = MIGRATIONS,
+    target: int | None = None,
+    timestamp_format: str = ISO,
+) -> int:
+    """Apply every pending migration up to ``target`` (default: latest).
+
+    ``timestamp_format`` only applies when the database is new; an existing
+    database, including an unversioned one being adopted, keeps the format
+    it was created with.
+
+    Returns the schema version the database is at afterwards. Raises
+    RuntimeError if the database was written by a newer schema than this
+    code knows about — silently running on it could drop audit columns.
+    """
+    check_format(timestamp_format)
+    current = await get_schema_version(db)
+    if current == 0:
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'requests'"
+        )
+        (adopted,) = await cursor.fetchone()
+        await cursor.close()
+        epoch = timestamp_format == EPOCH_US and not adopted
+    else:
+        # Tables added by later migrations follow the recorded format.
+        epoch = await get_timestamp_format(db) == EPOCH_US
+    await db.commit()
+    known = migrations[-1].version
+    if current > known:
+        raise RuntimeError(
+            f"Audit database schema version {current} is newer than supported version {known}"
+        )
+    target = known if target is None else target
+    for migration in migrations:
+        if migration.version <= current or migration.version > target:
+            continue
+        await db.execute("BEGIN")
+        try:
+            for sql in migration.statements:
+                await db.execute(_epoch_schema(sql) if epoch else sql)
+            if epoch and migration.version == _OPTIONS_VERSION:
+                await db.execute(
+                    "UPDATE schema_options SET value = ? WHERE name = 'timestamp_format'",
+                    (EPOCH_US,),
+                )
+            await db.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (
+                    migration.version,
+                    migration.description,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        current = migration.version
+    return current
@@ -6,15 +6,17 @@ from datetime import datetime, timezone
 
 from pydantic import BaseModel, Field
 
+from agentic.models.intent import Entity
+
 
 class RequestRecord(BaseModel):
     id: str
     raw_query: str
     intent_type: str
     confidence: float
-    created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
-    )
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # None: not recorded (requests logged before entities were).
+    entities: list[Entity] | None = None
 
 
 class ActionRecord(BaseModel):
@@ -25,6 +27,10 @@ class ActionRecord(BaseModel):
     command: str = ""
     risk_level: int = 1
     approved: bool = False
+    target: str = ""
+    parameters: dict[str, str] = Field(default_factory=dict)
+    rollback_command: str = ""
+    rollback_support: str = "UNKNOWN"
 
 
 class ExecutionRecord(BaseModel):
@@ -34,6 +40,5 @@ class ExecutionRecord(BaseModel):
     output: str = ""
     error: str = ""
     rolled_back: bool = False
-    executed_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
-    )
+    dry_run: bool = False
+    executed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
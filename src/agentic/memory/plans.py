@@ -0,0 +1,97 @@
+"""Compact storage of action plans and their simulated effects.
+
+``Pipeline.run`` logs every plan the decision engine produces, with its
+reasoning and every candidate action: those the gates denied as well as
+those approved and executed. Each candidate is one ``plan_actions`` row:
+
+* the action type, dictionary-encoded like ``actions.action_type``
+* ``flags`` — one bit per boolean (``APPROVED`` and the ``SIMULATED``
+  prediction bits below), so a prediction costs a single small integer
+* ``scope`` — the predicted ``ActionScope`` as its index in ``SCOPES``
+* ``warnings`` — newline-separated, NULL when there are none
+
+``ActionSimulation.simulated_output`` is not stored: it is derived from the
+action's command and target.
+
+``agentic.memory.predictions`` joins the predictions to
+``execution_results`` to show how well they matched what actually
+happened. Plans are analytics rather than audit records: they are not
+hash-chained, and retention deletes them with their request without
+archiving them.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from agentic.models.action import (
+    ActionCandidate,
+    ActionPlan,
+    ActionScope,
+    ActionSimulation,
+)
+
+REVERSIBLE = 1 << 0
+DATA_LOSS = 1 << 1
+AVAILABILITY = 1 << 2
+SUDO = 1 << 3
+SIMULATED = 1 << 4
+APPROVED = 1 << 5
+
+# Stored scope codes are indexes into this tuple: only ever append to it.
+SCOPES = (
+    ActionScope.PROCESS,
+    ActionScope.FILESYSTEM,
+    ActionScope.PACKAGE,
+    ActionScope.SERVICE,
+    ActionScope.MEMORY,
+    ActionScope.NETWORK,
+    ActionScope.SYSTEM,
+)
+_SCOPE_CODES = {scope: code for code, scope in enumerate(SCOPES)}
+
+
+def pack_flags(simulation: ActionSimulation | None, approved: bool) -> int:
+    flags = APPROVED if approved else 0
+    if simulation is not None:
+        flags |= SIMULATED
+        flags |= REVERSIBLE if simulation.reversible else 0
+        flags |= DATA_LOSS if simulation.data_loss_risk else 0
+        flags |= AVAILABILITY if simulation.availability_impact else 0
+        flags |= SUDO if simulation.would_require_sudo else 0
+    return flags
+
+
+def scope_code(scope: ActionScope) -> int:
+    return _SCOPE_CODES[scope]
+
+
+def unpack_simulation(
+    action_id: str, flags: int, scope: int | None, warnings: str | None
+) -> ActionSimulation | None:
+    """The stored prediction of an action; None if it was never simulated.
+    ``simulated_output`` is left empty."""
+    if not flags & SIMULATED:
+        return None
+    return ActionSimulation(
+        action_id=action_id,
+        predicted_scope=SCOPES[scope],  # type: ignore[index]  # set with SIMULATED
+        reversible=bool(flags & REVERSIBLE),
+        data_loss_risk=bool(flags & DATA_LOSS),
+        availability_impact=bool(flags & AVAILABILITY),
+        would_require_sudo=bool(flags & SUDO),
+        warnings=warnings.split("\n") if warnings else [],
+    )
+
+
+@dataclass(frozen=True)
+class LoggedPlan:
+    """A plan read back from the audit database."""
+
+    request_id: str
+    plan: ActionPlan
+    approved_ids: frozenset[str]
+
+    @property
+    def denied(self) -> list[ActionCandidate]:
+        return [a for a in self.plan.actions if a.id not in self.approved_ids]
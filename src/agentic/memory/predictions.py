@@ -0,0 +1,150 @@
+"""How well simulated action effects matched what actually happened.
+
+``PredictionAudit`` joins the predictions stored with each plan (see
+``agentic.memory.plans``) to ``execution_results``. An action's first
+non-dry-run execution result is the action itself; results logged after
+it are rollback attempts.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+
+from agentic.memory.plans import (
+    AVAILABILITY,
+    DATA_LOSS,
+    REVERSIBLE,
+    SCOPES,
+    SIMULATED,
+    SUDO,
+)
+from agentic.memory.store import MemoryStore
+from agentic.models.action import ActionScope
+
+FLAGS = {
+    "reversible": REVERSIBLE,
+    "data_loss": DATA_LOSS,
+    "availability": AVAILABILITY,
+    "sudo": SUDO,
+}
+
+_OUTCOMES = (
+    "WITH runs AS ("
+    "  SELECT action_id, MIN(rowid) AS first FROM execution_results WHERE dry_run = 0 GROUP BY action_id"
+    ") "
+    "SELECT p.action_id, t.value, p.flags, p.scope, e.success, "
+    "       (SELECT COUNT(*) FROM execution_results r "
+    "        WHERE r.action_id = p.action_id AND r.rowid > runs.first), "
+    "       (SELECT COUNT(*) FROM execution_results r "
+    "        WHERE r.action_id = p.action_id AND r.rowid > runs.first AND r.rolled_back != 0 AND r.success != 0) "
+    "FROM plan_actions p "
+    "JOIN action_types t ON t.id = p.action_type_id "
+    "LEFT JOIN runs ON runs.action_id = p.action_id "
+    "LEFT JOIN execution_results e ON e.rowid = runs.first "
+    "WHERE p.flags & ? AND (? IS NULL OR t.value = ?) "
+    "ORDER BY p.plan_id, p.position"
+)
+
+
+@dataclass(frozen=True)
+class PredictionOutcome:
+    """One simulated action and what happened when it ran.
+
+    ``succeeded`` is None if the action never ran outside a dry run.
+    """
+
+    action_id: str
+    action_type: str
+    flags: int
+    scope: ActionScope
+    succeeded: bool | None
+    rollbacks_attempted: int
+    rollbacks_succeeded: int
+
+    @property
+    def reversible(self) -> bool:
+        return bool(self.flags & REVERSIBLE)
+
+
+@dataclass(frozen=True)
+class PredictionAccuracy:
+    """Simulated effects compared with executions.
+
+    Reversibility is the one prediction the log can check: an action
+    predicted reversible should roll back when asked to, one predicted
+    irreversible should not. The other flags have no observable outcome, so
+    they are reported as the failure rate of the actions carrying them.
+    """
+
+    simulated: int = 0
+    executed: int = 0
+    failed: int = 0
+    rollbacks_checked: int = 0
+    reversible_correct: int = 0
+    flagged_executed: dict[str, int] = field(default_factory=dict)
+    flagged_failed: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def reversible_accuracy(self) -> float | None:
+        return (
+            self.reversible_correct / self.rollbacks_checked
+            if self.rollbacks_checked
+            else None
+        )
+
+    def failure_rate(self, flag: str) -> float | None:
+        executed = self.flagged_executed.get(flag, 0)
+        return self.flagged_failed.get(flag, 0) / executed if executed else None
+
+    def to_dict(self) -> dict[str, object]:
+        row = asdict(self)
+        row["reversible_accuracy"] = self.reversible_accuracy
+        row["failure_rates"] = {flag: self.failure_rate(flag) for flag in FLAGS}
+        return row
+
+
+class PredictionAudit:
+    """Reads plan predictions joined to their execution results."""
+
+    def __init__(self, store: MemoryStore) -> None:
+        self._store = store
+
+    async def outcomes(self, action_type: str | None = None) -> list[PredictionOutcome]:
+        """Every simulated action, optionally of one type, in plan order."""
+        rows = await self._store._fetchall(
+            _OUTCOMES, (SIMULATED, action_type, action_type)
+        )
+        return [
+            PredictionOutcome(
+                action_id=r[0],
+                action_type=r[1],
+                flags=r[2],
+                scope=SCOPES[r[3]],
+                succeeded=bool(r[4]) if r[4] is not None else None,
+                rollbacks_attempted=r[5] or 0,
+                rollbacks_succeeded=r[6] or 0,
+            )
+            for r in rows
+        ]
+
+    async def accuracy(self, action_type: str | None = None) -> PredictionAccuracy:
+        outcomes = await self.outcomes(action_type)
+        executed = [o for o in outcomes if o.succeeded is not None]
+        checked = [o for o in executed if o.rollbacks_attempted]
+        return PredictionAccuracy(
+            simulated=len(outcomes),
+            executed=len(executed),
+            failed=sum(not o.succeeded for o in executed),
+            rollbacks_checked=len(checked),
+            reversible_correct=sum(
+                o.reversible == bool(o.rollbacks_succeeded) for o in checked
+            ),
+            flagged_executed={
+                name: sum(bool(o.flags & bit) for o in executed)
+                for name, bit in FLAGS.items()
+            },
+            flagged_failed={
+                name: sum(bool(o.flags & bit) and not o.succeeded for o in executed)
+                for name, bit in FLAGS.items()
+            },
+        )
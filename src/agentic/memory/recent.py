@@ -0,0 +1,63 @@
+"""Bounded in-process buffer of the newest request records.
+
+``MemoryStore`` adds every request it logs, so in a long-lived process the
+recent history — and the similarity hits a context lookup resolves, which
+are mostly recent — are answered without a database round trip. The buffer
+only knows this process's writes: it is loaded from the database on first
+use and dropped whenever rows are removed behind its back (retention).
+"""
+
+from __future__ import annotations
+
+from bisect import insort
+
+from agentic.memory.models import RequestRecord
+
+
+def _key(record: RequestRecord) -> tuple[str, str]:
+    # The order of ``requests`` in the database: (created_at, id) as stored.
+    return record.created_at.isoformat(), record.id
+
+
+class RecentRequests:
+    def __init__(self, capacity: int) -> None:
+        if capacity < 0:
+            raise ValueError(f"capacity must be >= 0, got {capacity}")
+        self.capacity = capacity
+        self._records: list[RequestRecord] = []  # oldest first
+        self._by_id: dict[str, RequestRecord] = {}
+        self.loaded = False
+
+    def load(self, newest_first: list[RequestRecord]) -> None:
+        """Replace the contents with the newest rows read from the database."""
+        self._records = list(reversed(newest_first[: self.capacity]))
+        self._by_id = {r.id: r for r in self._records}
+        self.loaded = True
+
+    def clear(self) -> None:
+        self._records = []
+        self._by_id = {}
+        self.loaded = False
+
+    def add(self, record: RequestRecord) -> None:
+        if not self.capacity:
+            return
+        if len(self._records) == self.capacity and _key(record) < _key(
+            self._records[0]
+        ):
+            # Older than everything kept: the database still has it.
+            return
+        insort(self._records, record, key=_key)
+        self._by_id[record.id] = record
+        if len(self._records) > self.capacity:
+            del self._by_id[self._records.pop(0).id]
+
+    def newest(self, limit: int) -> list[RequestRecord] | None:
+        """The ``limit`` newest records, newest first, or None if the buffer
+        cannot answer (not loaded, or ``limit`` exceeds its capacity)."""
+        if not self.loaded or limit > self.capacity:
+            return None
+        return self._records[: -limit - 1 : -1]
+
+    def get(self, request_id: str) -> RequestRecord | None:
+        return self._by_id.get(request_id)
@@ -0,0 +1,409 @@
+"""Audit log retention: monthly archives, bounded-batch deletes, incremental vacuum.
+
+Rows leave the live database oldest-first, one calendar month at a time. Each
+batch of at most ``batch_size`` requests — with their actions, policy
+decisions, execution results and the output blobs those reference — is copied
+into that month's archive file and then deleted from the live database in a
+single short transaction, so pipeline writes interleave between batches instead of waiting for the whole
+prune. Archive files are ordinary SQLite databases with the audit tables,
+compacted after every prune, so they can be inspected with
+``ATTACH DATABASE 'audit-2025-01.db' AS jan``.
+
+Retention runs when ``agentic audit prune`` does; the CLI has no
+long-lived process to host a timer, so schedule that command (cron, a
+systemd timer) for periodic retention. Freed pages are returned to the
+filesystem by a background task that runs ``PRAGMA incremental_vacuum(N)``
+in steps of ``vacuum_pages``, taking the writer for one step at a time so
+pipeline writes go between steps. That requires ``auto_vacuum=INCREMENTAL``, which MemoryStore
+sets on every database it creates; databases created before that keep their
+free pages for reuse and are not shrunk.
+
+Deleting rows the audit chain verifier has not yet covered leaves their chain
+links in ``audit_chain_pruned``, signed with the store's checkpoint key (see
+``agentic.memory.chain``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+
+from agentic.memory import timestamps
+from agentic.memory.chain import sign_pruned
+from agentic.memory.dictionary import DICTIONARIES, select_columns
+from agentic.memory.store import MemoryStore
+
+_ARCHIVED_TABLES = (
+    "requests",
+    "actions",
+    "policy_decisions",
+    "execution_results",
+    "blobs",
+)
+_CODES = frozenset(d.code for d in DICTIONARIES)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    max_age_days: int | None = None
+    max_db_bytes: int | None = None
+    archive_dir: Path | None = None  # None: delete without archiving
+    batch_size: int = 500
+    vacuum_pages: int = 256
+
+    def __post_init__(self) -> None:
+        if self.max_age_days is not None and self.max_age_days < 0:
+            raise ValueError(f"max_age_days must be >= 0, got {self.max_age_days}")
+        if self.max_db_bytes is not None and self.max_db_bytes < 0:
+            raise ValueError(f"max_db_bytes must be >= 0, got {self.max_db_bytes}")
+        if self.batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got {self.batch_size}")
+        if self.vacuum_pages < 1:
+            raise ValueError(f"vacuum_pages must be >= 1, got {self.vacuum_pages}")
+
+
+@dataclass(frozen=True)
+class RetentionReport:
+    requests_removed: int = 0
+    decisions_removed: int = 0
+    archive_files: tuple[Path, ...] = field(default_factory=tuple)
+
+
+def archive_file(archive_dir: Path, month: str) -> Path:
+    """Archive file for a ``YYYY-MM`` month."""
+    return archive_dir / f"audit-{month}.db"
+
+
+def _next_month(month: str) -> datetime:
+    year, mon = int(month[:4]), int(month[5:7])
+    year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return datetime(year, mon, 1, tzinfo=timezone.utc)
+
+
+async def _record_pruned(
+    db: aiosqlite.Connection, table: str, where: str, key: bytes | None
+) -> None:
+    """Keep the chain links of rows about to be deleted that the last
+    verification has not covered yet, so ``audit verify`` can bridge them.
+    Without a key the links go unsigned and verification reports the gap."""
+    cursor = await db.execute(
+        f"SELECT chain_seq, chain_hash FROM {table} WHERE {where} AND chain_seq > "
+        "(SELECT COALESCE(MAX(seq), 0) FROM audit_checkpoints WHERE verified_at IS NOT NULL)"
+    )
+    await db.executemany(
+        "INSERT OR IGNORE INTO audit_chain_pruned (seq, chain_hash, signature) VALUES (?, ?, ?)",
+        [
+            (seq, h, sign_pruned(key, seq, h) if key else "")
+            for seq, h in await cursor.fetchall()
+        ],
+    )
+
+
+async def _scalar(db: aiosqlite.Connection, sql: str, params: tuple = ()) -> Any:
+    cursor = await db.execute(sql, params)
+    row = await cursor.fetchone()
+    return row[0] if row else None
+
+
+class RetentionManager:
+    def __init__(self, store: MemoryStore, policy: RetentionPolicy) -> None:
+        self._store = store
+        self._policy = policy
+        self._vacuum_task: asyncio.Task[int] | None = None
+
+    async def used_bytes(self) -> int:
+        """Bytes of the live database that hold data (free pages excluded)."""
+        async with self._store.writer() as db:
+            page_size = await _scalar(db, "PRAGMA page_size")
+            page_count = await _scalar(db, "PRAGMA page_count")
+            free = await _scalar(db, "PRAGMA freelist_count")
+        return (page_count - free) * page_size
+
+    async def run(self) -> RetentionReport:
+        """Apply the age policy, then the size policy, then start vacuuming
+        in the background; ``vacuumed()`` waits for it."""
+        requests_removed = 0
+        decisions_removed = 0
+        archives: set[Path] = set()
+
+        if self._policy.max_age_days is not None:
+            cutoff = self._store.timestamp_bound(
+                datetime.now(timezone.utc) - timedelta(days=self._policy.max_age_days)
+            )
+            n, d = await self._prune_before(cutoff, archives)
+            requests_removed += n
+            decisions_removed += d
+
+        if self._policy.max_db_bytes is not None:
+            while await self.used_bytes() > self._policy.max_db_bytes:
+                oldest = await self._oldest_month()
+                if oldest is None:
+                    break
+                n, d = await self._prune_before(
+                    self._store.timestamp_bound(_next_month(oldest)), archives
+                )
+                requests_removed += n
+                decisions_removed += d
+
+        if requests_removed:
+            # Removed requests must not linger in the similarity index or
+            # the recent-request buffer.
+            self._store.forget_requests()
+        for path in archives:
+            async with aiosqlite.connect(path) as archive:
+                await archive.execute("VACUUM")
+
+        if self._vacuum_task is None or self._vacuum_task.done():
+            self._vacuum_task = asyncio.create_task(self.vacuum())
+        return RetentionReport(
+            requests_removed=requests_removed,
+            decisions_removed=decisions_removed,
+            archive_files=tuple(sorted(archives)),
+        )
+
+    async def vacuumed(self) -> int:
+        """Wait for the vacuum ``run`` started; pages it released."""
+        if self._vacuum_task is None:
+            return 0
+        return await self._vacuum_task
+
+    async def vacuum(self) -> int:
+        """Release free pages ``vacuum_pages`` at a time, yielding between steps."""
+        released = 0
+        while True:
+            async with self._store.writer() as db:
+                if await _scalar(db, "PRAGMA auto_vacuum") != 2:  # INCREMENTAL
+                    return released
+                free = await _scalar(db, "PRAGMA freelist_count")
+                if not free:
+                    return released
+                step = min(free, self._policy.vacuum_pages)
+                cursor = await db.execute(f"PRAGMA incremental_vacuum({step})")
+                await cursor.fetchall()
+                released += step
+            await asyncio.sleep(0)
+
+    async def _oldest_month(self) -> str | None:
+        async with self._store.writer() as db:
+            oldest = await _scalar(db, "SELECT MIN(created_at) FROM requests")
+            if oldest is None:
+                oldest = await _scalar(
+                    db,
+                    "SELECT MIN(created_at) FROM policy_decisions "
+                    "WHERE action_id NOT IN (SELECT id FROM actions)",
+                )
+            return None if oldest is None else timestamps.month(oldest)
+
+    async def _prune_before(
+        self, cutoff: str | int, archives: set[Path]
+    ) -> tuple[int, int]:
+        requests_removed = 0
+        while n := await self._request_batch(cutoff, archives):
+            requests_removed += n
+            await asyncio.sleep(0)
+        decisions_removed = 0
+        while n := await self._orphan_decision_batch(cutoff, archives):
+            decisions_removed += n
+            await asyncio.sleep(0)
+        return requests_removed, decisions_removed
+
+    async def _request_batch(self, cutoff: str | int, archives: set[Path]) -> int:
+        async with self._store.writer() as db:
+            oldest = await _scalar(
+                db,
+                "SELECT MIN(created_at) FROM requests WHERE created_at < ?",
+                (cutoff,),
+            )
+            if oldest is None:
+                return 0
+            month = timestamps.month(oldest)
+            upper = min(cutoff, self._store.timestamp_bound(_next_month(month)))
+            await db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS retention_requests (id TEXT PRIMARY KEY)"
+            )
+            await db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS retention_actions (id TEXT PRIMARY KEY)"
+            )
+            await db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS retention_blobs (hash TEXT PRIMARY KEY)"
+            )
+            async with self._archive(db, month, archives) as archived:
+                await db.execute("DELETE FROM temp.retention_requests")
+                await db.execute("DELETE FROM temp.retention_actions")
+                await db.execute("DELETE FROM temp.retention_blobs")
+                await db.execute(
+                    "INSERT INTO temp.retention_requests SELECT id FROM requests "
+                    "WHERE created_at < ? ORDER BY created_at LIMIT ?",
+                    (upper, self._policy.batch_size),
+                )
+                await db.execute(
+                    "INSERT INTO temp.retention_actions SELECT id FROM actions "
+                    "WHERE request_id IN (SELECT id FROM temp.retention_requests)"
+                )
+                await db.execute(
+                    "INSERT OR IGNORE INTO temp.retention_blobs "
+                    "SELECT output_hash FROM execution_results "
+                    "WHERE output_hash IS NOT NULL "
+                    "AND action_id IN (SELECT id FROM temp.retention_actions) "
+                    "UNION SELECT error_hash FROM execution_results "
+                    "WHERE error_hash IS NOT NULL "
+                    "AND action_id IN (SELECT id FROM temp.retention_actions)"
+                )
+                scopes = {
+                    "requests": "id IN (SELECT id FROM temp.retention_requests)",
+                    "actions": "id IN (SELECT id FROM temp.retention_actions)",
+                    "policy_decisions": "action_id IN (SELECT id FROM temp.retention_actions)",
+                    "execution_results": "action_id IN (SELECT id FROM temp.retention_actions)",
+                    "blobs": "hash IN (SELECT hash FROM temp.retention_blobs)",
+                }
+                if archived:
+                    for table, where in scopes.items():
+                        await _copy_rows(db, table, where)
+                for table in (
+                    "execution_results",
+                    "policy_decisions",
+                    "actions",
+                    "requests",
+                ):
+                    await _record_pruned(
+                        db, table, scopes[table], self._store.signing_key()
+                    )
+                for table in ("execution_results", "policy_decisions", "actions"):
+                    await db.execute(f"DELETE FROM {table} WHERE {scopes[table]}")
+                # Blobs are shared by content; drop only those no result uses.
+                await db.execute(
+                    f"DELETE FROM blobs WHERE {scopes['blobs']} "
+                    "AND hash NOT IN (SELECT output_hash FROM execution_results "
+                    "                 WHERE output_hash IS NOT NULL) "
+                    "AND hash NOT IN (SELECT error_hash FROM execution_results "
+                    "                 WHERE error_hash IS NOT NULL)"
+                )
+                await db.execute(
+                    "DELETE FROM embeddings_cache "
+                    "WHERE request_id IN (SELECT id FROM temp.retention_requests)"
+                )
+                # Plans are analytics, not audit records: never archived.
+                await db.execute(
+                    "DELETE FROM plan_actions WHERE plan_id IN (SELECT id FROM plans "
+                    "WHERE request_id IN (SELECT id FROM temp.retention_requests))"
+                )
+                await db.execute(
+                    "DELETE FROM plans WHERE request_id IN (SELECT id FROM temp.retention_requests)"
+                )
+                cursor = await db.execute(
+                    f"DELETE FROM requests WHERE {scopes['requests']}"
+                )
+                return cursor.rowcount
+
+    async def _orphan_decision_batch(
+        self, cutoff: str | int, archives: set[Path]
+    ) -> int:
+        """Policy decisions for actions that were never logged (denied by a
+        gate) have no request row; they age out on their own timestamp."""
+        async with self._store.writer() as db:
+            orphan = (
+                f"created_at < ? AND {timestamps.sql_month('created_at', self._store.timestamp_format)} = ? "
+                "AND action_id NOT IN (SELECT id FROM actions)"
+            )
+            oldest = await _scalar(
+                db,
+                "SELECT MIN(created_at) FROM policy_decisions "
+                "WHERE created_at < ? AND action_id NOT IN (SELECT id FROM actions)",
+                (cutoff,),
+            )
+            if oldest is None:
+                return 0
+            month = timestamps.month(oldest)
+            where = (
+                f"id IN (SELECT id FROM policy_decisions WHERE {orphan} "
+                f"ORDER BY id LIMIT {int(self._policy.batch_size)})"
+            )
+            await db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS retention_decisions (id INTEGER PRIMARY KEY)"
+            )
+            async with self._archive(db, month, archives) as archived:
+                await db.execute("DELETE FROM temp.retention_decisions")
+                await db.execute(
+                    f"INSERT INTO temp.retention_decisions SELECT id FROM policy_decisions WHERE {where}",
+                    (cutoff, month),
+                )
+                scope = "id IN (SELECT id FROM temp.retention_decisions)"
+                if archived:
+                    await _copy_rows(db, "policy_decisions", scope)
+                await _record_pruned(
+                    db, "policy_decisions", scope, self._store.signing_key()
+                )
+                cursor = await db.execute(f"DELETE FROM policy_decisions WHERE {scope}")
+                return cursor.rowcount
+
+    @contextlib.asynccontextmanager
+    async def _archive(self, db: aiosqlite.Connection, month: str, archives: set[Path]):
+        """Attach the month's archive (if archiving) and run the body as one
+        transaction. Rows are copied before they are deleted and copies use
+        INSERT OR IGNORE, so an interrupted batch is simply redone."""
+        archive_dir = self._policy.archive_dir
+        archived = archive_dir is not None
+        if archive_dir is not None:
+            path = archive_file(archive_dir, month)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await db.execute("ATTACH DATABASE ? AS archive", (str(path),))
+            archives.add(path)
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                if archived:
+                    await _ensure_archive_schema(db)
+                yield archived
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+        finally:
+            if archived:
+                await db.execute("DETACH DATABASE archive")
+
+
+async def _ensure_archive_schema(db: aiosqlite.Connection) -> None:
+    for table in _ARCHIVED_TABLES:
+        sql = await _scalar(
+            db,
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        )
+        await db.execute(
+            str(sql).replace(
+                f"CREATE TABLE {table}",
+                f"CREATE TABLE IF NOT EXISTS archive.{table}",
+                1,
+            )
+        )
+
+
+async def _copy_rows(db: aiosqlite.Connection, table: str, where: str) -> None:
+    """Copy matching rows into the attached archive. Only columns present in
+    both schemas are copied, so archives written under an older schema stay
+    appendable. Dictionary-encoded columns are archived as their strings,
+    so an archive reads on its own."""
+    main_cols = [
+        r[1]
+        for r in await (await db.execute(f"PRAGMA main.table_info({table})")).fetchall()
+    ]
+    archive_cols = {
+        r[1]
+        for r in await (
+            await db.execute(f"PRAGMA archive.table_info({table})")
+        ).fetchall()
+    }
+    cols = [c for c in main_cols if c in archive_cols]
+    select = select_columns(table, cols, "m")
+    cols = [c for c in cols if c not in _CODES]
+    await db.execute(
+        f"INSERT OR IGNORE INTO archive.{table} ({', '.join(cols)}) "
+        f"SELECT {select} FROM main.{table} m WHERE {where}"
+    )
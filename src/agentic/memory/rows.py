@@ -0,0 +1,201 @@
+"""Lightweight row types for bulk and analytic audit reads.
+
+Building a validated pydantic record per row (and parsing its timestamp)
+dominates the cost of reading large slices of the audit log. These
+``__slots__`` rows hold the column values as SQLite returns them, decode the
+timestamp only when it is first read, and convert to the pydantic models
+with ``to_record()`` where a caller crosses an API boundary. ``to_record()``
+validates like a direct constructor call: pydantic's compiled validator
+parses a stored ISO string faster than ``model_construct`` can assign a
+pre-parsed value. Integer (epoch microsecond) timestamps are decoded first,
+since pydantic would read them as seconds.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.timestamps import decode
+from agentic.models.intent import Entity
+
+
+def dump_entities(entities: list[Entity] | None) -> str:
+    """The ``requests.entities`` text of ``entities``; empty for None (not recorded)."""
+    return "" if entities is None else json.dumps([e.model_dump() for e in entities])
+
+
+def load_entities(text: str) -> list[Entity] | None:
+    return None if not text else [Entity(**e) for e in json.loads(text)]
+
+
+class RequestRow:
+    __slots__ = (
+        "id",
+        "raw_query",
+        "intent_type",
+        "confidence",
+        "created_at_raw",
+        "entities_json",
+        "_created_at",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        raw_query: str,
+        intent_type: str,
+        confidence: float,
+        created_at: str | int,
+        entities: str = "",
+    ) -> None:
+        self.id = id
+        self.raw_query = raw_query
+        self.intent_type = intent_type
+        self.confidence = confidence
+        self.created_at_raw = created_at
+        self.entities_json = entities
+        self._created_at: datetime | None = None
+
+    @property
+    def created_at(self) -> datetime:
+        if self._created_at is None:
+            self._created_at = decode(self.created_at_raw)
+        return self._created_at
+
+    @property
+    def entities(self) -> list[Entity] | None:
+        return load_entities(self.entities_json)
+
+    def to_record(self) -> RequestRecord:
+        return RequestRecord(
+            id=self.id,
+            raw_query=self.raw_query,
+            intent_type=self.intent_type,
+            confidence=self.confidence,
+            created_at=self.created_at
+            if isinstance(self.created_at_raw, int)
+            else self.created_at_raw,
+            entities=self.entities,
+        )
+
+
+class ActionRow:
+    __slots__ = (
+        "id",
+        "request_id",
+        "action_type",
+        "description",
+        "command",
+        "risk_level",
+        "approved",
+        "target",
+        "parameters_json",
+        "rollback_command",
+        "rollback_support",
+        "_parameters",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        request_id: str,
+        action_type: str,
+        description: str,
+        command: str,
+        risk_level: int,
+        approved: int,
+        target: str = "",
+        parameters: str = "{}",
+        rollback_command: str = "",
+        rollback_support: str = "UNKNOWN",
+    ) -> None:
+        self.id = id
+        self.request_id = request_id
+        self.action_type = action_type
+        self.description = description
+        self.command = command
+        self.risk_level = risk_level
+        self.approved = bool(approved)
+        self.target = target
+        self.parameters_json = parameters
+        self.rollback_command = rollback_command
+        self.rollback_support = rollback_support
+        self._parameters: dict[str, str] | None = None
+
+    @property
+    def parameters(self) -> dict[str, str]:
+        if self._parameters is None:
+            self._parameters = json.loads(self.parameters_json)
+        return self._parameters
+
+    def to_record(self) -> ActionRecord:
+        return ActionRecord(
+            id=self.id,
+            request_id=self.request_id,
+            action_type=self.action_type,
+            description=self.description,
+            command=self.command,
+            risk_level=self.risk_level,
+            approved=self.approved,
+            target=self.target,
+            parameters=self.parameters,
+            rollback_command=self.rollback_command,
+            rollback_support=self.rollback_support,
+        )
+
+
+class ExecutionRow:
+    __slots__ = (
+        "id",
+        "action_id",
+        "success",
+        "output",
+        "error",
+        "rolled_back",
+        "executed_at_raw",
+        "dry_run",
+        "_executed_at",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        action_id: str,
+        success: int,
+        output: str,
+        error: str,
+        rolled_back: int,
+        executed_at: str | int,
+        dry_run: int = 0,
+    ) -> None:
+        self.id = id
+        self.action_id = action_id
+        self.success = bool(success)
+        self.output = output
+        self.error = error
+        self.rolled_back = bool(rolled_back)
+        self.executed_at_raw = executed_at
+        self.dry_run = bool(dry_run)
+        self._executed_at: datetime | None = None
+
+    @property
+    def executed_at(self) -> datetime:
+        if self._executed_at is None:
+            self._executed_at = decode(self.executed_at_raw)
+        return self._executed_at
+
+    def to_record(self) -> ExecutionRecord:
+        return ExecutionRecord(
+            id=self.id,
+            action_id=self.action_id,
+            success=self.success,
+            output=self.output,
+            error=self.error,
+            rolled_back=self.rolled_back,
+            dry_run=self.dry_run,
+            executed_at=self.executed_at
+            if isinstance(self.executed_at_raw, int)
+            else self.executed_at_raw,
+        )
@@ -0,0 +1,485 @@
+"""Time-sharded audit databases.
+
+``ShardedMemoryStore`` keeps one audit database per UTC day or ISO week in
+a directory (``audit-2025-01-10.db``, ``audit-2025-W02.db``), each a
+complete ``MemoryStore`` database with its own hash chain, aggregates and
+dictionaries. Dropping old data is deleting files (``drop_before``)
+instead of deleting rows.
+
+A request is written to the shard of its ``created_at``; its actions,
+policy decisions, plans and execution results (rollbacks included) follow
+it into that shard, however long after it they are logged.
+
+Shards partition time, so a newest-first read walks the shards that
+overlap the requested range newest first and needs no merge. Finding the
+shard that holds an ID is one indexed query over up to ten shards
+``ATTACH``ed read-only to a single connection (SQLite's limit), the newest
+and the one a UUIDv7 ID names first. Rows themselves are read through the
+shard's own store: each shard has its own dictionary ids. Only the newest
+``open_shards`` shards stay open; others are opened for the duration of a
+read. Similarity search (``search_similar``) covers the open shards only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import re
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Collection
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, TypeVar
+
+import aiosqlite
+
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.plans import LoggedPlan
+from agentic.memory.rows import RequestRow
+from agentic.memory.store import MemoryStore
+from agentic.memory.timestamps import as_utc
+from agentic.models.action import ActionPlan
+from agentic.models.ids import id_timestamp
+
+PERIODS = ("day", "week")
+
+_NAME = re.compile(r"^audit-(\d{4}-\d{2}-\d{2}|\d{4}-W\d{2})\.db$")
+_ROUTES = 4096
+# Databases SQLite attaches to one connection by default.
+_ATTACHED = 10
+
+T = TypeVar("T")
+
+
+def shard_key(ts: datetime, period: str) -> str:
+    """The shard holding ``ts``; naive means UTC."""
+    ts = as_utc(ts)
+    if period == "week":
+        year, week, _ = ts.isocalendar()
+        return f"{year}-W{week:02d}"
+    return ts.strftime("%Y-%m-%d")
+
+
+def shard_bounds(key: str, period: str) -> tuple[datetime, datetime]:
+    """The ``[start, end)`` UTC interval a shard covers."""
+    if period == "week":
+        year, week = key.split("-W")
+        start = datetime.fromisocalendar(int(year), int(week), 1).replace(
+            tzinfo=timezone.utc
+        )
+        return start, start + timedelta(weeks=1)
+    start = datetime.strptime(key, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+class ShardedMemoryStore:
+    """The ``MemoryStore`` interface over one database per day or week.
+
+    ``store_options`` are passed to every shard's ``MemoryStore``.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        period: str = "day",
+        open_shards: int = 2,
+        **store_options: Any,
+    ) -> None:
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {list(PERIODS)}, got {period!r}")
+        if open_shards < 1:
+            raise ValueError(f"open_shards must be >= 1, got {open_shards}")
+        self.directory = Path(directory)
+        self.period = period
+        self._open_shards = open_shards
+        self._options = store_options
+        # Open shards, least recently used first.
+        self._open: OrderedDict[str, MemoryStore] = OrderedDict()
+        # Shard of recently logged or looked-up requests and actions.
+        self._routes: OrderedDict[str, str] = OrderedDict()
+        self._request_generation = 0
+        # Connection with shards attached (as s0, s1, ...) to locate IDs.
+        self._locator: aiosqlite.Connection | None = None
+        self._attached: list[str] = []
+        self._locating = asyncio.Lock()
+        # Concurrent first uses of a shard open (and index) it once.
+        self._opening = asyncio.Lock()
+
+    async def initialize(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def close(self) -> None:
+        while self._open:
+            _, store = self._open.popitem(last=False)
+            await store.close()
+        await self._close_locator()
+
+    async def _close_locator(self) -> None:
+        if self._locator is not None:
+            await self._locator.close()
+            self._locator = None
+            self._attached = []
+
+    async def flush(self) -> None:
+        for store in list(self._open.values()):
+            await store.flush()
+
+    @property
+    def request_generation(self) -> int:
+        return self._request_generation
+
+    def shard_path(self, key: str) -> Path:
+        return self.directory / f"audit-{key}.db"
+
+    def shard_store(self, key: str) -> MemoryStore:
+        """An unopened ``MemoryStore`` on shard ``key``, configured like the
+        shards this store opens, for tools that work on one database."""
+        if key not in self.shard_keys():
+            raise ValueError(f"no {self.period} shard {key!r} in {self.directory}")
+        return MemoryStore(self.shard_path(key), **self._options)
+
+    def shard_keys(self) -> list[str]:
+        """Every shard on disk, oldest first."""
+        keys = {
+            m.group(1)
+            for p in self.directory.glob("audit-*.db")
+            if (m := _NAME.match(p.name))
+        }
+        return sorted(k for k in keys if ("W" in k) == (self.period == "week"))
+
+    def _current_key(self) -> str:
+        return shard_key(datetime.now(timezone.utc), self.period)
+
+    async def _shard(self, key: str) -> MemoryStore:
+        """The open store of a shard written to, opening it if needed."""
+        store = self._open.get(key)
+        if store is not None:
+            self._open.move_to_end(key)
+            return store
+        async with self._opening:
+            store = self._open.get(key)
+            if store is not None:
+                return store
+            store = MemoryStore(self.shard_path(key), **self._options)
+            await store.initialize()
+            self._open[key] = store
+            while len(self._open) > self._open_shards:
+                _, evicted = self._open.popitem(last=False)
+                await evicted.close()
+        return store
+
+    @contextlib.asynccontextmanager
+    async def _reading(self, key: str) -> AsyncIterator[MemoryStore]:
+        """A shard to read: its open store, or one opened for this read."""
+        store = self._open.get(key)
+        if store is not None:
+            yield store
+            return
+        store = MemoryStore(
+            self.shard_path(key), **{**self._options, "reader_pool_size": 0}
+        )
+        await store.initialize()
+        try:
+            yield store
+        finally:
+            await store.close()
+
+    def _route(self, item_id: str, key: str) -> None:
+        self._routes[item_id] = key
+        self._routes.move_to_end(item_id)
+        if len(self._routes) > _ROUTES:
+            self._routes.popitem(last=False)
+
+    def _candidates(self, item_id: str) -> list[str]:
+        """Shards to look for an ID in: the one its UUIDv7 timestamp names
+        first, then every shard newest first."""
+        keys = self.shard_keys()[::-1]
+        with contextlib.suppress(ValueError):
+            created = id_timestamp(item_id)
+            if created is not None:
+                hint = shard_key(
+                    datetime.fromtimestamp(created, timezone.utc), self.period
+                )
+                if hint in keys:
+                    keys.remove(hint)
+                    keys.insert(0, hint)
+        return keys
+
+    async def _attach(self, keys: list[str]) -> aiosqlite.Connection:
+        """The locator connection with exactly ``keys`` attached, in order."""
+        if self._locator is None:
+            self._locator = await aiosqlite.connect("file::memory:", uri=True)
+        if keys != self._attached:
+            for i in range(len(self._attached)):
+                await self._locator.execute(f"DETACH DATABASE s{i}")
+            self._attached = []
+            for i, key in enumerate(keys):
+                uri = f"{self.shard_path(key).resolve().as_uri()}?mode=ro"
+                await self._locator.execute(f"ATTACH DATABASE ? AS s{i}", (uri,))
+                self._attached.append(key)
+        return self._locator
+
+    async def _locate(self, table: str, item_id: str) -> str | None:
+        """The shard whose ``table`` holds ``item_id``: one primary-key
+        lookup per ``_ATTACHED`` shards, in ``_candidates`` order."""
+        keys = self._candidates(item_id)
+        async with self._locating:
+            for start in range(0, len(keys), _ATTACHED):
+                batch = keys[start : start + _ATTACHED]
+                db = await self._attach(batch)
+                sql = " UNION ALL ".join(
+                    f"SELECT {i} FROM s{i}.{table} WHERE id = ?"
+                    for i in range(len(batch))
+                )
+                cursor = await db.execute(f"{sql} LIMIT 1", (item_id,) * len(batch))
+                row = await cursor.fetchone()
+                await cursor.close()
+                if row is not None:
+                    return batch[row[0]]
+        return None
+
+    async def _find(
+        self,
+        item_id: str,
+        table: str,
+        fetch: Callable[[MemoryStore], Awaitable[T | None]],
+    ) -> T | None:
+        """What ``fetch`` reads in the shard holding a request or action."""
+        routed = self._routes.get(item_id)
+        if routed is not None and self.shard_path(routed).exists():
+            async with self._reading(routed) as store:
+                found = await fetch(store)
+            if found is not None:
+                return found
+        key = await self._locate(table, item_id)
+        if key is None:
+            return None
+        self._route(item_id, key)
+        return await self._read(key, fetch, None)
+
+    async def _key_of(self, item_id: str, table: str) -> str | None:
+        key = self._routes.get(item_id)
+        if key is None:
+            key = await self._locate(table, item_id)
+            if key is not None:
+                self._route(item_id, key)
+        return key
+
+    async def _request_key(self, request_id: str) -> str | None:
+        return await self._key_of(request_id, "requests")
+
+    async def _action_key(self, action_id: str) -> str | None:
+        return await self._key_of(action_id, "actions")
+
+    async def _read(
+        self, key: str | None, read: Callable[[MemoryStore], Awaitable[T]], default: T
+    ) -> T:
+        if key is None:
+            return default
+        async with self._reading(key) as store:
+            return await read(store)
+
+    def _keys_between(
+        self, after: datetime | None, before: datetime | None
+    ) -> list[str]:
+        """Shards overlapping ``(after, before)``, newest first."""
+        keys: list[str] = []
+        for key in reversed(self.shard_keys()):
+            start, end = shard_bounds(key, self.period)
+            if (after is None or end > as_utc(after)) and (
+                before is None or start < as_utc(before)
+            ):
+                keys.append(key)
+        return keys
+
+    # -- writes ------------------------------------------------------------
+
+    async def log_request(self, record: RequestRecord) -> None:
+        key = shard_key(record.created_at, self.period)
+        await (await self._shard(key)).log_request(record)
+        self._route(record.id, key)
+        self._request_generation += 1
+
+    async def log_action(self, record: ActionRecord) -> None:
+        key = await self._request_key(record.request_id) or self._current_key()
+        await (await self._shard(key)).log_action(record)
+        self._route(record.id, key)
+
+    async def log_policy_decision(
+        self, action_id: str, *args: Any, request_id: str | None = None, **kwargs: Any
+    ) -> None:
+        """Logged beside the action, or its ``request_id``: decisions come
+        before the approved action is logged."""
+        key = self._routes.get(action_id)
+        if key is None and request_id is not None:
+            key = await self._request_key(request_id)
+        store = await self._shard(key or self._current_key())
+        await store.log_policy_decision(
+            action_id, *args, request_id=request_id, **kwargs
+        )
+
+    async def log_execution(self, record: ExecutionRecord) -> None:
+        key = await self._action_key(record.action_id) or self._current_key()
+        await (await self._shard(key)).log_execution(record)
+
+    async def log_plan(
+        self, request_id: str, plan: ActionPlan, approved_ids: Collection[str] = ()
+    ) -> None:
+        key = await self._request_key(request_id) or self._current_key()
+        await (await self._shard(key)).log_plan(request_id, plan, approved_ids)
+
+    # -- point reads -------------------------------------------------------
+
+    async def get_request(self, request_id: str) -> RequestRecord | None:
+        return await self._find(
+            request_id, "requests", lambda s: s.get_request(request_id)
+        )
+
+    async def get_action(self, action_id: str) -> ActionRecord | None:
+        return await self._find(action_id, "actions", lambda s: s.get_action(action_id))
+
+    async def get_actions_for_request(self, request_id: str) -> list[ActionRecord]:
+        key = await self._request_key(request_id)
+        return await self._read(
+            key, lambda s: s.get_actions_for_request(request_id), []
+        )
+
+    async def get_executions(self, action_id: str) -> list[ExecutionRecord]:
+        key = await self._action_key(action_id)
+        return await self._read(key, lambda s: s.get_executions(action_id), [])
+
+    async def get_execution(self, action_id: str) -> ExecutionRecord | None:
+        executions = await self.get_executions(action_id)
+        return executions[0] if executions else None
+
+    async def get_rollback_command(self, action_id: str) -> str | None:
+        key = await self._action_key(action_id)
+        return await self._read(key, lambda s: s.get_rollback_command(action_id), None)
+
+    async def get_plans(self, request_id: str) -> list[LoggedPlan]:
+        key = await self._request_key(request_id)
+        return await self._read(key, lambda s: s.get_plans(request_id), [])
+
+    # -- range reads -------------------------------------------------------
+
+    async def get_recent_rows(self, limit: int = 10) -> list[RequestRow]:
+        rows: list[RequestRow] = []
+        for key in self._keys_between(None, None):
+            if len(rows) >= limit:
+                break
+            async with self._reading(key) as store:
+                rows += await store.get_recent_rows(limit - len(rows))
+        return rows
+
+    async def get_recent_context(self, limit: int = 10) -> list[RequestRecord]:
+        return [row.to_record() for row in await self.get_recent_rows(limit)]
+
+    async def search_similar(self, query: str, limit: int = 5) -> list[RequestRecord]:
+        """Similar requests from the ``open_shards`` newest shards, newest
+        shard first. Those shards are opened and kept open, so their vector
+        indexes are built once per process."""
+        records: list[RequestRecord] = []
+        for key in self._keys_between(None, None)[: self._open_shards]:
+            if len(records) >= limit:
+                break
+            records += await (await self._shard(key)).search_similar(
+                query, limit - len(records)
+            )
+        return records
+
+    async def get_history(self, limit: int = 20, **filters: Any) -> list[dict]:
+        return [
+            row
+            async for row in self.iter_history(
+                limit=limit, page_size=max(limit, 1), **filters
+            )
+        ]
+
+    async def iter_history(
+        self,
+        *,
+        after: datetime | None = None,
+        before: datetime | None = None,
+        limit: int | None = None,
+        **filters: Any,
+    ) -> AsyncIterator[dict]:
+        """``MemoryStore.iter_history`` over the shards overlapping
+        ``(after, before)``, newest first."""
+        remaining = limit
+        for key in self._keys_between(after, before):
+            if remaining is not None and remaining <= 0:
+                return
+            async with self._reading(key) as store:
+                seen: set[str] = set()
+                async for row in store.iter_history(
+                    after=after, before=before, limit=remaining, **filters
+                ):
+                    seen.add(row["request_id"])
+                    yield row
+            if remaining is not None:
+                remaining -= len(seen)
+
+    async def scan_request_rows(
+        self, *, after: datetime | None = None, page_size: int = 1000
+    ) -> AsyncIterator[list[RequestRow]]:
+        """``MemoryStore.scan_request_rows`` over the shards after ``after``,
+        oldest first."""
+        for key in reversed(self._keys_between(after, None)):
+            async with self._reading(key) as store:
+                async for page in store.scan_request_rows(
+                    after=after, page_size=page_size
+                ):
+                    yield page
+
+    async def search_text(
+        self,
+        query: str,
+        limit: int | None = 20,
+        candidates: int = 1000,
+        *,
+        intent_type: str | None = None,
+        action_type: str | None = None,
+        approved: bool | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+    ) -> list[dict]:
+        """``MemoryStore.search_text`` over the shards overlapping
+        ``(after, before)``; each shard ranks its own matches."""
+        hits: list[dict] = []
+        for key in self._keys_between(after, before):
+            async with self._reading(key) as store:
+                hits += await store.search_text(
+                    query,
+                    limit=limit,
+                    candidates=candidates,
+                    intent_type=intent_type,
+                    action_type=action_type,
+                    approved=approved,
+                    after=after,
+                    before=before,
+                )
+        hits.sort(key=lambda h: h["score"], reverse=True)
+        return hits[:limit]
+
+    # -- retention ---------------------------------------------------------
+
+    async def drop_before(self, cutoff: datetime) -> list[Path]:
+        """Delete every shard that ends at or before ``cutoff``; returns
+        the files removed."""
+        removed: list[Path] = []
+        await self._close_locator()
+        for key in self.shard_keys():
+            if shard_bounds(key, self.period)[1] > as_utc(cutoff):
+                break
+            store = self._open.pop(key, None)
+            if store is not None:
+                await store.close()
+            path = self.shard_path(key)
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{path}{suffix}").unlink(missing_ok=True)
+            removed.append(path)
+            for item_id in [i for i, k in self._routes.items() if k == key]:
+                del self._routes[item_id]
+        if removed:
+            self._request_generation += 1
+        return removed
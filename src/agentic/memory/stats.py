@@ -0,0 +1,108 @@
+"""Dashboard reads over the incrementally maintained audit aggregates.
+
+``AuditStats`` answers from ``audit_stats`` and ``audit_stats_denials``
+(see ``agentic.memory.aggregates``) only, so its cost does not grow with
+the audit log.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+
+from agentic.memory.aggregates import COUNTERS, DIMENSIONS
+from agentic.memory.store import MemoryStore
+
+
+@dataclass(frozen=True)
+class StatsRow:
+    dimension: str
+    key: str
+    requests: int = 0
+    confidence_sum: float = 0.0
+    decisions_approved: int = 0
+    decisions_denied: int = 0
+    actions: int = 0
+    executions: int = 0
+    failures: int = 0
+    rollbacks: int = 0
+    latency_ms_sum: float = 0.0
+    latency_count: int = 0
+
+    @property
+    def approval_rate(self) -> float | None:
+        decided = self.decisions_approved + self.decisions_denied
+        return self.decisions_approved / decided if decided else None
+
+    @property
+    def failure_rate(self) -> float | None:
+        return self.failures / self.executions if self.executions else None
+
+    @property
+    def mean_confidence(self) -> float | None:
+        return self.confidence_sum / self.requests if self.requests else None
+
+    @property
+    def mean_latency_ms(self) -> float | None:
+        return self.latency_ms_sum / self.latency_count if self.latency_count else None
+
+    def to_dict(self) -> dict[str, object]:
+        row = asdict(self)
+        for name in (
+            "approval_rate",
+            "failure_rate",
+            "mean_confidence",
+            "mean_latency_ms",
+        ):
+            row[name] = getattr(self, name)
+        return row
+
+
+@dataclass(frozen=True)
+class DenialRow:
+    gate: str
+    reason: str
+    count: int
+
+    def to_dict(self) -> dict[str, object]:
+        return asdict(self)
+
+
+class AuditStats:
+    """Reads the aggregate tables; never touches the audit rows."""
+
+    def __init__(self, store: MemoryStore) -> None:
+        self._store = store
+
+    async def total(self) -> StatsRow:
+        rows = await self.by("total")
+        return rows[0] if rows else StatsRow("total", "")
+
+    async def by(self, dimension: str, limit: int = 20) -> list[StatsRow]:
+        """Rows of one dimension: most recent first for ``hour``, busiest
+        first otherwise."""
+        if dimension not in DIMENSIONS:
+            raise ValueError(
+                f"dimension must be one of {DIMENSIONS}, got {dimension!r}"
+            )
+        order = (
+            "key DESC"
+            if dimension == "hour"
+            else "requests + decisions_approved + decisions_denied + actions + executions DESC, key"
+        )
+        rows = await self._store._fetchall(
+            f"SELECT dimension, key, {', '.join(COUNTERS)} FROM audit_stats "
+            f"WHERE dimension = ? ORDER BY {order} LIMIT ?",
+            (dimension, limit),
+        )
+        return [StatsRow(*r) for r in rows]
+
+    async def denials(
+        self, gate: str | None = None, limit: int = 20
+    ) -> list[DenialRow]:
+        """Most frequent denial reasons, optionally for one gate."""
+        rows = await self._store._fetchall(
+            "SELECT gate, reason, count FROM audit_stats_denials "
+            "WHERE ? IS NULL OR gate = ? ORDER BY count DESC, gate, reason LIMIT ?",
+            (gate, gate, limit),
+        )
+        return [DenialRow(*r) for r in rows]
@@ -1,59 +1,568 @@
-"""SQLite-backed memory store for audit logging and context retrieval."""
+"""SQLite-backed memory store for audit logging and context retrieval.
+
+Audit writes are write-behind: ``log_*`` calls append to an in-memory queue
+and return immediately. The queue is committed as one transaction when it
+reaches ``batch_size`` records, when ``flush_interval`` seconds have passed
+since the first queued record, or when ``flush()`` is awaited. ``Pipeline.run``
+awaits ``flush()`` before returning or raising, so INV-09 holds at every run
+boundary. Reads flush first, so the store always reads its own writes.
+
+Each logged request is also embedded offline (``HashingEmbedder``) and its
+int8-quantised vector written to ``embeddings_cache`` in the same batch.
+``search_similar`` ranks history by cosine similarity over an in-memory
+``VectorIndex`` that is loaded on first use and kept in sync by later writes.
+
+Audit rows join a hash chain as they are committed, with periodic signed
+checkpoints, so edits and deletions are detectable (``agentic.memory.chain``).
+
+Execution output above ``output_inline_bytes`` is stored once per distinct
+content in the zlib-compressed ``blobs`` table (see ``agentic.memory.blobs``)
+and only decompressed when ``get_execution`` reads it.
+
+``get_*`` methods return pydantic records; the ``*_rows`` variants return
+the ``__slots__`` rows of ``agentic.memory.rows`` for bulk and analytic reads.
+
+File-backed stores run in WAL mode with one writer connection and a small
+pool of read-only connections, so ``agentic history`` neither blocks nor is
+blocked by a concurrently running ``agentic ask``.
+
+Every plan is logged with its reasoning, all candidate actions (denied ones
+included) and their simulated effects, in the compact encoding of
+``agentic.memory.plans``.
+
+Intent types, action types and policy decision reasons are stored
+dictionary-encoded (``agentic.memory.dictionary``); reads decode them, so
+callers only ever see the strings.
+
+``backup`` copies the database online, without stopping writes (see
+``agentic.memory.backup``).
+
+A new database can store audit timestamps as integer epoch microseconds
+instead of ISO text (``timestamp_format``, see ``agentic.memory.timestamps``);
+an existing one keeps the format it was created with.
+"""
 
 from __future__ import annotations
 
-import uuid
+import asyncio
+import contextlib
+import json
+import time
+from collections.abc import AsyncIterator, Callable, Collection
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any
 
 import aiosqlite
 
-from agentic.memory.migrations import TABLES
+from agentic.memory.backup import COMPRESSED_SUFFIX, BackupReport, compress_file
+from agentic.memory.blobs import decode_blob, encode_blob, truncate_output
+from agentic.memory.chain import link, load_signing_key, sign
+from agentic.memory.dictionary import (
+    DICTIONARIES,
+    ENCODED_OPTION,
+    Dictionary,
+    decode_references,
+    decoded,
+    encoded,
+    find,
+    mark_encoded,
+    matches,
+)
+from agentic.memory.embeddings import HashingEmbedder, VectorIndex
+from agentic.memory.lookups import CacheStats, LookupCache
+from agentic.memory.migrations import get_timestamp_format, migrate
 from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.plans import (
+    APPROVED,
+    LoggedPlan,
+    pack_flags,
+    scope_code,
+    unpack_simulation,
+)
+from agentic.memory.recent import RecentRequests
+from agentic.memory.rows import ActionRow, ExecutionRow, RequestRow, dump_entities
+from agentic.memory.timestamps import ISO, bound, check_format, decode, encode, to_text
+from agentic.models.action import ActionCandidate, ActionPlan, ActionType
+
+_SYNCHRONOUS_MODES = frozenset({"OFF", "NORMAL", "FULL", "EXTRA"})
+_INTENT_TYPE = find("requests", "intent_type")
+_ACTION_TYPE = find("actions", "action_type")
+_REASON = find("policy_decisions", "reason")
+_REQUEST_COLUMNS = f"id, raw_query, {decoded(_INTENT_TYPE, 'requests')}, confidence, created_at, entities"
+_ACTION_COLUMNS = (
+    f"id, request_id, {decoded(_ACTION_TYPE, 'actions')}, description, command, risk_level, approved, "
+    "target, parameters, rollback_command, rollback_support"
+)
+_EXECUTION_SELECT = (
+    "SELECT e.id, e.action_id, e.success, e.output, e.error, e.rolled_back, e.executed_at, e.dry_run, "
+    "       ob.codec, ob.data, eb.codec, eb.data "
+    "FROM execution_results e "
+    "LEFT JOIN blobs ob ON ob.hash = e.output_hash "
+    "LEFT JOIN blobs eb ON eb.hash = e.error_hash "
+    "WHERE e.action_id = ? ORDER BY e.rowid"
+)
+
+
+def _execution_row(row: tuple) -> ExecutionRow:
+    return ExecutionRow(
+        row[0],
+        row[1],
+        row[2],
+        decode_blob(row[8], row[9]) if row[8] else row[3],
+        decode_blob(row[10], row[11]) if row[10] else row[4],
+        row[5],
+        row[6],
+        row[7],
+    )
+
+
+def _fts_query(text: str) -> str:
+    """Quote each term so user text is never parsed as FTS5 syntax."""
+    terms: list[str] = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+@dataclass(frozen=True)
+class WriterMetrics:
+    """Snapshot of the write-behind queue."""
+
+    queue_depth: int
+    max_queue_depth: int
+    batches_committed: int
+    records_committed: int
+    last_commit_ms: float
+    total_commit_ms: float
+
+    @property
+    def avg_commit_ms(self) -> float:
+        if self.batches_committed == 0:
+            return 0.0
+        return self.total_commit_ms / self.batches_committed
 
 
 class MemoryStore:
-    def __init__(self, db_path: Path | str = ":memory:") -> None:
+    def __init__(
+        self,
+        db_path: Path | str = ":memory:",
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        synchronous: str = "NORMAL",
+        cache_size: int = -8000,
+        mmap_size: int = 0,
+        reader_pool_size: int = 2,
+        embedder: HashingEmbedder | None = None,
+        output_max_bytes: int = 64 * 1024,
+        output_inline_bytes: int = 256,
+        signing_key_path: Path | str | None = None,
+        checkpoint_interval: int = 1000,
+        recent_cache_size: int = 256,
+        lookup_cache_size: int = 1024,
+        timestamp_format: str = ISO,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+        if flush_interval < 0:
+            raise ValueError(f"flush_interval must be >= 0, got {flush_interval}")
+        if synchronous.upper() not in _SYNCHRONOUS_MODES:
+            raise ValueError(
+                f"synchronous must be one of {sorted(_SYNCHRONOUS_MODES)}, got {synchronous!r}"
+            )
+        if mmap_size < 0:
+            raise ValueError(f"mmap_size must be >= 0, got {mmap_size}")
+        if reader_pool_size < 0:
+            raise ValueError(f"reader_pool_size must be >= 0, got {reader_pool_size}")
+        if output_max_bytes < 64:
+            raise ValueError(f"output_max_bytes must be >= 64, got {output_max_bytes}")
+        if output_inline_bytes < 0:
+            raise ValueError(
+                f"output_inline_bytes must be >= 0, got {output_inline_bytes}"
+            )
+        if checkpoint_interval < 0:
+            raise ValueError(
+                f"checkpoint_interval must be >= 0, got {checkpoint_interval}"
+            )
+        if recent_cache_size < 0:
+            raise ValueError(f"recent_cache_size must be >= 0, got {recent_cache_size}")
+        if lookup_cache_size < 0:
+            raise ValueError(f"lookup_cache_size must be >= 0, got {lookup_cache_size}")
+        check_format(timestamp_format)
         self.db_path = str(db_path)
         self._db: aiosqlite.Connection | None = None
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._pending: list[tuple[str, tuple[Any, ...], str | None]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+        self._max_queue_depth = 0
+        self._batches_committed = 0
+        self._records_committed = 0
+        self._last_commit_ms = 0.0
+        self._total_commit_ms = 0.0
+        self._synchronous = synchronous.upper()
+        self._cache_size = cache_size
+        self._mmap_size = mmap_size
+        self._reader_pool_size = reader_pool_size
+        self._readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._reader_conns: list[aiosqlite.Connection] = []
+        self._embedder = embedder or HashingEmbedder()
+        self._index: VectorIndex | None = None
+        self._index_lock = asyncio.Lock()
+        self._output_max_bytes = output_max_bytes
+        self._output_inline_bytes = output_inline_bytes
+        self._signing_key_path = (
+            Path(signing_key_path) if signing_key_path is not None else None
+        )
+        self._signing_key: bytes | None = None
+        self._checkpoint_interval = checkpoint_interval
+        self._recent = RecentRequests(recent_cache_size)
+        self._lookups = LookupCache(lookup_cache_size)
+        self._request_generation = 0
+        self._requested_timestamp_format = timestamp_format
+        # Values known to be in each lookup table (which never shrink), and
+        # those the next commit adds ahead of the rows that use them.
+        self._interned: dict[str, set[str]] = {d.lookup: set() for d in DICTIONARIES}
+        self._new_values: list[tuple[str, str]] = []
+        # False while rows written before the dictionaries remain unencoded.
+        self._encoded = False
+        self.timestamp_format = timestamp_format
 
     async def initialize(self) -> None:
         if self.db_path != ":memory:":
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         self._db = await aiosqlite.connect(self.db_path)
-        for table_sql in TABLES:
-            await self._db.execute(table_sql)
-        await self._db.commit()
+        # Only takes effect on a new, empty database; lets retention hand
+        # freed pages back with incremental_vacuum.
+        await self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute(f"PRAGMA synchronous={self._synchronous}")
+        await self._apply_cache_pragmas(self._db)
+        await migrate(self._db, timestamp_format=self._requested_timestamp_format)
+        self.timestamp_format = await get_timestamp_format(self._db)
+        await self._load_encoded()
+        # An in-memory database is private to its connection, so reads there
+        # go through the writer.
+        if self.db_path != ":memory:" and self._reader_pool_size > 0:
+            self._readers = asyncio.Queue()
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            for _ in range(self._reader_pool_size):
+                conn = await aiosqlite.connect(uri, uri=True)
+                await conn.execute("PRAGMA query_only=1")
+                await self._apply_cache_pragmas(conn)
+                self._reader_conns.append(conn)
+                self._readers.put_nowait(conn)
+
+    async def _load_encoded(self) -> None:
+        cursor = await self._get_db().execute(
+            "SELECT 1 FROM schema_options WHERE name = ?", (ENCODED_OPTION,)
+        )
+        self._encoded = await cursor.fetchone() is not None
+        await cursor.close()
+
+    async def _apply_cache_pragmas(self, conn: aiosqlite.Connection) -> None:
+        await conn.execute(f"PRAGMA cache_size={int(self._cache_size)}")
+        await conn.execute(f"PRAGMA mmap_size={int(self._mmap_size)}")
 
     async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        for conn in self._reader_conns:
+            await conn.close()
+        self._reader_conns = []
+        self._readers = None
         if self._db:
-            await self._db.close()
-            self._db = None
+            try:
+                await self.flush()
+            finally:
+                await self._db.close()
+                self._db = None
 
     def _get_db(self) -> aiosqlite.Connection:
         if self._db is None:
             raise RuntimeError("MemoryStore not initialized — call initialize() first")
         return self._db
 
-    async def log_request(self, record: RequestRecord) -> None:
+    @property
+    def metrics(self) -> WriterMetrics:
+        return WriterMetrics(
+            queue_depth=len(self._pending),
+            max_queue_depth=self._max_queue_depth,
+            batches_committed=self._batches_committed,
+            records_committed=self._records_committed,
+            last_commit_ms=self._last_commit_ms,
+            total_commit_ms=self._total_commit_ms,
+        )
+
+    @property
+    def lookup_stats(self) -> CacheStats:
+        """Hits and misses of the ``get_request``/``get_actions_for_request``/
+        ``get_execution`` cache."""
+        return self._lookups.stats
+
+    async def _enqueue(
+        self, sql: str, params: tuple[Any, ...], chain: str | None = None
+    ) -> None:
+        """Queue a write; ``chain`` names the audit table of a row that joins
+        the hash chain, whose ``chain_seq``/``chain_hash`` are appended to
+        ``params`` at commit time."""
+        self._get_db()
+        self._pending.append((sql, params, chain))
+        self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+        if len(self._pending) >= self._batch_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._flush_interval)
+        self._flush_task = None
+        # A failed background commit re-queues its batch; the next explicit
+        # flush() retries it and surfaces the error to the caller.
+        with contextlib.suppress(Exception):
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Commit every queued record in a single transaction.
+
+        Acts as a barrier: when it returns, everything logged before the call
+        is durable. On failure the batch is rolled back, re-queued in order,
+        and the error is re-raised.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            db = self._get_db()
+            batch, self._pending = self._pending, []
+            values, self._new_values = self._new_values, []
+            start = time.perf_counter()
+            try:
+                # IMMEDIATE takes the write lock before the chain head is read,
+                # so writers in other processes extend the chain in turn.
+                await db.execute("BEGIN IMMEDIATE")
+                for d in DICTIONARIES:
+                    new = [(value,) for lookup, value in values if lookup == d.lookup]
+                    if new:
+                        await db.executemany(
+                            f"INSERT OR IGNORE INTO {d.lookup} (value) VALUES (?)", new
+                        )
+                statements = await self._chain_batch(db, batch)
+                # Consecutive records with the same statement go out as one
+                # executemany, keeping insertion order across tables.
+                i = 0
+                while i < len(statements):
+                    sql = statements[i][0]
+                    j = i
+                    while j < len(statements) and statements[j][0] == sql:
+                        j += 1
+                    await db.executemany(sql, [params for _, params in statements[i:j]])
+                    i = j
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                self._pending[:0] = batch
+                self._new_values[:0] = values
+                raise
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._batches_committed += 1
+            self._records_committed += len(batch)
+            self._last_commit_ms = elapsed_ms
+            self._total_commit_ms += elapsed_ms
+
+    async def _chain_batch(
+        self,
+        db: aiosqlite.Connection,
+        batch: list[tuple[str, tuple[Any, ...], str | None]],
+    ) -> list[tuple[str, tuple[Any, ...]]]:
+        """Extend the hash chain over the batch's audit rows and return the
+        statements to execute (see ``agentic.memory.chain``)."""
+        if not any(table for _, _, table in batch):
+            return [(sql, params) for sql, params, _ in batch]
+        cursor = await db.execute("SELECT seq, hash FROM audit_chain_head WHERE id = 1")
+        first_seq, prev = await cursor.fetchone()
+        seq = first_seq
+        statements: list[tuple[str, tuple[Any, ...]]] = []
+        for sql, params, table in batch:
+            if table is not None:
+                seq += 1
+                prev = link(prev, table, params)
+                params = (*params, seq, prev)
+            statements.append((sql, params))
+        statements.append(
+            ("UPDATE audit_chain_head SET seq = ?, hash = ? WHERE id = 1", (seq, prev))
+        )
+        interval = self._checkpoint_interval
+        if (
+            self._signing_key_path is not None
+            and interval
+            and seq // interval > first_seq // interval
+        ):
+            if self._signing_key is None:
+                self._signing_key = load_signing_key(self._signing_key_path)
+            now = datetime.now(timezone.utc).isoformat()
+            statements.append(
+                (
+                    "INSERT INTO audit_checkpoints (seq, chain_hash, created_at, signature) "
+                    "VALUES (?, ?, ?, ?)",
+                    (seq, prev, now, sign(self._signing_key, seq, prev, now)),
+                )
+            )
+        return statements
+
+    def signing_key(self) -> bytes | None:
+        """The checkpoint key, or None if this store signs nothing."""
+        if self._signing_key is None and self._signing_key_path is not None:
+            self._signing_key = load_signing_key(self._signing_key_path)
+        return self._signing_key
+
+    @contextlib.asynccontextmanager
+    async def _read(self) -> AsyncIterator[aiosqlite.Connection]:
         db = self._get_db()
-        await db.execute(
-            "INSERT INTO requests (id, raw_query, intent_type, confidence, created_at) "
-            "VALUES (?, ?, ?, ?, ?)",
+        await self.flush()
+        if self._readers is None:
+            yield db
+            return
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @contextlib.asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Exclusive use of the writer connection for maintenance work,
+        serialised with write-behind commits (queued records go first)."""
+        await self.flush()
+        async with self._flush_lock:
+            yield self._get_db()
+
+    def _stamp(self, ts: datetime) -> str | int:
+        """``ts`` as this database stores it."""
+        return encode(ts, self.timestamp_format)
+
+    def timestamp_bound(self, ts: datetime) -> str | int:
+        """``ts`` as a range bound on stored timestamps; naive means UTC."""
+        return bound(ts, self.timestamp_format)
+
+    async def _fetchall(self, sql: str, params: tuple[Any, ...] = ()) -> list[Any]:
+        async with self._read() as db:
+            cursor = await db.execute(sql, params)
+            return list(await cursor.fetchall())
+
+    async def _fetchone(self, sql: str, params: tuple[Any, ...] = ()) -> Any:
+        async with self._read() as db:
+            cursor = await db.execute(sql, params)
+            return await cursor.fetchone()
+
+    async def _matches(
+        self, d: Dictionary, alias: str, value: str
+    ) -> tuple[str, tuple[Any, ...]]:
+        """A filter on ``d`` equal to ``value`` and its parameters; the value
+        is resolved to its id first so the filter can use the code index."""
+        row = await self._fetchone(
+            f"SELECT id FROM {d.lookup} WHERE value = ?", (value,)
+        )
+        code = row[0] if row is not None else None
+        if self._encoded:
+            return matches(d, alias), (code,)
+        return matches(d, alias, legacy=True), (code, value)
+
+    def _intern(self, d: Dictionary, value: str) -> None:
+        """Make sure the commit of the row about to be queued adds ``value``
+        to ``d``'s lookup table first."""
+        interned = self._interned[d.lookup]
+        if value not in interned:
+            self._new_values.append((d.lookup, value))
+            interned.add(value)
+
+    async def log_request(self, record: RequestRecord) -> None:
+        self._intern(_INTENT_TYPE, record.intent_type)
+        await self._enqueue(
+            "INSERT INTO requests (id, raw_query, intent_type_id, confidence, created_at, entities, intent_type, "
+            f"chain_seq, chain_hash) VALUES (?, ?, {encoded(_INTENT_TYPE)}, ?, ?, ?, '', ?, ?)",
             (
                 record.id,
                 record.raw_query,
                 record.intent_type,
                 record.confidence,
-                record.created_at.isoformat(),
+                self._stamp(record.created_at),
+                dump_entities(record.entities),
             ),
+            chain="requests",
+        )
+        await self._enqueue_embedding(
+            record.id, record.raw_query, self._stamp(record.created_at)
         )
-        await db.commit()
+        self._recent.add(record)
+        self._lookups.invalidate(("request", record.id))
+        self._request_generation += 1
+
+    @property
+    def request_generation(self) -> int:
+        """Changes whenever this store logs or removes requests; lets callers
+        cache anything derived from the request history."""
+        return self._request_generation
+
+    def forget_requests(self) -> None:
+        """Drop in-process request state after rows were deleted directly."""
+        self._index = None
+        self._recent.clear()
+        self._lookups.clear()
+        self._request_generation += 1
+
+    async def _enqueue_embedding(
+        self, request_id: str, text: str, created_at: str | int
+    ) -> None:
+        blob = self._embedder.quantize(self._embedder.embed(text))
+        await self._enqueue(
+            "INSERT INTO embeddings_cache (request_id, text, embedding, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (request_id, text, blob, created_at),
+        )
+        if self._index is not None:
+            self._index.add([request_id], self._embedder.dequantize([blob]))
+
+    async def _vector_index(self) -> VectorIndex:
+        async with self._index_lock:
+            if self._index is not None:
+                return self._index
+            dim = self._embedder.dim
+            rows = await self._fetchall(
+                "SELECT request_id, embedding FROM embeddings_cache "
+                "WHERE request_id IS NOT NULL AND length(embedding) = ? ORDER BY id",
+                (dim,),
+            )
+            index = VectorIndex(dim, capacity=len(rows) + 1024)
+            if rows:
+                index.add(
+                    [r[0] for r in rows],
+                    self._embedder.dequantize([r[1] for r in rows]),
+                )
+            # Requests logged before embeddings existed (or with a different
+            # embedding size) are embedded once, here.
+            missing = await self._fetchall(
+                "SELECT r.id, r.raw_query, r.created_at FROM requests r "
+                "LEFT JOIN embeddings_cache e ON e.request_id = r.id AND length(e.embedding) = ? "
+                "WHERE e.id IS NULL ORDER BY r.created_at",
+                (dim,),
+            )
+            self._index = index
+            for request_id, raw_query, created_at in missing:
+                await self._enqueue_embedding(request_id, raw_query, created_at)
+            return index
 
     async def log_action(self, record: ActionRecord) -> None:
-        db = self._get_db()
-        await db.execute(
-            "INSERT INTO actions (id, request_id, action_type, description, command, risk_level, approved) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        self._intern(_ACTION_TYPE, record.action_type)
+        await self._enqueue(
+            "INSERT INTO actions (id, request_id, action_type_id, description, command, risk_level, approved, "
+            "target, parameters, rollback_command, rollback_support, action_type, chain_seq, chain_hash) "
+            f"VALUES (?, ?, {encoded(_ACTION_TYPE)}, ?, ?, ?, ?, ?, ?, ?, ?, '', ?, ?)",
             (
                 record.id,
                 record.request_id,
@@ -62,135 +571,412 @@ class MemoryStore:
                 record.command,
                 record.risk_level,
                 int(record.approved),
+                record.target,
+                json.dumps(record.parameters, sort_keys=True),
+                record.rollback_command,
+                record.rollback_support,
             ),
+            chain="actions",
         )
-        await db.commit()
+        self._lookups.invalidate(("actions", record.request_id))
+
+    async def _store_text(self, text: str) -> tuple[str, str | None]:
+        """Return the (inline text, blob hash) pair to persist for ``text``."""
+        text = truncate_output(text, self._output_max_bytes)
+        if len(text.encode()) <= self._output_inline_bytes:
+            return text, None
+        blob = encode_blob(text)
+        await self._enqueue(
+            "INSERT OR IGNORE INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+            (blob.hash, blob.codec, blob.size, blob.data),
+        )
+        return "", blob.hash
 
     async def log_execution(self, record: ExecutionRecord) -> None:
-        db = self._get_db()
-        await db.execute(
-            "INSERT INTO execution_results (id, action_id, success, output, error, rolled_back, executed_at) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        output, output_hash = await self._store_text(record.output)
+        error, error_hash = await self._store_text(record.error)
+        await self._enqueue(
+            "INSERT INTO execution_results "
+            "(id, action_id, success, output, error, rolled_back, executed_at, output_hash, error_hash, "
+            "dry_run, chain_seq, chain_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
             (
                 record.id,
                 record.action_id,
                 int(record.success),
-                record.output,
-                record.error,
+                output,
+                error,
                 int(record.rolled_back),
-                record.executed_at.isoformat(),
+                self._stamp(record.executed_at),
+                output_hash,
+                error_hash,
+                int(record.dry_run),
             ),
+            chain="execution_results",
         )
-        await db.commit()
+        self._lookups.invalidate(("execution", record.action_id))
 
     async def get_recent_context(self, limit: int = 10) -> list[RequestRecord]:
-        db = self._get_db()
-        cursor = await db.execute(
-            "SELECT id, raw_query, intent_type, confidence, created_at "
-            "FROM requests ORDER BY created_at DESC LIMIT ?",
+        """The newest requests, newest first; served from the in-process
+        buffer when ``limit`` fits in it."""
+        records = self._recent.newest(limit)
+        if records is None and limit <= self._recent.capacity:
+            generation = self._request_generation
+            loaded = [
+                row.to_record()
+                for row in await self.get_recent_rows(self._recent.capacity)
+            ]
+            # A request logged while the rows were read is not in them.
+            if generation == self._request_generation:
+                self._recent.load(loaded)
+            return loaded[:limit]
+        if records is None:
+            return [row.to_record() for row in await self.get_recent_rows(limit)]
+        return records
+
+    async def get_recent_rows(self, limit: int = 10) -> list[RequestRow]:
+        rows = await self._fetchall(
+            f"SELECT {_REQUEST_COLUMNS} FROM requests ORDER BY created_at DESC, id DESC LIMIT ?",
             (limit,),
         )
-        rows = await cursor.fetchall()
-        return [
-            RequestRecord(
-                id=r[0],
-                raw_query=r[1],
-                intent_type=r[2],
-                confidence=r[3],
-                created_at=r[4],
+        return [RequestRow(*r) for r in rows]
+
+    async def scan_request_rows(
+        self, *, after: datetime | None = None, page_size: int = 1000
+    ) -> AsyncIterator[list[RequestRow]]:
+        """Stream every request oldest first, ``page_size`` rows per batch.
+
+        The bulk-read counterpart of ``iter_history``: keyset pagination on
+        ``(created_at, id)`` and lightweight rows, for exports and offline
+        analysis over the whole log.
+        """
+        if page_size < 1:
+            raise ValueError(f"page_size must be >= 1, got {page_size}")
+        bound = ["created_at > ?"] if after is not None else []
+        params: tuple[Any, ...] = (
+            (self.timestamp_bound(after),) if after is not None else ()
+        )
+        cursor: tuple[str | int, str] | None = None
+        while True:
+            clause = " AND ".join(
+                bound + (["(created_at, id) > (?, ?)"] if cursor else [])
             )
-            for r in rows
-        ]
+            rows = await self._fetchall(
+                f"SELECT {_REQUEST_COLUMNS} FROM requests "
+                + (f"WHERE {clause} " if clause else "")
+                + "ORDER BY created_at, id LIMIT ?",
+                (*params, *(cursor or ()), page_size),
+            )
+            if not rows:
+                return
+            yield [RequestRow(*r) for r in rows]
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1][4], rows[-1][0])
 
     async def get_request(self, request_id: str) -> RequestRecord | None:
-        db = self._get_db()
-        cursor = await db.execute(
-            "SELECT id, raw_query, intent_type, confidence, created_at "
-            "FROM requests WHERE id = ?",
+        key = ("request", request_id)
+        record = self._lookups.get(key)
+        if record is not None:
+            return record
+        generation = self._lookups.generation
+        row = await self._fetchone(
+            f"SELECT {_REQUEST_COLUMNS} FROM requests WHERE id = ?",
             (request_id,),
         )
-        row = await cursor.fetchone()
         if row is None:
             return None
-        return RequestRecord(
-            id=row[0],
-            raw_query=row[1],
-            intent_type=row[2],
-            confidence=row[3],
-            created_at=row[4],
+        record = RequestRow(*row).to_record()
+        self._lookups.put(key, record, generation)
+        return record
+
+    async def get_action(self, action_id: str) -> ActionRecord | None:
+        row = await self._fetchone(
+            f"SELECT {_ACTION_COLUMNS} FROM actions WHERE id = ?", (action_id,)
         )
+        return ActionRow(*row).to_record() if row is not None else None
 
     async def get_actions_for_request(self, request_id: str) -> list[ActionRecord]:
-        db = self._get_db()
-        cursor = await db.execute(
-            "SELECT id, request_id, action_type, description, command, risk_level, approved "
-            "FROM actions WHERE request_id = ?",
+        key = ("actions", request_id)
+        records = self._lookups.get(key)
+        if records is not None:
+            return list(records)
+        generation = self._lookups.generation
+        records = [row.to_record() for row in await self.get_action_rows(request_id)]
+        if records:
+            self._lookups.put(key, tuple(records), generation)
+        return records
+
+    async def get_action_rows(self, request_id: str) -> list[ActionRow]:
+        rows = await self._fetchall(
+            f"SELECT {_ACTION_COLUMNS} FROM actions WHERE request_id = ? ORDER BY rowid",
             (request_id,),
         )
-        rows = await cursor.fetchall()
-        return [
-            ActionRecord(
-                id=r[0],
-                request_id=r[1],
-                action_type=r[2],
-                description=r[3],
-                command=r[4],
-                risk_level=r[5],
-                approved=bool(r[6]),
-            )
-            for r in rows
-        ]
+        return [ActionRow(*r) for r in rows]
 
     async def get_execution(self, action_id: str) -> ExecutionRecord | None:
-        db = self._get_db()
-        cursor = await db.execute(
-            "SELECT id, action_id, success, output, error, rolled_back, executed_at "
-            "FROM execution_results WHERE action_id = ?",
-            (action_id,),
-        )
-        row = await cursor.fetchone()
+        key = ("execution", action_id)
+        record = self._lookups.get(key)
+        if record is not None:
+            return record
+        generation = self._lookups.generation
+        row = await self.get_execution_row(action_id)
         if row is None:
             return None
-        return ExecutionRecord(
-            id=row[0],
-            action_id=row[1],
-            success=bool(row[2]),
-            output=row[3],
-            error=row[4],
-            rolled_back=bool(row[5]),
-            executed_at=row[6],
-        )
+        record = row.to_record()
+        self._lookups.put(key, record, generation)
+        return record
+
+    async def get_execution_row(self, action_id: str) -> ExecutionRow | None:
+        """The first execution logged for ``action_id``; see ``get_executions``
+        for the rollbacks recorded after it."""
+        row = await self._fetchone(_EXECUTION_SELECT, (action_id,))
+        return _execution_row(row) if row is not None else None
+
+    async def get_executions(self, action_id: str) -> list[ExecutionRecord]:
+        """Every execution logged for ``action_id``, oldest first."""
+        rows = await self._fetchall(_EXECUTION_SELECT, (action_id,))
+        return [_execution_row(r).to_record() for r in rows]
 
     async def search_similar(self, query: str, limit: int = 5) -> list[RequestRecord]:
-        # Stub — future embedding-based similarity search
-        return await self.get_recent_context(limit=limit)
+        index = await self._vector_index()
+        hits = index.search(self._embedder.embed(query), limit)
+        by_id: dict[str, RequestRecord] = {}
+        missing: list[str] = []
+        for request_id, _ in hits:
+            record = self._recent.get(request_id)
+            if record is None:
+                missing.append(request_id)
+            else:
+                by_id[request_id] = record
+        if missing:
+            rows = await self._fetchall(
+                f"SELECT {_REQUEST_COLUMNS} FROM requests WHERE id IN ({', '.join('?' * len(missing))})",
+                tuple(missing),
+            )
+            by_id.update((r[0], RequestRow(*r).to_record()) for r in rows)
+        return [by_id[request_id] for request_id, _ in hits if request_id in by_id]
 
-    async def get_history(self, limit: int = 20) -> list[dict]:
-        db = self._get_db()
-        cursor = await db.execute(
-            "SELECT r.id, r.raw_query, r.intent_type, r.confidence, r.created_at, "
-            "       a.id, a.action_type, a.description, a.approved "
-            "FROM requests r LEFT JOIN actions a ON a.request_id = r.id "
-            "ORDER BY r.created_at DESC LIMIT ?",
-            (limit,),
+    async def get_history(self, limit: int = 20, **filters: Any) -> list[dict]:
+        """The ``limit`` most recent requests with their actions, newest first.
+
+        ``limit`` counts requests, not joined rows; ``filters`` are those of
+        ``iter_history``.
+        """
+        return [
+            row
+            async for row in self.iter_history(
+                limit=limit, page_size=max(limit, 1), **filters
+            )
+        ]
+
+    async def iter_history(
+        self,
+        *,
+        intent_type: str | None = None,
+        action_type: str | None = None,
+        approved: bool | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+        limit: int | None = None,
+        page_size: int = 100,
+    ) -> AsyncIterator[dict]:
+        """Stream history rows newest first, one request/action pair per row.
+
+        Requests are read ``page_size`` at a time with keyset pagination on
+        ``(created_at, id)``, so memory stays constant and rows logged while
+        iterating never shift a page. ``after``/``before`` bound ``created_at``
+        exclusively. When ``action_type`` or ``approved`` is given, only
+        requests with a matching action are returned, and only those actions.
+        A request without actions yields one row with ``action_*`` set to None.
+        """
+        if page_size < 1:
+            raise ValueError(f"page_size must be >= 1, got {page_size}")
+        where: list[str] = []
+        params: list[Any] = []
+        if intent_type is not None:
+            clause, values = await self._matches(_INTENT_TYPE, "r", intent_type)
+            where.append(clause)
+            params.extend(values)
+        if after is not None:
+            where.append("r.created_at > ?")
+            params.append(self.timestamp_bound(after))
+        if before is not None:
+            where.append("r.created_at < ?")
+            params.append(self.timestamp_bound(before))
+        action_where: list[str] = []
+        action_params: list[Any] = []
+        if action_type is not None:
+            clause, values = await self._matches(_ACTION_TYPE, "a", action_type)
+            action_where.append(clause)
+            action_params.extend(values)
+        if approved is not None:
+            action_where.append("a.approved = ?")
+            action_params.append(int(approved))
+        if action_where:
+            where.append(
+                "EXISTS (SELECT 1 FROM actions a WHERE a.request_id = r.id AND "
+                + " AND ".join(action_where)
+                + ")"
+            )
+            params.extend(action_params)
+
+        remaining = limit
+        cursor: tuple[str | int, str] | None = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            keyset = ["(r.created_at, r.id) < (?, ?)"] if cursor else []
+            clause = " AND ".join(where + keyset)
+            requests = await self._fetchall(
+                f"SELECT r.id, r.raw_query, {decoded(_INTENT_TYPE, 'r')}, r.confidence, r.created_at "
+                "FROM requests r "
+                + (f"WHERE {clause} " if clause else "")
+                + "ORDER BY r.created_at DESC, r.id DESC LIMIT ?",
+                (*params, *(cursor or ()), size),
+            )
+            if not requests:
+                return
+            actions: dict[str, list[tuple]] = {}
+            rows = await self._fetchall(
+                f"SELECT a.request_id, a.id, {decoded(_ACTION_TYPE, 'a')}, a.description, a.approved "
+                "FROM actions a "
+                f"WHERE a.request_id IN ({', '.join('?' * len(requests))}) "
+                + "".join(f"AND {w} " for w in action_where)
+                + "ORDER BY a.rowid",
+                (*(r[0] for r in requests), *action_params),
+            )
+            for a in rows:
+                actions.setdefault(a[0], []).append(a)
+            for r in requests:
+                for a in actions.get(r[0]) or [(r[0], None, None, None, None)]:
+                    yield {
+                        "request_id": r[0],
+                        "raw_query": r[1],
+                        "intent_type": r[2],
+                        "confidence": r[3],
+                        "created_at": to_text(r[4]),
+                        "action_id": a[1],
+                        "action_type": a[2],
+                        "description": a[3],
+                        "approved": bool(a[4]) if a[4] is not None else None,
+                    }
+            if len(requests) < size:
+                return
+            if remaining is not None:
+                remaining -= len(requests)
+            cursor = (requests[-1][4], requests[-1][0])
+
+    async def search_text(
+        self,
+        query: str,
+        limit: int | None = 20,
+        candidates: int = 1000,
+        *,
+        intent_type: str | None = None,
+        action_type: str | None = None,
+        approved: bool | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+    ) -> list[dict]:
+        """BM25-ranked full-text search over request queries and action
+        descriptions/commands, best match first.
+
+        Each whitespace-separated term must match; a trailing ``*`` makes a
+        term a prefix match. The filters mean what they do for
+        ``iter_history`` and apply before ranking, which covers the
+        ``candidates`` most recent matching rows per table: that bounds the
+        cost of very common terms on multi-million-row logs. ``limit=None``
+        lifts the cap too and returns every hit.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        where: list[str] = []
+        params: list[Any] = []
+        if intent_type is not None:
+            clause, values = await self._matches(_INTENT_TYPE, "r", intent_type)
+            where.append(clause)
+            params.extend(values)
+        if after is not None:
+            where.append("r.created_at > ?")
+            params.append(self.timestamp_bound(after))
+        if before is not None:
+            where.append("r.created_at < ?")
+            params.append(self.timestamp_bound(before))
+        action_where: list[str] = []
+        action_params: list[Any] = []
+        if action_type is not None:
+            clause, values = await self._matches(_ACTION_TYPE, "a", action_type)
+            action_where.append(clause)
+            action_params.extend(values)
+        if approved is not None:
+            action_where.append("a.approved = ?")
+            action_params.append(int(approved))
+        request_where = list(where)
+        if action_where:
+            # As in iter_history: a request hit needs a matching action.
+            request_where.append(
+                "EXISTS (SELECT 1 FROM actions a WHERE a.request_id = r.id AND "
+                + " AND ".join(action_where)
+                + ")"
+            )
+        request_clause = "".join(f"AND {c} " for c in request_where)
+        action_clause = "".join(f"AND {c} " for c in where + action_where)
+        cap = -1 if limit is None else candidates
+        # The filters sit inside the candidate subqueries, ahead of their
+        # LIMIT, so a narrow filter is not starved by newer matches.
+        rows = await self._fetchall(
+            decode_references(
+                "SELECT r.id, r.raw_query, r.intent_type, r.confidence, r.created_at, "
+                "       NULL, NULL, NULL, NULL, NULL, m.score "
+            )
+            + "FROM (SELECT requests_fts.rowid AS rowid, bm25(requests_fts) AS score FROM requests_fts "
+            "      JOIN requests r ON r.rowid = requests_fts.rowid "
+            "      WHERE requests_fts MATCH ? "
+            + request_clause
+            + "      ORDER BY requests_fts.rowid DESC LIMIT ?) m "
+            "JOIN requests r ON r.rowid = m.rowid "
+            "UNION ALL "
+            + decode_references(
+                "SELECT r.id, r.raw_query, r.intent_type, r.confidence, r.created_at, "
+                "       a.id, a.action_type, a.description, a.command, a.approved, m.score "
+            )
+            + "FROM (SELECT actions_fts.rowid AS rowid, bm25(actions_fts) AS score FROM actions_fts "
+            "      JOIN actions a ON a.rowid = actions_fts.rowid "
+            "      LEFT JOIN requests r ON r.id = a.request_id "
+            "      WHERE actions_fts MATCH ? "
+            + action_clause
+            + "      ORDER BY actions_fts.rowid DESC LIMIT ?) m "
+            "JOIN actions a ON a.rowid = m.rowid "
+            "LEFT JOIN requests r ON r.id = a.request_id "
+            "ORDER BY 11 LIMIT ?",
+            (
+                match,
+                *params,
+                *action_params,
+                cap,
+                match,
+                *params,
+                *action_params,
+                cap,
+                -1 if limit is None else limit,
+            ),
         )
-        rows = await cursor.fetchall()
-        results: list[dict] = []
-        for r in rows:
-            results.append(
-                {
-                    "request_id": r[0],
-                    "raw_query": r[1],
-                    "intent_type": r[2],
-                    "confidence": r[3],
-                    "created_at": r[4],
-                    "action_id": r[5],
-                    "action_type": r[6],
-                    "description": r[7],
-                    "approved": bool(r[8]) if r[8] is not None else None,
-                }
-            )
-        return results
+        return [
+            {
+                "request_id": r[0],
+                "raw_query": r[1],
+                "intent_type": r[2],
+                "confidence": r[3],
+                "created_at": to_text(r[4]),
+                "action_id": r[5],
+                "action_type": r[6],
+                "description": r[7],
+                "command": r[8],
+                "approved": bool(r[9]) if r[9] is not None else None,
+                "score": -r[10],
+            }
+            for r in rows
+        ]
 
     async def log_policy_decision(
         self,
@@ -199,24 +985,257 @@ class MemoryStore:
         approved: bool,
         requires_sudo: bool = False,
         reason: str = "",
+        gate: str = "",
+        request_id: str | None = None,
     ) -> None:
-        db = self._get_db()
-        await db.execute(
-            "INSERT INTO policy_decisions (action_id, risk_level, approved, requires_sudo, reason) "
-            "VALUES (?, ?, ?, ?, ?)",
-            (action_id, risk_level, int(approved), int(requires_sudo), reason),
+        """``request_id`` names the request the action belongs to; only a
+        sharded store needs it, to log the decision beside that request."""
+        self._intern(_REASON, reason)
+        await self._enqueue(
+            "INSERT INTO policy_decisions "
+            "(action_id, risk_level, approved, requires_sudo, reason_id, created_at, gate, chain_seq, chain_hash) "
+            f"VALUES (?, ?, ?, ?, {encoded(_REASON)}, ?, ?, ?, ?)",
+            (
+                action_id,
+                risk_level,
+                int(approved),
+                int(requires_sudo),
+                reason,
+                self._stamp(datetime.now(timezone.utc)),
+                gate,
+            ),
+            chain="policy_decisions",
         )
-        await db.commit()
+
+    async def log_plan(
+        self, request_id: str, plan: ActionPlan, approved_ids: Collection[str] = ()
+    ) -> None:
+        """Record ``plan`` with every candidate action and its simulation.
+
+        ``approved_ids`` are the actions that passed every gate; the others
+        were denied.
+        """
+        await self._enqueue(
+            "INSERT INTO plans (id, request_id, reasoning, created_at) VALUES (?, ?, ?, ?)",
+            (plan.id, request_id, plan.reasoning, self._stamp(plan.created_at)),
+        )
+        simulations = {s.action_id: s for s in plan.simulations}
+        for position, action in enumerate(plan.actions):
+            self._intern(_ACTION_TYPE, action.action_type.value)
+            simulation = simulations.get(action.id)
+            warnings = "\n".join(simulation.warnings) if simulation else ""
+            await self._enqueue(
+                "INSERT INTO plan_actions (plan_id, position, action_id, action_type_id, description, command, "
+                f"target, parameters, flags, scope, warnings) VALUES (?, ?, ?, {encoded(_ACTION_TYPE)}, "
+                "?, ?, ?, ?, ?, ?, ?)",
+                (
+                    plan.id,
+                    position,
+                    action.id,
+                    action.action_type.value,
+                    action.description,
+                    action.command,
+                    action.target,
+                    json.dumps(action.parameters, sort_keys=True)
+                    if action.parameters
+                    else None,
+                    pack_flags(simulation, action.id in approved_ids),
+                    scope_code(simulation.predicted_scope) if simulation else None,
+                    warnings or None,
+                ),
+            )
+
+    async def get_plans(self, request_id: str) -> list[LoggedPlan]:
+        """The plans logged for a request, oldest first."""
+        plans = await self._fetchall(
+            "SELECT id, reasoning, created_at FROM plans WHERE request_id = ? ORDER BY rowid",
+            (request_id,),
+        )
+        if not plans:
+            return []
+        rows = await self._fetchall(
+            "SELECT p.plan_id, p.action_id, t.value, p.description, p.command, p.target, p.parameters, "
+            "       p.flags, p.scope, p.warnings "
+            "FROM plan_actions p JOIN action_types t ON t.id = p.action_type_id "
+            f"WHERE p.plan_id IN ({', '.join('?' * len(plans))}) ORDER BY p.plan_id, p.position",
+            tuple(p[0] for p in plans),
+        )
+        by_plan: dict[str, list[tuple]] = {}
+        for row in rows:
+            by_plan.setdefault(row[0], []).append(row)
+        logged: list[LoggedPlan] = []
+        for plan_id, reasoning, created_at in plans:
+            actions = by_plan.get(plan_id, [])
+            simulations = [unpack_simulation(r[1], r[7], r[8], r[9]) for r in actions]
+            plan = ActionPlan(
+                id=plan_id,
+                intent_id=request_id,
+                actions=[
+                    ActionCandidate(
+                        id=r[1],
+                        action_type=ActionType(r[2]),
+                        description=r[3],
+                        command=r[4],
+                        target=r[5],
+                        parameters=json.loads(r[6]) if r[6] else {},
+                    )
+                    for r in actions
+                ],
+                reasoning=reasoning,
+                created_at=decode(created_at),
+                simulations=[s for s in simulations if s is not None],
+            )
+            approved = frozenset(r[1] for r in actions if r[7] & APPROVED)
+            logged.append(LoggedPlan(request_id, plan, approved))
+        return logged
 
     async def get_rollback_command(self, action_id: str) -> str | None:
-        db = self._get_db()
-        # Check execution_results to see if it was executed
-        exec_cursor = await db.execute(
-            "SELECT success FROM execution_results WHERE action_id = ?",
+        """The stored rollback command of an action that actually ran.
+
+        None if the action is unknown, has no rollback command, has no
+        successful non-dry-run execution to undo, or was already rolled back.
+        """
+        row = await self._fetchone(
+            "SELECT a.rollback_command FROM actions a WHERE a.id = ? AND EXISTS ("
+            "  SELECT 1 FROM execution_results e WHERE e.action_id = a.id "
+            "  AND e.success = 1 AND e.rolled_back = 0 AND e.dry_run = 0) "
+            "AND NOT EXISTS ("
+            "  SELECT 1 FROM execution_results e WHERE e.action_id = a.id AND e.rolled_back = 1)",
             (action_id,),
         )
-        exec_row = await exec_cursor.fetchone()
-        if exec_row is None:
+        if row is None:
             return None
-        # For now, return None — rollback commands stored on ActionCandidate
-        return None
+        return row[0] or None
+
+    async def encode_dictionaries(self, batch_size: int = 1000) -> int:
+        """Dictionary-encode rows written before the lookup tables existed.
+
+        Runs online: each batch of ``batch_size`` rows is its own short
+        transaction and the event loop runs between batches. Rows read the
+        same before and after, and an interrupted run simply resumes. A
+        completed run records that filters need not check the text columns.
+        Returns the number of rows rewritten.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+        total = 0
+        for d in DICTIONARIES:
+            last = 0
+            while True:
+                async with self.writer() as db:
+                    await db.execute("BEGIN IMMEDIATE")
+                    try:
+                        cursor = await db.execute(
+                            f"SELECT rowid FROM {d.table} WHERE rowid > ? AND {d.code} IS NULL "
+                            f"AND {d.column} IS NOT NULL ORDER BY rowid LIMIT ?",
+                            (last, batch_size),
+                        )
+                        rowids = [r[0] for r in await cursor.fetchall()]
+                        scope = f"rowid IN ({', '.join(map(str, rowids))})"
+                        await db.execute(
+                            f"INSERT OR IGNORE INTO {d.lookup} (value) "
+                            f"SELECT DISTINCT {d.column} FROM {d.table} WHERE {scope}"
+                        )
+                        await db.execute(
+                            f"UPDATE {d.table} SET {d.code} = "
+                            f"(SELECT id FROM {d.lookup} WHERE value = {d.table}.{d.column}), "
+                            f"{d.column} = '' WHERE {scope}"
+                        )
+                        await db.commit()
+                    except BaseException:
+                        await db.rollback()
+                        raise
+                total += len(rowids)
+                if len(rowids) < batch_size:
+                    break
+                last = rowids[-1]
+                await asyncio.sleep(0)
+        if not self._encoded:
+            async with self.writer() as db:
+                await db.execute(mark_encoded())
+                await db.commit()
+            await self._load_encoded()
+        return total
+
+    async def backup(
+        self,
+        target: Path | str,
+        *,
+        pages: int = 256,
+        sleep: float = 0.0,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> BackupReport:
+        """Copy the database to ``target`` while it stays in use.
+
+        Copies ``pages`` pages per step, pausing ``sleep`` seconds between
+        steps to throttle I/O; ``progress(remaining, total)`` is called on
+        the event loop after each step. Records queued before the call are
+        included. See ``agentic.memory.backup``.
+        """
+        if pages < 1:
+            raise ValueError(f"pages must be >= 1, got {pages}")
+        if sleep < 0:
+            raise ValueError(f"sleep must be >= 0, got {sleep}")
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".part")
+        copy = (
+            partial.with_name(partial.name + ".db")
+            if target.suffix == COMPRESSED_SUFFIX
+            else partial
+        )
+        loop = asyncio.get_running_loop()
+        steps = 0
+        total = 0
+
+        def on_step(status: int, remaining: int, count: int) -> None:
+            # Runs on the source connection's worker thread.
+            nonlocal steps, total
+            steps, total = steps + 1, count
+            if progress is not None:
+                loop.call_soon_threadsafe(progress, remaining, count)
+            if sleep:
+                time.sleep(sleep)
+
+        start = time.perf_counter()
+        try:
+            async with aiosqlite.connect(copy) as dest:
+                async with self._snapshot() as source:
+                    await source.backup(dest, pages=pages, progress=on_step)
+                await dest.execute("PRAGMA journal_mode=DELETE")
+            if copy != partial:
+                await asyncio.to_thread(compress_file, copy, partial)
+            size = partial.stat().st_size
+            partial.replace(target)
+        finally:
+            partial.unlink(missing_ok=True)
+            copy.unlink(missing_ok=True)
+        return BackupReport(
+            path=target,
+            pages=total,
+            steps=steps,
+            bytes_written=size,
+            elapsed_ms=(time.perf_counter() - start) * 1000,
+        )
+
+    @contextlib.asynccontextmanager
+    async def _snapshot(self) -> AsyncIterator[aiosqlite.Connection]:
+        """A connection reading one consistent snapshot of the database.
+
+        For a file, a private read-only connection in a read transaction,
+        which never blocks the writer. An in-memory database is only
+        reachable through the writer, which is held for the duration.
+        """
+        if self.db_path == ":memory:":
+            async with self.writer() as db:
+                yield db
+            return
+        await self.flush()
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        async with aiosqlite.connect(uri, uri=True) as conn:
+            await conn.execute("BEGIN")
+            await (await conn.execute("SELECT COUNT(*) FROM sqlite_master")).fetchone()
+            try:
+                yield conn
+            finally:
+                await conn.rollback()
@@ -0,0 +1,97 @@
+"""Storage formats for audit timestamps.
+
+An audit database stores ``requests.created_at``,
+``policy_decisions.created_at``, ``execution_results.executed_at`` (and the
+derived ``embeddings_cache``/``export_watermarks`` copies) in one of two
+formats, fixed when the database is created:
+
+* ``iso`` — ISO 8601 text, the original format
+* ``epoch_us`` — integer microseconds since the Unix epoch, UTC, in
+  ``INTEGER`` columns
+
+Integer keys are 8 bytes instead of 32, compare without collation, and keep
+``(created_at, id)`` index range scans and page splits cheap on append-heavy
+logs. Readers decode by type, so rows of either format read back the same.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+ISO = "iso"
+EPOCH_US = "epoch_us"
+FORMATS = (ISO, EPOCH_US)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def as_utc(ts: datetime) -> datetime:
+    """Naive means UTC."""
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def to_epoch_us(ts: datetime) -> int:
+    delta = as_utc(ts) - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_epoch_us(value: int) -> datetime:
+    return datetime.fromtimestamp(value // 1_000_000, timezone.utc).replace(
+        microsecond=value % 1_000_000
+    )
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(
+            f"timestamp format must be one of {list(FORMATS)}, got {fmt!r}"
+        )
+    return fmt
+
+
+def encode(ts: datetime, fmt: str) -> str | int:
+    """``ts`` as written by a database in ``fmt``."""
+    return to_epoch_us(ts) if fmt == EPOCH_US else ts.isoformat()
+
+
+def bound(ts: datetime, fmt: str) -> str | int:
+    """``ts`` as a range bound compared against stored values; ISO bounds are
+    normalised to UTC like the stored timestamps."""
+    return to_epoch_us(ts) if fmt == EPOCH_US else as_utc(ts).isoformat()
+
+
+def decode(value: str | int) -> datetime:
+    if isinstance(value, int):
+        return from_epoch_us(value)
+    return datetime.fromisoformat(value)
+
+
+def to_text(value: str | int | None) -> str | None:
+    """A stored timestamp rendered as ISO text, for output."""
+    if isinstance(value, int):
+        return from_epoch_us(value).isoformat()
+    return value
+
+
+def month(value: str | int) -> str:
+    """``YYYY-MM`` of a stored timestamp."""
+    if isinstance(value, int):
+        return from_epoch_us(value).strftime("%Y-%m")
+    return value[:7]
+
+
+def sql_month(column: str, fmt: str) -> str:
+    """SQL for the ``YYYY-MM`` of ``column`` in a database in ``fmt``."""
+    if fmt == EPOCH_US:
+        return f"strftime('%Y-%m', {column} / 1000000, 'unixepoch')"
+    return f"substr({column}, 1, 7)"
+
+
+def sql_julianday(column: str) -> str:
+    """SQL for the Julian day of a stored timestamp of either format."""
+    return (
+        f"CASE WHEN typeof({column}) = 'integer' THEN julianday({column} / 1000000.0, 'unixepoch') "
+        f"ELSE julianday({column}) END"
+    )
@@ -3,11 +3,12 @@
 from __future__ import annotations
 
 import enum
-import uuid
 from datetime import datetime, timezone
 
 from pydantic import BaseModel, Field
 
+from agentic.models.ids import new_id
+
 
 class ActionType(str, enum.Enum):
     KILL_PROCESS = "KILL_PROCESS"
@@ -33,9 +34,9 @@ class ActionScope(str, enum.Enum):
 
 
 class RollbackSupport(str, enum.Enum):
-    FULL = "FULL"        # rollback completely restores prior state
+    FULL = "FULL"  # rollback completely restores prior state
     PARTIAL = "PARTIAL"  # rollback attempts but residual effects may remain
-    NONE = "NONE"        # no rollback path exists for this action type
+    NONE = "NONE"  # no rollback path exists for this action type
     UNKNOWN = "UNKNOWN"  # rollback support not declared (treated as UNKNOWN)
 
 
@@ -62,7 +63,7 @@ class ActionSimulation(BaseModel):
 
 
 class ActionCandidate(BaseModel):
-    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    id: str = Field(default_factory=new_id)
     action_type: ActionType
     description: str
     command: str = ""
@@ -78,13 +79,11 @@ class ActionCandidate(BaseModel):
 
 
 class ActionPlan(BaseModel):
-    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    id: str = Field(default_factory=new_id)
     intent_id: str
     actions: list[ActionCandidate] = Field(default_factory=list)
     reasoning: str = ""
-    created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
-    )
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     simulations: list[ActionSimulation] = Field(default_factory=list)
 
 
@@ -94,6 +93,4 @@ class ActionResult(BaseModel):
     output: str = ""
     error: str = ""
     rolled_back: bool = False
-    executed_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
-    )
+    executed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,72 @@
+"""Identifier generation for intents, action candidates and plans.
+
+IDs are 32-character lowercase hex strings in either scheme:
+
+* ``uuid4`` — random (the default)
+* ``uuid7`` — RFC 9562 UUIDv7: a 48-bit millisecond timestamp, then a
+  12-bit counter that keeps IDs from one process strictly increasing within
+  a millisecond, then random bits
+
+UUIDv7 IDs sort by creation time, so audit rows keyed on them are appended
+at the right edge of their primary-key index instead of splitting pages at
+random, and an ID range is also a time range.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+
+SCHEMES = ("uuid4", "uuid7")
+
+_scheme = "uuid4"
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def set_id_scheme(scheme: str) -> None:
+    """Choose the scheme of every ID generated from now on."""
+    global _scheme
+    if scheme not in SCHEMES:
+        raise ValueError(f"id scheme must be one of {list(SCHEMES)}, got {scheme!r}")
+    _scheme = scheme
+
+
+def get_id_scheme() -> str:
+    return _scheme
+
+
+def uuid7_hex() -> str:
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms, _counter = ms, 0
+        else:
+            # Same millisecond (or the clock stepped back): count on from the
+            # last ID, borrowing the next millisecond when the counter is full.
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms, _counter = _last_ms + 1, 0
+        ms, counter = _last_ms, _counter
+    rand = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand
+    return f"{value:032x}"
+
+
+def new_id() -> str:
+    if _scheme == "uuid7":
+        return uuid7_hex()
+    return uuid.uuid4().hex
+
+
+def id_timestamp(value: str) -> float | None:
+    """Creation time (Unix seconds) encoded in a UUIDv7 ID, None for other
+    UUIDs. Raises ValueError if ``value`` is not a UUID."""
+    parsed = uuid.UUID(hex=value)
+    if parsed.version != 7:
+        return None
+    return (parsed.int >> 80) / 1000
@@ -3,19 +3,20 @@
 from __future__ import annotations
 
 import enum
-import uuid
 from datetime import datetime, timezone
 
 from pydantic import BaseModel, Field
 
+from agentic.models.ids import new_id
+
 
 class IntentType(str, enum.Enum):
     FOCUS = "FOCUS"
     UPDATE = "UPDATE"
     CLEAN_MEMORY = "CLEAN_MEMORY"
-    OBSERVE = "OBSERVE"    # read-only: list processes, check disk/memory/cpu status
-    NETWORK = "NETWORK"    # network management: interfaces, firewall, connectivity
-    STORAGE = "STORAGE"    # disk/filesystem: usage, cleanup, mount points
+    OBSERVE = "OBSERVE"  # read-only: list processes, check disk/memory/cpu status
+    NETWORK = "NETWORK"  # network management: interfaces, firewall, connectivity
+    STORAGE = "STORAGE"  # disk/filesystem: usage, cleanup, mount points
     UNKNOWN = "UNKNOWN"
 
 
@@ -26,12 +27,10 @@ class Entity(BaseModel):
 
 
 class ParsedIntent(BaseModel):
-    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    id: str = Field(default_factory=new_id)
     raw_query: str
     intent_type: IntentType
     confidence: float = Field(ge=0.0, le=1.0)
     entities: list[Entity] = Field(default_factory=list)
     reasoning: str = ""
-    created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc)
-    )
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
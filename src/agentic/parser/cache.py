@@ -0,0 +1,136 @@
+"""Persistent cache of parsed intents.
+
+Operators and automations send the same phrases many times a day; each
+one would otherwise pay a full OpenAI round trip. ``IntentParser`` looks
+the model's answer up here first, keyed on the normalized query, the
+model name, the prompt version and a hash of the context, so a change to
+any of them is a miss rather than a stale answer. The key keeps the
+query's case: the answer includes entities, and "kill MyApp" names a
+different process than "kill myapp".
+
+Entries live in a small SQLite file with a TTL and least-recently-used
+eviction beyond ``max_entries``. What is cached is the model's answer
+(intent type, confidence, entities, reasoning); each hit becomes a new
+``ParsedIntent`` with its own ID, and the cached confidence goes through
+the confidence gate like a fresh one. The stdlib ``sqlite3`` module is
+used directly: a point lookup in a small local file takes microseconds,
+less than handing it to a worker thread would.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from agentic.memory.lookups import CacheStats
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS intents ("
+    " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_intents_last_used ON intents(last_used)",
+    "CREATE INDEX IF NOT EXISTS idx_intents_expires_at ON intents(expires_at)",
+)
+
+
+def normalize_query(query: str, casefold: bool = True) -> str:
+    """Runs of whitespace and trailing punctuation do not change the intent
+    of a query, and neither does case (unless ``casefold`` is off)."""
+    if casefold:
+        query = query.casefold()
+    return " ".join(query.split()).rstrip(".!?")
+
+
+def cache_key(query: str, model: str, prompt_version: str, context: str) -> str:
+    context_hash = hashlib.sha256(context.encode()).hexdigest()
+    parts = (
+        normalize_query(query, casefold=False),
+        model,
+        prompt_version,
+        context_hash,
+    )
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+class IntentCache:
+    def __init__(
+        self,
+        path: Path | str = ":memory:",
+        ttl: float = 86400.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if ttl <= 0:
+            raise ValueError(f"ttl must be > 0, got {ttl}")
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be >= 1, got {max_entries}")
+        self.path = str(path)
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._db: sqlite3.Connection | None = None
+        self._hits = 0
+        self._misses = 0
+
+    def _get_db(self) -> sqlite3.Connection:
+        # Opened on first use: building a parser never touches the disk.
+        if self._db is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                db.execute(statement)
+            self._db = db
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        db = self._get_db()
+        now = self._clock()
+        row = db.execute(
+            "SELECT value FROM intents WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            self._misses += 1
+            return None
+        db.execute("UPDATE intents SET last_used = ? WHERE key = ?", (now, key))
+        self._hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        db = self._get_db()
+        now = self._clock()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT OR REPLACE INTO intents (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, sort_keys=True), now + self._ttl, now),
+            )
+            db.execute("DELETE FROM intents WHERE expires_at <= ?", (now,))
+            db.execute(
+                "DELETE FROM intents WHERE key IN (SELECT key FROM intents ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+
+    def clear(self) -> None:
+        self._get_db().execute("DELETE FROM intents")
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hits and misses of this process; ``size`` counts live and expired
+        entries on disk."""
+        (size,) = self._get_db().execute("SELECT COUNT(*) FROM intents").fetchone()
+        return CacheStats(
+            capacity=self._max_entries, size=size, hits=self._hits, misses=self._misses
+        )
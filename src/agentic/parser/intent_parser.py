@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
 import json
+from collections.abc import Sequence
 from typing import Any
 
 from openai import AsyncOpenAI
@@ -10,24 +14,79 @@ from openai import AsyncOpenAI
 from agentic.config.settings import Settings
 from agentic.exceptions import ParseError
 from agentic.models.intent import Entity, IntentType, ParsedIntent
+from agentic.parser.cache import IntentCache, cache_key
 from agentic.parser.prompt_templates import SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
+from agentic.parser.ratelimit import TokenBucket
 from agentic.parser.schemas import INTENT_JSON_SCHEMA
 
+# Changes whenever the prompts or the schema do, so cached answers to an
+# older prompt are never served.
+PROMPT_VERSION = hashlib.sha256(
+    "\0".join(
+        (
+            SYSTEM_PROMPT,
+            USER_PROMPT_TEMPLATE,
+            json.dumps(INTENT_JSON_SCHEMA, sort_keys=True),
+        )
+    ).encode()
+).hexdigest()[:16]
+
 
 class IntentParser:
-    def __init__(self, settings: Settings, client: AsyncOpenAI | None = None) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        client: AsyncOpenAI | None = None,
+        cache: IntentCache | None = None,
+        limiter: TokenBucket | None = None,
+    ) -> None:
         self._settings = settings
         self._client = client or AsyncOpenAI(api_key=settings.openai_api_key)
+        self._cache = cache
+        self._limiter = limiter
+        # Model calls in flight by cache key: concurrent parses of the same
+        # query and context share one call instead of each paying for it.
+        self._in_flight: dict[str, asyncio.Task[dict[str, Any]]] = {}
+
+    @property
+    def cache(self) -> IntentCache | None:
+        return self._cache
 
     async def parse(self, query: str, context: str = "") -> ParsedIntent:
         if not query.strip():
             raise ParseError("Empty query")
 
+        key = cache_key(query, self._settings.openai_model, PROMPT_VERSION, context)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return self._intent(query, cached)
+
+        call = self._in_flight.get(key)
+        if call is None:
+            call = asyncio.ensure_future(self._ask(key, query, context))
+            self._in_flight[key] = call
+            call.add_done_callback(functools.partial(self._landed, key))
+        # Shielded: a caller that gives up does not cancel the call for the
+        # others waiting on it.
+        return self._intent(query, await asyncio.shield(call))
+
+    def _landed(self, key: str, call: asyncio.Future[dict[str, Any]]) -> None:
+        """Forget a finished call and retrieve its error, which no one else
+        does when every caller waiting on it was cancelled."""
+        self._in_flight.pop(key, None)
+        if not call.cancelled():
+            call.exception()
+
+    async def _ask(self, key: str, query: str, context: str) -> dict[str, Any]:
+        """The model's answer for ``query``, normalized and cached."""
         user_prompt = USER_PROMPT_TEMPLATE.format(
             context=context or "No previous context.",
             query=query,
         )
 
+        if self._limiter is not None:
+            await self._limiter.acquire()
         try:
             response = await self._client.chat.completions.create(
                 model=self._settings.openai_model,
@@ -53,6 +112,48 @@ class IntentParser:
         except json.JSONDecodeError as exc:
             raise ParseError(f"Malformed JSON from OpenAI: {exc}") from exc
 
+        intent = self._intent(query, data)
+        answer = {
+            "intent_type": intent.intent_type.value,
+            "confidence": intent.confidence,
+            "entities": [e.model_dump() for e in intent.entities],
+            "reasoning": intent.reasoning,
+        }
+        if self._cache is not None:
+            self._cache.put(key, answer)
+        return answer
+
+    async def parse_many(
+        self,
+        queries: Sequence[str],
+        contexts: Sequence[str] | None = None,
+        concurrency: int | None = None,
+    ) -> list[ParsedIntent | Exception]:
+        """Parse ``queries`` concurrently, at most ``concurrency`` (default
+        ``settings.parse_concurrency``) at a time, in input order. A query
+        that fails gets its exception in place of an intent; the others
+        are unaffected."""
+        contexts = [""] * len(queries) if contexts is None else contexts
+        if len(contexts) != len(queries):
+            raise ValueError(f"{len(queries)} queries but {len(contexts)} contexts")
+        if concurrency is None:
+            concurrency = self._settings.parse_concurrency
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be >= 1, got {concurrency}")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def parse_one(query: str, context: str) -> ParsedIntent | Exception:
+            async with semaphore:
+                try:
+                    return await self.parse(query, context)
+                except Exception as exc:
+                    return exc
+
+        return list(await asyncio.gather(*map(parse_one, queries, contexts)))
+
+    @staticmethod
+    def _intent(query: str, data: dict[str, Any]) -> ParsedIntent:
+        """The intent the model's answer ``data`` describes."""
         intent_type = IntentType(data["intent_type"])
         confidence = float(data["confidence"])
 
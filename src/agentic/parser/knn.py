@@ -0,0 +1,306 @@
+"""Nearest-neighbour intent classifier learned from the audit history.
+
+Every parsed request is logged with its intent type and the model's
+confidence, so the audit log is a labelled training set. ``KnnClassifier``
+keeps one example per distinct normalized query with a high-confidence
+label, embedded with the offline ``HashingEmbedder``, and classifies a
+query by a similarity-weighted vote of its nearest examples. It answers
+only when the neighbours are close and agree; everything else goes on to
+the model.
+
+An intent with no entities means its broadest action (FOCUS without a
+process suspends every known distraction), so an answer needs known
+entities: a query the model answered before is answered with that
+answer's entities, and any other query only with no entities, when every
+neighbour that voted for the label was itself parsed with none. The audit
+log records each request's entities; requests logged before it did still
+vote on the label but never back an answer. A query holding a word seen
+in fewer than ``min_token_count`` examples (typically a process or
+package name) is left to the model, which extracts it. ``evaluate``
+scores ``classify`` itself, so its coverage is what the live tier gets.
+
+The model is rebuilt incrementally: ``update`` learns the rows logged
+since the last update, ``TieredParser`` teaches it each confident model
+answer as it arrives (``changed`` tells the caller to ``save`` it), and
+``save``/``load`` keep it in a compact ``.npz`` file (int8 vectors, as the
+store persists embeddings).
+"""
+
+from __future__ import annotations
+
+import os
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from agentic.memory.embeddings import HashingEmbedder, VectorIndex, tokenize
+from agentic.memory.rows import dump_entities, load_entities
+from agentic.memory.store import MemoryStore
+from agentic.models.intent import Entity, IntentType, ParsedIntent
+from agentic.parser.cache import normalize_query
+
+_LABELS = frozenset(t.value for t in IntentType) - {IntentType.UNKNOWN.value}
+
+
+@dataclass
+class _Example:
+    label: str
+    confidence: float
+    vector: bytes
+    entities: list[Entity] | None = None  # None: not known
+
+
+class KnnClassifier:
+    def __init__(
+        self,
+        embedder: HashingEmbedder | None = None,
+        k: int = 5,
+        min_similarity: float = 0.8,
+        min_agreement: float = 0.8,
+        min_confidence: float = 0.85,
+        min_token_count: int = 2,
+    ) -> None:
+        if k < 1:
+            raise ValueError(f"k must be >= 1, got {k}")
+        for name, value in (
+            ("min_similarity", min_similarity),
+            ("min_agreement", min_agreement),
+            ("min_confidence", min_confidence),
+        ):
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name} must be in [0, 1], got {value}")
+        if min_token_count < 1:
+            raise ValueError(f"min_token_count must be >= 1, got {min_token_count}")
+        self._embedder = embedder or HashingEmbedder()
+        self._k = k
+        self._min_similarity = min_similarity
+        self._min_agreement = min_agreement
+        self.min_confidence = min_confidence
+        self._min_token_count = min_token_count
+        self._examples: dict[str, _Example] = {}
+        self._index = VectorIndex(self._embedder.dim)
+        self._token_counts: Counter[str] = Counter()
+        self.trained_until: datetime | None = None
+        # Learned anything since it was built, loaded or saved.
+        self.changed = False
+
+    def __len__(self) -> int:
+        return len(self._examples)
+
+    def learn(
+        self,
+        query: str,
+        intent_type: str,
+        confidence: float,
+        entities: list[Entity] | None = None,
+    ) -> bool:
+        """Learn one labelled query; False if the label is not confident
+        enough to learn from. A repeated query takes its latest label."""
+        if confidence < self.min_confidence or intent_type not in _LABELS:
+            return False
+        text = normalize_query(query)
+        tokens = tokenize(text)
+        if not tokens:
+            return False
+        self.changed = True
+        known = self._examples.get(text)
+        if known is not None:
+            known.label, known.confidence = intent_type, confidence
+            if entities is not None:
+                known.entities = entities
+            return True
+        vector = self._embedder.quantize(self._embedder.embed(text))
+        self._add(text, _Example(intent_type, confidence, vector, entities))
+        return True
+
+    def _add(self, text: str, example: _Example) -> None:
+        self._examples[text] = example
+        self._index.add([text], self._embedder.dequantize([example.vector]))
+        self._token_counts.update(set(tokenize(text)))
+
+    def classify(self, query: str) -> ParsedIntent | None:
+        """The intent of ``query`` if its nearest examples agree on one and
+        its entities are known."""
+        text = normalize_query(query)
+        vote = self._vote(text)
+        if vote is None:
+            return None
+        label, confidence, voters = vote
+        exact = self._examples.get(text)
+        if exact is not None and exact.entities is not None:
+            entities = exact.entities if exact.label == label else None
+        elif all(example.entities == [] for example in voters):
+            entities = []
+        else:
+            entities = None
+        if entities is None:
+            return None
+        return ParsedIntent(
+            raw_query=query,
+            intent_type=IntentType(label),
+            confidence=confidence,
+            entities=entities,
+            reasoning=f"{len(voters)} similar past request(s) were {label}",
+        )
+
+    def _vote(self, text: str) -> tuple[str, float, list[_Example]] | None:
+        """The label the nearest examples of ``text`` agree on, its
+        confidence and the examples that voted for it."""
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        exact = self._examples.get(text)
+        known = exact is not None and exact.entities is not None
+        if not known and any(
+            self._token_counts[t] < self._min_token_count for t in tokens
+        ):
+            return None
+        hits = [
+            (self._examples[neighbour], score)
+            for neighbour, score in self._index.search(
+                self._embedder.embed(text), self._k
+            )
+            if score >= self._min_similarity
+        ]
+        if not hits:
+            return None
+        votes: Counter[str] = Counter()
+        for example, score in hits:
+            votes[example.label] += score
+        label, weight = max(sorted(votes.items()), key=lambda vote: vote[1])
+        agreement = weight / sum(votes.values())
+        if agreement < self._min_agreement:
+            return None
+        voters = [example for example, _ in hits if example.label == label]
+        confidence = round(
+            agreement * sum(e.confidence for e in voters) / len(voters), 4
+        )
+        return label, confidence, voters
+
+    async def update(self, store: MemoryStore) -> int:
+        """Learn every request logged since the last update; returns the
+        number of rows learned."""
+        learned = 0
+        async for page in store.scan_request_rows(after=self.trained_until):
+            for row in page:
+                learned += self.learn(
+                    row.raw_query, row.intent_type, row.confidence, row.entities
+                )
+                self.trained_until = row.created_at
+        return learned
+
+    def save(self, path: Path | str) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        texts = list(self._examples)
+        part = path.with_name(path.name + ".part")
+        with part.open("wb") as f:
+            np.savez_compressed(
+                f,
+                dim=np.int64(self._embedder.dim),
+                queries=np.array(texts, dtype=str),
+                labels=np.array([self._examples[t].label for t in texts], dtype=str),
+                confidences=np.array(
+                    [self._examples[t].confidence for t in texts], dtype=np.float64
+                ),
+                vectors=np.frombuffer(
+                    b"".join(self._examples[t].vector for t in texts), dtype=np.int8
+                ).reshape(len(texts), self._embedder.dim),
+                entities=np.array(
+                    [dump_entities(self._examples[t].entities) for t in texts],
+                    dtype=str,
+                ),
+                trained_until=np.array(
+                    self.trained_until.isoformat() if self.trained_until else ""
+                ),
+            )
+        os.replace(part, path)
+        self.changed = False
+
+    @classmethod
+    def load(cls, path: Path | str, **params: Any) -> KnnClassifier:
+        with np.load(path) as data:
+            model = cls(HashingEmbedder(int(data["dim"])), **params)
+            for text, label, confidence, vector, entities in zip(
+                data["queries"],
+                data["labels"],
+                data["confidences"],
+                data["vectors"],
+                data["entities"],
+            ):
+                example = _Example(
+                    str(label),
+                    float(confidence),
+                    vector.tobytes(),
+                    load_entities(str(entities)),
+                )
+                model._add(str(text), example)
+            trained_until = str(data["trained_until"])
+        model.trained_until = (
+            datetime.fromisoformat(trained_until) if trained_until else None
+        )
+        return model
+
+
+@dataclass(frozen=True)
+class KnnEvaluation:
+    trained: int
+    tested: int
+    answered: int
+    correct: int
+
+    @property
+    def coverage(self) -> float:
+        """Share of held-out requests the classifier answered."""
+        return self.answered / self.tested if self.tested else 0.0
+
+    @property
+    def accuracy(self) -> float:
+        """Share of its answers that match the model's intent and entities."""
+        return self.correct / self.answered if self.answered else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trained": self.trained,
+            "tested": self.tested,
+            "answered": self.answered,
+            "correct": self.correct,
+            "coverage": self.coverage,
+            "accuracy": self.accuracy,
+        }
+
+
+async def evaluate(
+    store: MemoryStore, model: KnnClassifier, holdout: float = 0.2
+) -> KnnEvaluation:
+    """Train ``model`` on all but the newest ``holdout`` share of confidently
+    labelled requests and score ``classify`` against the model's answers on
+    the rest. An answer is correct when its intent matches and so do its
+    entities, where the log recorded them."""
+    if not 0.0 < holdout < 1.0:
+        raise ValueError(f"holdout must be in (0, 1), got {holdout}")
+    rows = [
+        row
+        async for page in store.scan_request_rows()
+        for row in page
+        if row.confidence >= model.min_confidence and row.intent_type in _LABELS
+    ]
+    split = len(rows) - round(len(rows) * holdout)
+    for row in rows[:split]:
+        model.learn(row.raw_query, row.intent_type, row.confidence, row.entities)
+    answered = correct = 0
+    for row in rows[split:]:
+        intent = model.classify(row.raw_query)
+        if intent is not None:
+            answered += 1
+            expected = row.entities
+            correct += intent.intent_type.value == row.intent_type and (
+                expected is None or intent.entities == expected
+            )
+    return KnnEvaluation(
+        trained=split, tested=len(rows) - split, answered=answered, correct=correct
+    )
@@ -0,0 +1,47 @@
+"""Token-bucket rate limiting of OpenAI calls.
+
+``IntentParser`` takes a token before each API call, so a burst of
+parses (``parse_many``, a watch loop) stays within the account's
+requests-per-minute quota instead of failing with 429s. Cache hits take
+no token.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+
+class TokenBucket:
+    """``rate`` tokens a second, up to ``capacity`` saved for a burst."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate must be > 0, got {rate}")
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    async def acquire(self) -> None:
+        """Take one token, waiting until it is due if the bucket is empty.
+        Waiters are served in arrival order: each reserves the next token
+        (the balance goes negative) and sleeps until it has refilled."""
+        now = self._clock()
+        self._tokens = (
+            min(self.capacity, self._tokens + (now - self._updated) * self.rate) - 1
+        )
+        self._updated = now
+        if self._tokens < 0:
+            await self._sleep(-self._tokens / self.rate)
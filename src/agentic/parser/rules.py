@@ -0,0 +1,191 @@
+"""Local rule-based intent classifier.
+
+Many requests are unambiguous ("suspend spotify", "apt upgrade", "free up
+memory") and need no model to classify. ``RuleClassifier`` matches the
+normalized query against a compiled grammar: every rule must match the
+whole query, so anything with extra words, negations or a second request
+falls through to the model. A query is answered only when the rules of
+exactly one intent match it.
+
+Entity values are restricted to plain names (letters, digits and
+``._+-``; paths for mount points) because strategies put them into
+commands. Names in a list are separated by commas or "and" only, and a
+list holding a word that is not a name ("then", "reboot", "10") goes to
+the model: "install vim and reboot" is not two packages. Matching ignores
+case, but entity values keep the case they were written in.
+"""
+
+from __future__ import annotations
+
+import re
+
+from agentic.models.intent import Entity, IntentType, ParsedIntent
+from agentic.parser.cache import normalize_query
+
+RULE_CONFIDENCE = 0.9
+
+_NAME = r"[a-z0-9][a-z0-9._+-]*"
+_SEPARATOR = r"\s*,\s*(?:and\s+)?|\s+and\s+"
+_LIST = rf"{_NAME}(?:(?:{_SEPARATOR}){_NAME})*"
+_PATH = r"/[a-z0-9._/-]*"
+_SPLIT = re.compile(_SEPARATOR, re.IGNORECASE)
+# Words a name list may not contain: "suspend everything" is not a
+# process called "everything", and "install vim and reboot" is two
+# requests, not two packages.
+_NOT_NAMES = frozenset(
+    {
+        # quantifiers and pronouns
+        "all",
+        "and",
+        "any",
+        "apps",
+        "everything",
+        "it",
+        "me",
+        "my",
+        "other",
+        "some",
+        "stuff",
+        "that",
+        "the",
+        "them",
+        "these",
+        "this",
+        "those",
+        "updates",
+        # verbs of a second request
+        "clean",
+        "clear",
+        "close",
+        "free",
+        "install",
+        "kill",
+        "open",
+        "pause",
+        "quit",
+        "reboot",
+        "remove",
+        "restart",
+        "resume",
+        "run",
+        "show",
+        "shutdown",
+        "start",
+        "stop",
+        "suspend",
+        "update",
+        "upgrade",
+        # time and sequence
+        "after",
+        "again",
+        "also",
+        "before",
+        "for",
+        "hour",
+        "hours",
+        "later",
+        "min",
+        "mins",
+        "minute",
+        "minutes",
+        "now",
+        "then",
+        "today",
+        "tomorrow",
+        "until",
+    }
+)
+
+_GRAMMAR: dict[IntentType, tuple[str, ...]] = {
+    IntentType.FOCUS: (
+        r"(?:enter |start |turn on )?focus(?: mode)?",
+        r"(?:block|silence|no) distractions",
+        rf"(?:suspend|pause|freeze) (?P<process>{_LIST})",
+    ),
+    IntentType.UPDATE: (
+        r"(?:sudo )?apt(?:-get)? (?:update|upgrade|full-upgrade|dist-upgrade)(?: -y)?"
+        r"(?: && (?:sudo )?apt(?:-get)? (?:upgrade|full-upgrade|dist-upgrade)(?: -y)?)?",
+        r"(?:update|upgrade) (?:everything|all(?: packages)?|(?:the |my )?system|(?:all )?(?:the |my )?packages)",
+        rf"(?:sudo )?apt(?:-get)? install(?: -y)? (?P<package>{_LIST})",
+        rf"install (?:the )?(?:packages? )?(?P<package>{_LIST})",
+        rf"(?:update|upgrade) (?:the )?packages? (?P<package>{_LIST})",
+    ),
+    IntentType.CLEAN_MEMORY: (
+        r"(?:free|free up|clear|clean(?: up)?|reclaim) (?:some )?(?:memory|ram)",
+        r"(?:drop|clear|flush) (?:the )?(?:page |memory |filesystem )?caches?",
+        r"kill (?:the )?memory hogs",
+        rf"(?:free|free up|reclaim) (?:some )?(?:memory|ram) (?:by killing|from) (?P<process>{_LIST})",
+    ),
+    IntentType.OBSERVE: (
+        r"(?:show|list|check|display) (?:the )?(?:running |top )?(?:processes|procs)",
+        r"(?:show|check|display) (?:the )?(?:cpu|memory|ram)(?: usage| load)?",
+        r"(?:what is|what's|whats) (?:the )?(?:cpu|memory|ram) (?:usage|load)",
+        r"(?:show|check|view) (?:the )?(?:system |kernel )?logs?",
+        rf"(?:sudo )?systemctl status (?P<service>{_NAME})",
+        rf"(?:show |check )?(?:the )?status of (?:service )?(?P<service>{_NAME})",
+    ),
+    IntentType.NETWORK: (
+        r"(?:check|test) (?:the )?(?:network|internet)(?: connection| connectivity)?",
+        r"(?:show|list) (?:the )?(?:network )?interfaces",
+        r"(?:show|list) (?:the )?firewall rules",
+        r"(?:flush|clear) (?:the )?dns(?: cache)?",
+        rf"ping (?P<host>{_NAME})",
+    ),
+    IntentType.STORAGE: (
+        r"(?:check|show) (?:the )?disk (?:usage|space)",
+        r"how much disk space(?: is left| do i have)?",
+        r"df(?: -h)?",
+        r"(?:find|show|list) (?:the )?(?:large|big|largest|biggest) files",
+        r"(?:clean|clear|delete|remove) (?:the )?(?:temp|tmp|temporary) files",
+        rf"(?:mount|unmount|umount) (?P<mount_point>{_PATH})",
+    ),
+}
+
+
+class RuleClassifier:
+    def __init__(
+        self, grammar: dict[IntentType, tuple[str, ...]] | None = None
+    ) -> None:
+        self._rules = [
+            (
+                intent_type,
+                re.compile(rf"(?:please )?(?:{pattern})(?: please)?", re.IGNORECASE),
+            )
+            for intent_type, patterns in (grammar or _GRAMMAR).items()
+            for pattern in patterns
+        ]
+
+    def classify(self, query: str) -> ParsedIntent | None:
+        """The intent of ``query`` if the grammar is sure of it, else None."""
+        text = normalize_query(query, casefold=False)
+        matches: dict[IntentType, list[Entity]] = {}
+        for intent_type, rule in self._rules:
+            match = rule.fullmatch(text)
+            if match is None:
+                continue
+            entities = _entities(match)
+            if entities is None:
+                return None
+            matches.setdefault(intent_type, entities)
+        if len(matches) != 1:
+            return None
+        [(intent_type, entities)] = matches.items()
+        return ParsedIntent(
+            raw_query=query,
+            intent_type=intent_type,
+            confidence=RULE_CONFIDENCE,
+            entities=entities,
+            reasoning=f"Matched the local {intent_type.value} grammar",
+        )
+
+
+def _entities(match: re.Match[str]) -> list[Entity] | None:
+    """Entities named by the rule's groups, or None if a name list holds
+    words that are not names."""
+    entities: list[Entity] = []
+    for name, source in match.groupdict().items():
+        values = [source] if name == "mount_point" else _SPLIT.split(source)
+        if any(v.casefold() in _NOT_NAMES or v.isdigit() for v in values):
+            return None
+        entities += [Entity(name=name, value=value, source=source) for value in values]
+    return entities
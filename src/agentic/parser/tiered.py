@@ -0,0 +1,132 @@
+"""Tiered intent parsing: local rules first, the model as a fallback."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from agentic.exceptions import ParseError
+from agentic.models.intent import ParsedIntent
+from agentic.parser.cache import IntentCache
+from agentic.parser.intent_parser import IntentParser
+from agentic.parser.knn import KnnClassifier
+from agentic.parser.rules import RuleClassifier
+
+TIERS = ("local", "knn", "llm")
+
+
+@dataclass(frozen=True)
+class TierStats:
+    local: int = 0
+    knn: int = 0
+    llm: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.local + self.knn + self.llm
+
+    def hit_rate(self, tier: str) -> float:
+        """Share of parses answered by ``tier``."""
+        if tier not in TIERS:
+            raise ValueError(f"tier must be one of {list(TIERS)}, got {tier!r}")
+        return getattr(self, tier) / self.total if self.total else 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "total": self.total,
+            **{tier: getattr(self, tier) for tier in TIERS},
+            **{f"{tier}_hit_rate": self.hit_rate(tier) for tier in TIERS},
+        }
+
+
+class TieredParser:
+    """``IntentParser``'s interface; a query the local ``RuleClassifier``
+    or the nearest-neighbour ``knn`` classifier is sure of never reaches
+    the model. Confident model answers are taught to ``knn``. Each tier
+    is optional: ``rules=False`` leaves only ``knn`` in front of the model."""
+
+    def __init__(
+        self,
+        fallback: IntentParser,
+        local: RuleClassifier | None = None,
+        knn: KnnClassifier | None = None,
+        rules: bool = True,
+    ) -> None:
+        self._fallback = fallback
+        self._local = (local or RuleClassifier()) if rules else None
+        self._knn = knn
+        self._counts = dict.fromkeys(TIERS, 0)
+
+    @property
+    def cache(self) -> IntentCache | None:
+        return self._fallback.cache
+
+    @property
+    def knn(self) -> KnnClassifier | None:
+        return self._knn
+
+    @property
+    def stats(self) -> TierStats:
+        return TierStats(**self._counts)
+
+    async def parse(self, query: str, context: str = "") -> ParsedIntent:
+        intent = self._classify(query)
+        if intent is not None:
+            return intent
+        return self._learn(query, await self._fallback.parse(query, context))
+
+    async def parse_many(
+        self,
+        queries: Sequence[str],
+        contexts: Sequence[str] | None = None,
+        concurrency: int | None = None,
+    ) -> list[ParsedIntent | Exception]:
+        """``IntentParser.parse_many``; only the queries no local tier is
+        sure of are sent to the model."""
+        contexts = [""] * len(queries) if contexts is None else contexts
+        if len(contexts) != len(queries):
+            raise ValueError(f"{len(queries)} queries but {len(contexts)} contexts")
+        results: list[ParsedIntent | Exception | None] = []
+        for query in queries:
+            try:
+                results.append(self._classify(query))
+            except ParseError as exc:
+                results.append(exc)
+        pending = [i for i, result in enumerate(results) if result is None]
+        answers = await self._fallback.parse_many(
+            [queries[i] for i in pending],
+            [contexts[i] for i in pending],
+            concurrency=concurrency,
+        )
+        for i, answer in zip(pending, answers):
+            results[i] = (
+                answer
+                if isinstance(answer, Exception)
+                else self._learn(queries[i], answer)
+            )
+        return results  # type: ignore[return-value]  # no None left
+
+    def _classify(self, query: str) -> ParsedIntent | None:
+        """The local tiers' answer; None (counted as an LLM parse) if the
+        query has to go to the model."""
+        if not query.strip():
+            raise ParseError("Empty query")
+        if self._local is not None:
+            intent = self._local.classify(query)
+            if intent is not None:
+                self._counts["local"] += 1
+                return intent
+        if self._knn is not None:
+            intent = self._knn.classify(query)
+            if intent is not None:
+                self._counts["knn"] += 1
+                return intent
+        self._counts["llm"] += 1
+        return None
+
+    def _learn(self, query: str, intent: ParsedIntent) -> ParsedIntent:
+        if self._knn is not None:
+            self._knn.learn(
+                query, intent.intent_type.value, intent.confidence, intent.entities
+            )
+        return intent
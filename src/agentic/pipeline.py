@@ -2,18 +2,34 @@
 
 from __future__ import annotations
 
-import uuid
+import contextlib
+from collections.abc import Sequence
 
 from agentic.engine.decision_engine import DecisionEngine
-from agentic.exceptions import LowConfidenceError, PolicyDeniedError, UnsafeCommandError, UserCancelledError
+from agentic.engine.strategies.base import rollback_command
+from agentic.exceptions import (
+    AgenticError,
+    LowConfidenceError,
+    PolicyDeniedError,
+    UnsafeCommandError,
+    UserCancelledError,
+)
 from agentic.executor.action_executor import ActionExecutor
 from agentic.executor.command_validator import CommandValidator
 from agentic.memory.context import ContextRetriever
 from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
 from agentic.memory.store import MemoryStore
-from agentic.models.action import ActionPlan, ActionResult
+from agentic.models.action import (
+    ActionCandidate,
+    ActionPlan,
+    ActionResult,
+    ActionType,
+    RollbackSupport,
+)
+from agentic.models.ids import new_id
 from agentic.models.intent import IntentType, ParsedIntent
 from agentic.parser.intent_parser import IntentParser
+from agentic.parser.tiered import TieredParser
 from agentic.executor.simulation_engine import SimulationEngine
 from agentic.executor.transaction import TransactionManager
 from agentic.policy.capability_gate import CapabilityGate
@@ -25,7 +41,7 @@ from agentic.policy.safety_gate import SafetyGate
 class Pipeline:
     def __init__(
         self,
-        parser: IntentParser,
+        parser: IntentParser | TieredParser,
         engine: DecisionEngine,
         gate: SafetyGate,
         executor: ActionExecutor,
@@ -55,13 +71,76 @@ class Pipeline:
         self._simulation_engine = simulation_engine
         self._transaction_manager = transaction_manager
 
-    async def run(self, query: str) -> tuple[ParsedIntent, ActionPlan, list[ActionResult]]:
+    async def run(
+        self, query: str
+    ) -> tuple[ParsedIntent, ActionPlan, list[ActionResult]]:
+        # INV-09: the run's audit records are committed before run()
+        # returns or raises.
+        try:
+            result = await self._run(query)
+        except BaseException:
+            # A failed flush re-queues its records; it must not replace the
+            # error that ended the run.
+            with contextlib.suppress(Exception):
+                await self._store.flush()
+            raise
+        await self._store.flush()
+        return result
+
+    async def _run(
+        self, query: str
+    ) -> tuple[ParsedIntent, ActionPlan, list[ActionResult]]:
         # 1. Get context
         context_str = await self._context.format_context(query)
 
         # 2. Parse intent
         intent = await self._parser.parse(query, context=context_str)
+        return await self._act(query, intent)
+
+    async def run_many(
+        self, queries: Sequence[str], concurrency: int | None = None
+    ) -> list[tuple[ParsedIntent, ActionPlan, list[ActionResult]] | Exception]:
+        """Run ``queries`` with their model round trips overlapped.
 
+        Contexts are gathered first, the queries are parsed concurrently
+        with ``parse_many``, and then each is acted on in input order as
+        ``run`` would. A query whose parse or run fails gets its exception
+        in place of a result, as does one whose audit records fail to
+        flush; the rest still run.
+        """
+        contexts = [await self._context.format_context(query) for query in queries]
+        intents = await self._parser.parse_many(
+            queries, contexts, concurrency=concurrency
+        )
+        outcomes: list[
+            tuple[ParsedIntent, ActionPlan, list[ActionResult]] | Exception
+        ] = []
+        for query, intent in zip(queries, intents):
+            if isinstance(intent, Exception):
+                outcomes.append(intent)
+                continue
+            outcome: tuple[ParsedIntent, ActionPlan, list[ActionResult]] | Exception
+            try:
+                outcome = await self._act(query, intent)
+            except Exception as exc:
+                outcome = exc
+            except BaseException:
+                with contextlib.suppress(Exception):
+                    await self._store.flush()
+                raise
+            try:
+                await self._store.flush()
+            except Exception as exc:
+                # The records stay queued for the next flush; a query that
+                # already failed keeps its own error.
+                if not isinstance(outcome, Exception):
+                    outcome = exc
+            outcomes.append(outcome)
+        return outcomes
+
+    async def _act(
+        self, query: str, intent: ParsedIntent
+    ) -> tuple[ParsedIntent, ActionPlan, list[ActionResult]]:
         # 3. Log request
         await self._store.log_request(
             RequestRecord(
@@ -69,12 +148,17 @@ class Pipeline:
                 raw_query=query,
                 intent_type=intent.intent_type.value,
                 confidence=intent.confidence,
+                entities=intent.entities,
             )
         )
 
         # 4. Check for UNKNOWN
         if intent.intent_type == IntentType.UNKNOWN:
-            return intent, ActionPlan(intent_id=intent.id, reasoning="Unknown intent"), []
+            return (
+                intent,
+                ActionPlan(intent_id=intent.id, reasoning="Unknown intent"),
+                [],
+            )
 
         # 4.5: Confidence gate — deterministic guard against LLM hallucination
         effective_dry_run = self._dry_run
@@ -88,116 +172,262 @@ class Pipeline:
         # 5. Generate action plan
         plan = await self._engine.decide(intent)
 
+        # The plan as proposed is logged however the run ends: denied
+        # actions and simulated effects included.
         if not plan.actions:
+            await self._store.log_plan(intent.id, plan, [])
             return intent, plan, []
+        proposed = plan
+        approved_ids: list[str] = []
+        try:
+            # 5.5: Environment gate — enforce deployment-context risk ceiling
+            if self._environment_gate is not None:
+                permitted, env_denied = self._environment_gate.filter_approved(plan)
+                for d in env_denied:
+                    await self._store.log_policy_decision(
+                        action_id=d.action_id,
+                        risk_level=d.risk_level.value,
+                        approved=False,
+                        requires_sudo=d.requires_sudo,
+                        reason=d.reason,
+                        gate="environment",
+                        request_id=intent.id,
+                    )
+                if not permitted:
+                    raise PolicyDeniedError(
+                        f"All actions blocked by {self._environment_gate.environment.value} environment policy."
+                    )
+                plan = plan.model_copy(update={"actions": permitted})
 
-        # 5.5: Environment gate — enforce deployment-context risk ceiling
-        if self._environment_gate is not None:
-            permitted, env_denied = self._environment_gate.filter_approved(plan)
-            for d in env_denied:
+            # 5.6: Capability gate — least-privilege enforcement
+            if self._capability_gate is not None:
+                cap_permitted, cap_denied = self._capability_gate.filter_approved(plan)
+                for d in cap_denied:
+                    await self._store.log_policy_decision(
+                        action_id=d.action_id,
+                        risk_level=d.risk_level.value,
+                        approved=False,
+                        requires_sudo=d.requires_sudo,
+                        reason=d.reason,
+                        gate="capability",
+                        request_id=intent.id,
+                    )
+                if not cap_permitted:
+                    raise PolicyDeniedError("All actions blocked by capability policy.")
+                plan = plan.model_copy(update={"actions": cap_permitted})
+
+            # 6. Evaluate policy
+            decisions = self._gate.evaluate_plan(plan)
+            approved_actions, approved_decisions = self._gate.filter_approved(
+                plan, decisions
+            )
+
+            # Log policy decisions
+            for d in decisions:
                 await self._store.log_policy_decision(
                     action_id=d.action_id,
                     risk_level=d.risk_level.value,
-                    approved=False,
+                    approved=d.approved,
                     requires_sudo=d.requires_sudo,
                     reason=d.reason,
+                    gate="safety",
+                    request_id=intent.id,
                 )
-            if not permitted:
-                raise PolicyDeniedError(
-                    f"All actions blocked by {self._environment_gate.environment.value} environment policy."
+
+            if not approved_actions:
+                raise PolicyDeniedError("All actions were denied by the safety gate.")
+
+            # Log approved actions
+            for action in approved_actions:
+                decision_map = {d.action_id: d for d in approved_decisions}
+                d = decision_map.get(action.id)
+                await self._store.log_action(
+                    ActionRecord(
+                        id=action.id,
+                        request_id=intent.id,
+                        action_type=action.action_type.value,
+                        description=action.description,
+                        command=action.command,
+                        risk_level=d.risk_level.value if d else 1,
+                        approved=True,
+                        target=action.target,
+                        parameters=action.parameters,
+                        rollback_command=action.rollback_command,
+                        rollback_support=action.rollback_support.value,
+                    )
                 )
-            plan = plan.model_copy(update={"actions": permitted})
 
-        # 5.6: Capability gate — least-privilege enforcement
-        if self._capability_gate is not None:
-            cap_permitted, cap_denied = self._capability_gate.filter_approved(plan)
-            for d in cap_denied:
-                await self._store.log_policy_decision(
-                    action_id=d.action_id,
-                    risk_level=d.risk_level.value,
-                    approved=False,
-                    requires_sudo=d.requires_sudo,
-                    reason=d.reason,
+            # 6.5: Command validator — deterministic pre-flight safety check
+            if self._command_validator is not None:
+                for action, vr in self._command_validator.validate_many(
+                    approved_actions
+                ):
+                    if not vr.valid:
+                        raise UnsafeCommandError(vr.reason, action_id=action.id)
+
+            # 6.7: Simulation engine — pre-execution effect prediction (non-blocking)
+            if self._simulation_engine is not None:
+                sims = self._simulation_engine.simulate_plan(
+                    plan.model_copy(update={"actions": approved_actions})
                 )
-            if not cap_permitted:
-                raise PolicyDeniedError("All actions blocked by capability policy.")
-            plan = plan.model_copy(update={"actions": cap_permitted})
-
-        # 6. Evaluate policy
-        decisions = self._gate.evaluate_plan(plan)
-        approved_actions, approved_decisions = self._gate.filter_approved(plan, decisions)
-
-        # Log policy decisions
-        for d in decisions:
-            await self._store.log_policy_decision(
-                action_id=d.action_id,
-                risk_level=d.risk_level.value,
-                approved=d.approved,
-                requires_sudo=d.requires_sudo,
-                reason=d.reason,
-            )
+                plan = plan.model_copy(update={"simulations": sims})
+                proposed = proposed.model_copy(update={"simulations": sims})
 
-        if not approved_actions:
-            raise PolicyDeniedError("All actions were denied by the safety gate.")
+            # 7. User confirmation (if needed and not in dry-run mode)
+            needs_confirm = any(d.requires_confirmation for d in approved_decisions)
+            if needs_confirm and not effective_dry_run and self._confirm_callback:
+                confirmed = self._confirm_callback(approved_actions, approved_decisions)
+                if not confirmed:
+                    raise UserCancelledError("User cancelled execution.")
+            approved_ids = [a.id for a in approved_actions]
 
-        # Log approved actions
-        for action in approved_actions:
-            decision_map = {d.action_id: d for d in approved_decisions}
-            d = decision_map.get(action.id)
-            await self._store.log_action(
-                ActionRecord(
-                    id=action.id,
-                    request_id=intent.id,
-                    action_type=action.action_type.value,
-                    description=action.description,
-                    command=action.command,
-                    risk_level=d.risk_level.value if d else 1,
-                    approved=True,
+            # 8. Execute (with rollback if TransactionManager is wired in)
+            rolled_back_ids: list[str] = []
+            if self._transaction_manager is not None:
+                tx = await self._transaction_manager.execute_with_rollback(
+                    approved_actions, self._executor, dry_run=effective_dry_run
                 )
+                results = tx.results
+                rolled_back_ids = tx.rolled_back_ids
+            else:
+                results = await self._executor.execute_many(
+                    approved_actions, dry_run=effective_dry_run
+                )
+
+            # 9. Log results
+            for result in results:
+                await self._store.log_execution(
+                    ExecutionRecord(
+                        id=new_id(),
+                        action_id=result.action_id,
+                        success=result.success,
+                        output=result.output,
+                        error=result.error,
+                        rolled_back=result.rolled_back,
+                        dry_run=effective_dry_run,
+                    )
+                )
+            for action_id in rolled_back_ids:
+                await self._store.log_execution(
+                    ExecutionRecord(
+                        id=new_id(),
+                        action_id=action_id,
+                        success=True,
+                        output="Rolled back after a later action in the plan failed.",
+                        rolled_back=True,
+                    )
+                )
+        except BaseException:
+            # A failure to log the plan must not hide why the run failed.
+            with contextlib.suppress(Exception):
+                await self._store.log_plan(intent.id, proposed, approved_ids)
+            raise
+        await self._store.log_plan(intent.id, proposed, approved_ids)
+        return intent, plan, results
+
+    async def rollback(self, action_id: str) -> ActionResult:
+        """Undo one previously executed action from the audit log."""
+        record = await self._store.get_action(action_id)
+        if record is None:
+            return ActionResult(
+                action_id=action_id, success=False, error="Unknown action."
             )
+        return await self._rollback_record(record)
+
+    async def rollback_request(self, request_id: str) -> list[ActionResult]:
+        """Undo every executed action of a request, last executed first.
+
+        Actions that never ran, were already rolled back, or declare
+        ``RollbackSupport.NONE`` are skipped rather than reported as failures.
+        Each undo passes the safety gate, command validator and confirmation
+        as its own action, and only simulates in dry-run mode.
+        """
+        results: list[ActionResult] = []
+        for record in reversed(await self._store.get_actions_for_request(request_id)):
+            if await self._rollback_blocker(record) is None:
+                results.append(await self._undo(record))
+        return results
+
+    async def _rollback_blocker(self, record: ActionRecord) -> str | None:
+        if record.rollback_support == RollbackSupport.NONE.value:
+            return "Action declares no rollback support."
+        executions = await self._store.get_executions(record.id)
+        if any(e.rolled_back for e in executions):
+            return "Action was already rolled back."
+        if not any(e.success and not e.dry_run for e in executions):
+            return "Action was never successfully executed."
+        return None
+
+    async def _rollback_record(self, record: ActionRecord) -> ActionResult:
+        blocker = await self._rollback_blocker(record)
+        if blocker is not None:
+            return ActionResult(action_id=record.id, success=False, error=blocker)
+        return await self._undo(record)
 
-        # 6.5: Command validator — deterministic pre-flight safety check
+    async def _undo(self, record: ActionRecord) -> ActionResult:
+        # The logged rollback command is not trusted: it is rebuilt from the
+        # action's type and target, and the undo is gated like a new action.
+        action_type = ActionType(record.action_type)
+        action = ActionCandidate(
+            id=record.id,
+            action_type=action_type,
+            description=f"Roll back: {record.description}",
+            command=record.command,
+            target=record.target,
+            parameters=record.parameters,
+            rollback_command=rollback_command(action_type, record.target),
+            rollback_support=RollbackSupport(record.rollback_support),
+        )
+        decision = self._gate.evaluate(action)
+        await self._store.log_policy_decision(
+            action_id=record.id,
+            risk_level=decision.risk_level.value,
+            approved=decision.approved,
+            requires_sudo=decision.requires_sudo,
+            reason=decision.reason,
+            gate="safety",
+            request_id=record.request_id,
+        )
+        if not decision.approved:
+            return ActionResult(
+                action_id=record.id, success=False, error=decision.reason
+            )
         if self._command_validator is not None:
-            for action, vr in self._command_validator.validate_many(approved_actions):
-                if not vr.valid:
-                    raise UnsafeCommandError(vr.reason, action_id=action.id)
-
-        # 6.7: Simulation engine — pre-execution effect prediction (non-blocking)
-        if self._simulation_engine is not None:
-            sims = self._simulation_engine.simulate_plan(
-                plan.model_copy(update={"actions": approved_actions})
+            vr = self._command_validator.validate(
+                action.model_copy(update={"command": action.rollback_command})
             )
-            plan = plan.model_copy(update={"simulations": sims})
-
-        # 7. User confirmation (if needed and not in dry-run mode)
-        needs_confirm = any(d.requires_confirmation for d in approved_decisions)
-        if needs_confirm and not effective_dry_run and self._confirm_callback:
-            confirmed = self._confirm_callback(approved_actions, approved_decisions)
-            if not confirmed:
-                raise UserCancelledError("User cancelled execution.")
-
-        # 8. Execute (with rollback if TransactionManager is wired in)
-        if self._transaction_manager is not None:
-            tx = await self._transaction_manager.execute_with_rollback(
-                approved_actions, self._executor, dry_run=effective_dry_run
+            if not vr.valid:
+                return ActionResult(action_id=record.id, success=False, error=vr.reason)
+
+        if self._dry_run:
+            result = ActionResult(
+                action_id=record.id,
+                success=True,
+                output=f"[DRY RUN] Would execute: {action.description}",
             )
-            results = tx.results
         else:
-            results = await self._executor.execute_many(
-                approved_actions, dry_run=effective_dry_run
-            )
-
-        # 9. Log results
-        for result in results:
-            await self._store.log_execution(
-                ExecutionRecord(
-                    id=uuid.uuid4().hex,
-                    action_id=result.action_id,
-                    success=result.success,
-                    output=result.output,
-                    error=result.error,
-                    rolled_back=result.rolled_back,
+            if decision.requires_confirmation and self._confirm_callback:
+                if not self._confirm_callback([action], [decision]):
+                    return ActionResult(
+                        action_id=record.id,
+                        success=False,
+                        error="User cancelled rollback.",
+                    )
+            try:
+                result = await self._executor.rollback(action)
+            except AgenticError as exc:
+                result = ActionResult(
+                    action_id=record.id, success=False, error=str(exc)
                 )
+        await self._store.log_execution(
+            ExecutionRecord(
+                id=new_id(),
+                action_id=record.id,
+                success=result.success,
+                output=result.output,
+                error=result.error,
+                rolled_back=result.rolled_back,
+                dry_run=self._dry_run,
             )
-
-        return intent, plan, results
+        )
+        return result
@@ -2,17 +2,22 @@
 
 from __future__ import annotations
 
+import asyncio
+import gzip
+import json
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import psutil
 import pytest
 from typer.testing import CliRunner
 
-from agentic.cli.app import app
+from agentic.cli.app import _HISTORY_PAGE_SIZE, app
 from agentic.exceptions import ParseError, PolicyDeniedError
 from agentic.models.action import ActionCandidate, ActionPlan, ActionResult, ActionType
 from agentic.models.intent import IntentType, ParsedIntent
 from agentic.models.policy import PolicyDecision, RiskLevel
+from agentic.parser.cache import IntentCache
 
 runner = CliRunner()
 
@@ -20,6 +25,7 @@ runner = CliRunner()
 class TestGetPipeline:
     def test_get_pipeline_creates_pipeline(self, mock_settings):
         from agentic.cli.app import _get_pipeline
+
         pipeline = _get_pipeline(dry_run=True, force=True)
         assert pipeline is not None
         assert pipeline._dry_run is True
@@ -29,7 +35,9 @@ class TestAskCommand:
     def test_ask_basic(self):
         mock_pipeline = MagicMock()
         mock_intent = ParsedIntent(
-            raw_query="focus", intent_type=IntentType.FOCUS, confidence=0.9,
+            raw_query="focus",
+            intent_type=IntentType.FOCUS,
+            confidence=0.9,
         )
         mock_plan = ActionPlan(intent_id=mock_intent.id, actions=[])
         mock_pipeline.run = AsyncMock(return_value=(mock_intent, mock_plan, []))
@@ -51,15 +59,21 @@ class TestAskCommand:
             target="firefox",
         )
         mock_intent = ParsedIntent(
-            raw_query="focus", intent_type=IntentType.FOCUS, confidence=0.9,
+            raw_query="focus",
+            intent_type=IntentType.FOCUS,
+            confidence=0.9,
         )
         mock_plan = ActionPlan(intent_id=mock_intent.id, actions=[action])
         mock_result = ActionResult(action_id="a1", success=True, output="done")
-        mock_pipeline.run = AsyncMock(return_value=(mock_intent, mock_plan, [mock_result]))
+        mock_pipeline.run = AsyncMock(
+            return_value=(mock_intent, mock_plan, [mock_result])
+        )
         mock_pipeline._store = AsyncMock()
         mock_pipeline._gate = MagicMock()
         decision = PolicyDecision(
-            action_id="a1", risk_level=RiskLevel.LOW, approved=True,
+            action_id="a1",
+            risk_level=RiskLevel.LOW,
+            approved=True,
         )
         mock_pipeline._gate.evaluate_plan.return_value = [decision]
         mock_pipeline._gate.filter_approved.return_value = ([action], [decision])
@@ -77,14 +91,18 @@ class TestAskCommand:
             target="firefox",
         )
         mock_intent = ParsedIntent(
-            raw_query="focus", intent_type=IntentType.FOCUS, confidence=0.9,
+            raw_query="focus",
+            intent_type=IntentType.FOCUS,
+            confidence=0.9,
         )
         mock_plan = ActionPlan(intent_id=mock_intent.id, actions=[action])
         mock_pipeline.run = AsyncMock(return_value=(mock_intent, mock_plan, []))
         mock_pipeline._store = AsyncMock()
         mock_pipeline._gate = MagicMock()
         decision = PolicyDecision(
-            action_id="a1", risk_level=RiskLevel.LOW, approved=True,
+            action_id="a1",
+            risk_level=RiskLevel.LOW,
+            approved=True,
         )
         mock_pipeline._gate.evaluate_plan.return_value = [decision]
         mock_pipeline._gate.filter_approved.return_value = ([action], [decision])
@@ -105,7 +123,9 @@ class TestAskCommand:
     def test_ask_with_force(self):
         mock_pipeline = MagicMock()
         mock_intent = ParsedIntent(
-            raw_query="focus", intent_type=IntentType.FOCUS, confidence=0.9,
+            raw_query="focus",
+            intent_type=IntentType.FOCUS,
+            confidence=0.9,
         )
         mock_plan = ActionPlan(intent_id=mock_intent.id, actions=[])
         mock_pipeline.run = AsyncMock(return_value=(mock_intent, mock_plan, []))
@@ -119,7 +139,9 @@ class TestAskCommand:
     def test_ask_with_verbose(self):
         mock_pipeline = MagicMock()
         mock_intent = ParsedIntent(
-            raw_query="focus", intent_type=IntentType.FOCUS, confidence=0.9,
+            raw_query="focus",
+            intent_type=IntentType.FOCUS,
+            confidence=0.9,
         )
         mock_plan = ActionPlan(intent_id=mock_intent.id, actions=[])
         mock_pipeline.run = AsyncMock(return_value=(mock_intent, mock_plan, []))
@@ -131,60 +153,885 @@ class TestAskCommand:
         assert result.exit_code == 0
 
 
-class TestHistoryCommand:
-    def test_history_empty(self):
+def _history_store(rows):
+    store = AsyncMock()
+    store.calls = []
+
+    async def iter_history(**kwargs):
+        store.calls.append(kwargs)
+        for row in rows:
+            yield row
+
+    store.iter_history = iter_history
+    return store
+
+
+class TestBatchCommand:
+    def _pipeline(self, outcomes, confirm=None, dry_run=False):
         mock_pipeline = MagicMock()
+        mock_pipeline.run_many = AsyncMock(return_value=outcomes)
         mock_pipeline._store = AsyncMock()
-        mock_pipeline._store.get_history = AsyncMock(return_value=[])
-        mock_pipeline._store.initialize = AsyncMock()
-        mock_pipeline._store.close = AsyncMock()
+        mock_pipeline._confirm_callback = confirm
+        mock_pipeline._dry_run = dry_run
+        mock_pipeline._gate.evaluate_plan.return_value = []
+        mock_pipeline._gate.filter_approved.return_value = ([], [])
+        mock_pipeline._parser.cache = None
+        return mock_pipeline
+
+    def _outcome(self, query, actions=()):
+        intent = ParsedIntent(
+            raw_query=query, intent_type=IntentType.FOCUS, confidence=0.9
+        )
+        results = [
+            ActionResult(action_id=a.id, success=True, output="done") for a in actions
+        ]
+        return intent, ActionPlan(intent_id=intent.id, actions=list(actions)), results
+
+    def test_runs_a_file(self, tmp_path):
+        action = ActionCandidate(
+            id="a1", action_type=ActionType.SUSPEND_PROCESS, description="Suspend vlc"
+        )
+        source = tmp_path / "requests.txt"
+        source.write_text("# morning routine\nfocus mode\n\n  suspend vlc  \n")
+        mock_pipeline = self._pipeline(
+            [self._outcome("focus mode"), self._outcome("suspend vlc", [action])],
+            confirm=MagicMock(),
+        )
+        with patch(
+            "agentic.cli.app._get_pipeline", return_value=mock_pipeline
+        ) as get_pipeline:
+            result = runner.invoke(app, ["batch", str(source), "--dry-run", "-j", "4"])
+        assert result.exit_code == 0
+        get_pipeline.assert_called_once_with(dry_run=True, force=False)
+        mock_pipeline.run_many.assert_awaited_once_with(
+            ["focus mode", "suspend vlc"], concurrency=4
+        )
+        mock_pipeline._store.close.assert_awaited_once()
+        assert "2/2 suspend vlc" in result.output
+        assert "DRY RUN" in result.output
+        assert "Ran 2 request(s): 2 succeeded, 0 failed." in result.output
+        assert "Intent cache" not in result.output
+
+    def test_shows_intent_cache_stats(self):
+        cache = IntentCache()
+        cache.put("k", {})
+        cache.get("k"), cache.get("k"), cache.get("other")
+        mock_pipeline = self._pipeline([self._outcome("focus")])
+        mock_pipeline._parser.cache = cache
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["batch", "--force"], input="focus\n")
+        assert "Intent cache: 2 hit(s), 1 miss(es), 67% hit rate." in result.output
+
+    def test_failures_exit_nonzero(self):
+        mock_pipeline = self._pipeline(
+            [self._outcome("focus"), PolicyDeniedError("All actions were denied")]
+        )
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(
+                app, ["batch", "--force"], input="focus\n[red]kill all\n"
+            )
+        assert result.exit_code == 1
+        assert "[red]kill all" in result.output
+        assert "All actions were denied" in result.output
+        assert "1 succeeded, 1 failed." in result.output
+
+    def test_stdin_cannot_be_confirmed(self):
+        mock_pipeline = self._pipeline([], confirm=MagicMock())
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["batch"], input="update everything\n")
+        assert result.exit_code == 1
+        assert "cannot be confirmed" in result.output
+        mock_pipeline._store.initialize.assert_not_called()
+        with patch(
+            "agentic.cli.app._get_pipeline",
+            return_value=self._pipeline([], confirm=MagicMock(), dry_run=True),
+        ):
+            assert (
+                runner.invoke(app, ["batch"], input="update everything\n").exit_code
+                == 0
+            )
 
+    def test_nothing_to_run(self):
+        with patch("agentic.cli.app._get_pipeline") as get_pipeline:
+            result = runner.invoke(app, ["batch"], input="\n# nothing\n")
+        assert result.exit_code == 0
+        assert "No requests to run." in result.output
+        get_pipeline.assert_not_called()
+
+
+class TestHistoryCommand:
+    ROW = {
+        "request_id": "req-1",
+        "created_at": "2025-01-01",
+        "raw_query": "focus",
+        "intent_type": "FOCUS",
+        "action_id": "act-1",
+        "action_type": "SUSPEND_PROCESS",
+        "description": "Suspend",
+        "approved": True,
+    }
+
+    def _invoke(self, rows, *args):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = _history_store(rows)
         with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
-            result = runner.invoke(app, ["history"])
+            result = runner.invoke(app, ["history", *args])
+        return result, mock_pipeline._store
+
+    def test_history_empty(self):
+        result, store = self._invoke([])
         assert result.exit_code == 0
+        assert "No history found" in result.output
+        store.close.assert_awaited_once()
 
     def test_history_with_data(self):
+        result, _ = self._invoke([self.ROW])
+        assert result.exit_code == 0
+        assert "SUSPEND_PROCESS" in result.output
+
+    def test_history_with_limit(self):
+        result, store = self._invoke([], "--limit", "5")
+        assert result.exit_code == 0
+        assert store.calls[0]["limit"] == 5
+
+    def test_history_zero_limit_streams_everything(self):
+        result, store = self._invoke([], "-n", "0")
+        assert result.exit_code == 0
+        assert store.calls[0]["limit"] is None
+
+    def test_history_filters_passed_through(self):
+        result, store = self._invoke(
+            [],
+            "--intent",
+            "FOCUS",
+            "--action-type",
+            "KILL_PROCESS",
+            "--denied",
+            "--after",
+            "2025-01-01",
+            "--before",
+            "2025-02-01T12:00:00",
+        )
+        assert result.exit_code == 0
+        call = store.calls[0]
+        assert call["intent_type"] == "FOCUS"
+        assert call["action_type"] == "KILL_PROCESS"
+        assert call["approved"] is False
+        assert call["after"] == datetime(2025, 1, 1)
+        assert call["before"] == datetime(2025, 2, 1, 12)
+
+    def test_history_rejects_bad_timestamp(self):
+        result, _ = self._invoke([], "--after", "yesterday")
+        assert result.exit_code != 0
+
+    def test_history_json_lines(self):
+        rows = [dict(self.ROW, request_id=f"req-{i}") for i in range(3)]
+        result, _ = self._invoke(rows, "--json")
+        assert result.exit_code == 0
+        lines = [json.loads(line) for line in result.output.splitlines()]
+        assert [r["request_id"] for r in lines] == ["req-0", "req-1", "req-2"]
+
+    def test_history_json_empty_prints_nothing(self):
+        result, _ = self._invoke([], "--json")
+        assert result.exit_code == 0
+        assert result.output == ""
+
+    def test_history_prints_in_pages(self):
+        rows = [
+            dict(self.ROW, request_id=f"req-{i}") for i in range(_HISTORY_PAGE_SIZE + 1)
+        ]
+        with patch("agentic.cli.app.print_history") as print_history:
+            result, _ = self._invoke(rows)
+        assert result.exit_code == 0
+        assert [len(call.args[0]) for call in print_history.call_args_list] == [
+            _HISTORY_PAGE_SIZE,
+            1,
+        ]
+
+    def test_history_grep_uses_full_text_search(self):
         mock_pipeline = MagicMock()
         mock_pipeline._store = AsyncMock()
-        mock_pipeline._store.get_history = AsyncMock(return_value=[
-            {
-                "created_at": "2025-01-01",
-                "raw_query": "focus",
-                "intent_type": "FOCUS",
-                "action_type": "SUSPEND_PROCESS",
-                "approved": True,
-            }
-        ])
-        mock_pipeline._store.initialize = AsyncMock()
-        mock_pipeline._store.close = AsyncMock()
+        mock_pipeline._store.search_text = AsyncMock(
+            return_value=[
+                {
+                    "created_at": "2025-01-01",
+                    "raw_query": "restart nginx",
+                    "intent_type": "NETWORK",
+                    "action_type": None,
+                    "approved": None,
+                }
+            ]
+        )
 
         with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
-            result = runner.invoke(app, ["history"])
+            result = runner.invoke(app, ["history", "--grep", "nginx", "-n", "5"])
         assert result.exit_code == 0
+        mock_pipeline._store.search_text.assert_awaited_once_with(
+            "nginx",
+            limit=5,
+            intent_type=None,
+            action_type=None,
+            approved=None,
+            after=None,
+            before=None,
+        )
+        mock_pipeline._store.iter_history.assert_not_called()
+        assert "restart nginx" in result.output
 
-    def test_history_with_limit(self):
+    @pytest.mark.parametrize(
+        ("args", "expected"),
+        [
+            (["-n", "0"], {"limit": None}),
+            (["--intent", "NETWORK"], {"intent_type": "NETWORK"}),
+            (
+                ["--action-type", "SYSTEMCTL_RESTART"],
+                {"action_type": "SYSTEMCTL_RESTART"},
+            ),
+            (["--approved"], {"approved": True}),
+            (["--denied"], {"approved": False}),
+            (["--after", "2025-01-01"], {"after": datetime(2025, 1, 1)}),
+            (["--before", "2025-01-02"], {"before": datetime(2025, 1, 2)}),
+        ],
+    )
+    def test_history_grep_passes_filters(self, args, expected):
         mock_pipeline = MagicMock()
         mock_pipeline._store = AsyncMock()
-        mock_pipeline._store.get_history = AsyncMock(return_value=[])
-        mock_pipeline._store.initialize = AsyncMock()
-        mock_pipeline._store.close = AsyncMock()
+        mock_pipeline._store.search_text = AsyncMock(return_value=[])
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["history", "-g", "nginx", *args])
+        assert result.exit_code == 0
+        kwargs = mock_pipeline._store.search_text.await_args.kwargs
+        assert {key: kwargs[key] for key in expected} == expected
+
+    def test_history_grep_all_with_real_store(self, tmp_path):
+        from agentic.memory.models import ActionRecord, RequestRecord
+        from agentic.memory.store import MemoryStore
+
+        async def seed():
+            store = MemoryStore(tmp_path / "audit.db")
+            await store.initialize()
+            await store.log_request(
+                RequestRecord(
+                    id="r1",
+                    raw_query="restart nginx",
+                    intent_type="NETWORK",
+                    confidence=0.9,
+                )
+            )
+            await store.log_request(
+                RequestRecord(
+                    id="r2",
+                    raw_query="reload nginx",
+                    intent_type="NETWORK",
+                    confidence=0.9,
+                )
+            )
+            await store.log_action(
+                ActionRecord(
+                    id="a1",
+                    request_id="r2",
+                    action_type="SYSTEMCTL_RESTART",
+                    description="Reload nginx",
+                    approved=False,
+                )
+            )
+            await store.close()
+
+        asyncio.run(seed())
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = MemoryStore(tmp_path / "audit.db")
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            everything = runner.invoke(
+                app, ["history", "-n", "0", "-g", "nginx", "--json"]
+            )
+            denied = runner.invoke(
+                app, ["history", "-n", "0", "-g", "nginx", "--denied", "--json"]
+            )
+        assert everything.exit_code == 0, everything.output
+        assert len(everything.output.splitlines()) == 3
+        assert {
+            json.loads(line)["request_id"] for line in denied.output.splitlines()
+        } == {"r2"}
 
+    def test_history_grep_json(self):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        mock_pipeline._store.search_text = AsyncMock(
+            return_value=[{"request_id": "r1", "score": 1.5}]
+        )
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["history", "-g", "nginx", "--json"])
+        assert result.exit_code == 0
+        assert json.loads(result.output) == {"request_id": "r1", "score": 1.5}
+
+    def test_history_grep_no_matches(self):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        mock_pipeline._store.search_text = AsyncMock(return_value=[])
         with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
-            result = runner.invoke(app, ["history", "--limit", "5"])
+            result = runner.invoke(app, ["history", "-g", "nothing"])
         assert result.exit_code == 0
+        assert "No history found" in result.output
 
 
 class TestRollbackCommand:
-    def test_rollback_stub(self):
-        result = runner.invoke(app, ["rollback", "act-123"])
+    def _pipeline(self):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        return mock_pipeline
+
+    def test_rollback_action(self):
+        mock_pipeline = self._pipeline()
+        mock_pipeline.rollback = AsyncMock(
+            return_value=ActionResult(
+                action_id="act-123", success=True, output="resumed", rolled_back=True
+            )
+        )
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["rollback", "act-123"])
+        assert result.exit_code == 0
+        assert "resumed" in result.output
+        mock_pipeline.rollback.assert_awaited_once_with("act-123")
+        mock_pipeline._store.close.assert_awaited_once()
+
+    def test_rollback_failure_exits_1(self):
+        mock_pipeline = self._pipeline()
+        mock_pipeline.rollback = AsyncMock(
+            return_value=ActionResult(
+                action_id="act-123", success=False, error="Unknown action."
+            )
+        )
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["rollback", "act-123"])
+        assert result.exit_code == 1
+        assert "Unknown action." in result.output
+
+    def test_rollback_request(self):
+        mock_pipeline = self._pipeline()
+        mock_pipeline.rollback_request = AsyncMock(
+            return_value=[ActionResult(action_id="a2", success=True, rolled_back=True)]
+        )
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["rollback", "--request", "req-1"])
+        assert result.exit_code == 0
+        mock_pipeline.rollback_request.assert_awaited_once_with("req-1")
+
+    def test_rollback_request_with_nothing_to_undo(self):
+        mock_pipeline = self._pipeline()
+        mock_pipeline.rollback_request = AsyncMock(return_value=[])
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["rollback", "--request", "req-1"])
+        assert result.exit_code == 0
+        assert "Nothing to roll back" in result.output
+
+    def test_rollback_needs_exactly_one_target(self):
+        assert runner.invoke(app, ["rollback"]).exit_code == 1
+        assert (
+            runner.invoke(app, ["rollback", "act-1", "--request", "req-1"]).exit_code
+            == 1
+        )
+
+
+class TestStatsCommand:
+    def _pipeline(self, tmp_path):
+        from agentic.memory.models import RequestRecord
+        from agentic.memory.store import MemoryStore
+
+        store = MemoryStore(tmp_path / "audit.db")
+
+        async def seed():
+            await store.initialize()
+            await store.log_request(
+                RequestRecord(
+                    id="r1", raw_query="q", intent_type="FOCUS", confidence=0.9
+                )
+            )
+            await store.log_policy_decision(
+                "a1", 4, False, reason="CRITICAL risk action blocked", gate="safety"
+            )
+            await store.close()
+
+        asyncio.run(seed())
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = MemoryStore(tmp_path / "audit.db")
+        return mock_pipeline
+
+    def test_stats_tables(self, tmp_path):
+        with patch(
+            "agentic.cli.app._get_pipeline", return_value=self._pipeline(tmp_path)
+        ):
+            result = runner.invoke(app, ["stats", "--by", "intent"])
+        assert result.exit_code == 0, result.output
+        assert "Audit Totals" in result.output
+        assert "FOCUS" in result.output
+
+    def test_stats_denials_json(self, tmp_path):
+        with patch(
+            "agentic.cli.app._get_pipeline", return_value=self._pipeline(tmp_path)
+        ):
+            result = runner.invoke(app, ["stats", "--by", "denials", "--json"])
+        assert result.exit_code == 0, result.output
+        total, denial = [json.loads(line) for line in result.output.splitlines()]
+        assert (
+            total["requests"],
+            total["decisions_denied"],
+            total["approval_rate"],
+        ) == (1, 1, 0.0)
+        assert denial == {
+            "gate": "safety",
+            "reason": "CRITICAL risk action blocked",
+            "count": 1,
+        }
+
+    def test_stats_denials_table(self, tmp_path):
+        with patch(
+            "agentic.cli.app._get_pipeline", return_value=self._pipeline(tmp_path)
+        ):
+            result = runner.invoke(app, ["stats", "--by", "denials"])
+        assert result.exit_code == 0, result.output
+        assert "Denial Reasons" in result.output
+
+    def test_stats_rejects_unknown_breakdown(self):
+        result = runner.invoke(app, ["stats", "--by", "weekday"])
+        assert result.exit_code == 1
+        assert "--by must be one of" in result.output
+
+
+class TestAuditPruneCommand:
+    def test_prune_reports_and_closes_store(self, tmp_path):
+        from agentic.memory.retention import RetentionPolicy, RetentionReport
+
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        report = RetentionReport(
+            requests_removed=3,
+            decisions_removed=1,
+            archive_files=(tmp_path / "audit-2024-01.db",),
+        )
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch(
+                "agentic.cli.app._get_retention_policy", return_value=RetentionPolicy()
+            ) as get_policy,
+            patch(
+                "agentic.memory.retention.RetentionManager.run",
+                AsyncMock(return_value=report),
+            ),
+            patch(
+                "agentic.memory.retention.RetentionManager.vacuumed",
+                AsyncMock(return_value=12),
+            ),
+        ):
+            result = runner.invoke(
+                app, ["audit", "prune", "--max-age-days", "30", "--no-archive"]
+            )
+        assert result.exit_code == 0
+        get_policy.assert_called_once_with(
+            max_age_days=30, max_db_mb=None, archive=False
+        )
+        mock_pipeline._store.close.assert_awaited_once()
+        assert "Removed 3 request(s)" in result.output
+        assert "released 12 page(s)" in result.output
+        assert "audit-2024-01.db" in result.output
+
+    def test_prune_uses_settings_by_default(self):
+        from agentic.memory.retention import RetentionPolicy, RetentionReport
+
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch(
+                "agentic.cli.app._get_retention_policy", return_value=RetentionPolicy()
+            ) as get_policy,
+            patch(
+                "agentic.memory.retention.RetentionManager.run",
+                AsyncMock(return_value=RetentionReport()),
+            ),
+        ):
+            result = runner.invoke(app, ["audit", "prune"])
+        assert result.exit_code == 0
+        get_policy.assert_called_once_with(
+            max_age_days=None, max_db_mb=None, archive=None
+        )
+
+    def test_sharded_log_drops_old_shards(self, tmp_path):
+        from agentic.memory.models import RequestRecord
+        from agentic.memory.retention import RetentionPolicy
+        from agentic.memory.shards import ShardedMemoryStore
+
+        async def seed():
+            store = ShardedMemoryStore(tmp_path)
+            for request_id, created_at in (
+                ("old", datetime(2024, 1, 10)),
+                ("new", datetime.now()),
+            ):
+                await store.log_request(
+                    RequestRecord(
+                        id=request_id,
+                        raw_query="q",
+                        intent_type="NETWORK",
+                        confidence=0.9,
+                        created_at=created_at,
+                    )
+                )
+            await store.close()
+
+        asyncio.run(seed())
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = ShardedMemoryStore(tmp_path)
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch(
+                "agentic.cli.app._get_retention_policy",
+                return_value=RetentionPolicy(max_age_days=30),
+            ),
+        ):
+            result = runner.invoke(app, ["audit", "prune"])
+        assert result.exit_code == 0
+        assert "Dropped 1 shard(s)" in result.output
+        assert "audit-2024-01-10" in result.output
+        assert len(mock_pipeline._store.shard_keys()) == 1
+
+    def test_sharded_log_needs_max_age(self, tmp_path):
+        from agentic.memory.retention import RetentionPolicy
+        from agentic.memory.shards import ShardedMemoryStore
+
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = ShardedMemoryStore(tmp_path)
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch(
+                "agentic.cli.app._get_retention_policy", return_value=RetentionPolicy()
+            ),
+        ):
+            result = runner.invoke(app, ["audit", "prune"])
+        assert result.exit_code == 1
+        assert "--max-age-days" in result.output
+
+    def test_get_retention_policy(self, mock_settings):
+        from agentic.cli.app import _get_retention_policy
+
+        assert _get_retention_policy(max_age_days=5).max_age_days == 5
+
+
+class TestAuditEncodeCommand:
+    def test_encode_reports_and_closes_store(self):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        mock_pipeline._store.encode_dictionaries.return_value = 42
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["audit", "encode", "--batch-size", "10"])
+        assert result.exit_code == 0
+        mock_pipeline._store.encode_dictionaries.assert_awaited_once_with(batch_size=10)
+        mock_pipeline._store.close.assert_awaited_once()
+        assert "Encoded 42 row(s)." in result.output
+
+
+class TestAuditBackupCommand:
+    def test_backup_reports_and_closes_store(self, tmp_path):
+        from agentic.memory.backup import BackupReport
+
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        out = tmp_path / "audit.db.gz"
+        mock_pipeline._store.backup.return_value = BackupReport(
+            path=out, pages=120, steps=2, bytes_written=4096, elapsed_ms=12.0
+        )
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(
+                app, ["audit", "backup", str(out), "--pages", "64", "--sleep", "0.01"]
+            )
         assert result.exit_code == 0
+        mock_pipeline._store.backup.assert_awaited_once_with(out, pages=64, sleep=0.01)
+        mock_pipeline._store.close.assert_awaited_once()
+        assert "Backed up 120 page(s) in 2 step(s)" in result.output
+
+    def test_sharded_log_is_refused(self, tmp_path):
+        from agentic.memory.shards import ShardedMemoryStore
+
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = ShardedMemoryStore(tmp_path / "shards")
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(app, ["audit", "backup", str(tmp_path / "audit.db")])
+        assert result.exit_code == 1
+        assert "sharded by day" in result.output
+        assert not (tmp_path / "shards").exists()
+
+    def test_shard_option(self, tmp_path):
+        from agentic.memory.models import RequestRecord
+        from agentic.memory.shards import ShardedMemoryStore
+
+        async def seed():
+            store = ShardedMemoryStore(tmp_path / "shards")
+            await store.initialize()
+            await store.log_request(
+                RequestRecord(
+                    id="r1",
+                    raw_query="q",
+                    intent_type="FOCUS",
+                    confidence=0.9,
+                    created_at=datetime(2025, 1, 10, tzinfo=timezone.utc),
+                )
+            )
+            await store.close()
+
+        asyncio.run(seed())
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = ShardedMemoryStore(tmp_path / "shards")
+        out = tmp_path / "backup.db"
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            unknown = runner.invoke(
+                app, ["audit", "backup", str(out), "--shard", "2025-01-11"]
+            )
+            result = runner.invoke(
+                app, ["audit", "backup", str(out), "--shard", "2025-01-10"]
+            )
+        assert unknown.exit_code == 1
+        assert (
+            "No shard '2025-01-11'" in unknown.output and "2025-01-10" in unknown.output
+        )
+        assert result.exit_code == 0, result.output
+        assert out.exists()
+
+    def test_shard_option_needs_a_sharded_log(self, tmp_path):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        with patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline):
+            result = runner.invoke(
+                app,
+                ["audit", "backup", str(tmp_path / "b.db"), "--shard", "2025-01-10"],
+            )
+        assert result.exit_code == 1
+        assert "--shard needs a sharded audit log" in result.output
+        mock_pipeline._store.backup.assert_not_called()
+
+
+class TestAuditVerifyCommand:
+    def _invoke(self, tmp_path, report, *args):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch(
+                "agentic.cli.app._get_audit_key_path",
+                return_value=tmp_path / "audit.key",
+            ),
+            patch(
+                "agentic.memory.integrity.AuditVerifier.verify",
+                AsyncMock(return_value=report),
+            ) as verify,
+        ):
+            result = runner.invoke(app, ["audit", "verify", *args])
+        mock_pipeline._store.close.assert_awaited_once()
+        return result, verify
+
+    def test_verify_ok(self, tmp_path):
+        from agentic.memory.integrity import VerifyReport
+
+        report = VerifyReport(
+            start_seq=8, end_seq=12, rows_checked=4, checkpoints_checked=1
+        )
+        result, verify = self._invoke(tmp_path, report, "--full")
+        assert result.exit_code == 0
+        verify.assert_awaited_once_with(full=True)
+        assert "Audit chain OK: seq 8..12, 4 row(s)" in result.output
+        assert (tmp_path / "audit.key").exists()
+
+    def test_verify_failure_exits_nonzero(self, tmp_path):
+        from agentic.memory.integrity import VerifyReport
+
+        report = VerifyReport(start_seq=0, end_seq=4, problems=("seq 2: row missing",))
+        result, _ = self._invoke(tmp_path, report)
+        assert result.exit_code == 1
+        assert "seq 2: row missing" in result.output
+        assert "FAILED" in result.output
+
+    def test_get_audit_key_path(self, mock_settings):
+        from agentic.cli.app import _get_audit_key_path
+
+        assert _get_audit_key_path().name == "audit.key"
+
+
+class TestKnnCommands:
+    def _invoke(self, tmp_path, model, *args):
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch(
+                "agentic.cli.app._get_knn_classifier", return_value=model
+            ) as get_model,
+            patch(
+                "agentic.cli.app._get_knn_path",
+                return_value=tmp_path / "intents.knn.npz",
+            ),
+        ):
+            result = runner.invoke(app, ["knn", *args])
+        mock_pipeline._store.close.assert_awaited_once()
+        return result, get_model, mock_pipeline._store
+
+    def test_train_saves_the_model(self, tmp_path):
+        model = MagicMock()
+        model.update = AsyncMock(return_value=12)
+        model.__len__.return_value = 30
+        result, get_model, store = self._invoke(tmp_path, model, "train", "--full")
+        assert result.exit_code == 0
+        get_model.assert_called_once_with(fresh=True)
+        model.update.assert_awaited_once_with(store)
+        model.save.assert_called_once_with(tmp_path / "intents.knn.npz")
+        assert "Learned 12 request(s); the model holds 30 example(s)" in result.output
+
+    def test_evaluate(self, tmp_path):
+        from agentic.parser.knn import KnnEvaluation
+
+        report = KnnEvaluation(trained=80, tested=20, answered=10, correct=9)
+        with patch(
+            "agentic.parser.knn.evaluate", AsyncMock(return_value=report)
+        ) as evaluate:
+            result, get_model, store = self._invoke(
+                tmp_path, MagicMock(), "evaluate", "--holdout", "0.3"
+            )
+            assert result.exit_code == 0
+            evaluate.assert_awaited_once_with(
+                store, get_model.return_value, holdout=0.3
+            )
+            get_model.assert_called_once_with(fresh=True)
+            assert "answered 10 (50.0%), 9 matching the LLM" in result.output
+            result, _, _ = self._invoke(tmp_path, MagicMock(), "evaluate", "--json")
+        assert json.loads(result.output)["accuracy"] == 0.9
+
+    @pytest.mark.parametrize("command", [["ask", "free up memory"], ["batch", "-"]])
+    def test_run_saves_what_the_tier_learned(self, tmp_path, command):
+        from agentic.parser.knn import KnnClassifier
+        from agentic.parser.tiered import TieredParser
+
+        knn = KnnClassifier()
+        intent = ParsedIntent(
+            raw_query="free up memory",
+            intent_type=IntentType.CLEAN_MEMORY,
+            confidence=0.95,
+        )
+        plan = ActionPlan(intent_id=intent.id, actions=[])
+
+        def run(query, **_):
+            knn.learn(intent.raw_query, intent.intent_type.value, intent.confidence, [])
+            return (
+                (intent, plan, []) if isinstance(query, str) else [(intent, plan, [])]
+            )
+
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        mock_pipeline._parser = TieredParser(MagicMock(cache=None), knn=knn)
+        mock_pipeline._dry_run = True
+        mock_pipeline.run = mock_pipeline.run_many = AsyncMock(side_effect=run)
+        mock_pipeline._gate.evaluate_plan.return_value = []
+        mock_pipeline._gate.filter_approved.return_value = ([], [])
+        path = tmp_path / "intents.knn.npz"
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch("agentic.cli.app._get_knn_path", return_value=path),
+        ):
+            assert runner.invoke(app, command, input="free up memory\n").exit_code == 0
+            assert len(KnnClassifier.load(path)) == 1 and not knn.changed
+            path.unlink()
+            # Nothing new learned: the model file is left alone.
+            mock_pipeline.run = AsyncMock(return_value=(intent, plan, []))
+            mock_pipeline.run_many = AsyncMock(return_value=[(intent, plan, [])])
+            assert runner.invoke(app, command, input="free up memory\n").exit_code == 0
+        assert not path.exists()
+
+    def test_helpers(self, mock_settings):
+        from agentic.cli.app import _get_knn_classifier, _get_knn_path
+
+        assert _get_knn_path().name == "intents.knn.npz"
+        assert len(_get_knn_classifier(fresh=True)) == 0
+
+
+class TestAuditExportCommand:
+    def test_export_reports_counts_and_closes_store(self, tmp_path):
+        from agentic.memory.export import ExportReport
+
+        mock_pipeline = MagicMock()
+        mock_pipeline._store = AsyncMock()
+        report = ExportReport(
+            path=tmp_path / "a.gz",
+            requests=2,
+            actions=3,
+            policy_decisions=4,
+            execution_results=3,
+        )
+        with (
+            patch("agentic.cli.app._get_pipeline", return_value=mock_pipeline),
+            patch(
+                "agentic.memory.export.AuditExporter.export",
+                AsyncMock(return_value=report),
+            ) as export,
+        ):
+            result = runner.invoke(
+                app,
+                [
+                    "audit",
+                    "export",
+                    str(tmp_path / "a.gz"),
+                    "--format",
+                    "columnar",
+                    "--full",
+                ],
+            )
+        assert result.exit_code == 0
+        export.assert_awaited_once_with(tmp_path / "a.gz", fmt="columnar", full=True)
+        mock_pipeline._store.close.assert_awaited_once()
+        assert "Exported 2 request(s), 3 action(s)" in result.output
+
+    def test_export_rejects_unknown_format(self, tmp_path):
+        result = runner.invoke(
+            app, ["audit", "export", str(tmp_path / "a.gz"), "--format", "xml"]
+        )
+        assert result.exit_code == 1
+        assert "Unknown format" in result.output
+
+    def test_export_end_to_end(self, tmp_path, mock_settings):
+        from agentic.main import build_pipeline
+        from agentic.memory.models import RequestRecord
+        from agentic.memory.store import MemoryStore
+
+        settings = mock_settings.model_copy(update={"db_path": tmp_path / "audit.db"})
+        store = MemoryStore(settings.db_path)
+
+        async def seed():
+            await store.initialize()
+            await store.log_request(
+                RequestRecord(
+                    id="r1", raw_query="q", intent_type="FOCUS", confidence=0.9
+                )
+            )
+            await store.close()
+
+        asyncio.run(seed())
+        with patch(
+            "agentic.cli.app._get_pipeline", lambda: build_pipeline(settings=settings)
+        ):
+            result = runner.invoke(
+                app, ["audit", "export", str(tmp_path / "a.gz"), "--settle", "0"]
+            )
+            again = runner.invoke(
+                app, ["audit", "export", str(tmp_path / "b.gz"), "--settle", "0"]
+            )
+        assert result.exit_code == 0, result.output
+        with gzip.open(tmp_path / "a.gz", "rt") as f:
+            assert [json.loads(line)["id"] for line in f] == ["r1"]
+        assert "Exported 0 request(s)" in again.output
 
 
 class TestStatusCommand:
     def test_status(self):
         with (
             patch("agentic.cli.app.psutil.cpu_percent", return_value=25.0),
-            patch("agentic.cli.app.psutil.virtual_memory", return_value=MagicMock(percent=60.0)),
+            patch(
+                "agentic.cli.app.psutil.virtual_memory",
+                return_value=MagicMock(percent=60.0),
+            ),
             patch("agentic.cli.app.psutil.process_iter", return_value=[]),
         ):
             result = runner.invoke(app, ["status"])
@@ -200,7 +1047,10 @@ class TestStatusCommand:
         }
         with (
             patch("agentic.cli.app.psutil.cpu_percent", return_value=25.0),
-            patch("agentic.cli.app.psutil.virtual_memory", return_value=MagicMock(percent=60.0)),
+            patch(
+                "agentic.cli.app.psutil.virtual_memory",
+                return_value=MagicMock(percent=60.0),
+            ),
             patch("agentic.cli.app.psutil.process_iter", return_value=[mock_proc]),
         ):
             result = runner.invoke(app, ["status"])
@@ -213,7 +1063,10 @@ class TestStatusCommand:
         )
         with (
             patch("agentic.cli.app.psutil.cpu_percent", return_value=25.0),
-            patch("agentic.cli.app.psutil.virtual_memory", return_value=MagicMock(percent=60.0)),
+            patch(
+                "agentic.cli.app.psutil.virtual_memory",
+                return_value=MagicMock(percent=60.0),
+            ),
             patch("agentic.cli.app.psutil.process_iter", return_value=[mock_proc]),
         ):
             result = runner.invoke(app, ["status"])
@@ -229,7 +1082,10 @@ class TestStatusCommand:
         }
         with (
             patch("agentic.cli.app.psutil.cpu_percent", return_value=25.0),
-            patch("agentic.cli.app.psutil.virtual_memory", return_value=MagicMock(percent=60.0)),
+            patch(
+                "agentic.cli.app.psutil.virtual_memory",
+                return_value=MagicMock(percent=60.0),
+            ),
             patch("agentic.cli.app.psutil.process_iter", return_value=[mock_proc]),
         ):
             result = runner.invoke(app, ["status"])
@@ -8,13 +8,16 @@ from rich.console import Console
 
 from agentic.cli.output import (
     print_action_plan,
+    print_denials,
     print_error,
     print_history,
     print_info,
     print_intent,
     print_results,
+    print_stats,
     print_status,
 )
+from agentic.memory.stats import DenialRow, StatsRow
 from agentic.models.action import ActionCandidate, ActionPlan, ActionResult, ActionType
 from agentic.models.intent import Entity, IntentType, ParsedIntent
 from agentic.models.policy import PolicyDecision, RiskLevel
@@ -23,6 +26,7 @@ from agentic.models.policy import PolicyDecision, RiskLevel
 def _capture(func, *args, **kwargs) -> str:
     """Capture Rich output by temporarily replacing the module console."""
     import agentic.cli.output as mod
+
     buf = StringIO()
     original = mod.console
     mod.console = Console(file=buf, force_terminal=True, width=120)
@@ -114,13 +118,17 @@ class TestPrintActionPlan:
 
 class TestPrintResults:
     def test_success_result(self):
-        results = [ActionResult(action_id="a1", success=True, output="Suspended PID 123")]
+        results = [
+            ActionResult(action_id="a1", success=True, output="Suspended PID 123")
+        ]
         output = _capture(print_results, results)
         assert "OK" in output
         assert "Suspended" in output
 
     def test_failure_result(self):
-        results = [ActionResult(action_id="a1", success=False, error="Permission denied")]
+        results = [
+            ActionResult(action_id="a1", success=False, error="Permission denied")
+        ]
         output = _capture(print_results, results)
         assert "FAIL" in output
         assert "Permission denied" in output
@@ -184,3 +192,29 @@ class TestPrintStatus:
         output = _capture(print_status, 10.0, 50.0, procs)
         assert "chrome" in output
         assert "12.5" in output
+
+
+class TestPrintStats:
+    def test_rates_and_latency(self):
+        row = StatsRow(
+            "action_type",
+            "SYSTEMCTL_RESTART",
+            decisions_approved=3,
+            decisions_denied=1,
+            executions=4,
+            failures=1,
+            latency_ms_sum=3000.0,
+            latency_count=2,
+        )
+        output = _capture(print_stats, "By action type", [row])
+        assert "SYSTEMCTL_RESTART" in output
+        assert "75%" in output and "25%" in output
+        assert "1500 ms" in output
+
+    def test_missing_rates_shown_as_dash(self):
+        output = _capture(print_stats, "Audit Totals", [StatsRow("total", "")])
+        assert "-" in output
+
+    def test_denials(self):
+        output = _capture(print_denials, [DenialRow("", "blocked", 2)])
+        assert "blocked" in output and "2" in output
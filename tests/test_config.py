@@ -20,6 +20,19 @@ class TestSettings:
         assert s.log_level == "INFO"
         assert s.max_risk_level == "HIGH"
         assert s.require_confirmation is True
+        assert s.audit_batch_size == 256
+        assert s.audit_flush_interval == 0.05
+        assert s.db_synchronous == "NORMAL"
+        assert s.db_reader_pool_size == 2
+        assert s.output_max_bytes == 64 * 1024
+        assert s.output_inline_bytes == 256
+        assert s.audit_key_path is None
+        assert s.audit_checkpoint_interval == 1000
+        assert s.recent_cache_size == 256
+        assert s.context_cache_size == 128
+        assert s.db_timestamp_format == "iso"
+        assert s.id_scheme == "uuid4"
+        assert s.local_parser is False
 
     def test_env_override(self, monkeypatch):
         monkeypatch.setenv("AGENTIC_OPENAI_API_KEY", "sk-override")
@@ -73,3 +86,33 @@ class TestSettings:
         monkeypatch.setenv("AGENTIC_OPENAI_API_KEY", "sk-test")
         s = Settings()  # type: ignore[call-arg]
         assert s.openai_model == "gpt-4o"  # Default, not "wrong-model"
+
+    def test_audit_batch_size_must_be_positive(self, monkeypatch):
+        monkeypatch.setenv("AGENTIC_OPENAI_API_KEY", "sk-test")
+        monkeypatch.setenv("AGENTIC_AUDIT_BATCH_SIZE", "0")
+        with pytest.raises(ValidationError):
+            Settings()  # type: ignore[call-arg]
+
+    @pytest.mark.parametrize(
+        ("var", "good", "bad"),
+        [
+            ("AGENTIC_DB_TIMESTAMP_FORMAT", "epoch_us", "epoch_ms"),
+            ("AGENTIC_DB_SHARD_PERIOD", "week", "month"),
+            ("AGENTIC_ID_SCHEME", "uuid7", "ulid"),
+        ],
+    )
+    def test_storage_choices_are_validated_at_load(self, monkeypatch, var, good, bad):
+        monkeypatch.setenv("AGENTIC_OPENAI_API_KEY", "sk-test")
+        monkeypatch.setenv(var, good)
+        Settings()  # type: ignore[call-arg]
+        monkeypatch.setenv(var, bad)
+        with pytest.raises(ValidationError):
+            Settings()  # type: ignore[call-arg]
+
+    def test_db_synchronous_is_validated_at_load(self, monkeypatch):
+        monkeypatch.setenv("AGENTIC_OPENAI_API_KEY", "sk-test")
+        monkeypatch.setenv("AGENTIC_DB_SYNCHRONOUS", "full")
+        assert Settings().db_synchronous == "FULL"  # type: ignore[call-arg]
+        monkeypatch.setenv("AGENTIC_DB_SYNCHRONOUS", "NORMAL; DROP TABLE requests")
+        with pytest.raises(ValidationError):
+            Settings()  # type: ignore[call-arg]
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import pytest
 
+from agentic.engine.strategies.base import rollback_command
 from agentic.engine.strategies.clean_memory import CleanMemoryStrategy
 from agentic.engine.strategies.focus import DEFAULT_DISTRACTIONS, FocusStrategy
 from agentic.engine.strategies.update import UpdateStrategy
@@ -83,6 +84,36 @@ class TestFocusStrategy:
         assert actions[0].rollback_command != ""
         assert "CONT" in actions[0].rollback_command
 
+    @pytest.mark.asyncio
+    async def test_target_quoted_in_commands(self):
+        intent = ParsedIntent(
+            raw_query="pause my app",
+            intent_type=IntentType.FOCUS,
+            confidence=0.9,
+            entities=[
+                Entity(name="process", value="my app; rm -rf ~", source="my app")
+            ],
+        )
+        strategy = FocusStrategy()
+        actions = await strategy.generate_actions(intent)
+        assert actions[0].command == "kill -STOP $(pgrep -f 'my app; rm -rf ~')"
+        assert (
+            actions[0].rollback_command == "kill -CONT $(pgrep -f 'my app; rm -rf ~')"
+        )
+
+
+@pytest.mark.parametrize(
+    ("action_type", "command"),
+    [
+        (ActionType.SYSTEMCTL_START, "systemctl stop 'web; reboot'"),
+        (ActionType.SYSTEMCTL_STOP, "systemctl start 'web; reboot'"),
+        (ActionType.SYSTEMCTL_RESTART, "systemctl restart 'web; reboot'"),
+        (ActionType.KILL_PROCESS, ""),
+    ],
+)
+def test_rollback_command(action_type, command):
+    assert rollback_command(action_type, "web; reboot") == command
+
 
 class TestUpdateStrategy:
     @pytest.mark.asyncio
@@ -193,7 +224,9 @@ class TestCleanMemoryStrategy:
         )
         strategy = CleanMemoryStrategy()
         actions = await strategy.generate_actions(intent)
-        kill_actions = [a for a in actions if a.action_type == ActionType.KILL_BY_MEMORY]
+        kill_actions = [
+            a for a in actions if a.action_type == ActionType.KILL_BY_MEMORY
+        ]
         assert len(kill_actions) == 1
         assert kill_actions[0].target == "electron"
 
@@ -207,7 +240,9 @@ class TestCleanMemoryStrategy:
         )
         strategy = CleanMemoryStrategy()
         actions = await strategy.generate_actions(intent)
-        kill_actions = [a for a in actions if a.action_type == ActionType.KILL_BY_MEMORY]
+        kill_actions = [
+            a for a in actions if a.action_type == ActionType.KILL_BY_MEMORY
+        ]
         assert len(kill_actions) == 1
         assert kill_actions[0].target == "memory_hogs"
 
@@ -224,7 +259,9 @@ class TestCleanMemoryStrategy:
         )
         strategy = CleanMemoryStrategy()
         actions = await strategy.generate_actions(intent)
-        kill_actions = [a for a in actions if a.action_type == ActionType.KILL_BY_MEMORY]
+        kill_actions = [
+            a for a in actions if a.action_type == ActionType.KILL_BY_MEMORY
+        ]
         assert len(kill_actions) == 2
 
     @pytest.mark.asyncio
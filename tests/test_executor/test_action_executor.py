@@ -8,11 +8,17 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import psutil
 import pytest
 
+from agentic.engine.strategies.base import rollback_command
 from agentic.exceptions import ExecutionError
 from agentic.executor.action_executor import ActionExecutor
 from agentic.executor.runners.memory_runner import MemoryRunner
 from agentic.executor.runners.package_runner import PackageRunner
-from agentic.executor.runners.process_runner import ESSENTIAL_PROCESSES, ProcessRunner, _SIGCONT, _SIGSTOP
+from agentic.executor.runners.process_runner import (
+    ESSENTIAL_PROCESSES,
+    ProcessRunner,
+    _SIGCONT,
+    _SIGSTOP,
+)
 from agentic.executor.runners.systemctl_runner import SystemctlRunner
 from agentic.models.action import ActionCandidate, ActionType
 
@@ -77,7 +83,10 @@ class TestProcessRunner:
         mock_proc = MagicMock()
         with (
             patch.object(runner, "_find_pids", return_value=[12345]),
-            patch("agentic.executor.runners.process_runner.psutil.Process", return_value=mock_proc),
+            patch(
+                "agentic.executor.runners.process_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             result = await runner.run(action)
         mock_proc.send_signal.assert_called_once_with(_SIGSTOP)
@@ -94,7 +103,10 @@ class TestProcessRunner:
         mock_proc = MagicMock()
         with (
             patch.object(runner, "_find_pids", return_value=[99]),
-            patch("agentic.executor.runners.process_runner.psutil.Process", return_value=mock_proc),
+            patch(
+                "agentic.executor.runners.process_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             result = await runner.run(action)
         mock_proc.send_signal.assert_called_once_with(signal.SIGTERM)
@@ -111,7 +123,10 @@ class TestProcessRunner:
         mock_proc.send_signal.side_effect = psutil.AccessDenied(pid=1)
         with (
             patch.object(runner, "_find_pids", return_value=[1]),
-            patch("agentic.executor.runners.process_runner.psutil.Process", return_value=mock_proc),
+            patch(
+                "agentic.executor.runners.process_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             with pytest.raises(ExecutionError, match="Failed to signal"):
                 await runner.run(action)
@@ -128,7 +143,10 @@ class TestProcessRunner:
         mock_proc.send_signal.side_effect = psutil.NoSuchProcess(pid=999)
         with (
             patch.object(runner, "_find_pids", return_value=[999]),
-            patch("agentic.executor.runners.process_runner.psutil.Process", return_value=mock_proc),
+            patch(
+                "agentic.executor.runners.process_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             with pytest.raises(ExecutionError):
                 await runner.run(action)
@@ -144,7 +162,10 @@ class TestProcessRunner:
         mock_proc = MagicMock()
         with (
             patch.object(runner, "_find_pids", return_value=[123]),
-            patch("agentic.executor.runners.process_runner.psutil.Process", return_value=mock_proc),
+            patch(
+                "agentic.executor.runners.process_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             result = await runner.rollback(action)
         mock_proc.send_signal.assert_called_with(_SIGCONT)
@@ -174,7 +195,10 @@ class TestProcessRunner:
         mock_proc.send_signal.side_effect = psutil.NoSuchProcess(pid=999)
         with (
             patch.object(runner, "_find_pids", return_value=[999]),
-            patch("agentic.executor.runners.process_runner.psutil.Process", return_value=mock_proc),
+            patch(
+                "agentic.executor.runners.process_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             result = await runner.rollback(action)
         assert result.rolled_back is True
@@ -184,7 +208,10 @@ class TestProcessRunner:
         mock_proc.info = {"name": "firefox", "cmdline": ["/usr/bin/firefox"]}
         mock_proc.pid = 42
 
-        with patch("agentic.executor.runners.process_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.process_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             pids = ProcessRunner._find_pids("firefox")
         assert 42 in pids
 
@@ -193,7 +220,10 @@ class TestProcessRunner:
         mock_proc.info = {"name": "python3", "cmdline": ["python3", "myapp.py"]}
         mock_proc.pid = 55
 
-        with patch("agentic.executor.runners.process_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.process_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             pids = ProcessRunner._find_pids("myapp")
         assert 55 in pids
 
@@ -201,7 +231,10 @@ class TestProcessRunner:
         mock_proc = MagicMock()
         mock_proc.info = {"name": None, "cmdline": None}
 
-        with patch("agentic.executor.runners.process_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.process_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             pids = ProcessRunner._find_pids("test")
         assert pids == []
 
@@ -210,7 +243,10 @@ class TestProcessRunner:
         type(mock_proc).info = property(
             lambda self: (_ for _ in ()).throw(psutil.NoSuchProcess(1))
         )
-        with patch("agentic.executor.runners.process_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.process_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             pids = ProcessRunner._find_pids("test")
         assert pids == []
 
@@ -219,7 +255,10 @@ class TestProcessRunner:
         type(mock_proc).info = property(
             lambda self: (_ for _ in ()).throw(psutil.AccessDenied(1))
         )
-        with patch("agentic.executor.runners.process_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.process_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             pids = ProcessRunner._find_pids("test")
         assert pids == []
 
@@ -279,7 +318,9 @@ class TestPackageRunner:
             command="/nonexistent/binary",
             target="pkg",
         )
-        with patch("asyncio.create_subprocess_shell", side_effect=OSError("no such file")):
+        with patch(
+            "asyncio.create_subprocess_shell", side_effect=OSError("no such file")
+        ):
             with pytest.raises(ExecutionError, match="Failed to run"):
                 await runner.run(action)
 
@@ -403,7 +444,9 @@ class TestMemoryRunner:
             description="Kill hogs",
             target="chrome",
         )
-        with patch.object(runner, "_find_memory_hogs", return_value=[(123, "chrome", 600.0)]):
+        with patch.object(
+            runner, "_find_memory_hogs", return_value=[(123, "chrome", 600.0)]
+        ):
             result = await runner.run(action, dry_run=True)
         assert result.success is True
         assert "DRY RUN" in result.output
@@ -431,8 +474,13 @@ class TestMemoryRunner:
         )
         mock_proc = MagicMock()
         with (
-            patch.object(runner, "_find_memory_hogs", return_value=[(123, "chrome", 800.0)]),
-            patch("agentic.executor.runners.memory_runner.psutil.Process", return_value=mock_proc),
+            patch.object(
+                runner, "_find_memory_hogs", return_value=[(123, "chrome", 800.0)]
+            ),
+            patch(
+                "agentic.executor.runners.memory_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             result = await runner.run(action)
         mock_proc.terminate.assert_called_once()
@@ -449,8 +497,13 @@ class TestMemoryRunner:
         mock_proc = MagicMock()
         mock_proc.terminate.side_effect = psutil.AccessDenied(pid=123)
         with (
-            patch.object(runner, "_find_memory_hogs", return_value=[(123, "chrome", 800.0)]),
-            patch("agentic.executor.runners.memory_runner.psutil.Process", return_value=mock_proc),
+            patch.object(
+                runner, "_find_memory_hogs", return_value=[(123, "chrome", 800.0)]
+            ),
+            patch(
+                "agentic.executor.runners.memory_runner.psutil.Process",
+                return_value=mock_proc,
+            ),
         ):
             with pytest.raises(ExecutionError, match="Failed to kill"):
                 await runner.run(action)
@@ -486,7 +539,10 @@ class TestMemoryRunner:
             "memory_info": MagicMock(rss=600 * 1024 * 1024),
         }
         mock_proc.pid = 100
-        with patch("agentic.executor.runners.memory_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.memory_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             hogs = MemoryRunner._find_memory_hogs("chrome")
         assert len(hogs) == 1
 
@@ -498,7 +554,10 @@ class TestMemoryRunner:
             "memory_info": MagicMock(rss=600 * 1024 * 1024),
         }
         mock_proc.pid = 100
-        with patch("agentic.executor.runners.memory_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.memory_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             hogs = MemoryRunner._find_memory_hogs("memory_hogs")
         assert len(hogs) == 1
 
@@ -510,7 +569,10 @@ class TestMemoryRunner:
             "memory_info": MagicMock(rss=600 * 1024 * 1024),
         }
         mock_proc.pid = 100
-        with patch("agentic.executor.runners.memory_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.memory_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             hogs = MemoryRunner._find_memory_hogs("chrome")
         assert len(hogs) == 0
 
@@ -522,7 +584,10 @@ class TestMemoryRunner:
             "memory_info": MagicMock(rss=100 * 1024 * 1024),
         }
         mock_proc.pid = 100
-        with patch("agentic.executor.runners.memory_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.memory_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             hogs = MemoryRunner._find_memory_hogs("memory_hogs")
         assert len(hogs) == 0
 
@@ -530,7 +595,10 @@ class TestMemoryRunner:
         mock_proc = MagicMock()
         mock_proc.info = {"pid": 100, "name": "proc", "memory_info": None}
         mock_proc.pid = 100
-        with patch("agentic.executor.runners.memory_runner.psutil.process_iter", return_value=[mock_proc]):
+        with patch(
+            "agentic.executor.runners.memory_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             hogs = MemoryRunner._find_memory_hogs("memory_hogs")
         assert len(hogs) == 0
 
@@ -538,8 +606,13 @@ class TestMemoryRunner:
         mock_proc = MagicMock()
         mock_proc.info.__getitem__ = MagicMock(side_effect=psutil.NoSuchProcess(1))
         # Make .get() also raise
-        type(mock_proc).info = property(lambda self: (_ for _ in ()).throw(psutil.NoSuchProcess(1)))
-        with patch("agentic.executor.runners.memory_runner.psutil.process_iter", return_value=[mock_proc]):
+        type(mock_proc).info = property(
+            lambda self: (_ for _ in ()).throw(psutil.NoSuchProcess(1))
+        )
+        with patch(
+            "agentic.executor.runners.memory_runner.psutil.process_iter",
+            return_value=[mock_proc],
+        ):
             hogs = MemoryRunner._find_memory_hogs("test")
         assert len(hogs) == 0
 
@@ -673,6 +746,26 @@ class TestSystemctlRunner:
             with pytest.raises(ExecutionError, match="Rollback failed"):
                 await runner.rollback(action)
 
+    @pytest.mark.asyncio
+    async def test_service_name_is_quoted(self):
+        runner = SystemctlRunner()
+        action = ActionCandidate(
+            action_type=ActionType.SYSTEMCTL_STOP,
+            description="Stop web",
+            target="web; reboot",
+        )
+        mock_proc = AsyncMock()
+        mock_proc.returncode = 0
+        mock_proc.communicate.return_value = (b"ok", b"")
+        with patch("asyncio.create_subprocess_shell", return_value=mock_proc) as shell:
+            await runner.run(action)
+            await runner.rollback(action)
+        commands = [c.args[0] for c in shell.call_args_list]
+        assert commands == [
+            "systemctl stop 'web; reboot'",
+            rollback_command(action.action_type, action.target),
+        ]
+
     @pytest.mark.asyncio
     async def test_rollback_unsupported_action_type(self):
         runner = SystemctlRunner()
@@ -697,7 +790,10 @@ class TestActionExecutor:
         )
         with patch.object(ProcessRunner, "run", new_callable=AsyncMock) as mock_run:
             from agentic.models.action import ActionResult
-            mock_run.return_value = ActionResult(action_id=action.id, success=True, output="ok")
+
+            mock_run.return_value = ActionResult(
+                action_id=action.id, success=True, output="ok"
+            )
             result = await executor.execute(action, dry_run=True)
         assert result.success is True
 
@@ -718,7 +814,10 @@ class TestActionExecutor:
         ]
         with patch.object(ProcessRunner, "run", new_callable=AsyncMock) as mock_run:
             from agentic.models.action import ActionResult
-            mock_run.return_value = ActionResult(action_id="x", success=True, output="ok")
+
+            mock_run.return_value = ActionResult(
+                action_id="x", success=True, output="ok"
+            )
             results = await executor.execute_many(actions, dry_run=True)
         assert len(results) == 2
 
@@ -732,7 +831,10 @@ class TestActionExecutor:
         )
         with patch.object(ProcessRunner, "rollback", new_callable=AsyncMock) as mock_rb:
             from agentic.models.action import ActionResult
-            mock_rb.return_value = ActionResult(action_id=action.id, success=True, rolled_back=True)
+
+            mock_rb.return_value = ActionResult(
+                action_id=action.id, success=True, rolled_back=True
+            )
             result = await executor.rollback(action)
         assert result.rolled_back is True
 
@@ -746,6 +848,7 @@ class TestActionExecutor:
         )
         # Patch _RUNNER_MAP to remove the action type
         import agentic.executor.action_executor as mod
+
         original_map = mod._RUNNER_MAP.copy()
         mod._RUNNER_MAP.clear()
         try:
@@ -8,10 +8,18 @@ import pytest
 
 from agentic.engine.decision_engine import DecisionEngine
 from agentic.executor.action_executor import ActionExecutor
-from agentic.main import build_pipeline
+from agentic.main import (
+    build_knn_classifier,
+    build_pipeline,
+    build_retention_policy,
+    knn_model_path,
+)
 from agentic.memory.context import ContextRetriever
+from agentic.memory.shards import ShardedMemoryStore
 from agentic.memory.store import MemoryStore
+from agentic.models import ids
 from agentic.parser.intent_parser import IntentParser
+from agentic.parser.tiered import TieredParser
 from agentic.pipeline import Pipeline
 from agentic.policy.safety_gate import SafetyGate
 
@@ -25,6 +33,13 @@ class TestBuildPipeline:
         pipeline = build_pipeline(settings=mock_settings)
         assert isinstance(pipeline._parser, IntentParser)
 
+    def test_local_parser_can_be_enabled(self, mock_settings):
+        pipeline = build_pipeline(
+            settings=mock_settings.model_copy(update={"local_parser": True})
+        )
+        assert isinstance(pipeline._parser, TieredParser)
+        assert isinstance(pipeline._parser._fallback, IntentParser)
+
     def test_wires_engine(self, mock_settings):
         pipeline = build_pipeline(settings=mock_settings)
         assert isinstance(pipeline._engine, DecisionEngine)
@@ -45,6 +60,148 @@ class TestBuildPipeline:
         pipeline = build_pipeline(settings=mock_settings)
         assert isinstance(pipeline._context, ContextRetriever)
 
+    def test_store_uses_audit_batch_settings(self, mock_settings):
+        settings = mock_settings.model_copy(
+            update={"audit_batch_size": 8, "audit_flush_interval": 0.5}
+        )
+        pipeline = build_pipeline(settings=settings)
+        assert pipeline._store._batch_size == 8
+        assert pipeline._store._flush_interval == 0.5
+
+    def test_store_uses_db_pragma_settings(self, mock_settings):
+        settings = mock_settings.model_copy(
+            update={
+                "db_synchronous": "FULL",
+                "db_mmap_size": 1 << 20,
+                "db_reader_pool_size": 4,
+            }
+        )
+        pipeline = build_pipeline(settings=settings)
+        assert pipeline._store._synchronous == "FULL"
+        assert pipeline._store._mmap_size == 1 << 20
+        assert pipeline._store._reader_pool_size == 4
+
+    def test_timestamp_format_and_id_scheme(self, mock_settings, monkeypatch):
+        monkeypatch.setattr(ids, "_scheme", ids.get_id_scheme())
+        settings = mock_settings.model_copy(
+            update={"db_timestamp_format": "epoch_us", "id_scheme": "uuid7"}
+        )
+        pipeline = build_pipeline(settings=settings)
+        assert pipeline._store._requested_timestamp_format == "epoch_us"
+        assert ids.get_id_scheme() == "uuid7"
+
+    def test_sharded_store(self, mock_settings, tmp_path):
+        settings = mock_settings.model_copy(
+            update={
+                "db_path": tmp_path / "h.db",
+                "db_shard_period": "week",
+                "audit_batch_size": 8,
+            }
+        )
+        store = build_pipeline(settings=settings)._store
+        assert isinstance(store, ShardedMemoryStore)
+        assert (store.directory, store.period) == (tmp_path / "shards", "week")
+        assert store._options["batch_size"] == 8
+        assert store._options["signing_key_path"] == tmp_path / "audit.key"
+
+    def test_intent_cache(self, mock_settings, tmp_path):
+        settings = mock_settings.model_copy(
+            update={"db_path": tmp_path / "h.db", "intent_cache_ttl": 60.0}
+        )
+        cache = build_pipeline(settings=settings)._parser.cache
+        assert (cache.path, cache._ttl, cache._max_entries) == (
+            str(tmp_path / "intents.db"),
+            60.0,
+            10000,
+        )
+        assert not (tmp_path / "intents.db").exists()
+        settings = settings.model_copy(
+            update={"intent_cache_path": tmp_path / "c.db", "intent_cache_size": 5}
+        )
+        assert build_pipeline(settings=settings)._parser.cache.path == str(
+            tmp_path / "c.db"
+        )
+        settings = settings.model_copy(update={"intent_cache_size": 0})
+        assert build_pipeline(settings=settings)._parser.cache is None
+
+    def test_rate_limiter(self, mock_settings):
+        settings = mock_settings.model_copy(
+            update={"openai_requests_per_minute": 120.0, "openai_burst": 4}
+        )
+        parser = build_pipeline(settings=settings)._parser
+        assert (parser._limiter.rate, parser._limiter.capacity) == (2.0, 4)
+        settings = settings.model_copy(update={"openai_requests_per_minute": 0.0})
+        assert build_pipeline(settings=settings)._parser._limiter is None
+
+    def test_knn_classifier(self, mock_settings, tmp_path):
+        mock_settings = mock_settings.model_copy(update={"local_parser": True})
+        assert build_pipeline(settings=mock_settings)._parser._knn is None
+        settings = mock_settings.model_copy(
+            update={
+                "db_path": tmp_path / "h.db",
+                "knn_parser": True,
+                "knn_min_similarity": 0.9,
+            }
+        )
+        assert knn_model_path(settings) == tmp_path / "intents.knn.npz"
+        knn = build_pipeline(settings=settings)._parser.knn
+        assert (len(knn), knn._min_similarity, knn._embedder.dim) == (
+            0,
+            0.9,
+            settings.embedding_dim,
+        )
+        knn.learn("free up memory", "CLEAN_MEMORY", 0.95)
+        knn.save(knn_model_path(settings))
+        assert len(build_knn_classifier(settings)) == 1
+        assert len(build_knn_classifier(settings, fresh=True)) == 0
+        settings = settings.model_copy(update={"knn_model_path": tmp_path / "m.npz"})
+        assert len(build_knn_classifier(settings)) == 0
+
+    def test_knn_without_local_parser(self, mock_settings, tmp_path):
+        settings = mock_settings.model_copy(
+            update={"db_path": tmp_path / "h.db", "knn_parser": True}
+        )
+        parser = build_pipeline(settings=settings)._parser
+        assert isinstance(parser, TieredParser)
+        assert parser._local is None
+        assert parser.knn is not None
+
+    def test_store_signs_checkpoints_with_key_beside_db(self, mock_settings, tmp_path):
+        settings = mock_settings.model_copy(
+            update={"db_path": tmp_path / "h.db", "audit_checkpoint_interval": 50}
+        )
+        pipeline = build_pipeline(settings=settings)
+        assert pipeline._store._signing_key_path == tmp_path / "audit.key"
+        assert pipeline._store._checkpoint_interval == 50
+        settings = settings.model_copy(
+            update={"audit_key_path": tmp_path / "keys" / "k"}
+        )
+        assert (
+            build_pipeline(settings=settings)._store._signing_key_path
+            == tmp_path / "keys" / "k"
+        )
+
+    def test_wires_context_caches(self, mock_settings):
+        settings = mock_settings.model_copy(
+            update={
+                "recent_cache_size": 8,
+                "lookup_cache_size": 16,
+                "context_cache_size": 0,
+            }
+        )
+        pipeline = build_pipeline(settings=settings)
+        assert pipeline._store._recent.capacity == 8
+        assert pipeline._store._lookups.capacity == 16
+        assert pipeline._context._cache_size == 0
+
+    def test_store_uses_output_settings(self, mock_settings):
+        settings = mock_settings.model_copy(
+            update={"output_max_bytes": 4096, "output_inline_bytes": 0}
+        )
+        pipeline = build_pipeline(settings=settings)
+        assert pipeline._store._output_max_bytes == 4096
+        assert pipeline._store._output_inline_bytes == 0
+
     def test_dry_run_propagated(self, mock_settings):
         pipeline = build_pipeline(dry_run=True, settings=mock_settings)
         assert pipeline._dry_run is True
@@ -67,3 +224,41 @@ class TestBuildPipeline:
         monkeypatch.setenv("AGENTIC_REQUIRE_CONFIRMATION", "false")
         pipeline = build_pipeline()
         assert isinstance(pipeline, Pipeline)
+
+
+class TestBuildRetentionPolicy:
+    def test_defaults_from_settings(self, mock_settings):
+        policy = build_retention_policy(settings=mock_settings)
+        assert policy.max_age_days is None
+        assert policy.max_db_bytes is None
+        assert policy.archive_dir == mock_settings.db_path.parent / "archive"
+        assert policy.batch_size == 500
+
+    def test_settings_values(self, mock_settings, tmp_path):
+        settings = mock_settings.model_copy(
+            update={
+                "retention_max_age_days": 90,
+                "retention_max_db_mb": 512,
+                "retention_archive_dir": tmp_path,
+                "retention_vacuum_pages": 64,
+            }
+        )
+        policy = build_retention_policy(settings=settings)
+        assert policy.max_age_days == 90
+        assert policy.max_db_bytes == 512 * 1024 * 1024
+        assert policy.archive_dir == tmp_path
+        assert policy.vacuum_pages == 64
+
+    def test_overrides_take_precedence(self, mock_settings):
+        settings = mock_settings.model_copy(update={"retention_max_age_days": 90})
+        policy = build_retention_policy(
+            settings=settings, max_age_days=7, max_db_mb=1, archive=False
+        )
+        assert policy.max_age_days == 7
+        assert policy.max_db_bytes == 1024 * 1024
+        assert policy.archive_dir is None
+
+    def test_loads_settings_when_not_given(self, monkeypatch):
+        monkeypatch.setenv("AGENTIC_OPENAI_API_KEY", "sk-test")
+        monkeypatch.setenv("AGENTIC_RETENTION_MAX_AGE_DAYS", "30")
+        assert build_retention_policy().max_age_days == 30
@@ -0,0 +1,125 @@
+"""Brutal tests for online audit database backups."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import sqlite3
+
+import pytest
+import pytest_asyncio
+
+from agentic.memory.models import RequestRecord
+from agentic.memory.store import MemoryStore
+
+
+def _request(request_id):
+    return RequestRecord(
+        id=request_id,
+        raw_query="restart nginx " * 20,
+        intent_type="NETWORK",
+        confidence=0.9,
+    )
+
+
+def _count(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+
+
+@pytest_asyncio.fixture
+async def file_store(tmp_path):
+    store = MemoryStore(tmp_path / "history.db")
+    await store.initialize()
+    for n in range(300):
+        await store.log_request(_request(f"r{n}"))
+    yield store
+    await store.close()
+
+
+class TestBackup:
+    @pytest.mark.asyncio
+    async def test_incremental_copy_is_a_standalone_database(
+        self, file_store, tmp_path
+    ):
+        seen = []
+        report = await file_store.backup(
+            tmp_path / "out" / "audit.db", pages=4, progress=lambda *p: seen.append(p)
+        )
+        await asyncio.sleep(0)
+        assert report.path == tmp_path / "out" / "audit.db"
+        assert not report.compressed
+        assert report.steps == len(seen) == -(-report.pages // 4)
+        assert seen[-1] == (0, report.pages)
+        assert report.bytes_written == report.path.stat().st_size
+        assert _count(report.path) == 300
+        with sqlite3.connect(report.path) as db:
+            assert db.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+            assert db.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        assert sorted(p.name for p in report.path.parent.iterdir()) == ["audit.db"]
+
+    @pytest.mark.asyncio
+    async def test_writes_continue_during_the_copy_and_miss_the_snapshot(
+        self, file_store, tmp_path
+    ):
+        written = 0
+        done = asyncio.Event()
+
+        async def writer():
+            nonlocal written
+            while not done.is_set():
+                await file_store.log_request(_request(f"w{written}"))
+                await file_store.flush()
+                written += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(writer())
+        try:
+            report = await file_store.backup(
+                tmp_path / "audit.db", pages=2, sleep=0.002
+            )
+        finally:
+            done.set()
+            await task
+        assert written > 0
+        # The snapshot is taken once: rows committed later are not copied
+        # and never force the copy to restart.
+        assert _count(report.path) < 300 + written
+        assert report.steps == -(-report.pages // 2)
+
+    @pytest.mark.asyncio
+    async def test_gz_target_is_compressed(self, file_store, tmp_path):
+        report = await file_store.backup(tmp_path / "audit.db.gz")
+        assert report.compressed
+        assert report.bytes_written == report.path.stat().st_size
+        restored = tmp_path / "restored.db"
+        restored.write_bytes(gzip.decompress(report.path.read_bytes()))
+        assert report.bytes_written < restored.stat().st_size
+        assert _count(restored) == 300
+        assert sorted(
+            p.name for p in tmp_path.iterdir() if p.name.startswith("audit")
+        ) == ["audit.db.gz"]
+
+    @pytest.mark.asyncio
+    async def test_failed_backup_leaves_nothing_behind(
+        self, file_store, tmp_path, monkeypatch
+    ):
+        def fail(source, target):
+            raise OSError("disk full")
+
+        monkeypatch.setattr("agentic.memory.store.compress_file", fail)
+        with pytest.raises(OSError, match="disk full"):
+            await file_store.backup(tmp_path / "audit.db.gz")
+        assert not [p for p in tmp_path.iterdir() if p.name.startswith("audit")]
+
+    @pytest.mark.asyncio
+    async def test_in_memory_store_includes_queued_records(self, temp_db, tmp_path):
+        await temp_db.log_request(_request("r1"))
+        report = await temp_db.backup(tmp_path / "audit.db", pages=1)
+        assert _count(report.path) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kwargs", [{"pages": 0}, {"sleep": -1}])
+    async def test_rejects_invalid_arguments(self, temp_db, tmp_path, kwargs):
+        with pytest.raises(ValueError):
+            await temp_db.backup(tmp_path / "audit.db", **kwargs)
@@ -0,0 +1,142 @@
+"""Brutal tests for compressed, content-addressed execution output."""
+
+from __future__ import annotations
+
+import hashlib
+import zlib
+
+import pytest
+
+from agentic.memory.blobs import CODEC_ZLIB, decode_blob, encode_blob, truncate_output
+from agentic.memory.models import ExecutionRecord
+from agentic.memory.store import MemoryStore
+
+APT_LOG = "".join(f"Setting up libfoo{i} (1.0-{i}) ...\n" for i in range(200))
+
+
+async def _blob_rows(store: MemoryStore) -> list[tuple]:
+    await store.flush()
+    cursor = await store._get_db().execute(
+        "SELECT hash, codec, size, length(data) FROM blobs"
+    )
+    return await cursor.fetchall()
+
+
+class TestBlobCodec:
+    def test_round_trip(self):
+        blob = encode_blob(APT_LOG)
+        assert blob.codec == CODEC_ZLIB
+        assert blob.size == len(APT_LOG.encode())
+        assert blob.hash == hashlib.sha256(APT_LOG.encode()).hexdigest()
+        assert len(blob.data) < blob.size // 4
+        assert decode_blob(blob.codec, blob.data) == APT_LOG
+
+    def test_identical_text_same_hash(self):
+        assert encode_blob("same").hash == encode_blob("same").hash
+        assert encode_blob("same").hash != encode_blob("other").hash
+
+    def test_unknown_codec_raises(self):
+        with pytest.raises(ValueError, match="codec"):
+            decode_blob("zstd", zlib.compress(b"x"))
+
+    def test_short_text_untouched(self):
+        assert truncate_output("ok", 64) == "ok"
+
+    def test_truncate_keeps_head_and_tail(self):
+        text = "A" * 100 + "B" * 100
+        out = truncate_output(text, 64)
+        assert out.startswith("A" * 32)
+        assert out.endswith("B" * 32)
+        assert "[136 bytes truncated]" in out
+
+    def test_truncate_never_splits_multibyte_characters(self):
+        out = truncate_output("é" * 100, 65)
+        out.encode()  # would raise on a lone surrogate
+        assert out.startswith("é" * 16)
+        assert out.endswith("é" * 16)
+
+
+class TestStoreBlobs:
+    def test_rejects_small_output_cap(self):
+        with pytest.raises(ValueError, match="output_max_bytes"):
+            MemoryStore(":memory:", output_max_bytes=10)
+
+    def test_rejects_negative_inline_threshold(self):
+        with pytest.raises(ValueError, match="output_inline_bytes"):
+            MemoryStore(":memory:", output_inline_bytes=-1)
+
+    @pytest.mark.asyncio
+    async def test_small_output_stays_inline(self, temp_db):
+        await temp_db.log_execution(
+            ExecutionRecord(id="e1", action_id="a1", success=True, output="ok")
+        )
+        assert await _blob_rows(temp_db) == []
+        cursor = await temp_db._get_db().execute(
+            "SELECT output, output_hash FROM execution_results"
+        )
+        assert await cursor.fetchone() == ("ok", None)
+        assert (await temp_db.get_execution("a1")).output == "ok"
+
+    @pytest.mark.asyncio
+    async def test_large_output_deduplicated_across_runs(self, temp_db):
+        for n in range(3):
+            await temp_db.log_execution(
+                ExecutionRecord(
+                    id=f"e{n}", action_id=f"a{n}", success=True, output=APT_LOG
+                )
+            )
+        rows = await _blob_rows(temp_db)
+        assert len(rows) == 1
+        assert rows[0][1] == CODEC_ZLIB
+        cursor = await temp_db._get_db().execute(
+            "SELECT DISTINCT output, output_hash FROM execution_results"
+        )
+        assert await cursor.fetchall() == [("", rows[0][0])]
+        for n in range(3):
+            assert (await temp_db.get_execution(f"a{n}")).output == APT_LOG
+
+    @pytest.mark.asyncio
+    async def test_error_text_uses_blobs_too(self, temp_db):
+        error = "E: Unable to locate package\n" * 40
+        await temp_db.log_execution(
+            ExecutionRecord(id="e1", action_id="a1", success=False, error=error)
+        )
+        result = await temp_db.get_execution("a1")
+        assert result.error == error
+        assert result.output == ""
+
+    @pytest.mark.asyncio
+    async def test_oversized_output_truncated(self):
+        store = MemoryStore(":memory:", output_max_bytes=1024)
+        await store.initialize()
+        await store.log_execution(
+            ExecutionRecord(id="e1", action_id="a1", success=True, output=APT_LOG)
+        )
+        output = (await store.get_execution("a1")).output
+        assert output.startswith("Setting up libfoo0 ")
+        assert output.endswith("Setting up libfoo199 (1.0-199) ...\n")
+        assert "bytes truncated" in output
+        assert len(output.encode()) < 1100
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_inline_threshold_zero_moves_everything(self):
+        store = MemoryStore(":memory:", output_inline_bytes=0)
+        await store.initialize()
+        await store.log_execution(
+            ExecutionRecord(id="e1", action_id="a1", success=True, output="ok")
+        )
+        assert len(await _blob_rows(store)) == 1  # empty error text stays inline
+        assert (await store.get_execution("a1")).output == "ok"
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_legacy_inline_rows_still_read(self, temp_db):
+        db = temp_db._get_db()
+        await db.execute(
+            "INSERT INTO execution_results (id, action_id, success, output, error, rolled_back, executed_at) "
+            "VALUES ('e1', 'a1', 1, ?, '', 0, '2024-01-01')",
+            (APT_LOG,),
+        )
+        await db.commit()
+        assert (await temp_db.get_execution("a1")).output == APT_LOG
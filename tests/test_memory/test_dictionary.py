@@ -0,0 +1,304 @@
+"""Brutal tests for dictionary-encoded audit strings."""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import aiosqlite
+import pytest
+
+from agentic.memory.dictionary import (
+    DICTIONARIES,
+    ENCODED_OPTION,
+    decode_references,
+    decoded,
+    find,
+    select_columns,
+)
+from agentic.memory.integrity import AuditVerifier
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.retention import RetentionManager, RetentionPolicy
+from agentic.memory.stats import AuditStats, DenialRow
+from agentic.memory.store import MemoryStore
+
+OLD = datetime(2024, 1, 10, tzinfo=timezone.utc)
+KEY = b"k" * 32
+
+
+async def _seed(
+    store,
+    request_id,
+    intent="NETWORK",
+    action_type="SYSTEMCTL_RESTART",
+    created_at=None,
+):
+    await store.log_request(
+        RequestRecord(
+            id=request_id,
+            raw_query=f"restart nginx {request_id}",
+            intent_type=intent,
+            confidence=0.9,
+            **({"created_at": created_at} if created_at else {}),
+        )
+    )
+    await store.log_action(
+        ActionRecord(
+            id=f"{request_id}-a",
+            request_id=request_id,
+            action_type=action_type,
+            description="Restart nginx",
+            command="systemctl restart nginx",
+            approved=True,
+        )
+    )
+    await store.log_policy_decision(
+        f"{request_id}-a", 2, True, reason="Action approved at MEDIUM risk."
+    )
+    await store.log_execution(
+        ExecutionRecord(id=f"{request_id}-e", action_id=f"{request_id}-a", success=True)
+    )
+
+
+async def _rows(store, sql):
+    await store.flush()
+    cursor = await store._get_db().execute(sql)
+    return await cursor.fetchall()
+
+
+async def _decode_legacy(store):
+    """Turn encoded rows back into rows as written before the dictionaries."""
+    db = store._get_db()
+    for d in DICTIONARIES:
+        await db.execute(
+            f"UPDATE {d.table} SET {d.column} = {decoded(d, d.table)}, {d.code} = NULL"
+        )
+    await db.execute("DELETE FROM schema_options WHERE name = ?", (ENCODED_OPTION,))
+    await db.commit()
+    await store._load_encoded()
+
+
+class TestSql:
+    def test_decode_references_rewrites_qualified_columns_only(self):
+        sql = decode_references(
+            "SELECT r.intent_type, a.action_type, intent_type FROM requests r"
+        )
+        assert (
+            "COALESCE((SELECT value FROM intent_types WHERE id = r.intent_type_id), r.intent_type)"
+            in sql
+        )
+        assert "(SELECT value FROM action_types WHERE id = a.action_type_id)" in sql
+        assert sql.endswith(", intent_type FROM requests r")
+
+    def test_select_columns_decodes_and_hides_codes(self):
+        sql = select_columns("requests", ["id", "intent_type", "intent_type_id"], "r")
+        assert (
+            sql
+            == f"r.id, {decoded(find('requests', 'intent_type'), 'r')} AS intent_type"
+        )
+        assert select_columns("blobs", ["hash"], "b") == "b.hash"
+
+
+class TestEncodedWrites:
+    @pytest.mark.asyncio
+    async def test_rows_hold_codes_and_read_back_as_strings(self, temp_db):
+        await _seed(temp_db, "r1")
+        await _seed(temp_db, "r2", intent="FOCUS")
+        assert await _rows(
+            temp_db, "SELECT intent_type, intent_type_id FROM requests ORDER BY rowid"
+        ) == [("", 1), ("", 2)]
+        assert await _rows(
+            temp_db, "SELECT action_type, action_type_id FROM actions"
+        ) == [("", 1), ("", 1)]
+        assert await _rows(
+            temp_db, "SELECT reason, reason_id FROM policy_decisions"
+        ) == [("", 1), ("", 1)]
+        assert await _rows(temp_db, "SELECT id, value FROM intent_types") == [
+            (1, "NETWORK"),
+            (2, "FOCUS"),
+        ]
+
+        assert (await temp_db.get_request("r2")).intent_type == "FOCUS"
+        assert (await temp_db.get_action("r1-a")).action_type == "SYSTEMCTL_RESTART"
+        assert [r.intent_type for r in await temp_db.get_recent_rows(2)] == [
+            "FOCUS",
+            "NETWORK",
+        ]
+        history = await temp_db.get_history(
+            intent_type="NETWORK", action_type="SYSTEMCTL_RESTART"
+        )
+        assert [
+            (h["request_id"], h["intent_type"], h["action_type"]) for h in history
+        ] == [("r1", "NETWORK", "SYSTEMCTL_RESTART")]
+        hits = await temp_db.search_text("systemctl")
+        assert {(h["intent_type"], h["action_type"]) for h in hits} == {
+            ("NETWORK", "SYSTEMCTL_RESTART"),
+            ("FOCUS", "SYSTEMCTL_RESTART"),
+        }
+
+    @pytest.mark.asyncio
+    async def test_type_filters_compare_codes_on_their_index(self, temp_db):
+        await _seed(temp_db, "r1")
+        await temp_db.flush()
+        assert temp_db._encoded
+        assert await temp_db.get_history(action_type="PKG_INSTALL") == []
+        clause, params = await temp_db._matches(
+            find("actions", "action_type"), "a", "SYSTEMCTL_RESTART"
+        )
+        assert (clause, params) == ("a.action_type_id = ?", (1,))
+        plan = await _rows(
+            temp_db,
+            f"EXPLAIN QUERY PLAN SELECT request_id FROM actions a WHERE {clause.replace('?', '1')}",
+        )
+        assert "idx_actions_action_type_id" in " ".join(r[-1] for r in plan)
+        indexes = await _rows(
+            temp_db,
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'actions'",
+        )
+        assert ("idx_actions_action_type",) not in indexes
+
+    @pytest.mark.asyncio
+    async def test_lookup_values_are_written_once_and_survive_a_failed_commit(
+        self, temp_db, monkeypatch
+    ):
+        await temp_db.log_policy_decision("a1", 2, False, reason="blocked")
+        db = temp_db._get_db()
+        monkeypatch.setattr(
+            db,
+            "commit",
+            AsyncMock(side_effect=sqlite3.OperationalError("disk I/O error")),
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            await temp_db.flush()
+        monkeypatch.undo()
+        await temp_db.log_policy_decision("a2", 2, False, reason="blocked")
+        assert await _rows(temp_db, "SELECT value FROM decision_reasons") == [
+            ("blocked",)
+        ]
+        assert await _rows(temp_db, "SELECT reason_id FROM policy_decisions") == [
+            (1,),
+            (1,),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_chain_and_aggregates_see_strings(self, temp_db):
+        await _seed(temp_db, "r1")
+        await temp_db.log_policy_decision(
+            "x", 4, False, reason="CRITICAL risk action blocked", gate="safety"
+        )
+        await temp_db.flush()
+        assert (await AuditVerifier(temp_db, KEY).verify()).ok
+        stats = AuditStats(temp_db)
+        assert {r.key for r in await stats.by("intent")} == {"NETWORK"}
+        assert {r.key for r in await stats.by("action_type")} == {"SYSTEMCTL_RESTART"}
+        assert await stats.denials() == [
+            DenialRow("safety", "CRITICAL risk action blocked", 1)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_database_shares_lookup_values_across_stores(self, tmp_path):
+        first = MemoryStore(tmp_path / "h.db")
+        await first.initialize()
+        await _seed(first, "r1")
+        await first.close()
+        second = MemoryStore(tmp_path / "h.db")
+        await second.initialize()
+        try:
+            await _seed(second, "r2")
+            assert await _rows(second, "SELECT COUNT(*) FROM intent_types") == [(1,)]
+            assert [r.intent_type for r in await second.get_recent_rows(2)] == [
+                "NETWORK",
+                "NETWORK",
+            ]
+        finally:
+            await second.close()
+
+
+class TestOnlineEncoding:
+    @pytest.mark.asyncio
+    async def test_legacy_rows_read_the_same_before_and_after(self, temp_db):
+        for n in range(5):
+            await _seed(temp_db, f"r{n}", intent="FOCUS" if n % 2 else "NETWORK")
+        await _rows(temp_db, "SELECT 1")
+        await _decode_legacy(temp_db)
+        await _seed(temp_db, "r5")
+        before = await temp_db.get_history(limit=10)
+        assert [
+            h["request_id"] for h in await temp_db.get_history(intent_type="FOCUS")
+        ] == ["r3", "r1"]
+
+        assert not temp_db._encoded
+        assert await temp_db.encode_dictionaries(batch_size=2) == 15
+        assert temp_db._encoded
+        assert await temp_db.get_history(limit=10) == before
+        assert [
+            h["request_id"] for h in await temp_db.get_history(intent_type="FOCUS")
+        ] == ["r3", "r1"]
+        legacy = await _rows(
+            temp_db,
+            "SELECT COUNT(*) FROM requests WHERE intent_type_id IS NULL OR intent_type != ''",
+        )
+        assert legacy == [(0,)]
+        assert (await AuditVerifier(temp_db, KEY).verify(full=True)).ok
+        assert await temp_db.encode_dictionaries() == 0
+
+    @pytest.mark.asyncio
+    async def test_rows_without_a_value_are_left_alone(self, temp_db):
+        await temp_db.log_policy_decision("a1", 2, True)
+        await _rows(temp_db, "SELECT 1")
+        db = temp_db._get_db()
+        await db.execute("UPDATE policy_decisions SET reason = NULL, reason_id = NULL")
+        await db.commit()
+        assert await temp_db.encode_dictionaries(batch_size=1) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_rolls_back(self, temp_db, monkeypatch):
+        await _seed(temp_db, "r1")
+        await _rows(temp_db, "SELECT 1")
+        await _decode_legacy(temp_db)
+        db = temp_db._get_db()
+        monkeypatch.setattr(
+            db,
+            "commit",
+            AsyncMock(side_effect=sqlite3.OperationalError("disk I/O error")),
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            await temp_db.encode_dictionaries()
+        monkeypatch.undo()
+        assert await _rows(
+            temp_db, "SELECT intent_type, intent_type_id FROM requests"
+        ) == [("NETWORK", None)]
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_batch_size(self, temp_db):
+        with pytest.raises(ValueError, match="batch_size"):
+            await temp_db.encode_dictionaries(batch_size=0)
+
+
+class TestArchives:
+    @pytest.mark.asyncio
+    async def test_archived_rows_hold_strings(self, tmp_path):
+        store = MemoryStore(tmp_path / "h.db")
+        await store.initialize()
+        try:
+            await _seed(store, "jan", created_at=OLD)
+            archive_dir = tmp_path / "archive"
+            await RetentionManager(
+                store, RetentionPolicy(max_age_days=30, archive_dir=archive_dir)
+            ).run()
+        finally:
+            await store.close()
+        async with aiosqlite.connect(archive_dir / "audit-2024-01.db") as archive:
+            cursor = await archive.execute(
+                "SELECT r.intent_type, r.intent_type_id, a.action_type, p.reason FROM requests r "
+                "JOIN actions a ON a.request_id = r.id JOIN policy_decisions p ON p.action_id = a.id"
+            )
+            assert await cursor.fetchall() == [
+                (
+                    "NETWORK",
+                    None,
+                    "SYSTEMCTL_RESTART",
+                    "Action approved at MEDIUM risk.",
+                )
+            ]
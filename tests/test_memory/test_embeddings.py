@@ -0,0 +1,209 @@
+"""Brutal tests for the offline embedder, vector index and similarity search."""
+
+from __future__ import annotations
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from agentic.memory.embeddings import HashingEmbedder, VectorIndex
+from agentic.memory.models import RequestRecord
+from agentic.memory.store import MemoryStore
+
+
+class TestHashingEmbedder:
+    def test_rejects_tiny_dim(self):
+        with pytest.raises(ValueError, match="dim"):
+            HashingEmbedder(dim=4)
+
+    def test_deterministic_and_normalised(self):
+        a = HashingEmbedder(dim=64).embed("restart nginx")
+        b = HashingEmbedder(dim=64).embed("restart nginx")
+        assert a.dtype == np.float32
+        assert a.shape == (64,)
+        assert np.array_equal(a, b)
+        assert np.linalg.norm(a) == pytest.approx(1.0)
+
+    def test_empty_text_is_zero_vector(self):
+        vec = HashingEmbedder().embed("  ?! ")
+        assert not vec.any()
+
+    def test_related_text_scores_higher(self):
+        e = HashingEmbedder()
+        q = e.embed("restart the nginx service")
+        assert q @ e.embed("please restart nginx") > q @ e.embed("free up some memory")
+
+    def test_quantize_round_trip_preserves_direction(self):
+        e = HashingEmbedder()
+        vec = e.embed("suspend spotify and slack")
+        blob = e.quantize(vec)
+        assert len(blob) == e.dim
+        restored = e.dequantize([blob])[0]
+        assert float(restored @ vec) > 0.99
+
+    def test_quantize_zero_vector(self):
+        e = HashingEmbedder(dim=16)
+        blob = e.quantize(np.zeros(16, dtype=np.float32))
+        assert blob == bytes(16)
+        assert not e.dequantize([blob]).any()
+
+
+class TestVectorIndex:
+    def _unit(self, *values):
+        v = np.array(values, dtype=np.float32)
+        return v / np.linalg.norm(v)
+
+    def test_empty_index_returns_nothing(self):
+        index = VectorIndex(dim=2)
+        assert len(index) == 0
+        assert index.search(self._unit(1, 0), 3) == []
+
+    def test_non_positive_k_returns_nothing(self):
+        index = VectorIndex(dim=2)
+        index.add(["a"], np.array([self._unit(1, 0)]))
+        assert index.search(self._unit(1, 0), 0) == []
+
+    def test_top_k_ordered_by_similarity(self):
+        index = VectorIndex(dim=2)
+        index.add(
+            ["x", "y", "xy"],
+            np.array([self._unit(1, 0), self._unit(0, 1), self._unit(1, 1)]),
+        )
+        hits = index.search(self._unit(1, 0.1), 2)
+        assert [h[0] for h in hits] == ["x", "xy"]
+        assert hits[0][1] > hits[1][1]
+
+    def test_k_larger_than_index_returns_all(self):
+        index = VectorIndex(dim=2)
+        index.add(["x", "y"], np.array([self._unit(1, 0), self._unit(0, 1)]))
+        assert len(index.search(self._unit(1, 0), 10)) == 2
+
+    def test_grows_past_initial_capacity(self):
+        index = VectorIndex(dim=2, capacity=1)
+        for i in range(5):
+            index.add([f"id{i}"], np.array([self._unit(1, i)]))
+        assert len(index) == 5
+        assert index.search(self._unit(1, 4), 1)[0][0] == "id4"
+
+
+def _req(request_id: str, query: str) -> RequestRecord:
+    return RequestRecord(
+        id=request_id, raw_query=query, intent_type="FOCUS", confidence=0.9
+    )
+
+
+class TestSearchSimilar:
+    @pytest.mark.asyncio
+    async def test_returns_relevant_history_first(self, temp_db):
+        await temp_db.log_request(_req("r1", "restart nginx"))
+        await temp_db.log_request(_req("r2", "free up memory"))
+        await temp_db.log_request(_req("r3", "upgrade all packages"))
+        results = await temp_db.search_similar("when did we restart nginx", limit=1)
+        assert [r.id for r in results] == ["r1"]
+
+    @pytest.mark.asyncio
+    async def test_embeddings_written_with_request(self, temp_db):
+        await temp_db.log_request(_req("r1", "restart nginx"))
+        await temp_db.flush()
+        db = temp_db._get_db()
+        cursor = await db.execute(
+            "SELECT request_id, text, length(embedding) FROM embeddings_cache"
+        )
+        assert await cursor.fetchall() == [("r1", "restart nginx", 128)]
+
+    @pytest.mark.asyncio
+    async def test_index_kept_in_sync_after_load(self, temp_db):
+        await temp_db.log_request(_req("r1", "restart nginx"))
+        assert len(await temp_db.search_similar("nginx")) == 1
+        await temp_db.log_request(_req("r2", "stop apache"))
+        results = await temp_db.search_similar("stop apache", limit=1)
+        assert results[0].id == "r2"
+        assert len(temp_db._index) == 2
+
+    @pytest.mark.asyncio
+    async def test_index_loaded_from_disk(self, tmp_path):
+        db_file = tmp_path / "audit.db"
+        store = MemoryStore(db_file)
+        await store.initialize()
+        await store.log_request(_req("r1", "restart nginx"))
+        await store.log_request(_req("r2", "clear caches"))
+        await store.close()
+
+        reopened = MemoryStore(db_file)
+        await reopened.initialize()
+        results = await reopened.search_similar("nginx restart", limit=1)
+        assert results[0].id == "r1"
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_searches_load_the_index_once(self, tmp_path):
+        store = MemoryStore(tmp_path / "audit.db")
+        await store.initialize()
+        await store.log_request(_req("r1", "restart nginx"))
+        await store.close()
+
+        reopened = MemoryStore(tmp_path / "audit.db")
+        await reopened.initialize()
+        try:
+            fetchall = reopened._fetchall
+            loads = []
+
+            async def counting(sql, params=()):
+                loads.append("embeddings_cache" in sql and "JOIN" not in sql)
+                return await fetchall(sql, params)
+
+            reopened._fetchall = counting
+            results = await asyncio.gather(
+                *(reopened.search_similar("nginx") for _ in range(5))
+            )
+            assert [[r.id for r in found] for found in results] == [["r1"]] * 5
+            assert loads.count(True) == 1
+        finally:
+            await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_requests_without_embeddings_are_backfilled(self, temp_db):
+        db = temp_db._get_db()
+        await db.execute(
+            "INSERT INTO requests (id, raw_query, intent_type, confidence, created_at) "
+            "VALUES ('old', 'restart nginx', 'FOCUS', 0.9, '2024-01-01T00:00:00+00:00')"
+        )
+        await db.commit()
+        results = await temp_db.search_similar("nginx", limit=1)
+        assert results[0].id == "old"
+        await temp_db.flush()
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM embeddings_cache WHERE request_id = 'old'"
+        )
+        assert (await cursor.fetchone())[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_embeddings_of_other_dim_are_recomputed(self, tmp_path):
+        db_file = tmp_path / "audit.db"
+        store = MemoryStore(db_file, embedder=HashingEmbedder(dim=32))
+        await store.initialize()
+        await store.log_request(_req("r1", "restart nginx"))
+        await store.close()
+
+        reopened = MemoryStore(db_file, embedder=HashingEmbedder(dim=64))
+        await reopened.initialize()
+        assert [r.id for r in await reopened.search_similar("nginx")] == ["r1"]
+        assert reopened._index.dim == 64
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_empty_store_returns_empty(self, temp_db):
+        assert await temp_db.search_similar("anything") == []
+
+    @pytest.mark.asyncio
+    async def test_vanished_requests_are_skipped(self, temp_db):
+        await temp_db.log_request(_req("r1", "restart nginx"))
+        await temp_db.log_request(_req("r2", "restart nginx now"))
+        await temp_db.flush()
+        db = temp_db._get_db()
+        await db.execute("DELETE FROM requests WHERE id = 'r1'")
+        await db.commit()
+        # The index still holds r1; only the recent-request buffer is dropped.
+        temp_db._recent.clear()
+        assert [r.id for r in await temp_db.search_similar("restart nginx")] == ["r2"]
@@ -0,0 +1,275 @@
+"""Brutal tests for the streaming, incremental audit exporter."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agentic.memory import export as export_module
+from agentic.memory.export import AuditExporter, ExportWatermark
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+LONG_OUTPUT = "Setting up nginx ...\n" * 100
+
+
+async def _seed(store, request_id, created_at, actions=1, output="ok"):
+    await store.log_request(
+        RequestRecord(
+            id=request_id,
+            raw_query=f"q {request_id}",
+            intent_type="FOCUS",
+            confidence=0.9,
+            created_at=created_at,
+        )
+    )
+    for n in range(actions):
+        action_id = f"{request_id}-a{n}"
+        await store.log_action(
+            ActionRecord(
+                id=action_id,
+                request_id=request_id,
+                action_type="KILL_PROCESS",
+                description="d",
+                approved=True,
+            )
+        )
+        await store.log_policy_decision(action_id, 2, True, reason="ok")
+        await store.log_execution(
+            ExecutionRecord(
+                id=f"{action_id}-e", action_id=action_id, success=True, output=output
+            )
+        )
+
+
+def _lines(path):
+    with gzip.open(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestAuditExporter:
+    def test_rejects_invalid_settings(self, temp_db):
+        with pytest.raises(ValueError, match="page_size"):
+            AuditExporter(temp_db, page_size=0)
+        with pytest.raises(ValueError, match="settle_seconds"):
+            AuditExporter(temp_db, settle_seconds=-1)
+
+    @pytest.mark.asyncio
+    async def test_rejects_unknown_format(self, temp_db, tmp_path):
+        with pytest.raises(ValueError, match="fmt"):
+            await AuditExporter(temp_db).export(tmp_path / "x.gz", fmt="parquet")
+
+    @pytest.mark.asyncio
+    async def test_jsonl_is_ordered_hierarchically(self, temp_db, tmp_path):
+        await _seed(temp_db, "r2", BASE + timedelta(hours=1), actions=2)
+        await _seed(temp_db, "r1", BASE, output=LONG_OUTPUT)
+        report = await AuditExporter(temp_db, page_size=1).export(
+            tmp_path / "out" / "a.jsonl.gz"
+        )
+
+        lines = _lines(report.path)
+        assert [
+            (row["table"], row.get("id"))
+            for row in lines
+            if row["table"] != "policy_decisions"
+        ] == [
+            ("requests", "r1"),
+            ("actions", "r1-a0"),
+            ("execution_results", "r1-a0-e"),
+            ("requests", "r2"),
+            ("actions", "r2-a0"),
+            ("execution_results", "r2-a0-e"),
+            ("actions", "r2-a1"),
+            ("execution_results", "r2-a1-e"),
+        ]
+        assert [row["table"] for row in lines[:4]] == [
+            "requests",
+            "actions",
+            "policy_decisions",
+            "execution_results",
+        ]
+        execution = lines[3]
+        assert execution["output"] == LONG_OUTPUT
+        assert "output_hash" not in execution and "_output_codec" not in execution
+        assert (
+            report.requests,
+            report.actions,
+            report.policy_decisions,
+            report.execution_results,
+        ) == (2, 3, 3, 3)
+        assert report.watermark == ExportWatermark(
+            (BASE + timedelta(hours=1)).isoformat(), "r2", 0, 3, 3
+        )
+        assert not (tmp_path / "out" / "a.jsonl.gz.part").exists()
+
+    @pytest.mark.asyncio
+    async def test_columnar_batches(self, temp_db, tmp_path):
+        for i in range(3):
+            await _seed(temp_db, f"r{i}", BASE + timedelta(minutes=i))
+        report = await AuditExporter(temp_db, page_size=2).export(
+            tmp_path / "c.gz", fmt="columnar"
+        )
+        batches = _lines(report.path)
+        assert [(b["table"], b["rows"]) for b in batches] == [
+            ("requests", 2),
+            ("actions", 2),
+            ("policy_decisions", 2),
+            ("execution_results", 2),
+            ("requests", 1),
+            ("actions", 1),
+            ("policy_decisions", 1),
+            ("execution_results", 1),
+        ]
+        assert batches[0]["columns"]["id"] == ["r0", "r1"]
+        assert batches[0]["columns"]["intent_type"] == ["FOCUS", "FOCUS"]
+
+    @pytest.mark.asyncio
+    async def test_incremental_resumes_after_watermark(self, temp_db, tmp_path):
+        exporter = AuditExporter(temp_db, page_size=2)
+        await _seed(temp_db, "r0", BASE)
+        await _seed(temp_db, "r1", BASE + timedelta(minutes=1))
+        first = await exporter.export(tmp_path / "1.gz")
+        assert first.requests == 2
+        assert await exporter.watermark() == first.watermark
+
+        await _seed(temp_db, "r2", BASE + timedelta(minutes=2))
+        second = await exporter.export(tmp_path / "2.gz")
+        assert [
+            row["id"] for row in _lines(second.path) if row["table"] == "requests"
+        ] == ["r2"]
+
+        empty = await exporter.export(tmp_path / "3.gz")
+        assert empty.requests == 0
+        assert _lines(empty.path) == []
+        assert await exporter.watermark() == second.watermark
+
+        full = await exporter.export(tmp_path / "4.gz", full=True)
+        assert full.requests == 3
+
+    @pytest.mark.asyncio
+    async def test_watermarks_are_per_name(self, temp_db, tmp_path):
+        await _seed(temp_db, "r0", BASE)
+        await AuditExporter(temp_db, name="siem").export(tmp_path / "a.gz")
+        assert (
+            await AuditExporter(temp_db, name="backup").export(tmp_path / "b.gz")
+        ).requests == 1
+        assert (
+            await AuditExporter(temp_db, name="never").watermark() == ExportWatermark()
+        )
+
+    @pytest.mark.asyncio
+    async def test_rows_inside_settle_window_wait(self, temp_db, tmp_path):
+        await _seed(temp_db, "old", BASE)
+        await _seed(temp_db, "fresh", datetime.now(timezone.utc))
+        exporter = AuditExporter(temp_db, settle_seconds=3600)
+        report = await exporter.export(tmp_path / "a.gz")
+        assert report.requests == 1
+        report = await AuditExporter(temp_db, settle_seconds=0).export(
+            tmp_path / "b.gz"
+        )
+        assert [
+            row["id"] for row in _lines(report.path) if row["table"] == "requests"
+        ] == ["fresh"]
+
+    @pytest.mark.asyncio
+    async def test_orphan_decisions_exported_once(self, temp_db, tmp_path):
+        await _seed(temp_db, "r0", BASE)
+        await temp_db.log_policy_decision("denied-1", 4, False, reason="blocked")
+        await temp_db.log_policy_decision("denied-2", 4, False, reason="blocked")
+        exporter = AuditExporter(temp_db, page_size=1, settle_seconds=0)
+        report = await exporter.export(tmp_path / "a.gz")
+        tail = _lines(report.path)[-2:]
+        assert [(row["table"], row["action_id"]) for row in tail] == [
+            ("policy_decisions", "denied-1"),
+            ("policy_decisions", "denied-2"),
+        ]
+        assert report.policy_decisions == 3
+        assert report.watermark.decision_id == tail[-1]["id"]
+        assert (await exporter.export(tmp_path / "b.gz")).policy_decisions == 0
+
+    @pytest.mark.asyncio
+    async def test_rows_added_to_exported_requests_follow_later(
+        self, temp_db, tmp_path
+    ):
+        await _seed(temp_db, "r0", BASE)
+        await _seed(temp_db, "r1", BASE + timedelta(minutes=1))
+        exporter = AuditExporter(temp_db, page_size=1, settle_seconds=0)
+        await exporter.export(tmp_path / "a.gz")
+
+        await temp_db.log_policy_decision("r0-a0", 3, True, reason="rollback")
+        await temp_db.log_execution(
+            ExecutionRecord(
+                id="r0-a0-rb", action_id="r0-a0", success=True, output=LONG_OUTPUT
+            )
+        )
+        await temp_db.log_execution(
+            ExecutionRecord(
+                id="r1-a0-rb", action_id="r1-a0", success=False, error="nope"
+            )
+        )
+        await _seed(temp_db, "r2", BASE + timedelta(minutes=2))
+        report = await exporter.export(tmp_path / "b.gz")
+        lines = _lines(report.path)
+        assert [(row["table"], row.get("action_id", row["id"])) for row in lines] == [
+            ("requests", "r2"),
+            ("actions", "r2-a0"),
+            ("policy_decisions", "r2-a0"),
+            ("execution_results", "r2-a0"),
+            ("policy_decisions", "r0-a0"),
+            ("execution_results", "r0-a0"),
+            ("execution_results", "r1-a0"),
+        ]
+        assert lines[-2]["output"] == LONG_OUTPUT and "_rowid" not in lines[-2]
+        assert (report.policy_decisions, report.execution_results) == (2, 3)
+        assert report.watermark.execution_rowid == 5
+        assert _lines((await exporter.export(tmp_path / "c.gz")).path) == []
+
+    @pytest.mark.asyncio
+    async def test_late_and_orphan_passes_do_not_scan_history(
+        self, temp_db, tmp_path, monkeypatch
+    ):
+        await _seed(temp_db, "r0", BASE)
+        exporter = AuditExporter(temp_db, settle_seconds=0)
+        await exporter.export(tmp_path / "a.gz")
+        statements = []
+        select = exporter._select
+
+        async def recording(sql, params):
+            statements.append((sql, params))
+            return await select(sql, params)
+
+        monkeypatch.setattr(exporter, "_select", recording)
+        await exporter.export(tmp_path / "b.gz")
+        plans = []
+        for sql, params in statements:
+            cursor = await temp_db._get_db().execute(
+                f"EXPLAIN QUERY PLAN {sql}", params
+            )
+            plans.append(" ".join(row[-1] for row in await cursor.fetchall()))
+        # One request page, then the late decisions, late executions and
+        # orphan passes, each probing actions/requests by primary key
+        # instead of materialising every exported action.
+        assert len(plans) == 4
+        for plan in plans:
+            assert "SCAN" not in plan
+            assert "LIST SUBQUERY" not in plan and "IN-OPERATOR" not in plan
+            assert "TEMP B-TREE" not in plan
+
+    @pytest.mark.asyncio
+    async def test_failed_export_keeps_watermark_and_removes_partial(
+        self, temp_db, tmp_path, monkeypatch
+    ):
+        await _seed(temp_db, "r0", BASE)
+
+        def boom(out, page):
+            raise OSError("disk full")
+
+        monkeypatch.setitem(export_module._WRITERS, "jsonl", boom)
+        exporter = AuditExporter(temp_db)
+        with pytest.raises(OSError):
+            await exporter.export(tmp_path / "a.gz")
+        assert list(tmp_path.iterdir()) == []
+        assert await exporter.watermark() == ExportWatermark()
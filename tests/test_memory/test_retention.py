@@ -0,0 +1,373 @@
+"""Brutal tests for audit retention: archiving, batched deletes and vacuum."""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+from agentic.memory import retention as retention_module
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.retention import (
+    RetentionManager,
+    RetentionPolicy,
+    _next_month,
+    archive_file,
+)
+from agentic.memory.store import MemoryStore
+
+OLD_JAN = datetime(2024, 1, 10, tzinfo=timezone.utc)
+OLD_FEB = datetime(2024, 2, 10, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def file_store(tmp_path):
+    store = MemoryStore(tmp_path / "history.db")
+    await store.initialize()
+    yield store
+    await store.close()
+
+
+async def _seed(
+    store: MemoryStore,
+    request_id: str,
+    created_at: datetime,
+    query: str = "restart nginx",
+    output: str = "ok",
+) -> None:
+    await store.log_request(
+        RequestRecord(
+            id=request_id,
+            raw_query=query,
+            intent_type="NETWORK",
+            confidence=0.9,
+            created_at=created_at,
+        )
+    )
+    action_id = f"{request_id}-act"
+    await store.log_action(
+        ActionRecord(
+            id=action_id,
+            request_id=request_id,
+            action_type="SYSTEMCTL_RESTART",
+            description=f"Restart for {request_id}",
+            command="systemctl restart nginx",
+            approved=True,
+        )
+    )
+    await store.log_policy_decision(action_id, 3, True)
+    await store.log_execution(
+        ExecutionRecord(
+            id=f"{request_id}-exec", action_id=action_id, success=True, output=output
+        )
+    )
+
+
+async def _count(store: MemoryStore, table: str) -> int:
+    await store.flush()
+    cursor = await store._get_db().execute(f"SELECT COUNT(*) FROM {table}")
+    return (await cursor.fetchone())[0]
+
+
+class TestRetentionPolicy:
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"max_age_days": -1},
+            {"max_db_bytes": -1},
+            {"batch_size": 0},
+            {"vacuum_pages": 0},
+        ],
+    )
+    def test_rejects_invalid_values(self, kwargs):
+        with pytest.raises(ValueError):
+            RetentionPolicy(**kwargs)
+
+    def test_next_month_rolls_over_year(self):
+        assert _next_month("2024-12").isoformat() == "2025-01-01T00:00:00+00:00"
+        assert _next_month("2024-02").isoformat() == "2024-03-01T00:00:00+00:00"
+
+    def test_archive_file_name(self, tmp_path):
+        assert archive_file(tmp_path, "2024-01") == tmp_path / "audit-2024-01.db"
+
+
+class TestAgePolicy:
+    @pytest.mark.asyncio
+    async def test_archives_old_months_and_keeps_recent(self, file_store, tmp_path):
+        await _seed(file_store, "jan", OLD_JAN)
+        await _seed(file_store, "feb", OLD_FEB)
+        await _seed(file_store, "now", datetime.now(timezone.utc), query="stop apache")
+        archive_dir = tmp_path / "archive"
+
+        report = await RetentionManager(
+            file_store, RetentionPolicy(max_age_days=30, archive_dir=archive_dir)
+        ).run()
+
+        assert report.requests_removed == 2
+        assert report.archive_files == (
+            archive_dir / "audit-2024-01.db",
+            archive_dir / "audit-2024-02.db",
+        )
+        assert [r.id for r in await file_store.get_recent_context()] == ["now"]
+        for table in (
+            "actions",
+            "policy_decisions",
+            "execution_results",
+            "embeddings_cache",
+        ):
+            assert await _count(file_store, table) == 1
+        assert {r["request_id"] for r in await file_store.search_text("nginx")} == {
+            "now"
+        }
+
+        db = file_store._get_db()
+        await db.execute(
+            "ATTACH DATABASE ? AS jan", (str(archive_dir / "audit-2024-01.db"),)
+        )
+        cursor = await db.execute(
+            "SELECT r.raw_query, a.command, e.output, p.risk_level FROM jan.requests r "
+            "JOIN jan.actions a ON a.request_id = r.id "
+            "JOIN jan.execution_results e ON e.action_id = a.id "
+            "JOIN jan.policy_decisions p ON p.action_id = a.id"
+        )
+        assert await cursor.fetchall() == [
+            ("restart nginx", "systemctl restart nginx", "ok", 3)
+        ]
+        await db.execute("DETACH DATABASE jan")
+
+    @pytest.mark.asyncio
+    async def test_blobs_archived_and_released_when_unreferenced(
+        self, file_store, tmp_path
+    ):
+        shared = "Setting up nginx ...\n" * 50
+        await _seed(file_store, "jan", OLD_JAN, output=shared)
+        await _seed(
+            file_store, "jan-own", OLD_JAN, output="Unpacking apache2 ...\n" * 50
+        )
+        await _seed(file_store, "now", datetime.now(timezone.utc), output=shared)
+        archive_dir = tmp_path / "archive"
+
+        await RetentionManager(
+            file_store, RetentionPolicy(max_age_days=30, archive_dir=archive_dir)
+        ).run()
+
+        # The blob still used by the live row survives; the other one leaves.
+        assert await _count(file_store, "blobs") == 1
+        assert (await file_store.get_execution("now-act")).output == shared
+        db = file_store._get_db()
+        await db.execute(
+            "ATTACH DATABASE ? AS jan", (str(archive_dir / "audit-2024-01.db"),)
+        )
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM jan.execution_results e JOIN jan.blobs b ON b.hash = e.output_hash"
+        )
+        assert (await cursor.fetchone())[0] == 2
+        await db.execute("DETACH DATABASE jan")
+
+    @pytest.mark.asyncio
+    async def test_delete_without_archive(self, file_store, tmp_path):
+        await _seed(file_store, "jan", OLD_JAN)
+        report = await RetentionManager(
+            file_store, RetentionPolicy(max_age_days=30)
+        ).run()
+        assert report.requests_removed == 1
+        assert report.archive_files == ()
+        assert await _count(file_store, "requests") == 0
+        assert not (tmp_path / "archive").exists()
+
+    @pytest.mark.asyncio
+    async def test_deletes_in_bounded_batches(self, file_store, monkeypatch):
+        for i in range(5):
+            await _seed(file_store, f"r{i}", OLD_JAN + timedelta(hours=i))
+        manager = RetentionManager(
+            file_store, RetentionPolicy(max_age_days=30, batch_size=2)
+        )
+        batch = manager._request_batch
+        sizes: list[int] = []
+
+        async def spy(cutoff, archives):
+            n = await batch(cutoff, archives)
+            sizes.append(n)
+            return n
+
+        monkeypatch.setattr(manager, "_request_batch", spy)
+        report = await manager.run()
+        assert report.requests_removed == 5
+        assert sizes == [2, 2, 1, 0]
+
+    @pytest.mark.asyncio
+    async def test_similarity_index_reset_after_prune(self, file_store):
+        await _seed(file_store, "jan", OLD_JAN)
+        assert len(await file_store.search_similar("nginx")) == 1
+        await RetentionManager(file_store, RetentionPolicy(max_age_days=30)).run()
+        assert file_store._index is None
+        assert await file_store.search_similar("nginx") == []
+
+    @pytest.mark.asyncio
+    async def test_orphaned_decisions_age_out(self, file_store, tmp_path):
+        await file_store.log_policy_decision("denied-act", 5, False, reason="Blocked")
+        await file_store.flush()
+        db = file_store._get_db()
+        await db.execute(
+            "UPDATE policy_decisions SET created_at = ?", (OLD_JAN.isoformat(),)
+        )
+        await db.commit()
+        await file_store.log_policy_decision("fresh-denied", 5, False)
+
+        report = await RetentionManager(
+            file_store,
+            RetentionPolicy(max_age_days=30, archive_dir=tmp_path / "archive"),
+        ).run()
+        assert report.decisions_removed == 1
+        assert await _count(file_store, "policy_decisions") == 1
+        async with aiosqlite.connect(
+            tmp_path / "archive" / "audit-2024-01.db"
+        ) as archive:
+            cursor = await archive.execute(
+                "SELECT action_id, reason FROM policy_decisions"
+            )
+            assert await cursor.fetchall() == [("denied-act", "Blocked")]
+
+    @pytest.mark.asyncio
+    async def test_rerun_after_partial_copy_is_idempotent(self, file_store, tmp_path):
+        await _seed(file_store, "jan", OLD_JAN)
+        policy = RetentionPolicy(max_age_days=30, archive_dir=tmp_path / "archive")
+        path = archive_file(policy.archive_dir, "2024-01")
+        path.parent.mkdir()
+        async with aiosqlite.connect(path) as archive:
+            await archive.execute(
+                "CREATE TABLE requests (id TEXT PRIMARY KEY, raw_query TEXT NOT NULL, "
+                "intent_type TEXT NOT NULL, confidence REAL NOT NULL)"
+            )
+            await archive.execute(
+                "INSERT INTO requests VALUES ('jan', 'restart nginx', 'NETWORK', 0.9)"
+            )
+            await archive.commit()
+
+        report = await RetentionManager(file_store, policy).run()
+        assert report.requests_removed == 1
+        async with aiosqlite.connect(path) as archive:
+            cursor = await archive.execute("SELECT COUNT(*) FROM requests")
+            assert (await cursor.fetchone())[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_rolls_back_and_detaches(
+        self, file_store, tmp_path, monkeypatch
+    ):
+        await _seed(file_store, "jan", OLD_JAN)
+        monkeypatch.setattr(
+            retention_module,
+            "_copy_rows",
+            AsyncMock(side_effect=sqlite3.OperationalError("disk full")),
+        )
+        manager = RetentionManager(
+            file_store,
+            RetentionPolicy(max_age_days=30, archive_dir=tmp_path / "archive"),
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            await manager.run()
+        assert await _count(file_store, "requests") == 1
+        cursor = await file_store._get_db().execute("PRAGMA database_list")
+        assert "archive" not in [r[1] for r in await cursor.fetchall()]
+
+
+class TestSizePolicy:
+    @pytest.mark.asyncio
+    async def test_prunes_oldest_months_until_under_limit(self, file_store):
+        await _seed(file_store, "jan", OLD_JAN)
+        await _seed(file_store, "feb", OLD_FEB)
+        await file_store.log_policy_decision("orphan", 5, False)
+        manager = RetentionManager(file_store, RetentionPolicy(max_db_bytes=0))
+        assert await manager.used_bytes() > 0
+
+        report = await manager.run()
+        assert report.requests_removed == 2
+        assert report.decisions_removed == 1
+        assert await _count(file_store, "requests") == 0
+        assert await _count(file_store, "policy_decisions") == 0
+
+    @pytest.mark.asyncio
+    async def test_under_limit_prunes_nothing(self, file_store):
+        await _seed(file_store, "jan", OLD_JAN)
+        report = await RetentionManager(
+            file_store, RetentionPolicy(max_db_bytes=1 << 40)
+        ).run()
+        assert report.requests_removed == 0
+        assert await _count(file_store, "requests") == 1
+
+
+class TestVacuum:
+    @pytest.mark.asyncio
+    async def test_releases_free_pages_in_steps(self, file_store):
+        for i in range(200):
+            await _seed(file_store, f"r{i}", OLD_JAN, query="x" * 2000)
+        await file_store.flush()
+        manager = RetentionManager(
+            file_store, RetentionPolicy(max_age_days=30, vacuum_pages=8)
+        )
+        before = (
+            await (await file_store._get_db().execute("PRAGMA page_count")).fetchone()
+        )[0]
+        await manager.run()
+        assert await manager.vacuumed() > 8
+        after = (
+            await (await file_store._get_db().execute("PRAGMA page_count")).fetchone()
+        )[0]
+        assert after < before
+        assert await manager.vacuum() == 0
+
+    @pytest.mark.asyncio
+    async def test_runs_in_the_background_between_writes(self, file_store):
+        for i in range(200):
+            await _seed(file_store, f"r{i}", OLD_JAN, query="x" * 2000)
+        await file_store.flush()
+        manager = RetentionManager(
+            file_store, RetentionPolicy(max_age_days=30, vacuum_pages=8)
+        )
+        await manager.run()
+        # The prune returned before the free pages were released; a write
+        # logged now commits between vacuum steps.
+        assert (
+            await (
+                await file_store._get_db().execute("PRAGMA freelist_count")
+            ).fetchone()
+        )[0] > 8
+        await _seed(file_store, "during", datetime.now(timezone.utc))
+        await file_store.flush()
+        pages = await manager.vacuumed()
+        assert pages > 8
+        assert (
+            await (
+                await file_store._get_db().execute("PRAGMA freelist_count")
+            ).fetchone()
+        )[0] < 8
+        assert await _count(file_store, "requests") == 1
+
+    @pytest.mark.asyncio
+    async def test_a_running_vacuum_is_not_started_twice(self, file_store):
+        manager = RetentionManager(file_store, RetentionPolicy())
+        await manager.run()
+        task = manager._vacuum_task
+        await manager.run()
+        assert manager._vacuum_task is task
+        await manager.vacuumed()
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_wait_for_before_a_run(self, file_store):
+        assert await RetentionManager(file_store, RetentionPolicy()).vacuumed() == 0
+
+    @pytest.mark.asyncio
+    async def test_skipped_without_incremental_auto_vacuum(self, tmp_path):
+        path = tmp_path / "legacy.db"
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE filler (x)")
+        conn.commit()
+        conn.close()
+        store = MemoryStore(path)
+        await store.initialize()
+        assert await RetentionManager(store, RetentionPolicy()).vacuum() == 0
+        await store.close()
@@ -0,0 +1,171 @@
+"""Brutal tests for lightweight audit rows and the store's bulk read paths."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.rows import ActionRow, ExecutionRow, RequestRow
+
+TS = "2024-03-01T12:00:00+00:00"
+
+
+class TestRows:
+    def test_rows_have_no_instance_dict(self):
+        for row in (
+            RequestRow("r", "q", "FOCUS", 0.9, TS),
+            ActionRow("a", "r", "KILL_PROCESS", "d", "c", 2, 1),
+            ExecutionRow("e", "a", 1, "out", "", 0, TS),
+        ):
+            assert not hasattr(row, "__dict__")
+
+    def test_request_timestamp_decoded_lazily_once(self):
+        row = RequestRow("r", "q", "FOCUS", 0.9, TS)
+        assert row._created_at is None
+        first = row.created_at
+        assert first == datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+        assert row.created_at is first
+
+    def test_request_to_record(self):
+        record = RequestRow("r", "q", "FOCUS", 0.9, TS).to_record()
+        assert isinstance(record, RequestRecord)
+        assert record == RequestRecord(
+            id="r",
+            raw_query="q",
+            intent_type="FOCUS",
+            confidence=0.9,
+            created_at=datetime(2024, 3, 1, 12, tzinfo=timezone.utc),
+        )
+
+    def test_action_flags_are_bool(self):
+        row = ActionRow("a", "r", "KILL_PROCESS", "d", "c", 2, 0)
+        assert row.approved is False
+        assert row.to_record() == ActionRecord(
+            id="a",
+            request_id="r",
+            action_type="KILL_PROCESS",
+            description="d",
+            command="c",
+            risk_level=2,
+            approved=False,
+        )
+
+    def test_action_parameters_decoded_lazily_once(self):
+        row = ActionRow(
+            "a",
+            "r",
+            "SYSTEMCTL_STOP",
+            "d",
+            "c",
+            2,
+            1,
+            "nginx",
+            '{"unit": "nginx"}',
+            "",
+            "FULL",
+        )
+        assert row._parameters is None
+        assert row.parameters == {"unit": "nginx"}
+        assert row.parameters is row.parameters
+        record = row.to_record()
+        assert (record.target, record.parameters, record.rollback_support) == (
+            "nginx",
+            {"unit": "nginx"},
+            "FULL",
+        )
+
+    def test_execution_row(self):
+        row = ExecutionRow("e", "a", 0, "out", "err", 1, TS)
+        assert row.success is False and row.rolled_back is True
+        assert row.executed_at.year == 2024
+        assert row.executed_at is row.executed_at
+        assert row.to_record() == ExecutionRecord(
+            id="e",
+            action_id="a",
+            success=False,
+            output="out",
+            error="err",
+            rolled_back=True,
+            executed_at=datetime(2024, 3, 1, 12, tzinfo=timezone.utc),
+        )
+
+
+class TestStoreRowReads:
+    async def _seed(self, store, n):
+        for i in range(n):
+            await store.log_request(
+                RequestRecord(
+                    id=f"req-{i:02d}",
+                    raw_query=f"q{i}",
+                    intent_type="FOCUS",
+                    confidence=0.5,
+                    created_at=datetime(2024, 1, 1 + i // 2, tzinfo=timezone.utc),
+                )
+            )
+
+    @pytest.mark.asyncio
+    async def test_recent_rows_match_records(self, temp_db):
+        await self._seed(temp_db, 4)
+        rows = await temp_db.get_recent_rows(limit=3)
+        assert [r.id for r in rows] == ["req-03", "req-02", "req-01"]
+        assert [r.to_record() for r in rows] == await temp_db.get_recent_context(
+            limit=3
+        )
+
+    @pytest.mark.asyncio
+    async def test_action_and_execution_rows(self, temp_db):
+        await temp_db.log_action(
+            ActionRecord(
+                id="a1",
+                request_id="r1",
+                action_type="KILL_PROCESS",
+                description="d",
+                approved=True,
+            )
+        )
+        await temp_db.log_execution(
+            ExecutionRecord(id="e1", action_id="a1", success=True, output="done")
+        )
+        [action] = await temp_db.get_action_rows("r1")
+        assert action.approved is True
+        execution = await temp_db.get_execution_row("a1")
+        assert execution.output == "done"
+        assert await temp_db.get_execution_row("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_scan_is_oldest_first_in_pages(self, temp_db):
+        await self._seed(temp_db, 7)
+        pages = [
+            [r.id for r in page]
+            async for page in temp_db.scan_request_rows(page_size=3)
+        ]
+        assert pages == [
+            ["req-00", "req-01", "req-02"],
+            ["req-03", "req-04", "req-05"],
+            ["req-06"],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_scan_exact_multiple_of_page_size(self, temp_db):
+        await self._seed(temp_db, 4)
+        pages = [len(page) async for page in temp_db.scan_request_rows(page_size=2)]
+        assert pages == [2, 2]
+
+    @pytest.mark.asyncio
+    async def test_scan_after_is_exclusive(self, temp_db):
+        await self._seed(temp_db, 6)
+        pages = [
+            [r.id for r in page]
+            async for page in temp_db.scan_request_rows(
+                after=datetime(2024, 1, 2), page_size=1
+            )
+        ]
+        assert pages == [["req-04"], ["req-05"]]
+
+    @pytest.mark.asyncio
+    async def test_scan_rejects_bad_page_size(self, temp_db):
+        with pytest.raises(ValueError, match="page_size"):
+            async for _ in temp_db.scan_request_rows(page_size=0):
+                pass
@@ -0,0 +1,348 @@
+"""Brutal tests for time-sharded audit databases."""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.shards import ShardedMemoryStore, shard_bounds, shard_key
+from agentic.memory.store import MemoryStore
+from agentic.models.action import ActionPlan
+
+NOW = datetime.now(timezone.utc)
+DAY1 = datetime(2025, 1, 10, 23, 59, tzinfo=timezone.utc)
+DAY2 = datetime(2025, 1, 11, 0, 1, tzinfo=timezone.utc)
+
+
+def _uuid7(ts):
+    """A UUIDv7 hex ID created at ``ts``."""
+    return f"{int(ts.timestamp() * 1000) << 80 | 0x7 << 76 | 0b10 << 62:032x}"
+
+
+def _request(request_id, created_at, query="restart nginx"):
+    return RequestRecord(
+        id=request_id,
+        raw_query=query,
+        intent_type="SERVICE",
+        confidence=0.9,
+        created_at=created_at,
+    )
+
+
+def _action(action_id, request_id, description="restart the web server"):
+    return ActionRecord(
+        id=action_id,
+        request_id=request_id,
+        action_type="SYSTEMCTL_RESTART",
+        description=description,
+        approved=True,
+        rollback_command="systemctl start nginx",
+    )
+
+
+@pytest_asyncio.fixture
+async def shards(tmp_path):
+    store = ShardedMemoryStore(tmp_path / "shards")
+    await store.initialize()
+    yield store
+    await store.close()
+
+
+async def _log(store, request_id, created_at, **kwargs):
+    await store.log_request(_request(request_id, created_at, **kwargs))
+    await store.log_action(_action(f"{request_id}-a", request_id))
+
+
+class TestKeys:
+    def test_day_and_iso_week(self):
+        assert shard_key(DAY1, "day") == "2025-01-10"
+        assert shard_key(DAY1.replace(tzinfo=None), "day") == "2025-01-10"
+        assert (
+            shard_key(datetime(2024, 12, 30, tzinfo=timezone.utc), "week") == "2025-W01"
+        )
+        assert shard_bounds("2025-01-10", "day") == (
+            datetime(2025, 1, 10, tzinfo=timezone.utc),
+            datetime(2025, 1, 11, tzinfo=timezone.utc),
+        )
+        start, end = shard_bounds("2025-W01", "week")
+        assert (start, end - start) == (
+            datetime(2024, 12, 30, tzinfo=timezone.utc),
+            timedelta(weeks=1),
+        )
+
+    @pytest.mark.parametrize("kwargs", [{"period": "month"}, {"open_shards": 0}])
+    def test_rejects_invalid_arguments(self, tmp_path, kwargs):
+        with pytest.raises(ValueError):
+            ShardedMemoryStore(tmp_path, **kwargs)
+
+
+class TestRouting:
+    @pytest.mark.asyncio
+    async def test_records_follow_their_request_across_a_day_boundary(self, shards):
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", DAY2)
+        await shards.log_plan(
+            "r1", ActionPlan(id="p1", intent_id="r1", reasoning="nginx is down")
+        )
+        await shards.log_execution(
+            ExecutionRecord(id="e1", action_id="r1-a", success=True)
+        )
+        await shards.log_policy_decision("r1-a", 2, True, reason="ok")
+        # Decisions are logged before their action: they follow the request.
+        await shards.log_policy_decision(
+            "r1-b", 2, False, reason="denied", request_id="r1"
+        )
+        await shards.flush()
+        assert shards.shard_keys() == ["2025-01-10", "2025-01-11"]
+        day1 = shards._open["2025-01-10"]
+        assert await day1._fetchall(
+            "SELECT action_id FROM policy_decisions ORDER BY id"
+        ) == [("r1-a",), ("r1-b",)]
+
+        assert (await shards.get_request("r1")).created_at == DAY1
+        assert [a.id for a in await shards.get_actions_for_request("r2")] == ["r2-a"]
+        assert (await shards.get_execution("r1-a")).id == "e1"
+        assert await shards.get_rollback_command("r1-a") == "systemctl start nginx"
+        assert [p.plan.reasoning for p in await shards.get_plans("r1")] == [
+            "nginx is down"
+        ]
+        assert shards.request_generation == 2
+
+    @pytest.mark.asyncio
+    async def test_lookups_survive_a_restart_and_closed_shards(self, tmp_path):
+        first = ShardedMemoryStore(tmp_path, open_shards=1)
+        await _log(first, "r1", DAY1)
+        await _log(first, "r2", DAY2)
+        assert list(first._open) == ["2025-01-11"]
+        await first.close()
+
+        again = ShardedMemoryStore(tmp_path, open_shards=1)
+        try:
+            assert (await again.get_action("r1-a")).request_id == "r1"
+            assert not again._open
+            await again.log_execution(
+                ExecutionRecord(id="e1", action_id="r1-a", success=True)
+            )
+            assert list(again._open) == ["2025-01-10"]
+            assert [e.id for e in await again.get_executions("r1-a")] == ["e1"]
+        finally:
+            await again.close()
+
+    @pytest.mark.asyncio
+    async def test_uuid7_ids_are_looked_up_in_their_own_shard_first(self, tmp_path):
+        store = ShardedMemoryStore(tmp_path)
+        request_id = _uuid7(DAY1)
+        await _log(store, request_id, DAY1)
+        await _log(store, "r2", DAY2)
+        await store.close()
+
+        again = ShardedMemoryStore(tmp_path)
+        assert again._candidates(request_id) == ["2025-01-10", "2025-01-11"]
+        assert again._candidates(_uuid7(NOW)) == ["2025-01-11", "2025-01-10"]
+        assert again._candidates("not-a-uuid") == ["2025-01-11", "2025-01-10"]
+        assert again._candidates(uuid.uuid4().hex) == ["2025-01-11", "2025-01-10"]
+        assert (await again.get_request(request_id)).id == request_id
+
+    @pytest.mark.asyncio
+    async def test_ids_are_located_across_more_shards_than_attach_at_once(
+        self, tmp_path
+    ):
+        store = ShardedMemoryStore(tmp_path)
+        for day in range(12):
+            await _log(store, f"r{day}", DAY1 - timedelta(days=day))
+        await store.close()
+
+        again = ShardedMemoryStore(tmp_path)
+        try:
+            assert (await again.get_request("r11")).created_at == DAY1 - timedelta(
+                days=11
+            )
+            assert again._attached == ["2024-12-31", "2024-12-30"]
+            assert [a.id for a in await again.get_actions_for_request("r0")] == ["r0-a"]
+            assert len(again._attached) == 10 and again._attached[0] == "2025-01-10"
+            assert await again.get_action("missing") is None
+            await again.drop_before(DAY1 - timedelta(days=10))
+            assert again._locator is None
+            assert await again.get_request("r11") is None
+        finally:
+            await again.close()
+
+    @pytest.mark.asyncio
+    async def test_stale_routes_fall_back_to_locating(self, shards):
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", DAY2)
+        await shards.flush()
+        shards._routes["r1"] = "2025-01-11"
+        shards._routes["r1-a"] = "2025-01-09"
+        assert (await shards.get_request("r1")).created_at == DAY1
+        assert (await shards.get_action("r1-a")).request_id == "r1"
+        assert shards._routes["r1-a"] == "2025-01-10"
+
+    @pytest.mark.asyncio
+    async def test_unknown_ids(self, shards):
+        await _log(shards, "r1", DAY1)
+        assert await shards.get_request("missing") is None
+        assert await shards.get_actions_for_request("missing") == []
+        assert await shards.get_execution("missing") is None
+        assert await shards.get_rollback_command("missing") is None
+        assert await shards.get_plans("missing") == []
+
+    @pytest.mark.asyncio
+    async def test_orphans_go_to_the_current_shard(self, shards):
+        await shards.log_action(_action("a1", "missing"))
+        assert shards.shard_keys() == [shard_key(NOW, "day")]
+
+    @pytest.mark.asyncio
+    async def test_routes_are_bounded(self, shards, monkeypatch):
+        monkeypatch.setattr("agentic.memory.shards._ROUTES", 2)
+        for n in range(3):
+            await shards.log_request(_request(f"r{n}", DAY1))
+        assert list(shards._routes) == ["r1", "r2"]
+
+
+class TestRangeReads:
+    @pytest.mark.asyncio
+    async def test_history_walks_shards_newest_first(self, shards):
+        await _log(shards, "old", DAY1 - timedelta(days=1))
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", DAY2)
+        assert [r["request_id"] for r in await shards.get_history(limit=2)] == [
+            "r2",
+            "r1",
+        ]
+        assert [r["request_id"] for r in await shards.get_history(limit=0)] == []
+        rows = [r async for r in shards.iter_history(after=DAY1 - timedelta(hours=1))]
+        assert [r["request_id"] for r in rows] == ["r2", "r1"]
+        rows = [r async for r in shards.iter_history(before=DAY2)]
+        assert [r["request_id"] for r in rows] == ["r1", "old"]
+        assert [r.id for r in await shards.get_recent_context(limit=2)] == ["r2", "r1"]
+        assert [r.id for r in await shards.get_recent_context()] == ["r2", "r1", "old"]
+
+    @pytest.mark.asyncio
+    async def test_scan_request_rows_walks_shards_oldest_first(self, shards):
+        await _log(shards, "old", DAY1 - timedelta(days=1))
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", DAY2)
+        pages = [[r.id for r in page] async for page in shards.scan_request_rows()]
+        assert pages == [["old"], ["r1"], ["r2"]]
+        pages = [
+            [r.id for r in page]
+            async for page in shards.scan_request_rows(after=DAY1 - timedelta(hours=1))
+        ]
+        assert pages == [["r1"], ["r2"]]
+
+    @pytest.mark.asyncio
+    async def test_search_text_merges_shards_by_score(self, shards):
+        await _log(shards, "r1", DAY1, query="nginx nginx nginx is down")
+        await _log(
+            shards,
+            "r2",
+            DAY2,
+            query="restart nginx and postgres after the long maintenance window",
+        )
+        await _log(shards, "r3", DAY2, query="disk full")
+        hits = await shards.search_text("nginx")
+        assert [h["request_id"] for h in hits] == ["r1", "r2"]
+        assert hits[0]["score"] >= hits[1]["score"]
+        assert len(await shards.search_text("nginx", limit=1)) == 1
+        midnight = DAY2 - timedelta(minutes=1)
+        assert [
+            h["request_id"] for h in await shards.search_text("nginx", after=midnight)
+        ] == ["r2"]
+        assert await shards.search_text("nginx", after=DAY2) == []
+
+    @pytest.mark.asyncio
+    async def test_similarity_search_covers_open_shards(self, shards):
+        await _log(shards, "old", DAY1 - timedelta(days=1))
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", DAY2)
+        assert [
+            r.id for r in await shards.search_similar("restart nginx", limit=1)
+        ] == ["r2"]
+        assert [r.id for r in await shards.search_similar("restart nginx")] == [
+            "r2",
+            "r1",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_search_similar_opens_recent_shards(self, shards, monkeypatch):
+        await _log(shards, "old", DAY1 - timedelta(days=1))
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", DAY2)
+        await shards.close()
+        # A new process starts with no shard open.
+        fresh = ShardedMemoryStore(shards.directory)
+        await fresh.initialize()
+        try:
+            opened = []
+            initialize = MemoryStore.initialize
+
+            async def counting(store):
+                opened.append(Path(store.db_path).name)
+                await initialize(store)
+
+            monkeypatch.setattr(MemoryStore, "initialize", counting)
+            found = await asyncio.gather(
+                *(fresh.search_similar("restart nginx") for _ in range(3))
+            )
+            assert [[r.id for r in records] for records in found] == [["r2", "r1"]] * 3
+            assert sorted(opened) == ["audit-2025-01-10.db", "audit-2025-01-11.db"]
+        finally:
+            await fresh.close()
+
+    def test_shard_store(self, shards):
+        with pytest.raises(ValueError, match="no day shard"):
+            shards.shard_store("2025-01-10")
+
+
+class TestDropBefore:
+    @pytest.mark.asyncio
+    async def test_deletes_whole_shards(self, shards):
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", DAY2)
+        await shards.log_request(_request("r3", DAY2 + timedelta(days=1)))
+        generation = shards.request_generation
+        removed = await shards.drop_before(
+            datetime(2025, 1, 12, 0, 0, tzinfo=timezone.utc)
+        )
+        assert [p.name for p in removed] == [
+            "audit-2025-01-10.db",
+            "audit-2025-01-11.db",
+        ]
+        assert not any(shards.directory.glob("audit-2025-01-1[01].db*"))
+        assert shards.request_generation == generation + 1
+        assert "r1" not in shards._routes and "r2" not in shards._open
+        assert await shards.get_request("r1") is None
+        assert (await shards.get_request("r3")).id == "r3"
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_drop(self, shards):
+        await _log(shards, "r1", DAY2)
+        assert await shards.drop_before(DAY2) == []
+        assert shards.request_generation == 1
+
+    @pytest.mark.asyncio
+    async def test_drop_everything(self, shards):
+        await _log(shards, "r1", DAY1)
+        await _log(shards, "r2", NOW)
+        assert len(await shards.drop_before(NOW + timedelta(days=1))) == 2
+        assert shards.shard_keys() == [] and not shards._open
+
+    @pytest.mark.asyncio
+    async def test_weekly_shards_ignore_daily_files(self, tmp_path):
+        daily = ShardedMemoryStore(tmp_path)
+        await _log(daily, "r1", DAY1)
+        await daily.close()
+        weekly = ShardedMemoryStore(tmp_path, period="week")
+        try:
+            await _log(weekly, "r2", DAY2)
+            assert weekly.shard_keys() == ["2025-W02"]
+            assert [r["request_id"] for r in await weekly.get_history()] == ["r2"]
+        finally:
+            await weekly.close()
@@ -0,0 +1,252 @@
+"""Brutal tests for the incrementally maintained audit aggregates."""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import aiosqlite
+import pytest
+
+from agentic.memory.aggregates import COUNTERS
+from agentic.memory.migrations import migrate
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.stats import AuditStats, DenialRow, StatsRow
+
+T0 = datetime(2024, 3, 1, 12, 15, tzinfo=timezone.utc)
+
+
+async def _run(
+    store,
+    request_id,
+    intent="NETWORK",
+    action_type="SYSTEMCTL_RESTART",
+    success=True,
+    created_at=T0,
+    latency=timedelta(seconds=2),
+    **execution,
+):
+    await store.log_request(
+        RequestRecord(
+            id=request_id,
+            raw_query="q",
+            intent_type=intent,
+            confidence=0.8,
+            created_at=created_at,
+        )
+    )
+    await store.log_policy_decision(
+        f"{request_id}-a",
+        2,
+        True,
+        reason="Action approved at MEDIUM risk.",
+        gate="safety",
+    )
+    await store.log_action(
+        ActionRecord(
+            id=f"{request_id}-a",
+            request_id=request_id,
+            action_type=action_type,
+            description="d",
+        )
+    )
+    await store.log_execution(
+        ExecutionRecord(
+            id=f"{request_id}-e",
+            action_id=f"{request_id}-a",
+            success=success,
+            executed_at=created_at + latency,
+            **execution,
+        )
+    )
+    await store.flush()
+
+
+class TestAggregates:
+    @pytest.mark.asyncio
+    async def test_empty_log(self, temp_db):
+        stats = AuditStats(temp_db)
+        assert await stats.total() == StatsRow("total", "")
+        assert await stats.by("intent") == []
+        assert await stats.denials() == []
+
+    @pytest.mark.asyncio
+    async def test_counts_follow_inserts(self, temp_db):
+        await _run(temp_db, "r1")
+        await _run(temp_db, "r2", success=False, latency=timedelta(seconds=4))
+        await _run(
+            temp_db,
+            "r3",
+            intent="FOCUS",
+            action_type="SUSPEND_PROCESS",
+            created_at=T0 + timedelta(hours=1),
+        )
+        await temp_db.log_policy_decision(
+            "x", 4, False, reason="CRITICAL risk action blocked", gate="safety"
+        )
+        await temp_db.log_policy_decision(
+            "y", 2, False, reason="Required capability missing", gate="capability"
+        )
+        await temp_db.log_policy_decision(
+            "z", 4, False, reason="CRITICAL risk action blocked", gate="safety"
+        )
+        await temp_db.flush()
+        stats = AuditStats(temp_db)
+
+        total = await stats.total()
+        assert (total.requests, total.actions, total.executions, total.failures) == (
+            3,
+            3,
+            3,
+            1,
+        )
+        assert (total.decisions_approved, total.decisions_denied) == (3, 3)
+        assert total.approval_rate == 0.5
+        assert total.mean_confidence == pytest.approx(0.8)
+        assert total.mean_latency_ms == pytest.approx((2000 + 4000 + 2000) / 3, abs=1)
+
+        by_type = {r.key: r for r in await stats.by("action_type")}
+        assert by_type["SYSTEMCTL_RESTART"].failure_rate == 0.5
+        assert by_type["SUSPEND_PROCESS"].failure_rate == 0.0
+        hours = [r.key for r in await stats.by("hour")]
+        assert hours == sorted(hours, reverse=True)
+        assert hours[-2:] == ["2024-03-01T13", "2024-03-01T12"]
+        assert {r.key: r.requests for r in await stats.by("intent")} == {
+            "NETWORK": 2,
+            "FOCUS": 1,
+        }
+        assert {r.key: r.decisions_denied for r in await stats.by("gate")} == {
+            "safety": 2,
+            "capability": 1,
+        }
+        assert await stats.denials() == [
+            DenialRow("safety", "CRITICAL risk action blocked", 2),
+            DenialRow("capability", "Required capability missing", 1),
+        ]
+        assert await stats.denials(gate="capability", limit=5) == [
+            DenialRow("capability", "Required capability missing", 1),
+        ]
+        assert len(await stats.by("intent", limit=1)) == 1
+
+    @pytest.mark.asyncio
+    async def test_rollbacks_counted_and_dry_runs_ignored(self, temp_db):
+        await _run(temp_db, "r1")
+        await _run(temp_db, "r2", dry_run=True)
+        await temp_db.log_execution(
+            ExecutionRecord(id="undo", action_id="r1-a", success=True, rolled_back=True)
+        )
+        await temp_db.flush()
+        total = await AuditStats(temp_db).total()
+        assert (total.executions, total.rollbacks, total.latency_count) == (1, 1, 1)
+        assert total.mean_latency_ms == pytest.approx(2000, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_execution_without_logged_action(self, temp_db):
+        await temp_db.log_execution(
+            ExecutionRecord(id="e", action_id="ghost", success=False)
+        )
+        await temp_db.flush()
+        stats = AuditStats(temp_db)
+        total = await stats.total()
+        assert (total.executions, total.failures, total.latency_count) == (1, 1, 0)
+        assert total.mean_latency_ms is None
+        assert await stats.by("action_type") == []
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_batch_is_counted_once_on_retry(
+        self, temp_db, monkeypatch
+    ):
+        await temp_db.log_request(
+            RequestRecord(id="r1", raw_query="q", intent_type="FOCUS", confidence=0.5)
+        )
+        db = temp_db._get_db()
+        monkeypatch.setattr(
+            db,
+            "commit",
+            AsyncMock(side_effect=sqlite3.OperationalError("disk I/O error")),
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            await temp_db.flush()
+        monkeypatch.undo()
+        cursor = await db.execute("SELECT * FROM audit_stats")
+        assert await cursor.fetchall() == []
+
+        await temp_db.flush()
+        assert (await AuditStats(temp_db).total()).requests == 1
+
+    @pytest.mark.asyncio
+    async def test_retention_does_not_rewind_counts(self, temp_db):
+        await _run(temp_db, "r1")
+        db = temp_db._get_db()
+        for table in ("execution_results", "policy_decisions", "actions", "requests"):
+            await db.execute(f"DELETE FROM {table}")
+        await db.commit()
+        assert (await AuditStats(temp_db).total()).requests == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_unknown_dimension(self, temp_db):
+        with pytest.raises(ValueError, match="dimension"):
+            await AuditStats(temp_db).by("weekday")
+
+    def test_derived_rates_are_none_without_samples(self):
+        row = StatsRow("total", "")
+        assert (
+            row.approval_rate,
+            row.failure_rate,
+            row.mean_confidence,
+            row.mean_latency_ms,
+        ) == (None,) * 4
+        assert set(row.to_dict()) >= {*COUNTERS, "approval_rate", "mean_latency_ms"}
+        assert DenialRow("g", "r", 1).to_dict() == {
+            "gate": "g",
+            "reason": "r",
+            "count": 1,
+        }
+
+
+class TestAggregateBackfill:
+    @pytest.mark.asyncio
+    async def test_migration_backfills_existing_rows(self):
+        async with aiosqlite.connect(":memory:") as db:
+            await migrate(db, target=10)
+            await db.executescript(
+                """
+                INSERT INTO requests (id, raw_query, intent_type, confidence, created_at) VALUES
+                    ('r1', 'q', 'NETWORK', 0.9, '2024-03-01T12:00:00+00:00'),
+                    ('r2', 'q', 'FOCUS', 0.5, '2024-03-01T13:00:00+00:00');
+                INSERT INTO actions (id, request_id, action_type, description) VALUES
+                    ('a1', 'r1', 'SYSTEMCTL_RESTART', 'd');
+                INSERT INTO policy_decisions (action_id, risk_level, approved, reason, created_at) VALUES
+                    ('a1', 2, 1, 'ok', '2024-03-01T12:00:00+00:00'),
+                    ('a2', 4, 0, 'blocked', NULL);
+                INSERT INTO execution_results (id, action_id, success, executed_at, dry_run) VALUES
+                    ('e1', 'a1', 0, '2024-03-01T12:00:01+00:00', 0),
+                    ('e2', 'a1', 1, '2024-03-01T12:00:01+00:00', 1);
+                """
+            )
+            await db.commit()
+            await migrate(db)
+            cursor = await db.execute(
+                f"SELECT dimension, key, {', '.join(COUNTERS)} FROM audit_stats WHERE dimension IN ('total', 'hour') "
+                "ORDER BY dimension, key"
+            )
+            rows = [StatsRow(*r) for r in await cursor.fetchall()]
+            cursor = await db.execute(
+                "SELECT gate, reason, count FROM audit_stats_denials"
+            )
+            denials = await cursor.fetchall()
+
+        by_key = {(r.dimension, r.key): r for r in rows}
+        total = by_key["total", ""]
+        assert (total.requests, total.actions, total.executions, total.failures) == (
+            2,
+            1,
+            1,
+            1,
+        )
+        assert (total.decisions_approved, total.decisions_denied) == (1, 1)
+        assert total.mean_latency_ms == pytest.approx(1000, abs=1)
+        assert by_key["hour", ""].decisions_denied == 1
+        assert by_key["hour", "2024-03-01T12"].actions == 1
+        assert denials == [("", "blocked", 1)]
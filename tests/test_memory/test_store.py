@@ -2,16 +2,30 @@
 
 from __future__ import annotations
 
+import asyncio
+import sqlite3
 import uuid
 from datetime import datetime, timezone
+from unittest.mock import AsyncMock
 
+import aiosqlite
 import pytest
 import pytest_asyncio
 
 from agentic.memory.context import ContextRetriever
-from agentic.memory.migrations import TABLES
+from agentic.memory.lookups import LookupCache
+from agentic.memory.migrations import (
+    LATEST_VERSION,
+    MIGRATIONS,
+    TABLES,
+    Migration,
+    get_schema_version,
+    migrate,
+)
 from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.recent import RecentRequests
 from agentic.memory.store import MemoryStore
+from agentic.models.intent import Entity
 
 
 class TestMemoryModels:
@@ -69,11 +83,150 @@ class TestMigrations:
             assert "CREATE TABLE IF NOT EXISTS" in sql
 
     def test_table_names(self):
-        expected = ["requests", "actions", "policy_decisions", "execution_results", "embeddings_cache"]
+        expected = [
+            "requests",
+            "actions",
+            "policy_decisions",
+            "execution_results",
+            "embeddings_cache",
+        ]
         for name in expected:
             found = any(name in sql for sql in TABLES)
             assert found, f"Table {name} not found in migrations"
 
+    def test_versions_strictly_ascending(self):
+        versions = [m.version for m in MIGRATIONS]
+        assert versions == sorted(set(versions))
+        assert versions[0] == 1
+        assert LATEST_VERSION == versions[-1]
+
+    @pytest.mark.asyncio
+    async def test_fresh_database_is_at_latest_version(self, temp_db):
+        db = temp_db._get_db()
+        assert await get_schema_version(db) == LATEST_VERSION
+        cursor = await db.execute("SELECT version FROM schema_version ORDER BY version")
+        assert [r[0] for r in await cursor.fetchall()] == [
+            m.version for m in MIGRATIONS
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("sql", "params", "index"),
+        [
+            (
+                "SELECT id FROM requests ORDER BY created_at DESC LIMIT ?",
+                (10,),
+                "idx_requests_created_at",
+            ),
+            (
+                "SELECT id FROM actions WHERE request_id = ?",
+                ("r",),
+                "idx_actions_request_id",
+            ),
+            (
+                "SELECT id FROM execution_results WHERE action_id = ?",
+                ("a",),
+                "idx_execution_results_action_id",
+            ),
+            (
+                "SELECT id FROM policy_decisions WHERE action_id = ?",
+                ("a",),
+                "idx_policy_decisions_action_id",
+            ),
+        ],
+    )
+    async def test_lookups_use_indexes(self, temp_db, sql, params, index):
+        db = temp_db._get_db()
+        cursor = await db.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = " ".join(r[-1] for r in await cursor.fetchall())
+        assert index in plan
+
+    @pytest.mark.asyncio
+    async def test_unversioned_database_is_adopted_and_upgraded(self, tmp_path):
+        db_file = tmp_path / "legacy.db"
+        async with aiosqlite.connect(db_file) as db:
+            for sql in TABLES:
+                await db.execute(sql)
+            await db.execute(
+                "INSERT INTO requests VALUES ('req-old', 'q', 'FOCUS', 0.9, '2025-01-01T00:00:00+00:00')"
+            )
+            await db.commit()
+
+        store = MemoryStore(db_file)
+        await store.initialize()
+        assert await get_schema_version(store._get_db()) == LATEST_VERSION
+        assert await store.get_request("req-old") is not None
+        assert not store._encoded  # req-old still holds its intent type as text
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_unversioned_database_keeps_iso_under_epoch_us(self, tmp_path):
+        db_file = tmp_path / "legacy.db"
+        async with aiosqlite.connect(db_file) as db:
+            for sql in TABLES:
+                await db.execute(sql)
+            await db.execute(
+                "INSERT INTO requests VALUES ('req-old', 'q', 'FOCUS', 0.9, '2025-01-01T00:00:00+00:00')"
+            )
+            await db.commit()
+
+        store = MemoryStore(db_file, timestamp_format="epoch_us")
+        await store.initialize()
+        try:
+            assert store.timestamp_format == "iso"
+            await store.log_request(
+                RequestRecord(
+                    id="req-new", raw_query="q", intent_type="FOCUS", confidence=0.9
+                )
+            )
+            await store.flush()
+            assert [h["request_id"] for h in await store.get_history(10)] == [
+                "req-new",
+                "req-old",
+            ]
+        finally:
+            await store.close()
+
+    @pytest.mark.asyncio
+    async def test_migrate_is_idempotent_and_honours_target(self):
+        async with aiosqlite.connect(":memory:") as db:
+            assert await migrate(db, target=1) == 1
+            assert await get_schema_version(db) == 1
+            assert await migrate(db) == LATEST_VERSION
+            assert await migrate(db) == LATEST_VERSION
+            cursor = await db.execute("SELECT COUNT(*) FROM schema_version")
+            assert (await cursor.fetchone())[0] == len(MIGRATIONS)
+
+    @pytest.mark.asyncio
+    async def test_newer_schema_is_refused(self):
+        async with aiosqlite.connect(":memory:") as db:
+            await migrate(db)
+            await db.execute(
+                "INSERT INTO schema_version VALUES (?, 'from the future', '2030-01-01')",
+                (LATEST_VERSION + 1,),
+            )
+            await db.commit()
+            with pytest.raises(RuntimeError, match="newer than supported"):
+                await migrate(db)
+
+    @pytest.mark.asyncio
+    async def test_failed_migration_rolls_back(self):
+        broken = MIGRATIONS + [
+            Migration(
+                LATEST_VERSION + 1,
+                "broken",
+                ("CREATE TABLE scratch (x INTEGER)", "NOT VALID SQL"),
+            )
+        ]
+        async with aiosqlite.connect(":memory:") as db:
+            with pytest.raises(sqlite3.OperationalError):
+                await migrate(db, migrations=broken)
+            assert await get_schema_version(db) == LATEST_VERSION
+            cursor = await db.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'scratch'"
+            )
+            assert await cursor.fetchone() is None
+
 
 class TestMemoryStore:
     @pytest.mark.asyncio
@@ -111,6 +264,35 @@ class TestMemoryStore:
         result = await temp_db.get_request("req-test-1")
         assert result is not None
         assert result.raw_query == "focus"
+        assert result.entities is None
+
+    @pytest.mark.asyncio
+    async def test_entities_round_trip(self, temp_db):
+        vlc = [Entity(name="process", value="vlc", source="vlc")]
+        await temp_db.log_request(
+            RequestRecord(
+                id="r1",
+                raw_query="suspend vlc",
+                intent_type="FOCUS",
+                confidence=0.9,
+                entities=vlc,
+            )
+        )
+        await temp_db.log_request(
+            RequestRecord(
+                id="r2",
+                raw_query="focus",
+                intent_type="FOCUS",
+                confidence=0.9,
+                entities=[],
+            )
+        )
+        await temp_db.flush()
+        temp_db._lookups.clear()
+        assert (await temp_db.get_request("r1")).entities == vlc
+        assert (await temp_db.get_request("r2")).entities == []
+        rows = [row async for page in temp_db.scan_request_rows() for row in page]
+        assert [row.entities for row in rows] == [vlc, []]
 
     @pytest.mark.asyncio
     async def test_get_request_not_found(self, temp_db):
@@ -120,7 +302,9 @@ class TestMemoryStore:
     @pytest.mark.asyncio
     async def test_log_and_retrieve_action(self, temp_db):
         # First log a request
-        req = RequestRecord(id="req-a", raw_query="test", intent_type="FOCUS", confidence=0.9)
+        req = RequestRecord(
+            id="req-a", raw_query="test", intent_type="FOCUS", confidence=0.9
+        )
         await temp_db.log_request(req)
 
         action = ActionRecord(
@@ -174,20 +358,27 @@ class TestMemoryStore:
         assert recent == []
 
     @pytest.mark.asyncio
-    async def test_search_similar_delegates_to_recent(self, temp_db):
+    async def test_search_similar_finds_logged_request(self, temp_db):
         await temp_db.log_request(
-            RequestRecord(id="req-s", raw_query="focus", intent_type="FOCUS", confidence=0.9)
+            RequestRecord(
+                id="req-s", raw_query="focus", intent_type="FOCUS", confidence=0.9
+            )
         )
         results = await temp_db.search_similar("focus", limit=5)
         assert len(results) == 1
 
     @pytest.mark.asyncio
     async def test_get_history(self, temp_db):
-        req = RequestRecord(id="req-h", raw_query="test", intent_type="UPDATE", confidence=0.8)
+        req = RequestRecord(
+            id="req-h", raw_query="test", intent_type="UPDATE", confidence=0.8
+        )
         await temp_db.log_request(req)
         action = ActionRecord(
-            id="act-h", request_id="req-h", action_type="APT_UPGRADE",
-            description="Upgrade", approved=True,
+            id="act-h",
+            request_id="req-h",
+            action_type="APT_UPGRADE",
+            description="Upgrade",
+            approved=True,
         )
         await temp_db.log_action(action)
         history = await temp_db.get_history(limit=10)
@@ -209,18 +400,21 @@ class TestMemoryStore:
             reason="Approved by gate",
         )
         # No direct retrieval method, but should not raise
+        await temp_db.flush()
         db = temp_db._get_db()
-        cursor = await db.execute("SELECT * FROM policy_decisions WHERE action_id = ?", ("act-pol",))
+        cursor = await db.execute(
+            "SELECT * FROM policy_decisions WHERE action_id = ?", ("act-pol",)
+        )
         row = await cursor.fetchone()
         assert row is not None
 
     @pytest.mark.asyncio
-    async def test_get_rollback_command_no_execution(self, temp_db):
+    async def test_get_rollback_command_unknown_action(self, temp_db):
         result = await temp_db.get_rollback_command("nonexistent")
         assert result is None
 
     @pytest.mark.asyncio
-    async def test_get_rollback_command_with_execution(self, temp_db):
+    async def test_get_rollback_command_without_action_row(self, temp_db):
         await temp_db.log_execution(
             ExecutionRecord(
                 id="exec-rb",
@@ -230,9 +424,79 @@ class TestMemoryStore:
             )
         )
         result = await temp_db.get_rollback_command("act-rb")
-        # Currently returns None (stub)
         assert result is None
 
+    async def _log_rollbackable(
+        self, store, rollback_command="apt-get remove -y htop", **execution
+    ):
+        await store.log_action(
+            ActionRecord(
+                id="act-rb",
+                request_id="req-rb",
+                action_type="APT_INSTALL",
+                description="Install htop",
+                command="apt-get install -y htop",
+                target="htop",
+                parameters={"package": "htop"},
+                rollback_command=rollback_command,
+                rollback_support="FULL",
+            )
+        )
+        await store.log_execution(
+            ExecutionRecord(id="exec-rb", action_id="act-rb", success=True, **execution)
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_rollback_command_after_execution(self, temp_db):
+        await self._log_rollbackable(temp_db)
+        assert await temp_db.get_rollback_command("act-rb") == "apt-get remove -y htop"
+
+    @pytest.mark.asyncio
+    async def test_get_rollback_command_after_rollback(self, temp_db):
+        await self._log_rollbackable(temp_db)
+        await temp_db.log_execution(
+            ExecutionRecord(
+                id="exec-undo", action_id="act-rb", success=True, rolled_back=True
+            )
+        )
+        assert await temp_db.get_rollback_command("act-rb") is None
+
+    @pytest.mark.asyncio
+    async def test_get_rollback_command_ignores_dry_runs_and_empty_commands(
+        self, temp_db
+    ):
+        await self._log_rollbackable(temp_db, dry_run=True)
+        assert await temp_db.get_rollback_command("act-rb") is None
+
+    @pytest.mark.asyncio
+    async def test_get_rollback_command_empty_command(self, temp_db):
+        await self._log_rollbackable(temp_db, rollback_command="")
+        assert await temp_db.get_rollback_command("act-rb") is None
+
+    @pytest.mark.asyncio
+    async def test_rollback_metadata_round_trips(self, temp_db):
+        await self._log_rollbackable(temp_db)
+        action = await temp_db.get_action("act-rb")
+        assert action.target == "htop"
+        assert action.parameters == {"package": "htop"}
+        assert action.rollback_command == "apt-get remove -y htop"
+        assert action.rollback_support == "FULL"
+        assert await temp_db.get_actions_for_request("req-rb") == [action]
+        assert await temp_db.get_action("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_get_executions_oldest_first(self, temp_db):
+        await self._log_rollbackable(temp_db)
+        await temp_db.log_execution(
+            ExecutionRecord(
+                id="exec-undo", action_id="act-rb", success=True, rolled_back=True
+            )
+        )
+        executions = await temp_db.get_executions("act-rb")
+        assert [e.id for e in executions] == ["exec-rb", "exec-undo"]
+        assert (await temp_db.get_execution("act-rb")).id == "exec-rb"
+        assert await temp_db.get_executions("missing") == []
+
     @pytest.mark.asyncio
     async def test_get_actions_for_request_empty(self, temp_db):
         actions = await temp_db.get_actions_for_request("nonexistent")
@@ -260,7 +524,9 @@ class TestContextRetriever:
     @pytest.mark.asyncio
     async def test_format_context_with_records(self, temp_db):
         await temp_db.log_request(
-            RequestRecord(id="req-fc", raw_query="focus now", intent_type="FOCUS", confidence=0.9)
+            RequestRecord(
+                id="req-fc", raw_query="focus now", intent_type="FOCUS", confidence=0.9
+            )
         )
         retriever = ContextRetriever(temp_db)
         result = await retriever.format_context("focus")
@@ -271,8 +537,889 @@ class TestContextRetriever:
     async def test_get_context_respects_limit(self, temp_db):
         for i in range(10):
             await temp_db.log_request(
-                RequestRecord(id=f"req-lim-{i}", raw_query=f"q{i}", intent_type="FOCUS", confidence=0.8)
+                RequestRecord(
+                    id=f"req-lim-{i}",
+                    raw_query=f"q{i}",
+                    intent_type="FOCUS",
+                    confidence=0.8,
+                )
             )
         retriever = ContextRetriever(temp_db)
         records = await retriever.get_context("test", limit=3)
         assert len(records) == 3
+
+    def test_rejects_negative_cache_size(self, temp_db):
+        with pytest.raises(ValueError, match="cache_size"):
+            ContextRetriever(temp_db, cache_size=-1)
+
+    @pytest.mark.asyncio
+    async def test_format_context_cached_until_next_write(self, temp_db):
+        await temp_db.log_request(
+            RequestRecord(
+                id="r1", raw_query="focus now", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        retriever = ContextRetriever(temp_db)
+        first = await retriever.format_context("focus")
+        temp_db.search_similar = AsyncMock(side_effect=AssertionError("not cached"))
+        assert await retriever.format_context("focus") is first
+
+        await temp_db.log_request(
+            RequestRecord(
+                id="r2", raw_query="focus more", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        del temp_db.search_similar
+        assert "focus more" in await retriever.format_context("focus")
+
+    @pytest.mark.asyncio
+    async def test_format_context_cache_is_bounded_lru(self, temp_db):
+        retriever = ContextRetriever(temp_db, cache_size=2)
+        for query in ("a", "b", "a", "c"):
+            await retriever.format_context(query)
+        assert list(retriever._cache) == [("a", 5), ("c", 5)]
+
+    @pytest.mark.asyncio
+    async def test_format_context_not_cached_across_concurrent_write(self, temp_db):
+        retriever = ContextRetriever(temp_db)
+        search = temp_db.search_similar
+
+        async def search_then_write(query, limit):
+            records = await search(query, limit=limit)
+            await temp_db.log_request(
+                RequestRecord(
+                    id="late", raw_query="late", intent_type="FOCUS", confidence=1.0
+                )
+            )
+            return records
+
+        temp_db.search_similar = search_then_write
+        await retriever.format_context("late")
+        assert retriever._cache == {}
+
+    @pytest.mark.asyncio
+    async def test_format_context_cache_disabled(self, temp_db):
+        retriever = ContextRetriever(temp_db, cache_size=0)
+        await retriever.format_context("x")
+        assert retriever._cache == {}
+
+
+class TestRecentRequests:
+    def _record(self, i, minute=None):
+        return RequestRecord(
+            id=f"r{i}",
+            raw_query=f"q{i}",
+            intent_type="FOCUS",
+            confidence=0.5,
+            created_at=datetime(
+                2024, 1, 1, 0, i if minute is None else minute, tzinfo=timezone.utc
+            ),
+        )
+
+    def test_rejects_negative_capacity(self):
+        with pytest.raises(ValueError, match="capacity"):
+            RecentRequests(-1)
+
+    def test_keeps_newest_in_order(self):
+        recent = RecentRequests(3)
+        recent.load([])
+        for i in (1, 2, 4, 3, 5, 0):
+            recent.add(self._record(i))
+        assert [r.id for r in recent.newest(3)] == ["r5", "r4", "r3"]
+        assert [r.id for r in recent.newest(2)] == ["r5", "r4"]
+        assert recent.get("r2") is None
+        assert recent.get("r5").raw_query == "q5"
+
+    def test_cannot_answer_unloaded_or_beyond_capacity(self):
+        recent = RecentRequests(2)
+        recent.add(self._record(1))
+        assert recent.newest(1) is None
+        recent.load([self._record(2), self._record(1)])
+        assert recent.newest(3) is None
+        recent.clear()
+        assert recent.newest(1) is None and recent.get("r1") is None
+
+    def test_zero_capacity_holds_nothing(self):
+        recent = RecentRequests(0)
+        recent.add(self._record(1))
+        assert recent.get("r1") is None
+
+
+class TestStoreRecentBuffer:
+    def test_rejects_negative_recent_cache_size(self):
+        with pytest.raises(ValueError, match="recent_cache_size"):
+            MemoryStore(":memory:", recent_cache_size=-1)
+
+    @pytest.mark.asyncio
+    async def test_recent_context_served_from_buffer_after_first_load(
+        self, temp_db, monkeypatch
+    ):
+        for i in range(3):
+            await temp_db.log_request(
+                RequestRecord(
+                    id=f"r{i}", raw_query="q", intent_type="FOCUS", confidence=0.5
+                )
+            )
+        first = await temp_db.get_recent_context(2)
+        monkeypatch.setattr(
+            temp_db,
+            "get_recent_rows",
+            AsyncMock(side_effect=AssertionError("hit the db")),
+        )
+        await temp_db.log_request(
+            RequestRecord(id="r3", raw_query="q", intent_type="FOCUS", confidence=0.5)
+        )
+        assert [r.id for r in await temp_db.get_recent_context(2)] == [
+            "r3",
+            first[0].id,
+        ]
+
+    @pytest.mark.asyncio
+    async def test_recent_context_beyond_buffer_reads_db(self):
+        store = MemoryStore(":memory:", recent_cache_size=1)
+        await store.initialize()
+        for i in range(3):
+            await store.log_request(
+                RequestRecord(
+                    id=f"r{i}", raw_query="q", intent_type="FOCUS", confidence=0.5
+                )
+            )
+        assert len(await store.get_recent_context(3)) == 3
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_buffer_not_loaded_across_concurrent_write(
+        self, temp_db, monkeypatch
+    ):
+        read = temp_db.get_recent_rows
+
+        async def read_then_write(limit):
+            rows = await read(limit)
+            await temp_db.log_request(
+                RequestRecord(
+                    id="late", raw_query="q", intent_type="FOCUS", confidence=0.5
+                )
+            )
+            return rows
+
+        monkeypatch.setattr(temp_db, "get_recent_rows", read_then_write)
+        assert await temp_db.get_recent_context(1) == []
+        assert temp_db._recent.loaded is False
+
+    @pytest.mark.asyncio
+    async def test_similarity_hits_resolved_from_buffer(self, temp_db, monkeypatch):
+        await temp_db.log_request(
+            RequestRecord(
+                id="r1",
+                raw_query="restart nginx",
+                intent_type="NETWORK",
+                confidence=0.5,
+            )
+        )
+        await temp_db.flush()
+        fetchall = AsyncMock(wraps=temp_db._fetchall)
+        monkeypatch.setattr(temp_db, "_fetchall", fetchall)
+        await temp_db._vector_index()
+        fetchall.reset_mock()
+        assert [r.id for r in await temp_db.search_similar("nginx")] == ["r1"]
+        fetchall.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def testforget_requests_drops_buffer_and_bumps_generation(self, temp_db):
+        await temp_db.log_request(
+            RequestRecord(id="r1", raw_query="q", intent_type="FOCUS", confidence=0.5)
+        )
+        generation = temp_db.request_generation
+        temp_db.forget_requests()
+        assert temp_db.request_generation == generation + 1
+        assert temp_db._recent.get("r1") is None
+        assert [r.id for r in await temp_db.search_similar("q")] == ["r1"]
+
+
+class TestLookupCache:
+    def test_lru_eviction_and_stats(self):
+        cache = LookupCache(2)
+        for n in range(3):
+            cache.put(("request", f"r{n}"), n, cache.generation)
+        assert cache.get(("request", "r0")) is None
+        assert cache.get(("request", "r1")) == 1
+        cache.put(("request", "r3"), 3, cache.generation)
+        assert (
+            cache.get(("request", "r1")) == 1 and cache.get(("request", "r2")) is None
+        )
+        stats = cache.stats
+        assert (stats.capacity, stats.size, stats.hits, stats.misses) == (2, 2, 2, 2)
+        assert stats.hit_rate == 0.5
+        assert LookupCache(0).stats.hit_rate == 0.0
+
+    def test_stale_generation_and_zero_capacity_are_not_cached(self):
+        cache = LookupCache(2)
+        generation = cache.generation
+        cache.invalidate(("request", "r1"))
+        cache.put(("request", "r1"), 1, generation)
+        assert cache.get(("request", "r1")) is None
+        disabled = LookupCache(0)
+        disabled.put(("request", "r1"), 1, disabled.generation)
+        assert disabled.stats.size == 0
+        with pytest.raises(ValueError, match="capacity"):
+            LookupCache(-1)
+
+
+class TestStoreLookupCache:
+    def test_rejects_negative_lookup_cache_size(self):
+        with pytest.raises(ValueError, match="lookup_cache_size"):
+            MemoryStore(":memory:", lookup_cache_size=-1)
+
+    @pytest.mark.asyncio
+    async def test_repeated_lookups_skip_the_database(self, temp_db, monkeypatch):
+        await temp_db.log_request(
+            RequestRecord(id="r1", raw_query="q", intent_type="FOCUS", confidence=0.5)
+        )
+        await temp_db.log_action(
+            ActionRecord(id="a1", request_id="r1", action_type="T", description="d")
+        )
+        await temp_db.log_execution(
+            ExecutionRecord(id="e1", action_id="a1", success=True)
+        )
+        first = (
+            await temp_db.get_request("r1"),
+            await temp_db.get_actions_for_request("r1"),
+            await temp_db.get_execution("a1"),
+        )
+        monkeypatch.setattr(
+            temp_db, "_fetchone", AsyncMock(side_effect=AssertionError("hit the db"))
+        )
+        monkeypatch.setattr(
+            temp_db, "_fetchall", AsyncMock(side_effect=AssertionError("hit the db"))
+        )
+        again = (
+            await temp_db.get_request("r1"),
+            await temp_db.get_actions_for_request("r1"),
+            await temp_db.get_execution("a1"),
+        )
+        assert again == first
+        again[1].clear()
+        assert len(await temp_db.get_actions_for_request("r1")) == 1
+        stats = temp_db.lookup_stats
+        assert (stats.hits, stats.misses, stats.size) == (4, 3, 3)
+
+    @pytest.mark.asyncio
+    async def test_misses_are_not_cached(self, temp_db):
+        assert await temp_db.get_request("r1") is None
+        assert await temp_db.get_actions_for_request("r1") == []
+        assert await temp_db.get_execution("a1") is None
+        assert temp_db.lookup_stats.size == 0
+        await temp_db.log_request(
+            RequestRecord(id="r1", raw_query="q", intent_type="FOCUS", confidence=0.5)
+        )
+        assert (await temp_db.get_request("r1")).id == "r1"
+
+    @pytest.mark.asyncio
+    async def test_own_writes_invalidate(self, temp_db):
+        await temp_db.log_action(
+            ActionRecord(id="a1", request_id="r1", action_type="T", description="d")
+        )
+        assert len(await temp_db.get_actions_for_request("r1")) == 1
+        await temp_db.log_action(
+            ActionRecord(id="a2", request_id="r1", action_type="T", description="d")
+        )
+        assert [a.id for a in await temp_db.get_actions_for_request("r1")] == [
+            "a1",
+            "a2",
+        ]
+        await temp_db.log_request(
+            RequestRecord(id="r1", raw_query="q", intent_type="FOCUS", confidence=0.5)
+        )
+        await temp_db.get_request("r1")
+        temp_db.forget_requests()
+        assert temp_db.lookup_stats.size == 0
+
+    @pytest.mark.asyncio
+    async def test_lookup_racing_a_write_is_not_cached(self, temp_db, monkeypatch):
+        await temp_db.log_action(
+            ActionRecord(id="a1", request_id="r1", action_type="T", description="d")
+        )
+        read = temp_db.get_action_rows
+
+        async def read_then_write(request_id):
+            rows = await read(request_id)
+            await temp_db.log_action(
+                ActionRecord(id="a2", request_id="r1", action_type="T", description="d")
+            )
+            return rows
+
+        monkeypatch.setattr(temp_db, "get_action_rows", read_then_write)
+        assert [a.id for a in await temp_db.get_actions_for_request("r1")] == ["a1"]
+        assert temp_db.lookup_stats.size == 0
+
+
+class TestWriteBehind:
+    def test_rejects_invalid_batch_size(self):
+        with pytest.raises(ValueError, match="batch_size"):
+            MemoryStore(":memory:", batch_size=0)
+
+    def test_rejects_negative_flush_interval(self):
+        with pytest.raises(ValueError, match="flush_interval"):
+            MemoryStore(":memory:", flush_interval=-1)
+
+    @pytest.mark.asyncio
+    async def test_log_is_queued_until_flush(self, temp_db):
+        await temp_db.log_request(
+            RequestRecord(
+                id="req-q", raw_query="q", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        db = temp_db._get_db()
+        cursor = await db.execute("SELECT COUNT(*) FROM requests")
+        assert (await cursor.fetchone())[0] == 0
+        # The request row plus its embedding row
+        assert temp_db.metrics.queue_depth == 2
+
+        await temp_db.flush()
+        cursor = await db.execute("SELECT COUNT(*) FROM requests")
+        assert (await cursor.fetchone())[0] == 1
+        assert temp_db.metrics.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_enqueue_requires_initialize(self):
+        store = MemoryStore(":memory:")
+        with pytest.raises(RuntimeError, match="not initialized"):
+            await store.log_policy_decision("act-x", 1, True)
+
+    @pytest.mark.asyncio
+    async def test_flush_groups_mixed_records_into_one_transaction(self, temp_db):
+        await temp_db.log_request(
+            RequestRecord(
+                id="req-g", raw_query="q", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        for i in range(2):
+            await temp_db.log_action(
+                ActionRecord(
+                    id=f"act-g{i}",
+                    request_id="req-g",
+                    action_type="SUSPEND_PROCESS",
+                    description="d",
+                )
+            )
+        await temp_db.log_policy_decision("act-g0", 2, True)
+        await temp_db.flush()
+
+        m = temp_db.metrics
+        assert m.batches_committed == 1
+        # 4 audit rows plus the request's embedding row
+        assert m.records_committed == 5
+        assert m.max_queue_depth == 5
+        assert m.last_commit_ms > 0
+        assert m.avg_commit_ms == m.total_commit_ms
+        assert len(await temp_db.get_actions_for_request("req-g")) == 2
+
+    @pytest.mark.asyncio
+    async def test_flush_empty_queue_is_noop(self, temp_db):
+        await temp_db.flush()
+        assert temp_db.metrics.batches_committed == 0
+        assert temp_db.metrics.avg_commit_ms == 0.0
+
+    @pytest.mark.asyncio
+    async def test_batch_size_triggers_commit(self):
+        store = MemoryStore(":memory:", batch_size=2, flush_interval=60)
+        await store.initialize()
+        for i in range(2):
+            await store.log_policy_decision(f"act-{i}", 1, True)
+        assert store.metrics.batches_committed == 1
+        assert store.metrics.queue_depth == 0
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_flush_interval_triggers_background_commit(self):
+        store = MemoryStore(":memory:", flush_interval=0.01)
+        await store.initialize()
+        await store.log_policy_decision("act-t", 1, True)
+        await asyncio.sleep(0.05)
+        assert store.metrics.queue_depth == 0
+        assert store.metrics.batches_committed == 1
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_commit_requeues_and_raises(self, temp_db, monkeypatch):
+        await temp_db.log_policy_decision("act-f", 1, True)
+        db = temp_db._get_db()
+        monkeypatch.setattr(
+            db,
+            "executemany",
+            AsyncMock(side_effect=sqlite3.OperationalError("disk I/O error")),
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            await temp_db.flush()
+        assert temp_db.metrics.queue_depth == 1
+        assert temp_db.metrics.batches_committed == 0
+
+        monkeypatch.undo()
+        await temp_db.flush()
+        assert temp_db.metrics.records_committed == 1
+
+    @pytest.mark.asyncio
+    async def test_background_failure_is_deferred_to_next_flush(self, monkeypatch):
+        store = MemoryStore(":memory:", flush_interval=0.01)
+        await store.initialize()
+        db = store._get_db()
+        monkeypatch.setattr(
+            db, "executemany", AsyncMock(side_effect=sqlite3.OperationalError("locked"))
+        )
+        await store.log_policy_decision("act-b", 1, True)
+        await asyncio.sleep(0.05)
+        assert store.metrics.queue_depth == 1
+        with pytest.raises(sqlite3.OperationalError):
+            await store.flush()
+        monkeypatch.undo()
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_records(self, tmp_path):
+        db_file = tmp_path / "audit.db"
+        store = MemoryStore(db_file, flush_interval=60)
+        await store.initialize()
+        await store.log_request(
+            RequestRecord(
+                id="req-c", raw_query="q", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        await store.close()
+
+        reopened = MemoryStore(db_file)
+        await reopened.initialize()
+        assert await reopened.get_request("req-c") is not None
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_close_releases_connection_when_flush_fails(self):
+        store = MemoryStore(":memory:")
+        await store.initialize()
+        db = store._db
+        store.flush = AsyncMock(side_effect=OSError("disk full"))
+        with pytest.raises(OSError):
+            await store.close()
+        assert store._db is None
+        with pytest.raises(ValueError):
+            await db.execute("SELECT 1")
+
+
+class TestConnectionTuning:
+    def test_rejects_unknown_synchronous_mode(self):
+        with pytest.raises(ValueError, match="synchronous"):
+            MemoryStore(":memory:", synchronous="SOMETIMES")
+
+    def test_rejects_negative_mmap_size(self):
+        with pytest.raises(ValueError, match="mmap_size"):
+            MemoryStore(":memory:", mmap_size=-1)
+
+    def test_rejects_negative_reader_pool_size(self):
+        with pytest.raises(ValueError, match="reader_pool_size"):
+            MemoryStore(":memory:", reader_pool_size=-1)
+
+    @pytest.mark.asyncio
+    async def test_file_store_uses_wal_and_pragmas(self, tmp_path):
+        store = MemoryStore(
+            tmp_path / "audit.db",
+            synchronous="full",
+            cache_size=-2000,
+            mmap_size=1 << 20,
+        )
+        await store.initialize()
+        db = store._get_db()
+        assert (await (await db.execute("PRAGMA journal_mode")).fetchone())[0] == "wal"
+        assert (await (await db.execute("PRAGMA synchronous")).fetchone())[0] == 2
+        assert (await (await db.execute("PRAGMA cache_size")).fetchone())[0] == -2000
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_memory_store_has_no_reader_pool(self, temp_db):
+        assert temp_db._readers is None
+
+    @pytest.mark.asyncio
+    async def test_reader_pool_size_zero_reads_through_writer(self, tmp_path):
+        store = MemoryStore(tmp_path / "audit.db", reader_pool_size=0)
+        await store.initialize()
+        assert store._readers is None
+        await store.log_request(
+            RequestRecord(
+                id="req-w", raw_query="q", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        assert await store.get_request("req-w") is not None
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_readers_are_read_only_and_returned_to_pool(self, tmp_path):
+        store = MemoryStore(tmp_path / "audit.db", reader_pool_size=3)
+        await store.initialize()
+        assert store._readers.qsize() == 3
+        reader = store._reader_conns[0]
+        with pytest.raises(sqlite3.OperationalError):
+            await reader.execute("DELETE FROM requests")
+
+        await store.log_request(
+            RequestRecord(
+                id="req-p", raw_query="q", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        assert len(await store.get_recent_context()) == 1
+        assert store._readers.qsize() == 3
+        await store.close()
+        assert store._reader_conns == []
+        assert store._readers is None
+
+    @pytest.mark.asyncio
+    async def test_history_not_blocked_by_open_write_transaction(self, tmp_path):
+        db_file = tmp_path / "audit.db"
+        writer = MemoryStore(db_file)
+        reader = MemoryStore(db_file)
+        await writer.initialize()
+        await reader.initialize()
+        await writer.log_request(
+            RequestRecord(
+                id="req-1", raw_query="first", intent_type="FOCUS", confidence=0.9
+            )
+        )
+        await writer.flush()
+
+        db = writer._get_db()
+        await db.execute("BEGIN EXCLUSIVE")
+        await db.execute(
+            "INSERT INTO requests (id, raw_query, intent_type, confidence, created_at) "
+            "VALUES ('req-2', 'second', 'FOCUS', 0.9, '2030-01-01')"
+        )
+        history = await asyncio.wait_for(reader.get_history(), timeout=1)
+        assert [h["request_id"] for h in history] == ["req-1"]
+        await db.rollback()
+        await reader.close()
+        await writer.close()
+
+
+class TestIterHistory:
+    async def _seed(self, store, requests=5, actions=3):
+        for i in range(requests):
+            await store.log_request(
+                RequestRecord(
+                    id=f"req-{i}",
+                    raw_query=f"query {i}",
+                    intent_type="UPDATE" if i % 2 else "FOCUS",
+                    confidence=0.9,
+                    created_at=datetime(2024, 1, 1 + i, tzinfo=timezone.utc),
+                )
+            )
+            for j in range(actions):
+                await store.log_action(
+                    ActionRecord(
+                        id=f"act-{i}-{j}",
+                        request_id=f"req-{i}",
+                        action_type="APT_UPGRADE" if j == 0 else "SYSTEMCTL_RESTART",
+                        description=f"step {j}",
+                        approved=j != 2,
+                    )
+                )
+
+    async def _ids(self, store, **kwargs):
+        return [
+            (row["request_id"], row["action_id"])
+            async for row in store.iter_history(**kwargs)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_limit_counts_requests_not_joined_rows(self, temp_db):
+        await self._seed(temp_db)
+        history = await temp_db.get_history(limit=2)
+        assert [h["request_id"] for h in history] == ["req-4"] * 3 + ["req-3"] * 3
+        assert [h["action_id"] for h in history[:3]] == [
+            "act-4-0",
+            "act-4-1",
+            "act-4-2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_everything_once_in_order(self, temp_db):
+        await self._seed(temp_db, requests=7, actions=1)
+        rows = await self._ids(temp_db, page_size=3)
+        assert rows == [(f"req-{i}", f"act-{i}-0") for i in range(6, -1, -1)]
+
+    @pytest.mark.asyncio
+    async def test_ties_on_created_at_broken_by_id(self, temp_db):
+        ts = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        for rid in ("b", "a", "c"):
+            await temp_db.log_request(
+                RequestRecord(
+                    id=rid,
+                    raw_query=rid,
+                    intent_type="FOCUS",
+                    confidence=0.9,
+                    created_at=ts,
+                )
+            )
+        rows = await self._ids(temp_db, page_size=1)
+        assert rows == [("c", None), ("b", None), ("a", None)]
+
+    @pytest.mark.asyncio
+    async def test_limit_across_pages(self, temp_db):
+        await self._seed(temp_db, requests=7, actions=0)
+        rows = await self._ids(temp_db, limit=5, page_size=2)
+        assert [r[0] for r in rows] == ["req-6", "req-5", "req-4", "req-3", "req-2"]
+
+    @pytest.mark.asyncio
+    async def test_intent_and_time_range_filters(self, temp_db):
+        await self._seed(temp_db, actions=0)
+        rows = await self._ids(
+            temp_db,
+            intent_type="FOCUS",
+            after=datetime(2024, 1, 1),
+            before=datetime(2024, 1, 5, tzinfo=timezone.utc),
+        )
+        assert rows == [("req-2", None)]
+
+    @pytest.mark.asyncio
+    async def test_action_filters_select_matching_actions(self, temp_db):
+        await self._seed(temp_db, requests=2)
+        await temp_db.log_request(
+            RequestRecord(id="bare", raw_query="q", intent_type="FOCUS", confidence=0.9)
+        )
+        assert await self._ids(temp_db, approved=False) == [
+            ("req-1", "act-1-2"),
+            ("req-0", "act-0-2"),
+        ]
+        rows = await self._ids(temp_db, action_type="SYSTEMCTL_RESTART", approved=True)
+        assert rows == [("req-1", "act-1-1"), ("req-0", "act-0-1")]
+
+    @pytest.mark.asyncio
+    async def test_rows_logged_mid_iteration_do_not_shift_pages(self, temp_db):
+        await self._seed(temp_db, requests=4, actions=0)
+        seen = []
+        async for row in temp_db.iter_history(page_size=2):
+            seen.append(row["request_id"])
+            if len(seen) == 1:
+                await temp_db.log_request(
+                    RequestRecord(
+                        id="late", raw_query="q", intent_type="FOCUS", confidence=0.9
+                    )
+                )
+        assert seen == ["req-3", "req-2", "req-1", "req-0"]
+
+    @pytest.mark.asyncio
+    async def test_rejects_bad_page_size(self, temp_db):
+        with pytest.raises(ValueError, match="page_size"):
+            await self._ids(temp_db, page_size=0)
+
+    @pytest.mark.asyncio
+    async def test_zero_limit_returns_nothing(self, temp_db):
+        await self._seed(temp_db, requests=1)
+        assert await temp_db.get_history(limit=0) == []
+
+    @pytest.mark.asyncio
+    async def test_uses_keyset_index(self, temp_db):
+        cursor = await temp_db._get_db().execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM requests r WHERE (r.created_at, r.id) < ('x', 'y') "
+            "ORDER BY r.created_at DESC, r.id DESC LIMIT 10"
+        )
+        plan = " ".join(row[-1] for row in await cursor.fetchall())
+        assert "idx_requests_created_at_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestSearchText:
+    async def _seed(self, store):
+        await store.log_request(
+            RequestRecord(
+                id="r1",
+                raw_query="restart nginx please",
+                intent_type="NETWORK",
+                confidence=0.9,
+            )
+        )
+        await store.log_request(
+            RequestRecord(
+                id="r2",
+                raw_query="free up memory",
+                intent_type="CLEAN_MEMORY",
+                confidence=0.9,
+            )
+        )
+        await store.log_action(
+            ActionRecord(
+                id="a1",
+                request_id="r2",
+                action_type="SYSTEMCTL_RESTART",
+                description="Restart service: nginx",
+                command="systemctl restart nginx",
+                approved=True,
+            )
+        )
+        await store.log_action(
+            ActionRecord(
+                id="a2",
+                request_id="r2",
+                action_type="DROP_CACHES",
+                description="Drop caches",
+                command="sync",
+            )
+        )
+
+    @pytest.mark.asyncio
+    async def test_matches_requests_and_actions(self, temp_db):
+        await self._seed(temp_db)
+        results = await temp_db.search_text("nginx")
+        assert {(r["request_id"], r["action_id"]) for r in results} == {
+            ("r1", None),
+            ("r2", "a1"),
+        }
+        action_hit = next(r for r in results if r["action_id"] == "a1")
+        assert action_hit["command"] == "systemctl restart nginx"
+        assert action_hit["approved"] is True
+        assert all(r["score"] > 0 for r in results)
+
+    @pytest.mark.asyncio
+    async def test_ranked_best_first_and_limited(self, temp_db):
+        await self._seed(temp_db)
+        results = await temp_db.search_text("restart nginx", limit=1)
+        assert len(results) == 1
+        assert results[0]["action_id"] == "a1"
+
+    @pytest.mark.asyncio
+    async def test_no_limit_returns_every_hit(self, temp_db):
+        await self._seed(temp_db)
+        assert len(await temp_db.search_text("nginx", limit=None)) == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("filters", "expected"),
+        [
+            ({"intent_type": "NETWORK"}, {("r1", None)}),
+            ({"action_type": "SYSTEMCTL_RESTART"}, {("r2", "a1")}),
+            ({"approved": True}, {("r2", "a1")}),
+            ({"approved": False}, set()),
+        ],
+    )
+    async def test_filters(self, temp_db, filters, expected):
+        await self._seed(temp_db)
+        results = await temp_db.search_text("nginx", **filters)
+        assert {(r["request_id"], r["action_id"]) for r in results} == expected
+
+    @pytest.mark.asyncio
+    async def test_action_filter_keeps_request_hits_with_a_matching_action(
+        self, temp_db
+    ):
+        await self._seed(temp_db)
+        results = await temp_db.search_text("memory", action_type="DROP_CACHES")
+        assert [(r["request_id"], r["action_id"]) for r in results] == [("r2", None)]
+        assert await temp_db.search_text("memory", action_type="PKG_INSTALL") == []
+
+    @pytest.mark.asyncio
+    async def test_time_bounds(self, temp_db):
+        await self._seed(temp_db)
+        await temp_db.flush()
+        db = temp_db._get_db()
+        await db.execute(
+            "UPDATE requests SET created_at = ? WHERE id = 'r1'",
+            (temp_db.timestamp_bound(datetime(2024, 1, 1, tzinfo=timezone.utc)),),
+        )
+        await db.commit()
+        cutoff = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        assert {
+            r["request_id"] for r in await temp_db.search_text("nginx", after=cutoff)
+        } == {"r2"}
+        assert {
+            r["request_id"] for r in await temp_db.search_text("nginx", before=cutoff)
+        } == {"r1"}
+
+    @pytest.mark.asyncio
+    async def test_candidates_bound_ranking_to_most_recent_matches(self, temp_db):
+        await self._seed(temp_db)
+        await temp_db.log_request(
+            RequestRecord(
+                id="r3", raw_query="nginx again", intent_type="NETWORK", confidence=0.9
+            )
+        )
+        results = await temp_db.search_text("nginx", candidates=1)
+        assert {r["request_id"] for r in results if r["action_id"] is None} == {"r3"}
+        assert {
+            r["request_id"]
+            for r in await temp_db.search_text("nginx", limit=None, candidates=1)
+        } == {"r1", "r2", "r3"}
+
+    @pytest.mark.asyncio
+    async def test_filters_apply_before_the_candidate_cap(self, temp_db):
+        old = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for i in range(6):
+            stamp = {"created_at": old} if i < 2 else {}
+            await temp_db.log_request(
+                RequestRecord(
+                    id=f"r{i}",
+                    raw_query="nginx down",
+                    intent_type="NETWORK",
+                    confidence=0.9,
+                    **stamp,
+                )
+            )
+        await temp_db.flush()
+        before = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        results = await temp_db.search_text("nginx", candidates=3, before=before)
+        assert {r["request_id"] for r in results} == {"r0", "r1"}
+
+    @pytest.mark.asyncio
+    async def test_all_terms_required(self, temp_db):
+        await self._seed(temp_db)
+        assert await temp_db.search_text("nginx caches") == []
+
+    @pytest.mark.asyncio
+    async def test_prefix_terms(self, temp_db):
+        await self._seed(temp_db)
+        results = await temp_db.search_text("mem*")
+        assert [r["request_id"] for r in results] == ["r2"]
+
+    @pytest.mark.asyncio
+    async def test_fts_syntax_is_not_interpreted(self, temp_db):
+        await self._seed(temp_db)
+        assert await temp_db.search_text('nginx" OR "memory') == []
+        assert await temp_db.search_text("apt-get NOT") == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("query", ["", "   ", "***"])
+    async def test_empty_query_returns_nothing(self, temp_db, query):
+        await self._seed(temp_db)
+        assert await temp_db.search_text(query) == []
+
+    @pytest.mark.asyncio
+    async def test_index_follows_deletes(self, temp_db):
+        await self._seed(temp_db)
+        await temp_db.flush()
+        db = temp_db._get_db()
+        await db.execute("DELETE FROM actions WHERE id = 'a1'")
+        await db.execute(
+            "UPDATE requests SET raw_query = 'reload apache' WHERE id = 'r1'"
+        )
+        await db.execute("DELETE FROM requests WHERE id = 'r2'")
+        await db.commit()
+        assert await temp_db.search_text("nginx") == []
+        assert [r["request_id"] for r in await temp_db.search_text("apache")] == ["r1"]
+
+    @pytest.mark.asyncio
+    async def test_action_update_reindexed(self, temp_db):
+        await self._seed(temp_db)
+        await temp_db.flush()
+        db = temp_db._get_db()
+        await db.execute(
+            "UPDATE actions SET command = 'systemctl reload haproxy' WHERE id = 'a1'"
+        )
+        await db.commit()
+        assert [r["action_id"] for r in await temp_db.search_text("haproxy")] == ["a1"]
+
+    @pytest.mark.asyncio
+    async def test_existing_rows_indexed_by_migration(self):
+        async with aiosqlite.connect(":memory:") as db:
+            await migrate(db, target=3)
+            await db.execute(
+                "INSERT INTO requests VALUES ('old', 'restart nginx', 'NETWORK', 0.9, '2024-01-01')"
+            )
+            await db.commit()
+            await migrate(db)
+            cursor = await db.execute(
+                "SELECT rowid FROM requests_fts WHERE requests_fts MATCH 'nginx'"
+            )
+            assert len(await cursor.fetchall()) == 1
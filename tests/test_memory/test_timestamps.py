@@ -0,0 +1,276 @@
+"""Brutal tests for the integer epoch-microsecond timestamp mode."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+from agentic.memory import timestamps
+from agentic.memory.export import AuditExporter
+from agentic.memory.integrity import AuditVerifier
+from agentic.memory.migrations import get_timestamp_format, migrate
+from agentic.memory.models import ActionRecord, ExecutionRecord, RequestRecord
+from agentic.memory.retention import RetentionManager, RetentionPolicy
+from agentic.memory.stats import AuditStats
+from agentic.memory.store import MemoryStore
+
+T0 = datetime(2024, 1, 10, 12, 30, 15, 123456, tzinfo=timezone.utc)
+KEY = b"k" * 32
+
+
+@pytest_asyncio.fixture
+async def epoch_store():
+    store = MemoryStore(":memory:", timestamp_format="epoch_us")
+    await store.initialize()
+    yield store
+    await store.close()
+
+
+async def _seed(store, request_id, created_at, latency=timedelta(milliseconds=1500)):
+    await store.log_request(
+        RequestRecord(
+            id=request_id,
+            raw_query=f"restart nginx {request_id}",
+            intent_type="NETWORK",
+            confidence=0.9,
+            created_at=created_at,
+        )
+    )
+    await store.log_action(
+        ActionRecord(
+            id=f"{request_id}-a",
+            request_id=request_id,
+            action_type="SYSTEMCTL_RESTART",
+            description="Restart nginx",
+            command="systemctl restart nginx",
+            approved=True,
+        )
+    )
+    await store.log_policy_decision(
+        f"{request_id}-a", 2, True, reason="ok", gate="safety"
+    )
+    await store.log_execution(
+        ExecutionRecord(
+            id=f"{request_id}-e",
+            action_id=f"{request_id}-a",
+            success=True,
+            output="ok",
+            executed_at=created_at + latency,
+        )
+    )
+
+
+class TestCodec:
+    def test_epoch_round_trip_keeps_microseconds(self):
+        value = timestamps.to_epoch_us(T0)
+        assert value == 1704889815123456
+        assert timestamps.from_epoch_us(value) == T0
+        assert timestamps.decode(value) == T0
+        assert timestamps.decode(T0.isoformat()) == T0
+
+    def test_naive_means_utc_and_offsets_normalise(self):
+        naive = T0.replace(tzinfo=None)
+        shifted = T0.astimezone(timezone(timedelta(hours=-5)))
+        assert (
+            timestamps.to_epoch_us(naive)
+            == timestamps.to_epoch_us(shifted)
+            == timestamps.to_epoch_us(T0)
+        )
+        assert timestamps.bound(shifted, "iso") == T0.isoformat()
+        assert timestamps.bound(naive, "epoch_us") == timestamps.to_epoch_us(T0)
+
+    def test_before_epoch(self):
+        ts = datetime(1969, 12, 31, 23, 59, 59, 500000, tzinfo=timezone.utc)
+        assert timestamps.to_epoch_us(ts) == -500000
+        assert timestamps.from_epoch_us(-500000) == ts
+
+    def test_encode_text_and_month(self):
+        assert timestamps.encode(T0, "iso") == T0.isoformat()
+        assert timestamps.encode(T0, "epoch_us") == timestamps.to_epoch_us(T0)
+        assert timestamps.to_text(timestamps.to_epoch_us(T0)) == T0.isoformat()
+        assert timestamps.to_text("2024-01-10") == "2024-01-10"
+        assert timestamps.to_text(None) is None
+        assert (
+            timestamps.month(timestamps.to_epoch_us(T0))
+            == timestamps.month(T0.isoformat())
+            == "2024-01"
+        )
+
+    def test_rejects_unknown_format(self):
+        with pytest.raises(ValueError, match="timestamp format"):
+            timestamps.check_format("unix")
+        with pytest.raises(ValueError, match="timestamp format"):
+            MemoryStore(timestamp_format="unix")
+
+
+class TestSchemaMode:
+    @pytest.mark.asyncio
+    async def test_new_database_declares_integer_columns(self, epoch_store):
+        assert epoch_store.timestamp_format == "epoch_us"
+        db = epoch_store._get_db()
+        for table, column in (
+            ("requests", "created_at"),
+            ("execution_results", "executed_at"),
+            ("policy_decisions", "created_at"),
+            ("export_watermarks", "created_at"),
+        ):
+            cursor = await db.execute(
+                f"SELECT type FROM pragma_table_info('{table}') WHERE name = ?",
+                (column,),
+            )
+            assert (await cursor.fetchone())[0] == "INTEGER"
+        cursor = await db.execute(
+            "SELECT type FROM pragma_table_info('audit_checkpoints') WHERE name = 'created_at'"
+        )
+        assert (await cursor.fetchone())[0] == "TEXT"
+
+    @pytest.mark.asyncio
+    async def test_existing_database_keeps_its_format(self, tmp_path):
+        store = MemoryStore(tmp_path / "h.db")
+        await store.initialize()
+        await store.close()
+        store = MemoryStore(tmp_path / "h.db", timestamp_format="epoch_us")
+        await store.initialize()
+        try:
+            assert store.timestamp_format == "iso"
+            await store.log_request(
+                RequestRecord(
+                    id="r", raw_query="q", intent_type="FOCUS", confidence=0.5
+                )
+            )
+            await store.flush()
+            cursor = await store._get_db().execute(
+                "SELECT typeof(created_at) FROM requests"
+            )
+            assert (await cursor.fetchone())[0] == "text"
+        finally:
+            await store.close()
+
+    @pytest.mark.asyncio
+    async def test_format_before_options_existed_is_iso(self):
+        async with aiosqlite.connect(":memory:") as db:
+            await migrate(db, target=11)
+            assert await get_timestamp_format(db) == "iso"
+            # Only a new database takes the requested format.
+            await migrate(db, timestamp_format="epoch_us")
+            assert await get_timestamp_format(db) == "iso"
+            await db.execute("DELETE FROM schema_options")
+            assert await get_timestamp_format(db) == "iso"
+
+
+class TestEpochStore:
+    @pytest.mark.asyncio
+    async def test_rows_are_integers_and_read_back_as_datetimes(self, epoch_store):
+        await _seed(epoch_store, "r1", T0)
+        await epoch_store.flush()
+        cursor = await epoch_store._get_db().execute(
+            "SELECT r.created_at, e.executed_at, typeof(p.created_at), typeof(c.created_at) FROM requests r "
+            "JOIN execution_results e JOIN policy_decisions p JOIN embeddings_cache c"
+        )
+        created, executed, decided, embedded = await cursor.fetchone()
+        assert created == timestamps.to_epoch_us(T0)
+        assert executed == created + 1_500_000
+        assert (decided, embedded) == ("integer", "integer")
+
+        record = await epoch_store.get_request("r1")
+        assert record.created_at == T0
+        assert (await epoch_store.get_execution("r1-a")).executed_at == T0 + timedelta(
+            milliseconds=1500
+        )
+        assert (
+            await epoch_store.get_execution_row("r1-a")
+        ).executed_at == T0 + timedelta(milliseconds=1500)
+        assert (await epoch_store.get_recent_rows(1))[0].created_at == T0
+
+    @pytest.mark.asyncio
+    async def test_range_scans_and_history_output(self, epoch_store):
+        for n in range(5):
+            await _seed(epoch_store, f"r{n}", T0 + timedelta(minutes=n))
+        history = await epoch_store.get_history(
+            limit=10, after=T0, before=(T0 + timedelta(minutes=4)).replace(tzinfo=None)
+        )
+        assert [h["request_id"] for h in history] == ["r3", "r2", "r1"]
+        assert history[0]["created_at"] == (T0 + timedelta(minutes=3)).isoformat()
+        pages = [
+            [r.id for r in page]
+            async for page in epoch_store.scan_request_rows(after=T0, page_size=2)
+        ]
+        assert pages == [["r1", "r2"], ["r3", "r4"]]
+        paged = [h["request_id"] async for h in epoch_store.iter_history(page_size=2)]
+        assert paged == ["r4", "r3", "r2", "r1", "r0"]
+        hit = (await epoch_store.search_text("nginx r2"))[0]
+        assert hit["created_at"] == (T0 + timedelta(minutes=2)).isoformat()
+
+    @pytest.mark.asyncio
+    async def test_chain_verifies(self, epoch_store):
+        await _seed(epoch_store, "r1", T0)
+        await epoch_store.flush()
+        report = await AuditVerifier(epoch_store, KEY).verify()
+        assert report.ok, report.problems
+
+    @pytest.mark.asyncio
+    async def test_aggregates_bucket_and_time_integers(self, epoch_store):
+        await _seed(epoch_store, "r1", T0)
+        await epoch_store.flush()
+        stats = AuditStats(epoch_store)
+        assert (await stats.total()).mean_latency_ms == pytest.approx(1500, abs=1)
+        hours = {r.key: r for r in await stats.by("hour")}
+        assert hours["2024-01-10T12"].requests == 1
+        assert hours["2024-01-10T12"].actions == 1
+
+
+class TestEpochRetentionAndExport:
+    @pytest.mark.asyncio
+    async def test_age_policy_archives_by_month(self, tmp_path):
+        store = MemoryStore(tmp_path / "h.db", timestamp_format="epoch_us")
+        await store.initialize()
+        try:
+            await _seed(store, "jan", T0)
+            await _seed(store, "feb", T0 + timedelta(days=31))
+            await _seed(store, "now", datetime.now(timezone.utc))
+            await store.log_policy_decision("denied", 5, False)
+            await store.flush()
+            db = store._get_db()
+            await db.execute(
+                "UPDATE policy_decisions SET created_at = ? WHERE action_id = 'denied'",
+                (timestamps.to_epoch_us(T0),),
+            )
+            await db.commit()
+            archive_dir = tmp_path / "archive"
+            report = await RetentionManager(
+                store, RetentionPolicy(max_age_days=30, archive_dir=archive_dir)
+            ).run()
+            assert (report.requests_removed, report.decisions_removed) == (2, 1)
+            assert report.archive_files == (
+                archive_dir / "audit-2024-01.db",
+                archive_dir / "audit-2024-02.db",
+            )
+            assert [r.id for r in await store.get_recent_context()] == ["now"]
+
+            await _seed(store, "old", T0)
+            report = await RetentionManager(
+                store, RetentionPolicy(max_db_bytes=0)
+            ).run()
+            assert report.requests_removed == 2
+        finally:
+            await store.close()
+
+    @pytest.mark.asyncio
+    async def test_incremental_export(self, epoch_store, tmp_path):
+        await _seed(epoch_store, "r1", T0)
+        exporter = AuditExporter(epoch_store, page_size=1)
+        first = await exporter.export(tmp_path / "a.jsonl.gz")
+        assert first.requests == 1
+        assert first.watermark.created_at == timestamps.to_epoch_us(T0)
+        await _seed(epoch_store, "r2", T0 + timedelta(seconds=1))
+        second = await exporter.export(tmp_path / "b.jsonl.gz")
+        assert second.requests == 1
+        with gzip.open(second.path, "rt") as f:
+            request = json.loads(f.readline())
+        assert request["id"] == "r2"
+        assert request["created_at"] == timestamps.to_epoch_us(T0) + 1_000_000
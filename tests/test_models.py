@@ -2,10 +2,23 @@
 
 from __future__ import annotations
 
+import time
+import uuid
+
 import pytest
 from pydantic import ValidationError
 
-from agentic.models.action import ActionCandidate, ActionEffect, ActionPlan, ActionResult, ActionScope, ActionSimulation, ActionType, RollbackSupport
+from agentic.models import ids
+from agentic.models.action import (
+    ActionCandidate,
+    ActionEffect,
+    ActionPlan,
+    ActionResult,
+    ActionScope,
+    ActionSimulation,
+    ActionType,
+    RollbackSupport,
+)
 from agentic.models.capability import Capability
 from agentic.models.environment import Environment
 from agentic.models.intent import Entity, IntentType, ParsedIntent
@@ -94,8 +107,14 @@ class TestParsedIntent:
 
 class TestCapabilityModel:
     def test_all_members(self):
-        expected = {"KILL_PROCESS", "SUSPEND_PROCESS", "RENICE_PROCESS",
-                    "PACKAGE_MANAGEMENT", "MEMORY_MANAGEMENT", "SERVICE_MANAGEMENT"}
+        expected = {
+            "KILL_PROCESS",
+            "SUSPEND_PROCESS",
+            "RENICE_PROCESS",
+            "PACKAGE_MANAGEMENT",
+            "MEMORY_MANAGEMENT",
+            "SERVICE_MANAGEMENT",
+        }
         assert {c.value for c in Capability} == expected
 
     def test_from_value(self):
@@ -147,7 +166,15 @@ class TestRollbackSupport:
 
 class TestActionScope:
     def test_all_members(self):
-        expected = {"PROCESS", "FILESYSTEM", "PACKAGE", "SERVICE", "MEMORY", "NETWORK", "SYSTEM"}
+        expected = {
+            "PROCESS",
+            "FILESYSTEM",
+            "PACKAGE",
+            "SERVICE",
+            "MEMORY",
+            "NETWORK",
+            "SYSTEM",
+        }
         actual = {m.value for m in ActionScope}
         assert actual == expected
 
@@ -182,10 +209,16 @@ class TestActionEffect:
 class TestActionType:
     def test_all_members_exist(self):
         expected = {
-            "KILL_PROCESS", "SUSPEND_PROCESS", "RENICE_PROCESS",
-            "APT_INSTALL", "APT_UPGRADE",
-            "DROP_CACHES", "KILL_BY_MEMORY",
-            "SYSTEMCTL_START", "SYSTEMCTL_STOP", "SYSTEMCTL_RESTART",
+            "KILL_PROCESS",
+            "SUSPEND_PROCESS",
+            "RENICE_PROCESS",
+            "APT_INSTALL",
+            "APT_UPGRADE",
+            "DROP_CACHES",
+            "KILL_BY_MEMORY",
+            "SYSTEMCTL_START",
+            "SYSTEMCTL_STOP",
+            "SYSTEMCTL_RESTART",
         }
         actual = {m.value for m in ActionType}
         assert actual == expected
@@ -310,7 +343,13 @@ class TestRiskLevel:
         assert RiskLevel.CRITICAL.value == 5
 
     def test_ordering(self):
-        assert RiskLevel.SAFE < RiskLevel.LOW < RiskLevel.MEDIUM < RiskLevel.HIGH < RiskLevel.CRITICAL
+        assert (
+            RiskLevel.SAFE
+            < RiskLevel.LOW
+            < RiskLevel.MEDIUM
+            < RiskLevel.HIGH
+            < RiskLevel.CRITICAL
+        )
 
 
 class TestPolicyDecision:
@@ -335,3 +374,47 @@ class TestPolicyDecision:
         )
         assert d.requires_sudo is True
         assert d.reason == "Too risky"
+
+
+class TestIds:
+    @pytest.fixture(autouse=True)
+    def _restore_scheme(self, monkeypatch):
+        monkeypatch.setattr(ids, "_scheme", ids.get_id_scheme())
+
+    def test_default_is_random_uuid4(self):
+        value = ParsedIntent(
+            raw_query="q", intent_type=IntentType.FOCUS, confidence=0.5
+        ).id
+        assert len(value) == 32
+        assert uuid.UUID(hex=value).version == 4
+        assert ids.id_timestamp(value) is None
+
+    def test_uuid7_ids_are_time_sortable(self):
+        ids.set_id_scheme("uuid7")
+        before = time.time()
+        values = [
+            ParsedIntent(
+                raw_query="q", intent_type=IntentType.FOCUS, confidence=0.5
+            ).id,
+            ActionCandidate(action_type=ActionType.KILL_PROCESS, description="d").id,
+            ActionPlan(intent_id="i").id,
+            *(ids.new_id() for _ in range(5000)),
+        ]
+        assert values == sorted(values)
+        assert len(set(values)) == len(values)
+        parsed = uuid.UUID(hex=values[0])
+        assert (parsed.version, parsed.variant) == (7, uuid.RFC_4122)
+        assert before - 0.001 <= ids.id_timestamp(values[0]) <= time.time() + 0.1
+
+    def test_uuid7_counter_overflow_borrows_next_millisecond(self, monkeypatch):
+        monkeypatch.setattr(ids.time, "time_ns", lambda: 1_700_000_000_000 * 1_000_000)
+        monkeypatch.setattr(ids, "_last_ms", 0)
+        values = [ids.uuid7_hex() for _ in range(0x1002)]
+        assert values == sorted(values)
+        assert ids.id_timestamp(values[0]) == 1_700_000_000.0
+        assert ids.id_timestamp(values[-1]) == 1_700_000_000.001
+
+    def test_rejects_unknown_scheme(self):
+        with pytest.raises(ValueError, match="id scheme"):
+            ids.set_id_scheme("ulid")
+        assert ids.get_id_scheme() == "uuid4"
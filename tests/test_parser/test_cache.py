@@ -0,0 +1,183 @@
+"""Brutal tests for the persistent intent cache."""
+
+from __future__ import annotations
+
+import sqlite3
+from unittest.mock import AsyncMock
+
+import pytest
+
+from agentic.models.intent import IntentType
+from agentic.parser.cache import IntentCache, cache_key, normalize_query
+from agentic.parser.intent_parser import PROMPT_VERSION, IntentParser
+from agentic.policy.confidence_gate import ConfidenceGate
+
+ANSWER = {
+    "intent_type": "CLEAN_MEMORY",
+    "confidence": 0.8,
+    "entities": [],
+    "reasoning": "free RAM",
+}
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestKeys:
+    def test_normalization(self):
+        assert normalize_query("  Free   UP memory!! ") == "free up memory"
+        assert normalize_query("free up memory") == normalize_query("FREE UP MEMORY.")
+        assert normalize_query("  kill   MyApp!! ", casefold=False) == "kill MyApp"
+
+    def test_every_part_changes_the_key(self):
+        key = cache_key("free up memory", "gpt-4o", "v1", "")
+        assert cache_key(" free up  memory.", "gpt-4o", "v1", "") == key
+        assert cache_key("kill MyApp", "gpt-4o", "v1", "") != cache_key(
+            "kill myapp", "gpt-4o", "v1", ""
+        )
+        assert (
+            len(
+                {
+                    key,
+                    cache_key("free memory", "gpt-4o", "v1", ""),
+                    cache_key("free up memory", "gpt-4o-mini", "v1", ""),
+                    cache_key("free up memory", "gpt-4o", "v2", ""),
+                    cache_key("free up memory", "gpt-4o", "v1", "Recent history: ..."),
+                }
+            )
+            == 5
+        )
+
+
+class TestIntentCache:
+    def test_round_trip_and_stats(self):
+        cache = IntentCache()
+        assert cache.get("k") is None
+        cache.put("k", ANSWER)
+        assert cache.get("k") == ANSWER
+        stats = cache.stats
+        assert (stats.hits, stats.misses, stats.size, stats.capacity) == (
+            1,
+            1,
+            1,
+            10000,
+        )
+
+    def test_entries_expire(self):
+        clock = Clock()
+        cache = IntentCache(ttl=60, clock=clock)
+        cache.put("old", ANSWER)
+        clock.now += 60
+        assert cache.get("old") is None
+        cache.put("new", ANSWER)
+        assert cache.stats.size == 1
+
+    def test_least_recently_used_is_evicted(self):
+        clock = Clock()
+        cache = IntentCache(max_entries=2, clock=clock)
+        for key in ("a", "b"):
+            clock.now += 1
+            cache.put(key, ANSWER)
+        clock.now += 1
+        assert cache.get("a") == ANSWER
+        clock.now += 1
+        cache.put("c", ANSWER)
+        assert cache.get("b") is None
+        assert cache.get("a") == cache.get("c") == ANSWER
+
+    def test_persists_across_processes(self, tmp_path):
+        path = tmp_path / "cache" / "intents.db"
+        cache = IntentCache(path)
+        cache.put("k", ANSWER)
+        cache.close()
+        cache.close()
+        assert IntentCache(path).get("k") == ANSWER
+        with sqlite3.connect(path) as db:
+            assert db.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+    def test_clear(self):
+        cache = IntentCache()
+        cache.put("k", ANSWER)
+        cache.clear()
+        assert cache.stats.size == 0
+
+    @pytest.mark.parametrize("kwargs", [{"ttl": 0}, {"max_entries": 0}])
+    def test_rejects_invalid_arguments(self, kwargs):
+        with pytest.raises(ValueError):
+            IntentCache(**kwargs)
+
+
+class TestCachedParse:
+    @pytest.fixture
+    def parser(self, mock_settings, mock_openai_response):
+        client = AsyncMock()
+        client.chat.completions.create = AsyncMock(
+            return_value=mock_openai_response(
+                {
+                    **ANSWER,
+                    "entities": [
+                        {"name": "process", "value": "chrome", "source": "chrome"}
+                    ],
+                }
+            )
+        )
+        return IntentParser(mock_settings, client=client, cache=IntentCache())
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_skips_the_model(self, parser):
+        first = await parser.parse("free up memory, kill chrome")
+        again = await parser.parse("free up memory,   kill chrome.")
+        parser._client.chat.completions.create.assert_awaited_once()
+        assert again.id != first.id
+        assert again.raw_query == "free up memory,   kill chrome."
+        assert again.model_dump(
+            include={"intent_type", "confidence", "entities", "reasoning"}
+        ) == (
+            first.model_dump(
+                include={"intent_type", "confidence", "entities", "reasoning"}
+            )
+        )
+        assert parser.cache.stats.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_context_model_and_prompt_version_are_part_of_the_key(
+        self, parser, mock_settings
+    ):
+        await parser.parse("free up memory")
+        await parser.parse(
+            "free up memory",
+            context="Recent history:\n- [FOCUS] focus (confidence: 0.9)",
+        )
+        assert parser._client.chat.completions.create.await_count == 2
+        assert parser.cache.get(
+            cache_key("free up memory", mock_settings.openai_model, PROMPT_VERSION, "")
+        )
+        assert not parser.cache.get(
+            cache_key("free up memory", "other-model", PROMPT_VERSION, "")
+        )
+
+    @pytest.mark.asyncio
+    async def test_cached_confidence_goes_through_the_gate(
+        self, parser, mock_openai_response
+    ):
+        parser._client.chat.completions.create.return_value = mock_openai_response(
+            {**ANSWER, "confidence": 0.3}
+        )
+        await parser.parse("free up memory")
+        cached = await parser.parse("free up memory")
+        assert (cached.intent_type, cached.confidence) == (IntentType.UNKNOWN, 0.3)
+        assert not ConfidenceGate().evaluate(cached).passed
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, parser):
+        parser._client.chat.completions.create.side_effect = RuntimeError(
+            "rate limited"
+        )
+        with pytest.raises(Exception, match="rate limited"):
+            await parser.parse("free up memory")
+        assert parser.cache.stats.size == 0
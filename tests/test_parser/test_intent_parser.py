@@ -1,7 +1,9 @@
-"""Brutal tests for intent_parser, schemas, and prompt_templates."""
+"""Brutal tests for intent_parser, schemas, prompt_templates and ratelimit."""
 
 from __future__ import annotations
 
+import asyncio
+import gc
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -9,6 +11,7 @@ import pytest
 
 from agentic.exceptions import ParseError
 from agentic.models.intent import IntentType
+from agentic.parser.cache import IntentCache
 from agentic.parser.intent_parser import IntentParser
 from agentic.parser.prompt_templates import SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
 from agentic.parser.schemas import INTENT_JSON_SCHEMA
@@ -44,7 +47,15 @@ class TestSchemas:
 
     def test_schema_intent_type_enum(self):
         enum_vals = INTENT_JSON_SCHEMA["schema"]["properties"]["intent_type"]["enum"]
-        assert set(enum_vals) == {"FOCUS", "UPDATE", "CLEAN_MEMORY", "OBSERVE", "NETWORK", "STORAGE", "UNKNOWN"}
+        assert set(enum_vals) == {
+            "FOCUS",
+            "UPDATE",
+            "CLEAN_MEMORY",
+            "OBSERVE",
+            "NETWORK",
+            "STORAGE",
+            "UNKNOWN",
+        }
 
     def test_schema_entities_structure(self):
         items = INTENT_JSON_SCHEMA["schema"]["properties"]["entities"]["items"]
@@ -104,7 +115,9 @@ class TestIntentParser:
         data = {
             "intent_type": "CLEAN_MEMORY",
             "confidence": 0.85,
-            "entities": [{"name": "process", "value": "electron", "source": "electron"}],
+            "entities": [
+                {"name": "process", "value": "electron", "source": "electron"}
+            ],
             "reasoning": "Free RAM",
         }
         parser._client.chat.completions.create = AsyncMock(
@@ -131,7 +144,9 @@ class TestIntentParser:
         assert result.intent_type == IntentType.UNKNOWN
 
     @pytest.mark.asyncio
-    async def test_low_confidence_falls_back_to_unknown(self, parser, mock_openai_response):
+    async def test_low_confidence_falls_back_to_unknown(
+        self, parser, mock_openai_response
+    ):
         data = {
             "intent_type": "FOCUS",
             "confidence": 0.3,
@@ -251,3 +266,213 @@ class TestIntentParser:
 
         result = await parser.parse("focus mode")
         assert result.reasoning == "User explicitly asked to focus"
+
+
+class TestParseMany:
+    @pytest.fixture
+    def parser(self, mock_settings, mock_openai_response):
+        in_flight = []
+        peak = []
+
+        async def create(**kwargs):
+            query = kwargs["messages"][1]["content"]
+            in_flight.append(query)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(query)
+            if "fail" in query:
+                raise RuntimeError("rate limited")
+            return mock_openai_response(
+                {
+                    "intent_type": "OBSERVE",
+                    "confidence": 0.9,
+                    "entities": [],
+                    "reasoning": query,
+                }
+            )
+
+        client = AsyncMock()
+        client.chat.completions.create = create
+        parser = IntentParser(
+            mock_settings.model_copy(update={"parse_concurrency": 3}), client=client
+        )
+        parser.peak = peak
+        return parser
+
+    @pytest.mark.asyncio
+    async def test_fans_out_within_the_limit_in_input_order(self, parser):
+        queries = [f"show process {i}" for i in range(10)]
+        intents = await parser.parse_many(
+            queries, contexts=[f"context {i}" for i in range(10)]
+        )
+        assert [i.raw_query for i in intents] == queries
+        assert all("context" in i.reasoning for i in intents)
+        assert max(parser.peak) == 3
+        parser.peak.clear()
+        await parser.parse_many(queries, concurrency=1)
+        assert max(parser.peak) == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_are_isolated(self, parser):
+        results = await parser.parse_many(["show disk", "fail please", "", "show cpu"])
+        assert [type(r).__name__ for r in results] == [
+            "ParsedIntent",
+            "ParseError",
+            "ParseError",
+            "ParsedIntent",
+        ]
+        assert "rate limited" in str(results[1])
+
+    @pytest.mark.asyncio
+    async def test_model_calls_take_rate_limit_tokens(
+        self, mock_settings, mock_openai_response
+    ):
+        limiter = AsyncMock()
+        client = AsyncMock()
+        client.chat.completions.create = AsyncMock(
+            return_value=mock_openai_response(
+                {
+                    "intent_type": "OBSERVE",
+                    "confidence": 0.9,
+                    "entities": [],
+                    "reasoning": "",
+                }
+            )
+        )
+        parser = IntentParser(
+            mock_settings, client=client, cache=IntentCache(), limiter=limiter
+        )
+        await parser.parse_many(["show cpu", "show cpu", "show disk"], concurrency=1)
+        assert (
+            limiter.acquire.await_count
+            == client.chat.completions.create.await_count
+            == 2
+        )
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_arguments(self, parser):
+        assert await parser.parse_many([]) == []
+        with pytest.raises(ValueError, match="contexts"):
+            await parser.parse_many(["a", "b"], contexts=["only one"])
+        with pytest.raises(ValueError, match="concurrency"):
+            await parser.parse_many(["a"], concurrency=0)
+
+
+class TestCoalescing:
+    @pytest.fixture
+    def parser(self, mock_settings, mock_openai_response):
+        release = asyncio.Event()
+
+        async def create(**kwargs):
+            await release.wait()
+            if "fail" in kwargs["messages"][1]["content"]:
+                raise RuntimeError("rate limited")
+            return mock_openai_response(
+                {
+                    "intent_type": "CLEAN_MEMORY",
+                    "confidence": 0.8,
+                    "entities": [],
+                    "reasoning": "free RAM",
+                }
+            )
+
+        client = AsyncMock()
+        client.chat.completions.create = AsyncMock(side_effect=create)
+        parser = IntentParser(mock_settings, client=client)
+        parser.release = release
+        return parser
+
+    async def _burst(self, parser, *calls):
+        tasks = [asyncio.ensure_future(parser.parse(*call)) for call in calls]
+        await asyncio.sleep(0)
+        parser.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_identical_parses_share_one_call(self, parser):
+        intents = await self._burst(
+            parser, ("free up memory",), ("free up  memory!",), ("free up memory",)
+        )
+        parser._client.chat.completions.create.assert_awaited_once()
+        assert len({i.id for i in intents}) == 3
+        assert [i.raw_query for i in intents] == [
+            "free up memory",
+            "free up  memory!",
+            "free up memory",
+        ]
+        assert {(i.intent_type, i.confidence, i.reasoning) for i in intents} == {
+            (IntentType.CLEAN_MEMORY, 0.8, "free RAM")
+        }
+        assert parser._in_flight == {}
+        await parser.parse("free up memory")
+        assert (
+            parser._client.chat.completions.create.await_count == 2
+        )  # nothing in flight, no cache
+
+    @pytest.mark.asyncio
+    async def test_different_context_is_a_different_call(self, parser):
+        await self._burst(
+            parser, ("free up memory",), ("free up memory", "Recent history: ...")
+        )
+        assert parser._client.chat.completions.create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_different_case_is_a_different_call(self, parser):
+        # The answer carries entities: "MyApp" and "myapp" are different processes.
+        await self._burst(parser, ("kill MyApp",), ("kill myapp",))
+        assert parser._client.chat.completions.create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_every_waiter_gets_the_error(self, parser):
+        results = await self._burst(parser, ("fail please",), ("fail please",))
+        parser._client.chat.completions.create.assert_awaited_once()
+        assert all(
+            isinstance(r, ParseError) and "rate limited" in str(r) for r in results
+        )
+        assert parser._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_a_cancelled_caller_does_not_cancel_the_call(self, parser):
+        first = asyncio.ensure_future(parser.parse("free up memory"))
+        second = asyncio.ensure_future(parser.parse("free up memory"))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        parser.release.set()
+        assert (await second).intent_type == IntentType.CLEAN_MEMORY
+        assert first.cancelled()
+        parser._client.chat.completions.create.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_a_call_every_caller_abandoned_is_cleaned_up(self, parser):
+        loop = asyncio.get_running_loop()
+        reported = []
+        loop.set_exception_handler(
+            lambda _, context: reported.append(context["message"])
+        )
+        try:
+            callers = [
+                asyncio.ensure_future(parser.parse("fail please")) for _ in range(2)
+            ]
+            await asyncio.sleep(0)
+            call = parser._in_flight[next(iter(parser._in_flight))]
+            for caller in callers:
+                caller.cancel()
+            await asyncio.gather(*callers, return_exceptions=True)
+            parser.release.set()
+            await asyncio.wait([call])
+            assert parser._in_flight == {}
+            del call, callers, caller
+            gc.collect()
+            assert reported == []
+        finally:
+            loop.set_exception_handler(None)
+
+    @pytest.mark.asyncio
+    async def test_a_cancelled_call_is_forgotten(self, parser):
+        caller = asyncio.ensure_future(parser.parse("free up memory"))
+        await asyncio.sleep(0)
+        parser._in_flight[next(iter(parser._in_flight))].cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        assert parser._in_flight == {}
@@ -0,0 +1,264 @@
+"""Brutal tests for the nearest-neighbour intent classifier."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agentic.memory.embeddings import HashingEmbedder
+from agentic.memory.models import RequestRecord
+from agentic.models.intent import Entity, IntentType
+from agentic.parser.knn import KnnClassifier, KnnEvaluation, evaluate
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+SPOTIFY = [Entity(name="process", value="spotify", source="spotify")]
+
+
+def _trained(**kwargs):
+    model = KnnClassifier(**kwargs)
+    for query in (
+        "free up some memory",
+        "please free up memory",
+        "free memory now",
+        "memory is full",
+    ):
+        model.learn(query, "CLEAN_MEMORY", 0.95, [])
+    for query in (
+        "update all packages",
+        "update the system now",
+        "please update everything",
+    ):
+        model.learn(query, "UPDATE", 0.9, [])
+    return model
+
+
+def _answer(intent):
+    return intent and intent.model_dump(
+        include={"intent_type", "confidence", "entities", "reasoning"}
+    )
+
+
+async def _log(
+    store, queries, intent_type="CLEAN_MEMORY", confidence=0.95, start=0, entities=()
+):
+    for i, query in enumerate(queries, start):
+        await store.log_request(
+            RequestRecord(
+                id=f"r{i}",
+                raw_query=query,
+                intent_type=intent_type,
+                confidence=confidence,
+                created_at=T0 + timedelta(minutes=i),
+                entities=None if entities is None else list(entities),
+            )
+        )
+
+
+class TestKnnClassifier:
+    def test_answers_from_agreeing_neighbours(self):
+        intent = _trained().classify("Free up memory please!")
+        assert intent.intent_type == IntentType.CLEAN_MEMORY
+        assert intent.raw_query == "Free up memory please!"
+        assert intent.entities == []
+        assert 0.85 <= intent.confidence <= 0.95
+        assert intent.reasoning.endswith("similar past request(s) were CLEAN_MEMORY")
+
+    def test_unseen_words_go_to_the_model(self):
+        model = _trained()
+        assert model.classify("suspend vlc") is None
+        assert model.classify("free up memory by killing firefox") is None
+        assert model.classify("...") is None
+
+    def test_distant_or_split_neighbours_go_to_the_model(self):
+        assert _trained(min_similarity=1.0).classify("free memory please") is None
+        model = _trained()
+        model.learn("free memory now please", "UPDATE", 0.95)
+        model.learn("memory now please", "UPDATE", 0.95)
+        assert model.classify("free memory now please") is None
+
+    def test_exact_queries_reuse_learned_entities(self):
+        model = _trained()
+        assert model.learn("suspend spotify", "FOCUS", 0.95, SPOTIFY)
+        intent = model.classify("Suspend Spotify.")
+        assert (intent.intent_type, intent.entities) == (IntentType.FOCUS, SPOTIFY)
+        assert model.classify("suspend vlc") is None
+
+    def test_unknown_entities_go_to_the_model(self):
+        model = KnnClassifier()
+        for query in (
+            "suspend vlc now",
+            "please suspend vlc",
+            "suspend vlc please",
+            "suspend spotify",
+        ):
+            model.learn(query, "FOCUS", 0.95)
+        # Without a known process this would suspend every default distraction.
+        assert model.classify("suspend vlc") is None
+        model.learn(
+            "suspend vlc please", "FOCUS", 0.95, [Entity(name="process", value="vlc")]
+        )
+        assert model.classify("suspend vlc now") is None
+        assert model.classify("Suspend VLC please").entities[0].value == "vlc"
+
+    def test_learn_skips_unconfident_and_unknown_labels(self):
+        model = KnnClassifier()
+        assert not model.learn("free up memory", "CLEAN_MEMORY", 0.5)
+        assert not model.learn("what", "UNKNOWN", 0.99)
+        assert not model.learn("!!!", "FOCUS", 0.99)
+        assert len(model) == 0
+
+    def test_repeated_query_takes_its_latest_label(self):
+        model = KnnClassifier()
+        model.learn("free up memory", "CLEAN_MEMORY", 0.9)
+        model.learn("Free up memory!", "STORAGE", 0.95, [])
+        model.learn("free up memory", "STORAGE", 0.9)
+        assert len(model) == 1
+        intent = model.classify("free up memory")
+        assert (intent.intent_type, intent.confidence, intent.entities) == (
+            IntentType.STORAGE,
+            0.9,
+            [],
+        )
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"k": 0},
+            {"min_similarity": 1.5},
+            {"min_agreement": -0.1},
+            {"min_confidence": 2.0},
+            {"min_token_count": 0},
+        ],
+    )
+    def test_rejects_invalid_arguments(self, kwargs):
+        with pytest.raises(ValueError):
+            KnnClassifier(**kwargs)
+
+
+class TestTraining:
+    @pytest.mark.asyncio
+    async def test_update_learns_only_new_rows(self, temp_db):
+        model = KnnClassifier()
+        await _log(temp_db, ["free up memory", "free up memory", "free some memory"])
+        assert await model.update(temp_db) == 3
+        assert (len(model), model.trained_until) == (2, T0 + timedelta(minutes=2))
+        assert await model.update(temp_db) == 0
+        await _log(temp_db, ["update everything"], "UPDATE", start=3)
+        await _log(temp_db, ["maybe update"], "UPDATE", confidence=0.4, start=4)
+        assert await model.update(temp_db) == 1
+        assert model.trained_until == T0 + timedelta(minutes=4)
+
+    @pytest.mark.asyncio
+    async def test_update_learns_logged_entities(self, temp_db):
+        await _log(
+            temp_db, ["free up some memory", "please free up memory", "free memory now"]
+        )
+        await _log(temp_db, ["suspend spotify"], "FOCUS", start=3, entities=SPOTIFY)
+        await _log(temp_db, ["memory is full", "memory is low"], start=4, entities=None)
+        model = KnnClassifier(min_token_count=1)
+        await model.update(temp_db)
+        assert model.classify("free up memory").entities == []
+        assert model.classify("suspend spotify").entities == SPOTIFY
+        # Rows logged before entities were vote but never back an answer.
+        assert model.classify("memory is low") is None
+
+    def test_changed_until_saved(self, tmp_path):
+        model = KnnClassifier()
+        assert not model.changed
+        model.learn("free up memory", "CLEAN_MEMORY", 0.4)
+        assert not model.changed
+        model.learn("free up memory", "CLEAN_MEMORY", 0.95, [])
+        assert model.changed
+        model.save(tmp_path / "m.npz")
+        assert not model.changed
+        assert not KnnClassifier.load(tmp_path / "m.npz").changed
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        model = _trained(embedder=HashingEmbedder(dim=64))
+        model.learn("suspend spotify", "FOCUS", 0.95, SPOTIFY)
+        model.trained_until = T0
+        path = tmp_path / "models" / "intents.knn.npz"
+        model.save(path)
+        assert not path.with_name(path.name + ".part").exists()
+        loaded = KnnClassifier.load(path)
+        assert (len(loaded), loaded.trained_until, loaded._embedder.dim) == (
+            len(model),
+            T0,
+            64,
+        )
+        assert KnnClassifier.load(path, min_confidence=0.5).min_confidence == 0.5
+        for query in ("free memory please", "suspend spotify", "update everything now"):
+            assert _answer(loaded.classify(query)) == _answer(model.classify(query))
+        assert loaded.classify("suspend vlc") is None
+
+    def test_empty_model_round_trip(self, tmp_path):
+        KnnClassifier().save(tmp_path / "m.npz")
+        loaded = KnnClassifier.load(tmp_path / "m.npz")
+        assert (len(loaded), loaded.trained_until) == (0, None)
+        assert loaded.classify("free up memory") is None
+
+
+class TestEvaluate:
+    @pytest.mark.asyncio
+    async def test_scores_the_newest_requests(self, temp_db):
+        await _log(
+            temp_db,
+            [
+                "free up memory",
+                "free some memory",
+                "free up some memory",
+                "clear some memory",
+                "clear up memory",
+                "please free up memory",
+                "Free up memory!",
+                "clear some memory",
+                "suspend vlc",
+            ],
+        )
+        await _log(temp_db, ["memory?"], "UNKNOWN", start=9)
+        report = await evaluate(temp_db, KnnClassifier(), holdout=1 / 3)
+        assert report == KnnEvaluation(trained=6, tested=3, answered=2, correct=2)
+        assert report.to_dict() == {
+            "trained": 6,
+            "tested": 3,
+            "answered": 2,
+            "correct": 2,
+            "coverage": 2 / 3,
+            "accuracy": 1.0,
+        }
+
+    @pytest.mark.asyncio
+    async def test_scores_what_classify_answers(self, temp_db):
+        queries = [
+            "free up memory",
+            "free some memory",
+            "free up some memory",
+            "clear some memory",
+            "clear up memory",
+            "please free up memory",
+        ]
+        # Logged before entities were: the label vote agrees, but classify cannot answer.
+        await _log(temp_db, queries + ["Free up memory!"], entities=None)
+        assert await evaluate(temp_db, KnnClassifier(), holdout=1 / 7) == KnnEvaluation(
+            6, 1, 0, 0
+        )
+
+    @pytest.mark.asyncio
+    async def test_answers_with_other_entities_are_wrong(self, temp_db):
+        await _log(temp_db, ["suspend spotify"] * 3, "FOCUS", entities=SPOTIFY)
+        await _log(temp_db, ["suspend spotify"], "FOCUS", start=3, entities=[])
+        assert await evaluate(temp_db, KnnClassifier(), holdout=0.25) == KnnEvaluation(
+            3, 1, 1, 0
+        )
+
+    @pytest.mark.asyncio
+    async def test_empty_log(self, temp_db):
+        report = await evaluate(temp_db, KnnClassifier())
+        assert (report.coverage, report.accuracy) == (0.0, 0.0)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("holdout", [0.0, 1.0])
+    async def test_rejects_invalid_holdout(self, temp_db, holdout):
+        with pytest.raises(ValueError, match="holdout"):
+            await evaluate(temp_db, KnnClassifier(), holdout=holdout)
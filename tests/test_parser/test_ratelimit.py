@@ -0,0 +1,52 @@
+"""Brutal tests for the token-bucket rate limiter."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agentic.parser.ratelimit import TokenBucket
+
+
+class FakeTime:
+    """A clock that ``sleep`` advances instead of waiting."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_bursts_then_paces(self):
+        time = FakeTime()
+        bucket = TokenBucket(rate=2.0, capacity=3, clock=time, sleep=time.sleep)
+        for _ in range(5):
+            await bucket.acquire()
+        assert time.sleeps == [0.5, 0.5]
+        time.now += 10
+        for _ in range(3):
+            await bucket.acquire()
+        assert len(time.sleeps) == 2  # refilled, but only up to capacity
+        await bucket.acquire()
+        assert time.sleeps[2:] == [0.5]
+
+    @pytest.mark.asyncio
+    async def test_waiters_share_the_rate(self):
+        time = FakeTime()
+        bucket = TokenBucket(rate=10.0, clock=time, sleep=time.sleep)
+        await asyncio.gather(*(bucket.acquire() for _ in range(11)))
+        assert time.now == pytest.approx(1.0)
+
+    @pytest.mark.parametrize("kwargs", [{"rate": 0}, {"rate": 1, "capacity": 0}])
+    def test_rejects_invalid_arguments(self, kwargs):
+        with pytest.raises(ValueError):
+            TokenBucket(**kwargs)
@@ -0,0 +1,235 @@
+"""Brutal tests for the local rule classifier and the tiered parser."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from agentic.exceptions import ParseError
+from agentic.models.intent import Entity, IntentType, ParsedIntent
+from agentic.parser.knn import KnnClassifier
+from agentic.parser.rules import RULE_CONFIDENCE, RuleClassifier
+from agentic.parser.tiered import TieredParser, TierStats
+
+
+def _classify(query):
+    intent = RuleClassifier().classify(query)
+    return intent and (intent.intent_type, [(e.name, e.value) for e in intent.entities])
+
+
+class TestRuleClassifier:
+    @pytest.mark.parametrize(
+        ("query", "expected"),
+        [
+            ("suspend spotify", (IntentType.FOCUS, [("process", "spotify")])),
+            (
+                "Please pause Slack, discord and spotify.",
+                (
+                    IntentType.FOCUS,
+                    [
+                        ("process", "Slack"),
+                        ("process", "discord"),
+                        ("process", "spotify"),
+                    ],
+                ),
+            ),
+            (
+                "suspend firefox, chrome, and MyApp",
+                (
+                    IntentType.FOCUS,
+                    [
+                        ("process", "firefox"),
+                        ("process", "chrome"),
+                        ("process", "MyApp"),
+                    ],
+                ),
+            ),
+            ("focus mode", (IntentType.FOCUS, [])),
+            ("sudo apt update && sudo apt upgrade -y", (IntentType.UPDATE, [])),
+            ("update everything", (IntentType.UPDATE, [])),
+            ("apt-get install -y htop", (IntentType.UPDATE, [("package", "htop")])),
+            ("Free up memory!", (IntentType.CLEAN_MEMORY, [])),
+            (
+                "free memory by killing chrome",
+                (IntentType.CLEAN_MEMORY, [("process", "chrome")]),
+            ),
+            ("show running processes", (IntentType.OBSERVE, [])),
+            ("status of nginx", (IntentType.OBSERVE, [("service", "nginx")])),
+            ("ping example.com", (IntentType.NETWORK, [("host", "example.com")])),
+            ("flush dns cache", (IntentType.NETWORK, [])),
+            ("df -h", (IntentType.STORAGE, [])),
+            (
+                "umount /mnt/usb-1",
+                (IntentType.STORAGE, [("mount_point", "/mnt/usb-1")]),
+            ),
+        ],
+    )
+    def test_unambiguous_requests(self, query, expected):
+        assert _classify(query) == expected
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "kill chrome",  # FOCUS or CLEAN_MEMORY
+            "don't suspend spotify",
+            "suspend spotify and update everything",
+            "suspend everything",
+            "install updates",
+            "suspend $(rm -rf ~)",
+            "apt install htop; reboot",
+            "suspend slack for 10 minutes",
+            "suspend firefox and kill chrome",
+            "install vim and then reboot",
+            "install vim and reboot",
+            "suspend slack now",
+            "suspend firefox chrome",
+            "ping 1234",
+            "restart nginx",
+            "",
+        ],
+    )
+    def test_anything_else_falls_through(self, query):
+        assert RuleClassifier().classify(query) is None
+
+    def test_intent_fields(self):
+        intent = RuleClassifier().classify("Suspend Spotify")
+        assert intent.raw_query == "Suspend Spotify"
+        assert intent.confidence == RULE_CONFIDENCE
+        assert (intent.entities[0].value, intent.entities[0].source) == (
+            "Spotify",
+            "Spotify",
+        )
+        assert intent.reasoning == "Matched the local FOCUS grammar"
+
+    def test_rules_of_two_intents_matching_is_ambiguous(self):
+        grammar = {
+            IntentType.FOCUS: (r"close (?P<process>\w+)",),
+            IntentType.CLEAN_MEMORY: (r"close \w+",),
+        }
+        assert RuleClassifier(grammar).classify("close chrome") is None
+        assert RuleClassifier({IntentType.FOCUS: grammar[IntentType.FOCUS]}).classify(
+            "close chrome"
+        )
+
+
+class TestTieredParser:
+    @pytest.fixture
+    def fallback(self):
+        parser = AsyncMock()
+        parser.parse.return_value = ParsedIntent(
+            raw_query="restart nginx", intent_type=IntentType.OBSERVE, confidence=0.7
+        )
+        return parser
+
+    @pytest.mark.asyncio
+    async def test_local_tier_answers_without_the_model(self, fallback):
+        parser = TieredParser(fallback)
+        intent = await parser.parse("suspend spotify", context="ignored")
+        assert intent.intent_type == IntentType.FOCUS
+        fallback.parse.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_with_context(self, fallback):
+        parser = TieredParser(fallback)
+        intent = await parser.parse("restart nginx", context="Recent history")
+        assert intent is fallback.parse.return_value
+        fallback.parse.assert_awaited_once_with("restart nginx", "Recent history")
+
+    @pytest.mark.asyncio
+    async def test_per_tier_hit_rate(self, fallback):
+        parser = TieredParser(fallback)
+        assert parser.stats.hit_rate("local") == 0.0
+        for query in ("suspend spotify", "apt upgrade", "df -h", "restart nginx"):
+            await parser.parse(query)
+        stats = parser.stats
+        assert (stats.local, stats.llm, stats.total) == (3, 1, 4)
+        assert stats.hit_rate("local") == 0.75
+        assert stats.to_dict() == {
+            "total": 4,
+            "local": 3,
+            "knn": 0,
+            "llm": 1,
+            "local_hit_rate": 0.75,
+            "knn_hit_rate": 0.0,
+            "llm_hit_rate": 0.25,
+        }
+        with pytest.raises(ValueError, match="tier"):
+            stats.hit_rate("cache")
+        assert TierStats() == TierStats(local=0, knn=0, llm=0)
+
+    @pytest.mark.asyncio
+    async def test_knn_tier_learns_confident_model_answers(self, fallback):
+        knn = KnnClassifier()
+        parser = TieredParser(fallback, knn=knn)
+        await parser.parse("restart nginx")
+        assert len(knn) == 0  # 0.7 is not confident enough to learn
+        fallback.parse.return_value = ParsedIntent(
+            raw_query="suspend vlc",
+            intent_type=IntentType.FOCUS,
+            confidence=0.95,
+            entities=[Entity(name="process", value="vlc")],
+        )
+        await parser.parse("could you suspend vlc for me")
+        intent = await parser.parse("Could you suspend VLC for me?")
+        assert (intent.intent_type, intent.entities[0].value) == (
+            IntentType.FOCUS,
+            "vlc",
+        )
+        assert fallback.parse.await_count == 2
+        assert (parser.stats.knn, parser.stats.llm) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_knn_tier_without_rules(self, fallback):
+        knn = KnnClassifier()
+        knn.learn(
+            "please suspend spotify",
+            "FOCUS",
+            0.95,
+            [Entity(name="process", value="spotify")],
+        )
+        parser = TieredParser(fallback, knn=knn, rules=False)
+        intent = await parser.parse("please suspend spotify")
+        assert intent.intent_type == IntentType.FOCUS
+        await parser.parse(
+            "suspend vlc"
+        )  # a rule would answer this; the model does instead
+        fallback.parse.assert_awaited_once_with("suspend vlc", "")
+        assert (parser.stats.local, parser.stats.knn, parser.stats.llm) == (0, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_parse_many_sends_only_the_rest_to_the_model(self, fallback):
+        answer = ParsedIntent(
+            raw_query="could you suspend vlc for me",
+            intent_type=IntentType.FOCUS,
+            confidence=0.95,
+            entities=[Entity(name="process", value="vlc")],
+        )
+        error = ParseError("rate limited")
+        fallback.parse_many.return_value = [answer, error]
+        knn = KnnClassifier()
+        parser = TieredParser(fallback, knn=knn)
+        results = await parser.parse_many(
+            ["suspend spotify", "could you suspend vlc for me", " ", "restart nginx"],
+            contexts=["a", "b", "c", "d"],
+            concurrency=2,
+        )
+        fallback.parse_many.assert_awaited_once_with(
+            ["could you suspend vlc for me", "restart nginx"], ["b", "d"], concurrency=2
+        )
+        assert results[0].intent_type == IntentType.FOCUS
+        assert results[1] is answer
+        assert isinstance(results[2], ParseError)
+        assert results[3] is error
+        assert len(knn) == 1
+        assert (parser.stats.local, parser.stats.llm) == (1, 2)
+        with pytest.raises(ValueError, match="contexts"):
+            await parser.parse_many(["a"], contexts=[])
+
+    @pytest.mark.asyncio
+    async def test_empty_query(self, fallback):
+        with pytest.raises(ParseError, match="Empty"):
+            await TieredParser(fallback).parse("   ")
+
+    def test_exposes_the_fallback_cache(self, fallback):
+        assert TieredParser(fallback).cache is fallback.cache